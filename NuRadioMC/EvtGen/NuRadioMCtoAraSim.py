@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function
 import numpy as np
 from NuRadioReco.utilities import units
+from NuRadioMC.utilities import categorical
 import argparse
 import h5py
 
@@ -20,7 +21,7 @@ AraStationDep = args.avgDepth / units.m
 event_ids = fin['event_ids']
 flavors = np.array(fin['flavors'])
 energies = np.array(fin['energies'])
-ccncs = np.array(fin['interaction_type'])
+ccncs = categorical.read_strings(fin, 'interaction_type')
 xx = np.array(fin['xx'])
 yy = np.array(fin['yy'])
 zz = np.array(fin['zz'])
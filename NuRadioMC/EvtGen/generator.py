@@ -4,6 +4,7 @@ import numpy as np
 import NuRadioMC
 from NuRadioReco.utilities import units
 from NuRadioMC.utilities import inelasticities
+from NuRadioMC.utilities import categorical
 from NuRadioMC.utilities import version
 from six import iterkeys, iteritems
 from scipy import constants
@@ -524,8 +525,9 @@ def write_events_to_hdf5(filename, data_sets, attributes, n_events_per_file=None
         for key in data_sets:
             data_sets[key] = np.array(data_sets[key])
         for key, value in data_sets.items():
-            if value.dtype.kind == 'U':
-                fout[key] = [np.char.encode(c, 'utf8') for c in value[start_index:stop_index]]
+            if value.dtype.kind in ['U', 'S']:
+                # string columns are stored as integer codes
+                categorical.write(fout, key, value[start_index:stop_index])
             else:
                 fout[key] = value[start_index:stop_index]
 
@@ -759,6 +761,139 @@ def draw_zeniths(n_events, full_rmax, full_zmax, full_zmin, thetamin, thetamax):
     return np.array(zeniths)
 
 
+def get_importance_sampling_radius(energies, radius=2 * units.km, slope=0.3):
+    """
+    returns the energy dependent radial scale of the importance sampling of the vertex positions
+
+    The scale follows a power law in energy, scale = radius * (E / 1 EeV) ** slope, which mimics the growth of the
+    maximum distance at which a neutrino interaction can trigger the detector.
+
+    Parameters
+    ----------
+    energies: float or array of floats
+        the neutrino energies
+    radius: float
+        the radial scale at 1 EeV
+    slope: float
+        the power law index of the radial scale
+
+    Returns
+    -------
+    float or array of floats: the radial scale
+    """
+    return radius * (np.asarray(energies) / units.EeV) ** slope
+
+
+def get_importance_sampling_weights(xx, yy, sigmas, station_positions, rmin, rmax, uniform_fraction):
+    """
+    returns the ratio of the uniform vertex density and the density of the importance sampling
+
+    The proposal density is a mixture of a uniform distribution in the area of the cylinder (fraction
+    `uniform_fraction`) and one two dimensional gaussian per station (truncated to the cylinder area).
+
+    Parameters
+    ----------
+    xx: array of floats
+        the x coordinates of the vertices
+    yy: array of floats
+        the y coordinates of the vertices
+    sigmas: array of floats
+        the width of the gaussians of each vertex (see `get_importance_sampling_radius`)
+    station_positions: array of floats
+        the (x, y) positions of the stations
+    rmin: float
+        the inner radius of the cylinder
+    rmax: float
+        the outer radius of the cylinder
+    uniform_fraction: float
+        the fraction of the vertices that is drawn uniformly in the cylinder
+
+    Returns
+    -------
+    array of floats: the sampling weights (mean 1 for vertices drawn from the proposal density)
+    """
+    from scipy.stats import ncx2
+    area = np.pi * (rmax ** 2 - rmin ** 2)
+    station_positions = np.atleast_2d(station_positions)
+    density = np.zeros(len(xx))
+    for x_station, y_station in station_positions[:, :2]:
+        d2 = (xx - x_station) ** 2 + (yy - y_station) ** 2
+        # the probability that the gaussian of this station is within the cylinder area
+        nc = (x_station ** 2 + y_station ** 2) / sigmas ** 2
+        norm = ncx2.cdf(rmax ** 2 / sigmas ** 2, 2, nc) - ncx2.cdf(rmin ** 2 / sigmas ** 2, 2, nc)
+        density += np.exp(-0.5 * d2 / sigmas ** 2) / (2 * np.pi * sigmas ** 2 * norm)
+    density = uniform_fraction / area + (1 - uniform_fraction) * density / len(station_positions)
+    return 1. / (area * density)
+
+
+def draw_vertices_importance_sampling(energies, station_positions, rmin, rmax, radius=2 * units.km, slope=0.3,
+                                      uniform_fraction=0.2):
+    """
+    draws the horizontal vertex positions from a proposal density concentrated around the stations
+
+    A fraction `uniform_fraction` of the vertices is drawn uniformly in the area of the cylinder, the others from
+    two dimensional gaussians around randomly selected stations with an energy dependent width
+    (see `get_importance_sampling_radius`). Vertices outside of the cylinder are drawn again from the same mixture
+    component (uniform or the gaussian of the same station), such that every gaussian is truncated to the cylinder
+    area with its own normalization as assumed by `get_importance_sampling_weights`.
+
+    Parameters
+    ----------
+    energies: array of floats
+        the neutrino energies (one vertex per energy is drawn)
+    station_positions: array of floats
+        the (x, y) positions of the stations
+    rmin: float
+        the inner radius of the cylinder
+    rmax: float
+        the outer radius of the cylinder
+    radius: float
+        the radial scale at 1 EeV
+    slope: float
+        the power law index of the radial scale
+    uniform_fraction: float
+        the fraction of the vertices that is drawn uniformly, guarantees that the sampling weights are smaller than
+        1 / uniform_fraction
+
+    Returns
+    -------
+    xx: array of floats
+    yy: array of floats
+    sampling_weights: array of floats
+        the ratio of the uniform density and the proposal density. The effective volume is calculated with the
+        product of the event weights and the sampling weights.
+    """
+    station_positions = np.atleast_2d(station_positions)[:, :2]
+    n_events = len(energies)
+    sigmas = get_importance_sampling_radius(energies, radius, slope)
+    xx = np.zeros(n_events)
+    yy = np.zeros(n_events)
+    # the mixture component (uniform or the gaussian of a station) of every vertex is fixed before the rejection loop
+    all_uniform = np.random.uniform(size=n_events) < uniform_fraction
+    all_stations = station_positions[np.random.randint(0, len(station_positions), n_events)]
+    todo = np.ones(n_events, dtype=bool)
+    while(np.any(todo)):
+        n = np.sum(todo)
+        uniform = all_uniform[todo]
+        stations = all_stations[todo]
+        rr = np.sqrt(np.random.uniform(rmin ** 2, rmax ** 2, n))
+        phiphi = np.random.uniform(0, 2 * np.pi, n)
+        x = rr * np.cos(phiphi)
+        y = rr * np.sin(phiphi)
+        x_gauss = stations[:, 0] + np.random.normal(0, 1, n) * sigmas[todo]
+        y_gauss = stations[:, 1] + np.random.normal(0, 1, n) * sigmas[todo]
+        x[~uniform] = x_gauss[~uniform]
+        y[~uniform] = y_gauss[~uniform]
+        r2 = x ** 2 + y ** 2
+        inside = (r2 >= rmin ** 2) & (r2 <= rmax ** 2)
+        indices = np.flatnonzero(todo)[inside]
+        xx[indices] = x[inside]
+        yy[indices] = y[inside]
+        todo[indices] = False
+    sampling_weights = get_importance_sampling_weights(xx, yy, sigmas, station_positions, rmin, rmax, uniform_fraction)
+    return xx, yy, sampling_weights
+
+
 def generate_surface_muons(filename, n_events, Emin, Emax,
                            fiducial_rmin, fiducial_rmax, fiducial_zmin, fiducial_zmax,
                            full_rmin=None, full_rmax=None, full_zmin=None, full_zmax=None,
@@ -1074,7 +1209,11 @@ def generate_eventlist_cylinder(filename, n_events, Emin, Emax,
                                 deposited=False,
                                 proposal=False,
                                 proposal_config='SouthPole',
-                                start_file_id=0):
+                                start_file_id=0,
+                                station_positions=None,
+                                importance_radius=2 * units.km,
+                                importance_slope=0.3,
+                                importance_uniform_fraction=0.2):
     """
     Event generator
 
@@ -1171,6 +1310,18 @@ def generate_eventlist_cylinder(filename, n_events, Emin, Emax,
     start_file_id: int (default 0)
         in case the data set is distributed over several files, this number specifies the id of the first file
         (useful if an existing data set is extended)
+    station_positions: array of floats or None (default)
+        if set, the vertex positions are drawn from a proposal density concentrated around the (x, y) positions of the
+        stations instead of uniformly in the cylinder (importance sampling). The ratio of the uniform and the proposal
+        density is saved as data set 'sampling_weights', which is taken into account by `Veff.get_Veff`.
+        See `draw_vertices_importance_sampling` for details.
+    importance_radius: float (default 2km)
+        the width of the proposal density around the stations at 1 EeV (only used if `station_positions` is set)
+    importance_slope: float (default 0.3)
+        the width of the proposal density scales with the neutrino energy as (E / 1 EeV) ** importance_slope
+    importance_uniform_fraction: float (default 0.2)
+        the fraction of the vertices that is still drawn uniformly in the cylinder, this limits the sampling weights
+        to 1 / importance_uniform_fraction
     """
     if proposal:
         from NuRadioMC.EvtGen.NuRadioProposal import ProposalFunctions
@@ -1231,6 +1382,11 @@ def generate_eventlist_cylinder(filename, n_events, Emin, Emax,
     attributes['phimin'] = phimin
     attributes['phimax'] = phimax
     attributes['deposited'] = deposited
+    if(station_positions is not None):
+        attributes['importance_station_positions'] = np.atleast_2d(station_positions)[:, :2]
+        attributes['importance_radius'] = importance_radius
+        attributes['importance_slope'] = importance_slope
+        attributes['importance_uniform_fraction'] = importance_uniform_fraction
 
     data_sets = {}
     # generate neutrino vertices randomly
@@ -1239,14 +1395,13 @@ def generate_eventlist_cylinder(filename, n_events, Emin, Emax,
     data_sets["zeniths"] = np.arccos(np.random.uniform(np.cos(thetamax), np.cos(thetamin), n_events))
 
     logger.debug("generating vertex positions")
-    rr_full = np.random.triangular(full_rmin, full_rmax, full_rmax, n_events)
-    phiphi = np.random.uniform(0, 2 * np.pi, n_events)
-    data_sets["xx"] = rr_full * np.cos(phiphi)
-    data_sets["yy"] = rr_full * np.sin(phiphi)
+    if(station_positions is None):
+        rr_full = np.random.triangular(full_rmin, full_rmax, full_rmax, n_events)
+        phiphi = np.random.uniform(0, 2 * np.pi, n_events)
+        data_sets["xx"] = rr_full * np.cos(phiphi)
+        data_sets["yy"] = rr_full * np.sin(phiphi)
     data_sets["zz"] = np.random.uniform(full_zmin, full_zmax, n_events)
 
-    fmask = (rr_full >= fiducial_rmin) & (rr_full <= fiducial_rmax) & (data_sets["zz"] >= fiducial_zmin) & (data_sets["zz"] <= fiducial_zmax)  # fiducial volume mask
-
     logger.debug("generating event ids")
     data_sets["event_ids"] = np.arange(n_events) + start_event_id
     logger.debug("generating number of interactions")
@@ -1328,6 +1483,16 @@ def generate_eventlist_cylinder(filename, n_events, Emin, Emax,
                                 data_sets["flavors"], data_sets["inelasticity"])]
         data_sets["energies"] = np.array(data_sets["energies"])
 
+    if(station_positions is not None):
+        # the vertex positions are drawn after the energies because the proposal density depends on the energy
+        logger.debug("generating vertex positions (importance sampling)")
+        data_sets["xx"], data_sets["yy"], data_sets["sampling_weights"] = draw_vertices_importance_sampling(
+            data_sets["energies"], station_positions, full_rmin, full_rmax, importance_radius, importance_slope,
+            importance_uniform_fraction)
+        rr_full = (data_sets["xx"] ** 2 + data_sets["yy"] ** 2) ** 0.5
+
+    fmask = (rr_full >= fiducial_rmin) & (rr_full <= fiducial_rmax) & (data_sets["zz"] >= fiducial_zmin) & (data_sets["zz"] <= fiducial_zmax)  # fiducial volume mask
+
     data_sets_fiducial = {}
 
     if proposal:
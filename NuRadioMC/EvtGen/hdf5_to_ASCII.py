@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function
 import numpy as np
 from NuRadioReco.utilities import units
+from NuRadioMC.utilities import categorical
 import argparse
 import h5py
 
@@ -16,7 +17,7 @@ fin = h5py.File(args.hdf5input, 'r')
 event_ids = fin['event_ids']
 flavors = fin['flavors']
 energies = fin['energies']
-ccncs = fin['interaction_type']
+ccncs = categorical.read_strings(fin, 'interaction_type')
 xx = fin['xx']
 yy = fin['yy']
 zz = fin['zz']
@@ -218,7 +218,7 @@ class ARZ(object):
         self._interp_factor2 = interp_factor
 
     def get_time_trace(self, shower_energy, theta, N, dt, shower_type, n_index, R, shift_for_xmax=False,
-                       same_shower=False, iN=None, output_mode='trace', maximum_angle=20*units.deg):
+                       same_shower=False, iN=None, output_mode='trace', maximum_angle=20*units.deg, random_state=None):
         """
         calculates the electric-field Askaryan pulse from a charge-excess profile
 
@@ -261,6 +261,8 @@ class ARZ(object):
         maximum_angle: float
             Maximum angular difference allowed between the observer angle and the Cherenkov angle.
             If the difference is greater, the function returns an empty trace.
+        random_state: None or numpy.random.RandomState
+            if not None, the shower realization is drawn from this generator instead of the generator of the class
 
         Returns: array of floats
             array of electric-field time trace in 'on-sky' coordinate system eR, eTheta, ePhi
@@ -288,6 +290,9 @@ class ARZ(object):
         profiles = self._library[shower_type][energies[iE]]
         N_profiles = len(profiles['charge_excess'])
 
+        random_generator = self._random_generator
+        if(random_state is not None):
+            random_generator = random_state
         if(iN is None):
             if(same_shower):
                 if(shower_type in self._random_numbers):
@@ -295,11 +300,11 @@ class ARZ(object):
                     logger.info("using previously used shower {}/{}".format(iN, N_profiles))
                 else:
                     logger.warning("no previous random number for shower type {} exists. Generating a new random number.".format(shower_type))
-                    iN = self._random_generator.randint(N_profiles)
+                    iN = random_generator.randint(N_profiles)
                     self._random_numbers[shower_type] = iN
                     logger.info("picking profile {}/{} randomly".format(iN, N_profiles))
             else:
-                iN = self._random_generator.randint(N_profiles)
+                iN = random_generator.randint(N_profiles)
                 self._random_numbers[shower_type] = iN
                 logger.info("picking profile {}/{} randomly".format(iN, N_profiles))
         else:
@@ -13,7 +13,7 @@ def set_log_level(level):
 
 
 def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, interp_factor=None, interp_factor2=None,
-                   same_shower=False, seed=None, **kwargs):
+                   same_shower=False, seed=None, random_state=None, **kwargs):
     """
     returns the Askaryan pulse in the time domain of the eTheta component
 
@@ -58,6 +58,9 @@ def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, interp_
         more details
     seed: None or int
         the random seed for the Askaryan modules
+    random_state: None or numpy.random.RandomState
+        if not None, the random numbers of the Askaryan modules (e.g. the shower realization) are drawn from this
+        generator instead of the module wide generator that is seeded with `seed`
 
     Returns
     -------
@@ -68,7 +71,8 @@ def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, interp_
     if(energy == 0):
         return np.zeros(N)
     if model in par.get_parametrizations():
-        return par.get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, seed=seed, same_shower=same_shower)
+        return par.get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, seed=seed, same_shower=same_shower,
+                                  random_state=random_state)
     elif(model == 'HCRB2017'):
         from NuRadioMC.SignalGen import HCRB2017
         is_em_shower = None
@@ -93,7 +97,8 @@ def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, interp_
 
         if(interp_factor2 is not None):
             gARZ.set_interpolation_factor2(interp_factor2)
-        return gARZ.get_time_trace(energy, theta, N, dt, shower_type, n_index, R, same_shower=same_shower, **kwargs)[1]
+        return gARZ.get_time_trace(energy, theta, N, dt, shower_type, n_index, R, same_shower=same_shower,
+                                   random_state=random_state, **kwargs)[1]
 
     elif(model == 'spherical'):
         amplitude = 1. * energy / R
@@ -104,6 +109,73 @@ def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, interp_
         raise NotImplementedError("model {} unknown".format(model))
 
 
+def has_amplitude_upper_bound(model):
+    """
+    returns True if an upper bound of the pulse amplitude can be calculated for the model, see `get_amplitude_upper_bound`
+    """
+    return model == 'spherical' or model in ['ZHS1992', 'Alvarez2000', 'Alvarez2009']
+
+
+def get_amplitude_upper_bound(energy, theta, n_index, R, model, frequencies, attenuation=None, shower_type=None):
+    """
+    returns an upper bound of the maximum absolute amplitude of the Askaryan pulse
+
+    The bound is calculated without generating the pulse from the frequency spectrum of the model, including its
+    own angular dependence (see `parametrizations.get_spectrum_upper_bound`). The maximum amplitude in the time
+    domain is bounded by the sum of the absolute values of the frequency spectrum, i.e., by assuming that all
+    frequency components are in phase. The models without an analytic frequency spectrum (HCRB2017, ARZ2019 and
+    ARZ2020) have no bound, infinity is returned.
+
+    Parameters
+    ----------
+    energy : float
+        energy of the shower
+    theta: float
+        viewangle: angle between shower axis (neutrino direction) and the line
+        of sight between interaction and detector
+    n_index: float
+        index of refraction at interaction vertex
+    R: float
+        distance from vertex to observer
+    model: string
+        specifies the signal model (see `get_time_trace` for a list of models)
+    frequencies: array of floats
+        the frequencies of the (equally spaced) frequency spectrum the pulse would be simulated with
+    attenuation: array of floats or None (default)
+        optional attenuation factor for each frequency. Needs to be an upper bound of the true attenuation
+        factors to keep the estimate conservative.
+    shower_type: string or None (default)
+        type of shower, either "HAD" (hadronic) or "EM" (electromagnetic). If None, the larger bound of both
+        shower types is returned.
+
+    Returns
+    -------
+    max_amplitude: float
+        the upper bound of the maximum absolute amplitude of the eTheta component
+    """
+    if(energy == 0):
+        return 0.
+    if(attenuation is None):
+        attenuation = np.ones_like(frequencies)
+    if(model == 'spherical'):
+        return 1. * energy / R * np.max(attenuation)
+    if(not has_amplitude_upper_bound(model)):
+        return np.inf
+    if(shower_type is None):
+        return max([get_amplitude_upper_bound(energy, theta, n_index, R, model, frequencies, attenuation, tmp_shower_type)
+                    for tmp_shower_type in ["HAD", "EM"]])
+    mask = frequencies > 0
+    freqs = frequencies[mask]
+    df = freqs[1] - freqs[0]
+    try:
+        spectrum = par.get_spectrum_upper_bound(energy, theta, freqs, shower_type, n_index, model)
+    except NotImplementedError:
+        return np.inf
+    # the factor 0.5 of the ZHS fourier transform normalization cancels with the factor of 2
+    # of the negative frequencies
+    return np.sum(spectrum * attenuation[mask]) * df / R
+
+
 def get_frequency_spectrum(energy, theta, N, dt, shower_type, n_index, R, model, **kwargs):
     """
     returns the complex amplitudes of the frequency spectrum of the neutrino radio signal
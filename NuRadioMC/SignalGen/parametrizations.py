@@ -30,7 +30,8 @@ def get_parametrizations():
     return ['ZHS1992', 'Alvarez2000', 'Alvarez2009', 'Alvarez2012']
 
 
-def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, seed=None, same_shower=False, average_shower=False):
+def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, seed=None, same_shower=False, average_shower=False,
+                   random_state=None):
     """
     returns the Askaryan pulse in the time domain of the eTheta component
 
@@ -70,6 +71,9 @@ def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, seed=No
         signal for both ray tracing solutions from the same shower.
     average_shower: bool (default False)
         if True, for the Alvarez2009 model electromagnetic showers, no random shower is generated, but the average shower is choosen. 
+    random_state: None or numpy.random.RandomState
+        if not None, the random numbers are drawn from this generator instead of the module wide generator of the
+        model (which is seeded with `seed` on first use)
 
     Returns
     -------
@@ -79,6 +83,9 @@ def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, seed=No
     """
     if(model not in _random_generators):
         _random_generators[model] = np.random.RandomState(seed)
+    random_generator = _random_generators[model]
+    if(random_state is not None):
+        random_generator = random_state
     if(model == 'ZHS1992'):
         """ Parametrization from E. Zas, F. Halzen, and T. Stanev, Phys. Rev. D 45, 362 (1992)."""
         freqs = np.fft.rfftfreq(N, dt)
@@ -156,7 +163,7 @@ def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, seed=No
 
             
                 else:
-                    _Alvarez2009_k_L = 10 ** _random_generators[model].normal(log10_k_L_bar, sigma_k_L)
+                    _Alvarez2009_k_L = 10 ** random_generator.normal(log10_k_L_bar, sigma_k_L)
                     k_L = _Alvarez2009_k_L
                 if(average_shower):
                     k_L = 10**log10_k_L_bar
@@ -265,3 +272,103 @@ def get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, seed=No
 
     else:
         raise NotImplementedError("model {} unknown".format(model))
+
+
+def get_spectrum_upper_bound(energy, theta, freqs, shower_type, n_index, model):
+    """
+    returns an upper bound of the absolute value of the frequency spectrum of the parametrizations
+
+    The spectrum is returned in the convention of the ZHS code (before the factor 0.5 of the ZHS fourier transform
+    normalization) and at a distance of R = 1, i.e., the maximum absolute amplitude of the pulse in the time domain
+    is bounded by sum(spectrum) * df / R (all frequency components in phase). The angular dependence of each model
+    is used. For the random shower realizations of electromagnetic showers of the Alvarez2009 model, the shortest
+    shower (5 standard deviations of the elongation factor), i.e., the widest Cherenkov cone, is assumed.
+
+    Parameters
+    ----------
+    energy : float
+        energy of the shower
+    theta: float
+        viewangle: angle between shower axis (neutrino direction) and the line
+        of sight between interaction and detector
+    freqs: array of floats
+        the (positive) frequencies
+    shower_type: string
+        type of shower, either "HAD" (hadronic) or "EM" (electromagnetic)
+    n_index: float
+        index of refraction at interaction vertex
+    model: string
+        the parametrization, see `get_time_trace`
+
+    Returns
+    -------
+    spectrum: array of floats
+        the upper bound of the absolute amplitude for each frequency
+    """
+    cherenkov_angle = np.arccos(1. / n_index)
+    if(model == 'ZHS1992'):
+        vv0 = freqs / (0.5 * units.GHz)
+        return 1.1e-7 * energy / units.TeV * vv0 * 1. / (1 + 0.4 * (vv0) ** 2) * \
+            np.exp(-0.5 * ((theta - cherenkov_angle) / (2.4 * units.deg / vv0)) ** 2) * units.V / units.MHz
+
+    elif(model == 'Alvarez2009'):
+        E_C = 73.1 * units.MeV
+        rho = 0.924 * units.g / units.cm ** 3
+        X_0 = 36.08 * units.g / units.cm ** 2
+        R_M = 10.57 * units.g / units.cm ** 2
+        c = constants.c * units.m / units.s
+        log10_E_0 = np.log10(energy / units.eV)
+        if(shower_type == 'HAD'):
+            k_E_bar = 4.13e-16 * units.V / units.cm / units.MHz ** 2 * np.abs(np.tanh((log10_E_0 - 10.60) / 2.54))
+            k_L = 31.25 * (energy / (1.e15 * units.eV)) ** 3.01e-2
+            beta = 2.57
+            k_R_bar = 2.73 + np.tanh((12.92 - log10_E_0) / 1.72)
+        elif(shower_type == 'EM'):
+            k_E_bar = 4.65e-16 * units.V / units.cm / units.MHz ** 2
+            if (log10_E_0 < 14.99):
+                sigma_k_L = 3.39e-2
+            else:
+                sigma_k_L = 3.39e-2 + 2.25e-2 * (log10_E_0 - 14.99)
+            if (log10_E_0 < 16.61):
+                log10_k_L_bar = 1.52 + 5.59e-2 * (log10_E_0 - 16.61)
+            else:
+                log10_k_L_bar = 1.52 + 0.39 * (log10_E_0 - 16.61)
+            k_L = 10 ** (log10_k_L_bar - 5 * sigma_k_L)
+            beta = 2.74
+            k_R_bar = 1.54
+        else:
+            raise NotImplementedError("shower type {} is not implemented in Alvarez2009 model.".format(shower_type))
+        nu_L = rho / k_L / X_0 * c / max(np.abs(1 - n_index * np.cos(theta)), 1.e-8)
+        nu_R = rho / k_R_bar / R_M * c / np.sqrt(n_index ** 2 - 1)
+        return k_E_bar * energy / E_C * X_0 / rho * np.sin(theta) * freqs / (1 + (freqs / nu_L) ** beta) / \
+            (1 + (freqs / nu_R) ** 1.27)
+
+    elif(model == 'Alvarez2000'):
+        f0 = 1.15 * units.GHz
+        E = 2.53e-7 * energy / units.TeV * freqs / f0 / (1 + (freqs / f0) ** 1.44)
+        E *= units.V / units.MHz
+        E *= np.sin(theta) / np.sin(cherenkov_angle)
+        if(shower_type == "EM"):
+            Elpm = 2e15 * units.eV
+            dTheta = 2.7 * units.deg * 500 * units.MHz / freqs * (Elpm / (0.14 * energy + Elpm)) ** 0.3
+            return E * np.exp(-np.log(2) * ((theta - cherenkov_angle) / dTheta) ** 2)
+        elif(shower_type == "HAD"):
+            epsilon = np.log10(energy / units.TeV)
+            if(epsilon < 0):
+                return np.zeros_like(freqs)
+            elif(epsilon <= 2):
+                dTheta = 500 * units.MHz / freqs * (2.07 - 0.33 * epsilon + 7.5e-2 * epsilon ** 2) * units.deg
+            elif(epsilon <= 5):
+                dTheta = 500 * units.MHz / freqs * (1.74 - 1.21e-2 * epsilon) * units.deg
+            elif(epsilon <= 7):
+                dTheta = 500 * units.MHz / freqs * (4.23 - 0.785 * epsilon + 5.5e-2 * epsilon ** 2) * units.deg
+            else:
+                dTheta = 500 * units.MHz / freqs * (4.23 - 0.785 * 7 + 5.5e-2 * 7 ** 2) * (1 + (epsilon - 7) * 0.075) * units.deg
+            # missing energy factor of hadronic showers
+            f_epsilon = -1.27e-2 - 4.76e-2 * (epsilon + 3) - 2.07e-3 * (epsilon + 3) ** 2 + 0.52 * np.sqrt(epsilon + 3)
+            return E * np.exp(-np.log(2) * ((theta - cherenkov_angle) / dTheta) ** 2) * np.abs(f_epsilon)
+        else:
+            raise NotImplementedError("shower type {} not implemented in {} Askaryan module".format(shower_type, model))
+
+    else:
+        raise NotImplementedError("model {} unknown".format(model))
@@ -2,6 +2,7 @@ from __future__ import absolute_import, division, print_function
 import numpy as np
 import time
 import copy
+import os
 from scipy.optimize import fsolve, minimize, basinhopping, root
 from scipy import optimize, integrate, interpolate
 import scipy.constants
@@ -17,26 +18,72 @@ from NuRadioMC.utilities import attenuation as attenuation_util
 import logging
 logging.basicConfig()
 
-# check if CPP implementation is available
-cpp_available = False
+logger = logging.getLogger('analyticraytracing')
+
+# the implementation of the core functions of the ray tracer (backend) is selected when the first ray tracing
+# object is created, see `set_backend`
+backends = ['cpp', 'numba', 'python']
+_backend = None
+cpp_available = False  # True if the CPP implementation is used
+numba_available = False  # True if the numba implementation is used
+wrapper = None
+numba_analytic_raytracing = None
+
+
+def set_backend(backend="auto"):
+    """
+    selects the implementation of the core functions of the analytic ray tracer
+
+    The backend modules are only imported by this function. If no backend is set explicitly, the backend
+    specified in the environment variable `NURADIOMC_RAYTRACING_BACKEND` (default 'auto') is selected when the
+    first ray tracing object is created.
+
+    Parameters
+    ----------
+    backend: string
+        * 'cpp': the C++ implementation, needs to be compiled once after the installation with
+          `nuradiomc-build-raytracer` (see `NuRadioMC.SignalProp.build_extension`)
+        * 'numba': the numba-compiled python implementation (requires numba)
+        * 'python': the pure python implementation
+        * 'auto': the first available backend of 'cpp', 'numba' and 'python'
+
+    Returns
+    -------
+    backend: string
+        the selected backend
+    """
+    global _backend, cpp_available, numba_available, wrapper, numba_analytic_raytracing
+    if(backend == 'auto'):
+        for tmp_backend in ['cpp', 'numba']:
+            try:
+                return set_backend(tmp_backend)
+            except ImportError:
+                logger.debug(f"{tmp_backend} backend of the ray tracer is not available")
+        backend = 'python'
+    if(backend == 'cpp'):
+        from NuRadioMC.SignalProp.CPPAnalyticRayTracing import wrapper as cpp_wrapper
+        wrapper = cpp_wrapper
+    elif(backend == 'numba'):
+        from NuRadioMC.SignalProp import numba_analytic_raytracing as numba_module
+        numba_analytic_raytracing = numba_module
+    elif(backend != 'python'):
+        raise ValueError(f"unknown ray tracing backend {backend}, available backends are {backends}")
+    _backend = backend
+    cpp_available = backend == 'cpp'
+    numba_available = backend == 'numba'
+    logger.info(f"using {backend} backend of the analytic ray tracer")
+    return backend
+
+
+def get_backend():
+    """
+    returns the backend of the analytic ray tracer (the default backend is selected if it was not set yet),
+    see `set_backend`
+    """
+    if(_backend is None):
+        set_backend(os.environ.get('NURADIOMC_RAYTRACING_BACKEND', 'auto'))
+    return _backend
 
-try:
-    from NuRadioMC.SignalProp.CPPAnalyticRayTracing import wrapper
-    cpp_available = True
-    print("using CPP version of ray tracer")
-except:
-    print("trying to compile the CPP extension on-the-fly")
-    try:
-        import subprocess
-        import os
-        subprocess.call(os.path.join(os.path.dirname(os.path.abspath(__file__)),
-                                 "install.sh"))
-        from NuRadioMC.SignalProp.CPPAnalyticRayTracing import wrapper
-        cpp_available = True
-        print("compilation was sucessful, using CPP version of ray tracer")
-    except:
-        print("compilation was not sucessful, using python version of ray tracer")
-        cpp_available = False
 
 """
 analytic ray tracing solution
@@ -48,6 +95,150 @@ solution_types = {1: 'direct',
                   3: 'reflected'}
 
 
+# results of the solution existence pre-classifier (see `classify_solution_existence`)
+solution_existence_types = {0: 'no solution',
+                            1: 'solution expected',
+                            2: 'uncertain'}
+
+
+def get_maximum_horizontal_distance(z1, z2, medium, n_points=64):
+    """
+    returns the maximum horizontal distance between two points at which a ray tracing solution exists
+
+    A ray with the Snell invariant p = n(z) sin(theta) turns at the depth where n(z) = p (or is reflected at the
+    surface if p < n(0)). A point at depth z2 is reached by rays with p <= n(z2), the horizontal distance
+    of a refracted ray is the sum of the horizontal distances from z1 and from z2 to the turning point.
+    The maximum distance over p in [n(0), n(z2)] is determined on a grid of `n_points` values of p
+    (which slightly underestimates the maximum). All smaller distances are reached by a refracted or reflected
+    ray. Bottom reflections are not considered. The function is vectorized in z1 and z2.
+
+    Parameters
+    ----------
+    z1: float or array of floats
+        depth of the first point (needs to be below the surface)
+    z2: float or array of floats
+        depth of the second point (needs to be below the surface)
+    medium: medium class
+        class describing the (exponential) index-of-refraction profile
+    n_points: int
+        the number of grid points in p
+
+    Returns
+    -------
+    distance: float or array of floats
+        the maximum horizontal distance
+    """
+    z1 = np.minimum(z1, 0)
+    z2 = np.minimum(z2, 0)
+    z_high = np.maximum(z1, z2)[..., np.newaxis]
+    z_low = np.minimum(z1, z2)[..., np.newaxis]
+    gamma_high = medium.delta_n * np.exp(z_high / medium.z_0)
+    gamma_low = medium.delta_n * np.exp(z_low / medium.z_0)
+    n_surface = medium.n_ice - medium.delta_n
+    b = 2 * medium.n_ice
+
+    def get_distance(p):
+        c = medium.n_ice ** 2 - p ** 2
+        gamma_turn = medium.n_ice - p
+
+        def get_y(gamma):  # analytic ray path (see `ray_tracing_2D.get_y`) for C_0 = 1 / p and C_1 = 0
+            root = np.abs(gamma ** 2 - gamma * b + c)
+            logargument = gamma / (2 * c ** 0.5 * root ** 0.5 - b * gamma + 2 * c)
+            return medium.z_0 * (medium.n_ice ** 2 / p ** 2 - 1) ** -0.5 * np.log(logargument)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_turn = get_y(gamma_turn)
+            distance = (y_turn - get_y(gamma_low)) + (y_turn - get_y(gamma_high))
+        return np.where(np.isnan(distance), -np.inf, distance)
+
+    # the grid is denser close to n(z_high) where the maximum typically is
+    t = np.linspace(0, 1, n_points)
+    p = n_surface + (medium.n_ice - gamma_high - n_surface) * (1 - (1 - t) ** 2)
+    distance = get_distance(p)
+    # refine the grid around the maximum
+    iMax = np.argmax(distance, axis=-1)[..., np.newaxis]
+    p_start = np.take_along_axis(p, np.maximum(iMax - 1, 0), axis=-1)
+    p_stop = np.take_along_axis(p, np.minimum(iMax + 1, n_points - 1), axis=-1)
+    p_fine = p_start + (p_stop - p_start) * t
+    return np.maximum(np.max(distance, axis=-1), np.max(get_distance(p_fine), axis=-1))
+
+
+def classify_solution_existence(x1s, x2s, medium, n_reflections=0, margin=0.01, min_margin=1 * units.m):
+    """
+    decides for many pairs of points, without solving for the ray paths, if ray tracing solutions exist
+
+    A pair of points has no solution if the horizontal distance is larger than the maximum range of the
+    refracted rays (see `get_maximum_horizontal_distance`), i.e., if one point is in the shadow zone of the other.
+    If the distance is smaller, at least one (refracted or reflected) solution exists. Pairs close to the boundary
+    (within the relative `margin` or `min_margin`) are classified as uncertain, as are pairs above the ice surface
+    and all shadow zone pairs if bottom reflections are simulated.
+
+    Parameters
+    ----------
+    x1s: array of shape (N, 3)
+        the start points of the rays
+    x2s: array of shape (N, 3)
+        the stop points of the rays
+    medium: medium class
+        class describing the (exponential) index-of-refraction profile
+    n_reflections: int (default 0)
+        the number of bottom reflections that are simulated
+    margin: float
+        the relative distance to the shadow zone boundary below which a pair is classified as uncertain
+    min_margin: float
+        the minimal absolute distance to the shadow zone boundary below which a pair is classified as uncertain
+
+    Returns
+    -------
+    classification: array of ints
+        the classification of each pair (see `solution_existence_types`)
+        * 0: no solution possible
+        * 1: a direct, refracted or reflected solution is expected
+        * 2: uncertain
+    """
+    x1s = np.atleast_2d(x1s)
+    x2s = np.atleast_2d(x2s)
+    d = np.linalg.norm(x2s[:, :2] - x1s[:, :2], axis=-1)
+    d_max = get_maximum_horizontal_distance(x1s[:, 2], x2s[:, 2], medium)
+    delta = np.maximum(margin * d_max, min_margin)
+    classification = np.full(len(d), 2, dtype=int)
+    classification[d < d_max - delta] = 1
+    if(not n_reflections or getattr(medium, "reflection", None) is None):
+        classification[d > d_max + delta] = 0
+    classification[(x1s[:, 2] > 0) | (x2s[:, 2] > 0)] = 2
+    return classification
+
+
+# the number of solutions for which the attenuation was calculated and the total number of reference
+# frequencies (i.e. numerical integrations per path segment), see `ray_tracing_2D.get_attenuation_reference_points`
+attenuation_statistics = {'n_solutions': 0, 'n_integrations': 0}
+
+
+def interpolate_attenuation(frequency, freqs, attenuations):
+    """
+    interpolates the attenuation of all path segments from the reference frequencies
+
+    Parameters
+    ----------
+    frequency: array of floats
+        the frequencies for which the attenuation is calculated
+    freqs: array of floats
+        the reference frequencies
+    attenuations: 2dim array of floats
+        the attenuation factor of each path segment at the reference frequencies
+
+    Returns
+    -------
+    attenuation: array of floats
+        the attenuation factor of the full path (product of all segments)
+    """
+    mask = frequency > 0
+    attenuation = np.ones_like(frequency)
+    for tmp in attenuations:
+        attenuation[mask] *= np.interp(frequency[mask], freqs, tmp)
+    return attenuation
+
+
 @lru_cache(maxsize=32)
 def get_z_deep(ice_params):
     """
@@ -73,7 +264,8 @@ class ray_tracing_2D():
     def __init__(self, medium, attenuation_model="SP1",
                  log_level=logging.WARNING,
                  n_frequencies_integration=25,
-                 use_optimized_start_values=False):
+                 use_optimized_start_values=False,
+                 attenuation_tolerance=None, attenuation_table=None):
         """
         initialize 2D analytic ray tracing class
 
@@ -90,8 +282,18 @@ class ray_tracing_2D():
         use_optimized_start_value: bool
             if True, the initial C_0 paramter (launch angle) is set to the ray that skims the surface
             (default: False)
-
-        """
+        attenuation_tolerance: float or None
+            if set, the reference frequencies of the attenuation calculation are determined adaptively such that the
+            estimated error of the linearly interpolated attenuation factor is below this value
+            (see `get_adaptive_attenuation_reference_points`). If None (default), `n_frequencies_integration`
+            equally spaced reference frequencies are used.
+        attenuation_table: attenuation_table or None
+            optional table of the depth-cumulative attenuation integrals of the ice and attenuation model
+            (see `NuRadioMC.SignalProp.attenuation_table`). If set, the attenuation of the path segments is obtained from
+            table lookups instead of a numerical integration along the path.
+
+        """
+        get_backend()
         self.medium = medium
         if(not hasattr(self.medium, "reflection")):
             self.medium.reflection = None
@@ -105,6 +307,9 @@ class ray_tracing_2D():
         self.__logger.setLevel(log_level)
         self.__n_frequencies_integration = n_frequencies_integration
         self.__use_optimized_start_values = use_optimized_start_values
+        self.__attenuation_tolerance = attenuation_tolerance
+        self.__max_attenuation_frequencies = 64
+        self.__attenuation_table = attenuation_table
 
     def n(self, z):
         """
@@ -321,12 +526,17 @@ class ray_tracing_2D():
             points = None
             if(x1[1] < z_turn and z_turn < x2_mirrored[1]):
                 points = [z_turn]
-            path_length = integrate.quad(self.ds, x1[1], x2_mirrored[1], args=(C_0), points=points, epsabs=1e-4, epsrel=1.49e-08, limit=50)
+            if(numba_available):
+                path_length = numba_analytic_raytracing.integrate_path(numba_analytic_raytracing.PATH_LENGTH, x1[1], x2_mirrored[1], C_0,
+                                                                       self.medium.n_ice, self.medium.delta_n, self.medium.z_0,
+                                                                       epsabs=1e-4, epsrel=1.49e-08, limit=50)
+            else:
+                path_length = integrate.quad(self.ds, x1[1], x2_mirrored[1], args=(C_0), points=points, epsabs=1e-4, epsrel=1.49e-08, limit=50)[0]
             self.__logger.info("calculating path length ({}) from ({:.0f}, {:.0f}) to ({:.2f}, {:.2f}) = ({:.2f}, {:.2f}) = {:.2f} m".format(solution_types[self.determine_solution_type(x1, x2, C_0)], x1[0], x1[1], x2[0], x2[1],
                                                                                                                                         x2_mirrored[0],
                                                                                                                                         x2_mirrored[1],
-                                                                                                                                        path_length[0] / units.m))
-            tmp += path_length[0]
+                                                                                                                                        path_length / units.m))
+            tmp += path_length
         return tmp
 
     def get_path_length_analytic(self, x1, x2, C_0, reflection=0, reflection_case=1):
@@ -442,10 +652,15 @@ class ray_tracing_2D():
             points = None
             if(x1[1] < z_turn and z_turn < x2_mirrored[1]):
                 points = [z_turn]
-            travel_time = integrate.quad(dt, x1[1], x2_mirrored[1], args=(C_0), points=points, epsabs=1e-10, epsrel=1.49e-08, limit=500)
+            if(numba_available):
+                travel_time = numba_analytic_raytracing.integrate_path(numba_analytic_raytracing.TRAVEL_TIME, x1[1], x2_mirrored[1], C_0,
+                                                                       self.medium.n_ice, self.medium.delta_n, self.medium.z_0,
+                                                                       epsabs=1e-10, epsrel=1.49e-08, limit=500)
+            else:
+                travel_time = integrate.quad(dt, x1[1], x2_mirrored[1], args=(C_0), points=points, epsabs=1e-10, epsrel=1.49e-08, limit=500)[0]
             self.__logger.info("calculating travel time from ({:.0f}, {:.0f}) to ({:.0f}, {:.0f}) = ({:.0f}, {:.0f}) = {:.2f} ns".format(
-                x1[0], x1[1], x2[0], x2[1], x2_mirrored[0], x2_mirrored[1], travel_time[0] / units.ns))
-            tmp += travel_time[0]
+                x1[0], x1[1], x2[0], x2[1], x2_mirrored[0], x2_mirrored[1], travel_time / units.ns))
+            tmp += travel_time
         return tmp
 
     def get_travel_time_analytic(self, x1, x2, C_0, reflection=0, reflection_case=1):
@@ -558,8 +773,34 @@ class ray_tracing_2D():
             return freqs
 
     def get_attenuation_along_path(self, x1, x2, C_0, frequency, max_detector_freq, reflection=0, reflection_case=1):
-        tmp_attenuation = None
-        output = f"calculating attenuation for n_ref = {reflection:d}: "
+        freqs, attenuations = self.get_attenuation_reference_points(x1, x2, C_0, frequency, max_detector_freq,
+                                                                    reflection=reflection, reflection_case=reflection_case)
+        return interpolate_attenuation(frequency, freqs, attenuations)
+
+    def get_attenuation_reference_points(self, x1, x2, C_0, frequency, max_detector_freq, reflection=0, reflection_case=1,
+                                         start_frequencies=None):
+        """
+        calculates the attenuation of each path segment at the reference frequencies
+
+        The attenuation is only calculated for a few reference frequencies and linearly interpolated
+        for all other frequencies, see `interpolate_attenuation`. The reference frequencies are either
+        `n_frequencies_integration` equally spaced frequencies or, if an `attenuation_tolerance` is set,
+        determined adaptively (see `get_adaptive_attenuation_reference_points`).
+
+        Parameters
+        ----------
+        start_frequencies: array of floats or None
+            only used in the adaptive mode: the reference frequencies of another solution of the same pair of points
+            that are used as start values of the refinement
+
+        Returns
+        -------
+        freqs: array of floats
+            the reference frequencies
+        attenuations: 2dim array of floats
+            the attenuation factor of each path segment at the reference frequencies
+        """
+        segments = []
         for iS, segment in enumerate(self.get_path_segments(x1, x2, C_0, reflection, reflection_case)):
             if(iS == 0 and reflection_case == 2):  # we can only integrate upward going rays, so if the ray starts downwardgoing, we need to mirror
                 x11, x1, x22, x2, C_0, C_1 = segment
@@ -571,17 +812,114 @@ class ray_tracing_2D():
                 x1 = x1t
             else:
                 x11, x1, x22, x2, C_0, C_1 = segment
+            segments.append((x1, x2, C_0))
+
+        if(self.__attenuation_tolerance is None):
+            freqs = self.__get_frequencies_for_attenuation(frequency, max_detector_freq)
+            attenuations = self.__get_segment_attenuations(segments, freqs)
+        else:
+            freqs, attenuations = self.get_adaptive_attenuation_reference_points(segments, frequency, max_detector_freq,
+                                                                                 start_frequencies)
+        attenuation_statistics['n_solutions'] += 1
+        attenuation_statistics['n_integrations'] += len(freqs)
+        iF = len(freqs) // 3
+        self.__logger.info(f"calculating attenuation for n_ref = {reflection:d} at {len(freqs):d} frequencies: " +
+                           ", ".join([f"path segment {iS:d} -> {tmp[iF]:.2g} at {freqs[iF]/units.MHz:.0f} MHz" for iS, tmp in enumerate(attenuations)]))
+        return freqs, attenuations
+
+    def get_adaptive_attenuation_reference_points(self, segments, frequency, max_detector_freq, start_frequencies=None):
+        """
+        determines the reference frequencies of the attenuation adaptively
+
+        The refinement starts with four log-spaced frequencies up to `max_detector_freq` (plus the maximum frequency)
+        or with `start_frequencies`. The error of the linear interpolation in each frequency interval is estimated from
+        the second divided differences of the neighboring reference points (|f''| h^2 / 8). Intervals with an error above
+        `attenuation_tolerance` (10x the tolerance above `max_detector_freq`) are bisected until the estimated error of
+        all intervals is below the tolerance or the maximum number of reference frequencies is reached.
+
+        Parameters
+        ----------
+        segments: list of tuples
+            the (x1, x2, C_0) of the path segments
+        frequency: array of floats
+            the frequencies for which the attenuation is calculated
+        max_detector_freq: float or None
+            the maximum frequency of the final detector sampling
+        start_frequencies: array of floats or None
+            the start values of the reference frequencies
 
+        Returns
+        -------
+        freqs: array of floats
+            the reference frequencies
+        attenuations: 2dim array of floats
+            the attenuation factor of each path segment at the reference frequencies
+        """
+        mask = frequency > 0
+        fmin = frequency[mask].min()
+        fmax = frequency[mask].max()
+        if(np.sum(mask) <= 4):
+            freqs = frequency[mask]
+            return freqs, self.__get_segment_attenuations(segments, freqs)
+        if(start_frequencies is not None):
+            freqs = np.unique(np.concatenate(([fmin, fmax], start_frequencies[(start_frequencies > fmin) & (start_frequencies < fmax)])))
+        else:
+            f_band = fmax
+            if(max_detector_freq is not None):
+                f_band = min(max(max_detector_freq, fmin), fmax)
+            freqs = np.unique(np.append(np.geomspace(fmin, f_band, 4), fmax))
+        attenuations = self.__get_segment_attenuations(segments, freqs)
+        while(len(freqs) < self.__max_attenuation_frequencies):
+            attenuation = np.prod(attenuations, axis=0)
+            slopes = np.diff(attenuation) / np.diff(freqs)
+            # second divided differences at the inner reference points
+            curvature_nodes = np.abs(2 * np.diff(slopes) / (freqs[2:] - freqs[:-2]))
+            curvature = np.zeros(len(freqs) - 1)
+            curvature[:-1] = curvature_nodes
+            curvature[1:] = np.maximum(curvature[1:], curvature_nodes)
+            errors = curvature * np.diff(freqs) ** 2 / 8
+            tolerance = np.ones_like(errors) * self.__attenuation_tolerance
+            if(max_detector_freq is not None):
+                tolerance[freqs[:-1] >= max_detector_freq] *= 10
+            refine = np.argwhere(errors > tolerance).flatten()
+            if(len(refine) == 0):
+                break
+            # bisect the intervals with the largest errors first
+            refine = refine[np.argsort(errors[refine])[::-1]][:self.__max_attenuation_frequencies - len(freqs)]
+            new_freqs = 0.5 * (freqs[refine] + freqs[refine + 1])
+            freqs = np.append(freqs, new_freqs)
+            attenuations = np.append(attenuations, self.__get_segment_attenuations(segments, new_freqs), axis=1)
+            sort = np.argsort(freqs)
+            freqs = freqs[sort]
+            attenuations = attenuations[:, sort]
+        self.__logger.debug(f"calculating attenuation for frequencies {freqs}")
+        return freqs, attenuations
+
+    def __get_segment_attenuations(self, segments, freqs):
+        """
+        calculates the attenuation factor of each path segment (x1, x2, C_0) at the frequencies `freqs`
+        """
+        attenuations = np.zeros((len(segments), len(freqs)))
+        for iS, (x1, x2, C_0) in enumerate(segments):
+            if(self.__attenuation_table is not None):
+                tmp = self.__attenuation_table.get_attenuation(x1[1], self.get_z_mirrored(x1, x2, C_0)[1], C_0, freqs)
+                if(tmp is not None):
+                    attenuations[iS] = tmp
+                    continue
+                # the segment is outside of the table, the attenuation is integrated along the path
             if(cpp_available):
-                mask = frequency > 0
-                freqs = self.__get_frequencies_for_attenuation(frequency, max_detector_freq)
                 tmp = np.zeros_like(freqs)
                 for i, f in enumerate(freqs):
                     tmp[i] = wrapper.get_attenuation_along_path(
                         x1, x2, C_0, f, self.medium.n_ice, self.medium.delta_n, self.medium.z_0, self.attenuation_model_int)
                 self.__logger.debug(tmp)
-                attenuation = np.ones_like(frequency)
-                attenuation[mask] = np.interp(frequency[mask], freqs, tmp)
+            elif(numba_available):
+                x2_mirrored = self.get_z_mirrored(x1, x2, C_0)
+                tmp = np.array([numba_analytic_raytracing.integrate_path(numba_analytic_raytracing.ATTENUATION, x1[1], x2_mirrored[1], C_0,
+                                                                         self.medium.n_ice, self.medium.delta_n, self.medium.z_0,
+                                                                         frequency=f, attenuation_model=self.attenuation_model_int,
+                                                                         epsabs=1.49e-8, epsrel=1e-2, limit=50) for f in freqs])
+                tmp = np.exp(-1 * tmp)
             else:
 
                 x2_mirrored = self.get_z_mirrored(x1, x2, C_0)
@@ -592,8 +930,6 @@ class ray_tracing_2D():
 
                 # to speed up things we only calculate the attenuation for a few frequencies
                 # and interpolate linearly between them
-                mask = frequency > 0
-                freqs = self.__get_frequencies_for_attenuation(frequency, max_detector_freq)
                 gamma_turn, z_turn = self.get_turning_point(self.medium.n_ice ** 2 - C_0 ** -2)
                 points = None
                 if(x1[1] < z_turn and z_turn < x2_mirrored[1]):
@@ -602,18 +938,10 @@ class ray_tracing_2D():
                     C_0, f), epsrel=1e-2, points=points)[0] for f in freqs])
                 tmp = np.exp(-1 * tmp)
         #         tmp = np.array([integrate.quad(dt, x1[1], x2_mirrored[1], args=(C_0, f), epsrel=0.05)[0] for f in frequency[mask]])
-                attenuation = np.ones_like(frequency)
-                attenuation[mask] = np.interp(frequency[mask], freqs, tmp)
                 self.__logger.info("calculating attenuation from ({:.0f}, {:.0f}) to ({:.0f}, {:.0f}) = ({:.0f}, {:.0f}) =  a factor {}".format(
-                    x1[0], x1[1], x2[0], x2[1], x2_mirrored[0], x2_mirrored[1], 1 / attenuation))
-            iF = len(frequency) // 3
-            output += f"adding attenuation for path segment {iS:d} -> {attenuation[iF]:.2g} at {frequency[iF]/units.MHz:.0f} MHz, "
-            if(tmp_attenuation is None):
-                tmp_attenuation = attenuation
-            else:
-                tmp_attenuation *= attenuation
-        self.__logger.info(output)
-        return tmp_attenuation
+                    x1[0], x1[1], x2[0], x2[1], x2_mirrored[0], x2_mirrored[1], 1 / tmp))
+            attenuations[iS] = tmp
+        return attenuations
 
     def get_path_segments(self, x1, x2, C_0, reflection=0, reflection_case=1):
         """
@@ -871,6 +1199,8 @@ class ray_tracing_2D():
         """
         objective function to find solution for C0
         """
+        if(numba_available):
+            return self.__get_delta_y_numba(logC_0, x1, x2, reflection, reflection_case, log=True) ** 2
         C_0 = self.get_C0_from_log(logC_0)
         return self.get_delta_y(C_0, copy.copy(x1), x2, reflection=reflection, reflection_case=reflection_case) ** 2
 
@@ -879,14 +1209,35 @@ class ray_tracing_2D():
         function to find solution for C0, returns distance in y between function and x2 position
         result is signed! (important to use a root finder)
         """
+        if(numba_available):
+            return self.__get_delta_y_numba(logC_0, x1, x2, reflection, reflection_case, log=True)
         C_0 = self.get_C0_from_log(logC_0)
         return self.get_delta_y(C_0, copy.copy(x1), x2, reflection=reflection, reflection_case=reflection_case)
 
+    def __get_delta_y_numba(self, C_0, x1, x2, reflection, reflection_case, log=False):
+        """
+        numba implementation of `get_delta_y` (or `obj_delta_y` if `log` is True)
+        """
+        if(hasattr(C_0, '__len__')):
+            C_0 = C_0[0]
+        z_reflection = self.medium.reflection
+        if(z_reflection is None):
+            z_reflection = 0.
+        if(log):
+            return numba_analytic_raytracing.obj_delta_y(float(C_0), float(x1[0]), float(x1[1]), float(x2[0]), float(x2[1]),
+                                                         int(reflection), int(reflection_case), self.medium.n_ice,
+                                                         self.medium.delta_n, self.medium.z_0, z_reflection)
+        return numba_analytic_raytracing.get_delta_y(float(C_0), float(x1[0]), float(x1[1]), float(x2[0]), float(x2[1]),
+                                                     int(reflection), int(reflection_case), self.medium.n_ice,
+                                                     self.medium.delta_n, self.medium.z_0, z_reflection)
+
     def get_delta_y(self, C_0, x1, x2, C0range=None, reflection=0, reflection_case=2):
         """
         calculates the difference in the y position between the analytic ray tracing path
         specified by C_0 at the position x2
         """
+        if(numba_available and C0range is None):
+            return self.__get_delta_y_numba(C_0, x1, x2, reflection, reflection_case)
         if(C0range is None):
             C0range = [1. / self.medium.n_ice, np.inf]
         if(hasattr(C_0, '__len__')):
@@ -1000,7 +1351,86 @@ class ray_tracing_2D():
             else:
                 return 2
 
-    def find_solutions(self, x1, x2, plot=False, reflection=0, reflection_case=1):
+    def find_solutions_from_hints(self, x1, x2, C0_hints, reflection=0, reflection_case=1,
+                                  width=0.05, n_expansions=3):
+        """
+        finds the ray tracing solutions close to known solutions of a similar geometry (warm start)
+
+        For each hint, the root of the objective function is searched in a narrow bracket in logC0
+        around the hint. Neighboring hints are separated at their midpoint (two solutions are often close
+        to each other on both sides of a maximum of the objective function). The outer bracket edges are
+        widened by a factor of 4 up to `n_expansions` times.
+
+        Parameters
+        -----------
+        x1: tuple
+            (y,z) coordinate of start point
+        x2: tuple
+            (y,z) coordinate of stop point
+        C0_hints: array of floats
+            the C0 values of the solutions of a similar geometry
+        reflection: int (default 0)
+            how many reflections off the reflective layer (bottom of ice shelf) should be simulated
+        reflection_case: int (default 1)
+            the reflection case
+        width: float
+            the initial distance in logC0 of the outer bracket edges from the smallest and largest hint
+        n_expansions: int
+            the maximum number of brackets that are tried for each hint
+
+        Returns
+        -------
+        results: list of dicts or None
+            the solutions, or None if not every hint lead to a distinct solution
+        """
+        tol = 1e-3 * units.m
+        C0_hints = np.array(C0_hints)
+        if(np.any(C0_hints <= 1. / self.medium.n_ice)):
+            return None
+        logC0_hints = np.sort(np.log(C0_hints - 1. / self.medium.n_ice))
+        mids = 0.5 * (logC0_hints[1:] + logC0_hints[:-1])
+        logC0s = []
+        for iH in range(len(logC0_hints)):
+            logC0 = None
+            # the hints are typically very close to the solutions, so we try a few secant steps first
+            try:
+                logC0 = optimize.newton(self.obj_delta_y, logC0_hints[iH], x1=logC0_hints[iH] + 1e-4,
+                                        args=(x1, x2, reflection, reflection_case), tol=1e-10, maxiter=10)
+                if((not np.isfinite(logC0)) or (iH > 0 and logC0 < mids[iH - 1]) or (iH < len(mids) and logC0 > mids[iH])):
+                    logC0 = None
+            except (RuntimeError, ZeroDivisionError):
+                logC0 = None
+            w = width
+            for i in range(n_expansions if logC0 is None else 0):
+                logC0_start = mids[iH - 1] if iH > 0 else logC0_hints[0] - w
+                logC0_stop = mids[iH] if iH < len(mids) else logC0_hints[-1] + w
+                delta_start = self.obj_delta_y(logC0_start, x1, x2, reflection, reflection_case)
+                delta_stop = self.obj_delta_y(logC0_stop, x1, x2, reflection, reflection_case)
+                if(np.isfinite(delta_start) and np.isfinite(delta_stop) and np.sign(delta_start) != np.sign(delta_stop)):
+                    logC0 = optimize.brentq(self.obj_delta_y, logC0_start, logC0_stop, args=(x1, x2, reflection, reflection_case))
+                    break
+                w *= 4
+            if(logC0 is None):
+                return None
+            # the sign of the objective function also changes at discontinuities, check that the root is a solution
+            if(np.abs(self.obj_delta_y(logC0, x1, x2, reflection, reflection_case)) > tol):
+                return None
+            if(np.round(logC0, 3) in np.round(logC0s, 3)):
+                return None
+            logC0s.append(logC0)
+        results = []
+        for logC0 in logC0s:
+            C_0 = self.get_C0_from_log(logC0)
+            solution_type = self.determine_solution_type(x1, x2, C_0)
+            self.__logger.info("found {} solution C0 = {:.2f} (warm start)".format(solution_types[solution_type], C_0))
+            results.append({'type': solution_type,
+                            'C0': C_0,
+                            'C1': self.get_C_1(x1, C_0),
+                            'reflection': reflection,
+                            'reflection_case': reflection_case})
+        return sorted(results, key=itemgetter('type'))
+
+    def find_solutions(self, x1, x2, plot=False, reflection=0, reflection_case=1, C0_hints=None):
         """
         this function finds all ray tracing solutions
 
@@ -1015,6 +1445,10 @@ class ray_tracing_2D():
             (y,z) coordinate of stop point
         reflection: int (default 0)
             how many reflections off the reflective layer (bottom of ice shelf) should be simulated
+        C0_hints: array of floats or None (default)
+            the C0 values of the solutions of a similar geometry. If given, the solutions are first searched
+            close to the hints (see `find_solutions_from_hints`) and the full search is only performed if
+            this fails. Only used by the python implementation.
 
 
         returns an array of the C_0 paramters of the solutions (the array might be empty)
@@ -1035,6 +1469,11 @@ class ray_tracing_2D():
 #             print((time.time() -t)*1000.)
             return solutions
         else:
+            if(C0_hints is not None and len(C0_hints)):
+                results = self.find_solutions_from_hints(x1, x2, C0_hints, reflection, reflection_case)
+                if(results is not None):
+                    return results
+                self.__logger.debug("warm start failed, performing full search")
 
             tol = 1e-6
             results = []
@@ -1516,7 +1955,7 @@ class ray_tracing:
 
     def __init__(self, x1, x2, medium, attenuation_model="SP1", log_level=logging.WARNING,
                  n_frequencies_integration=6,
-                 n_reflections=0):
+                 n_reflections=0, solution_store=None, attenuation_tolerance=None, attenuation_table=None):
         """
         class initilization
 
@@ -1545,6 +1984,19 @@ class ray_tracing:
         n_reflections: int (default 0)
             in case of a medium with a reflective layer at the bottom, how many reflections should be considered
 
+        solution_store: solution_store or None
+            optional on-disk store of ray tracing solutions (see `NuRadioMC.SignalProp.solution_store`). If set,
+            `find_solutions` looks up the solutions in the store before solving and adds new solutions to the store.
+
+        attenuation_tolerance: float or None
+            if set, the reference frequencies of the attenuation calculation are determined adaptively, see
+            `ray_tracing_2D.get_adaptive_attenuation_reference_points`. The reference frequencies of the first solution
+            are used as start values for the other solutions.
+
+        attenuation_table: attenuation_table or None
+            optional table of the depth-cumulative attenuation integrals (see `NuRadioMC.SignalProp.attenuation_table`).
+            If set, the attenuation is obtained from table lookups instead of a numerical integration along the path.
+
         """
         # make sure that arrays are floats
         x1 = np.array(x1, dtype=np.float)
@@ -1586,8 +2038,16 @@ class ray_tracing:
         self.__x2 = np.array([X2r[0], X2r[2]])
 
         self.__logger.debug("2D points {} {}".format(self.__x1, self.__x2))
+        self.__attenuation_tolerance = attenuation_tolerance
+        self.__attenuation_frequencies = None  # the reference frequencies of the last attenuation calculation
         self.__r2d = ray_tracing_2D(self.__medium, self.__attenuation_model, log_level=log_level,
-                                    n_frequencies_integration=self.__n_frequencies_integration)
+                                    n_frequencies_integration=self.__n_frequencies_integration,
+                                    attenuation_tolerance=self.__attenuation_tolerance, attenuation_table=attenuation_table)
+        self.__solution_store = solution_store
+        self.__store_key = None
+        if(self.__solution_store is not None):
+            self.__store_key = self.__solution_store.get_key(x1, x2, self.__medium, self.__attenuation_model, self.__n_reflections)
+        self.__stored = None  # the cached quantities of each solution if the solution store is used
 
     def set_solution(self, C0s, C1s, solution_types, reflection=None, reflection_case=None):
         results = []
@@ -1602,21 +2062,75 @@ class ray_tracing:
                                 'reflection': reflection[i],
                                 'reflection_case': reflection_case[i]})
         self.__results = results
+        self.__stored = None
 
-    def find_solutions(self):
+    def find_solutions(self, C0_hints=None):
         """
         find all solutions between x1 and x2
-        """
-        self.__results = self.__r2d.find_solutions(self.__x1, self.__x2)
+
+        Parameters
+        ----------
+        C0_hints: dict or None (default)
+            the C0 values of the solutions of a similar geometry as returned by `get_C0_hints`, used as
+            start values of the root finding (warm start). If the warm start fails, the full search is performed.
+        """
+        if(C0_hints is None):
+            C0_hints = {}
+        self.__stored = None
+        if(self.__solution_store is not None):
+            stored = self.__solution_store.get(self.__store_key)
+            if(stored is not None):
+                self.__results = [{key: solution[key] for key in ['type', 'C0', 'C1', 'reflection', 'reflection_case']}
+                                  for solution in stored]
+                self.__stored = stored
+                return
+        self.__results = self.__r2d.find_solutions(self.__x1, self.__x2, C0_hints=C0_hints.get((0, 1), None))
         for i in range(self.__n_reflections):
             for j in range(2):
-                self.__results.extend(self.__r2d.find_solutions(self.__x1, self.__x2, reflection=i + 1, reflection_case=j + 1))
+                self.__results.extend(self.__r2d.find_solutions(self.__x1, self.__x2, reflection=i + 1, reflection_case=j + 1,
+                                                                C0_hints=C0_hints.get((i + 1, j + 1), None)))
 
         # check if not too many solutions were found (the same solution can potentially found twice because of numerical imprecision)
         if(self.get_number_of_solutions() > (2 + 4 * self.__n_reflections)):
             self.__logger.error(f"{self.get_number_of_solutions()} were found but only {(2 + 4 * self.__n_reflections)} are allowed! Returning zero solutions")
             self.__results = []
 
+        if(self.__solution_store is not None):
+            self.__add_to_solution_store()
+
+    def __add_to_solution_store(self):
+        """
+        calculates all quantities of the solutions that are stored in the solution store and adds them to the store
+        """
+        stored = []
+        for iS, result in enumerate(self.__results):
+            solution = dict(result)
+            solution['solution_type'] = self.get_solution_type(iS)
+            solution['path_length'] = self.get_path_length(iS)
+            solution['travel_time'] = self.get_travel_time(iS)
+            solution['launch_vector'] = self.get_launch_vector(iS)
+            solution['receive_vector'] = self.get_receive_vector(iS)
+            solution['attenuation'] = {}
+            stored.append(solution)
+        self.__stored = stored
+        self.__solution_store.put(self.__store_key, stored)
+
+    def __get_stored(self, iS, key):
+        if(self.__stored is None):
+            return None
+        return self.__stored[iS].get(key, None)
+
+    def get_C0_hints(self):
+        """
+        returns the C0 values of all solutions grouped by (reflection, reflection_case)
+
+        The result can be passed to `find_solutions` of a similar geometry to speed up the root finding.
+        """
+        C0_hints = {}
+        for result in self.__results:
+            C0_hints.setdefault((int(result['reflection']), int(result['reflection_case'])), []).append(result['C0'])
+        return C0_hints
+
     def has_solution(self):
         """
         checks if ray tracing solution exists
@@ -1651,6 +2165,8 @@ class ray_tracing:
             * 2: 'refracted'
             * 3: 'reflected
         """
+        if(self.__get_stored(iS, 'solution_type') is not None):
+            return self.__stored[iS]['solution_type']
         return self.__r2d.determine_solution_type(self.__x1, self.__x2, self.__results[iS]['C0'])
 
     def get_path(self, iS, n_points=1000):
@@ -1688,6 +2204,8 @@ class ray_tracing:
             self.__logger.error("solution number {:d} requested but only {:d} solutions exist".format(iS + 1, n))
             raise IndexError
 
+        if(self.__get_stored(iS, 'launch_vector') is not None):
+            return np.array(self.__stored[iS]['launch_vector'])
         result = self.__results[iS]
         alpha = self.__r2d.get_launch_angle(self.__x1, result['C0'], reflection=result['reflection'],
                                             reflection_case=result['reflection_case'])
@@ -1721,6 +2239,8 @@ class ray_tracing:
             self.__logger.error("solution number {:d} requested but only {:d} solutions exist".format(iS + 1, n))
             raise IndexError
 
+        if(self.__get_stored(iS, 'receive_vector') is not None):
+            return np.array(self.__stored[iS]['receive_vector'])
         result = self.__results[iS]
         alpha = self.__r2d.get_receive_angle(self.__x1, self.__x2, result['C0'],
                                              reflection=result['reflection'],
@@ -1781,6 +2301,8 @@ class ray_tracing:
             self.__logger.error("solution number {:d} requested but only {:d} solutions exist".format(iS + 1, n))
             raise IndexError
 
+        if(analytic and self.__get_stored(iS, 'path_length') is not None):
+            return self.__stored[iS]['path_length']
         result = self.__results[iS]
         if analytic:
             try:
@@ -1822,6 +2344,8 @@ class ray_tracing:
             self.__logger.error("solution number {:d} requested but only {:d} solutions exist".format(iS + 1, n))
             raise IndexError
 
+        if(analytic and self.__get_stored(iS, 'travel_time') is not None):
+            return self.__stored[iS]['travel_time']
         result = self.__results[iS]
         if(analytic):
             try:
@@ -1870,9 +2394,27 @@ class ray_tracing:
             raise IndexError
 
         result = self.__results[iS]
-        return self.__r2d.get_attenuation_along_path(self.__x1, self.__x2, result['C0'], frequency, max_detector_freq,
-                                                     reflection=result['reflection'],
-                                                     reflection_case=result['reflection_case'])
+        # the reference frequencies are fully determined by the frequency grid and the maximum detector frequency
+        frequency_key = (len(frequency), float(frequency[0]), float(frequency[-1]), max_detector_freq, self.__n_frequencies_integration,
+                         self.__attenuation_tolerance)
+        attenuation = None
+        if(self.__stored is not None):
+            attenuation = self.__stored[iS]['attenuation']
+        if(attenuation is None or frequency_key not in attenuation):
+            start_frequencies = None
+            if(self.__attenuation_frequencies is not None and self.__attenuation_frequencies[0] == frequency_key):
+                start_frequencies = self.__attenuation_frequencies[1]
+            reference_points = self.__r2d.get_attenuation_reference_points(self.__x1, self.__x2, result['C0'], frequency, max_detector_freq,
+                                                                           reflection=result['reflection'],
+                                                                           reflection_case=result['reflection_case'],
+                                                                           start_frequencies=start_frequencies)
+            self.__attenuation_frequencies = (frequency_key, reference_points[0])
+            if(attenuation is None):
+                return interpolate_attenuation(frequency, *reference_points)
+            attenuation[frequency_key] = reference_points
+            self.__solution_store.put(self.__store_key, self.__stored)
+        freqs, attenuations = attenuation[frequency_key]
+        return interpolate_attenuation(frequency, freqs, attenuations)
 
     def get_focusing(self, iS, dz, limit=2.):
         """
@@ -1911,7 +2453,7 @@ class ray_tracing:
             recPos1 = np.array([self.__X2[0], self.__X2[1], self.__X2[2] + dz])
         if(not hasattr(self, "_r1")):
             self._r1 = ray_tracing(vetPos, recPos1, self.__medium, self.__attenuation_model, logging.WARNING,
-                             self.__n_frequencies_integration, self.__n_reflections)
+                             self.__n_frequencies_integration, self.__n_reflections, self.__solution_store)
             self._r1.find_solutions()
         if iS < self._r1.get_number_of_solutions():
             lauVec1 = self._r1.get_launch_vector(iS)
@@ -1940,3 +2482,521 @@ class ray_tracing:
         return self.__r2d.get_path_reflections(self.__x1, self.__x2, self.__results[iS]['C0'], 10000,
                                    reflection=self.__results[iS]['reflection'],
                                    reflection_case=self.__results[iS]['reflection_case'])
+
+
+class ray_tracing_result():
+    """
+    preallocated record of all ray tracing solutions between two points (see `ray_tracing_solver`)
+
+    The arrays have the length of the maximum number of solutions, only the first `n_solutions` entries are valid.
+    """
+    __slots__ = ['n_solutions', 'C0', 'C1', 'solution_type', 'reflection', 'reflection_case',
+                 'launch_vector', 'receive_vector', 'path_length', 'travel_time', 'reflection_angle']
+
+    def __init__(self, max_solutions):
+        """
+        Parameters
+        ----------
+        max_solutions: int
+            the maximum number of solutions
+        """
+        self.n_solutions = 0
+        self.C0 = np.full(max_solutions, np.nan)
+        self.C1 = np.full(max_solutions, np.nan)
+        self.solution_type = np.zeros(max_solutions, dtype=np.int)
+        self.reflection = np.zeros(max_solutions, dtype=np.int)
+        self.reflection_case = np.ones(max_solutions, dtype=np.int)
+        self.launch_vector = np.full((max_solutions, 3), np.nan)
+        self.receive_vector = np.full((max_solutions, 3), np.nan)
+        self.path_length = np.full(max_solutions, np.nan)
+        self.travel_time = np.full(max_solutions, np.nan)
+        # the output of `ray_tracing_2D.get_reflection_angle`, i.e., None if the ray is not reflected at the surface
+        # or an array with one entry per path segment if bottom reflections are simulated
+        self.reflection_angle = np.full(max_solutions, None, dtype=object)
+
+
+class ray_tracing_solver():
+    """
+    reusable ray tracing solver for a fixed medium, attenuation model and number of bottom reflections
+
+    In contrast to the `ray_tracing` class, which is constructed for every pair of points, a single instance
+    of this class is used for all pairs. `solve` calculates the solutions and all per-solution quantities
+    (launch and receive vectors, path lengths, travel times and reflection angles) at once and writes them
+    into the preallocated record `result`. The class provides the same interface as `ray_tracing`
+    (after the points were set with `set_points`), so it can be used as a drop-in replacement.
+    """
+    __slots__ = ['_medium', '_attenuation_model', '_n_frequencies_integration', '_n_reflections', '_log_level',
+                 '_logger', '_r2d', '_solution_store', '_store_key', '_stored', '_X1', '_X2', '_x1', '_x2',
+                 '_swap', '_cos', '_sin', '_R', '_dX', '_X2r', '_focusing_solver', '_focusing_valid', '_attenuation_tolerance',
+                 '_attenuation_frequencies', 'result']
+
+    def __init__(self, medium, attenuation_model="SP1", log_level=logging.WARNING,
+                 n_frequencies_integration=6, n_reflections=0, solution_store=None, attenuation_tolerance=None,
+                 attenuation_table=None):
+        """
+        Parameters
+        ----------
+        medium: medium class
+            class describing the index-of-refraction profile
+        attenuation_model: string
+            signal attenuation model
+        log_level: logging object
+            specify the log level of the ray tracing class
+        n_frequencies_integration: int
+            the number of frequencies for which the frequency dependent attenuation
+            length is being calculated. The attenuation length for all other frequencies
+            is obtained via linear interpolation.
+        n_reflections: int (default 0)
+            in case of a medium with a reflective layer at the bottom, how many reflections should be considered
+        solution_store: solution_store or None
+            optional on-disk store of ray tracing solutions (see `NuRadioMC.SignalProp.solution_store`)
+        attenuation_tolerance: float or None
+            if set, the reference frequencies of the attenuation calculation are determined adaptively,
+            see `ray_tracing.__init__`
+        attenuation_table: attenuation_table or None
+            optional table of the depth-cumulative attenuation integrals (see `NuRadioMC.SignalProp.attenuation_table`)
+        """
+        self._logger = logging.getLogger('ray_tracing')
+        self._logger.setLevel(log_level)
+        self._log_level = log_level
+        self._medium = medium
+        self._attenuation_model = attenuation_model
+        self._n_frequencies_integration = n_frequencies_integration
+        if(n_reflections):
+            if(not hasattr(self._medium, "reflection") or self._medium.reflection is None):
+                self._logger.warning("ray paths with bottom reflections requested medium does not have any reflective layer, setting number of reflections to zero.")
+                n_reflections = 0
+        self._n_reflections = n_reflections
+        self._attenuation_tolerance = attenuation_tolerance
+        self._attenuation_frequencies = None
+        self._r2d = ray_tracing_2D(self._medium, self._attenuation_model, log_level=log_level,
+                                   n_frequencies_integration=self._n_frequencies_integration,
+                                   attenuation_tolerance=self._attenuation_tolerance, attenuation_table=attenuation_table)
+        self._solution_store = solution_store
+        self._store_key = None
+        self._stored = None
+        self._X1 = np.zeros(3)
+        self._X2 = np.zeros(3)
+        self._x1 = np.zeros(2)
+        self._x2 = np.zeros(2)
+        self._R = np.identity(3)
+        self._dX = np.zeros(3)
+        self._X2r = np.zeros(3)
+        self._swap = False
+        self._cos = 1.
+        self._sin = 0.
+        self._focusing_solver = None
+        self._focusing_valid = False
+        self.result = ray_tracing_result(2 + 4 * self._n_reflections)
+
+    def set_points(self, x1, x2):
+        """
+        sets the start and stop point of the ray and resets the solutions
+
+        Parameters
+        ----------
+        x1: 3dim np.array
+            start point of the ray
+        x2: 3dim np.array
+            stop point of the ray
+        """
+        if(self._n_reflections):
+            if(x1[2] < self._medium.reflection or x2[2] < self._medium.reflection):
+                self._logger.error("start or stop point is below the reflective layer at {:.1f}m".format(self._medium.reflection / units.m))
+                raise AttributeError("start or stop point is below the reflective layer at {:.1f}m".format(self._medium.reflection / units.m))
+        self._swap = x2[2] < x1[2]
+        if(self._swap):
+            self._X1[:] = x2
+            self._X2[:] = x1
+        else:
+            self._X1[:] = x1
+            self._X2[:] = x2
+        dx = self._X2[0] - self._X1[0]
+        dy = self._X2[1] - self._X1[1]
+        # the 2D problem is solved in the vertical plane through both points (rotation around the z axis by dPhi)
+        dPhi = -np.arctan2(dy, dx)
+        self._cos = np.cos(dPhi)
+        self._sin = np.sin(dPhi)
+        self._R[0, 0] = self._cos
+        self._R[0, 1] = -self._sin
+        self._R[1, 0] = self._sin
+        self._R[1, 1] = self._cos
+        # (computed in the same way as in `ray_tracing` to obtain bitwise identical results)
+        np.subtract(self._X2, self._X1, out=self._dX)
+        np.dot(self._R, self._dX, out=self._X2r)
+        self._x1[0] = self._X1[0]
+        self._x1[1] = self._X1[2]
+        self._x2[0] = self._X2r[0] + self._X1[0]
+        self._x2[1] = self._X2r[2] + self._X1[2]
+        if(self._solution_store is not None):
+            self._store_key = self._solution_store.get_key(x1, x2, self._medium, self._attenuation_model, self._n_reflections)
+        self._stored = None
+        self._focusing_valid = False
+        self._attenuation_frequencies = None
+        self.result.n_solutions = 0
+
+    def solve(self, x1, x2, C0_hints=None):
+        """
+        finds all solutions between x1 and x2 and calculates all per-solution quantities
+
+        Parameters
+        ----------
+        x1: 3dim np.array
+            start point of the ray
+        x2: 3dim np.array
+            stop point of the ray
+        C0_hints: dict or None (default)
+            the C0 values of the solutions of a similar geometry (see `ray_tracing.find_solutions`)
+
+        Returns
+        -------
+        result: ray_tracing_result
+            the record holding all solutions (it is overwritten by the next call)
+        """
+        self.set_points(x1, x2)
+        self.find_solutions(C0_hints)
+        return self.result
+
+    def find_solutions(self, C0_hints=None):
+        """
+        find all solutions between the points set with `set_points`
+
+        Parameters
+        ----------
+        C0_hints: dict or None (default)
+            the C0 values of the solutions of a similar geometry (see `ray_tracing.find_solutions`)
+        """
+        if(self._solution_store is not None):
+            stored = self._solution_store.get(self._store_key)
+            if(stored is not None):
+                self._fill_result(stored)
+                self._stored = stored
+                return
+        if(C0_hints is None):
+            C0_hints = {}
+        results = self._r2d.find_solutions(self._x1, self._x2, C0_hints=C0_hints.get((0, 1), None))
+        for i in range(self._n_reflections):
+            for j in range(2):
+                results.extend(self._r2d.find_solutions(self._x1, self._x2, reflection=i + 1, reflection_case=j + 1,
+                                                        C0_hints=C0_hints.get((i + 1, j + 1), None)))
+        # check if not too many solutions were found (the same solution can potentially found twice because of numerical imprecision)
+        if(len(results) > (2 + 4 * self._n_reflections)):
+            self._logger.error(f"{len(results)} were found but only {(2 + 4 * self._n_reflections)} are allowed! Returning zero solutions")
+            results = []
+        self._fill_result(results)
+        if(self._solution_store is not None):
+            self._stored = []
+            for iS in range(self.result.n_solutions):
+                self._stored.append({'type': results[iS]['type'],
+                                     'C0': self.result.C0[iS],
+                                     'C1': self.result.C1[iS],
+                                     'reflection': self.result.reflection[iS],
+                                     'reflection_case': self.result.reflection_case[iS],
+                                     'solution_type': self.result.solution_type[iS],
+                                     'path_length': self.result.path_length[iS],
+                                     'travel_time': self.result.travel_time[iS],
+                                     'launch_vector': np.array(self.result.launch_vector[iS]),
+                                     'receive_vector': np.array(self.result.receive_vector[iS]),
+                                     'attenuation': {}})
+            self._solution_store.put(self._store_key, self._stored)
+
+    def set_solution(self, C0s, C1s, solution_types, reflection=None, reflection_case=None):
+        """
+        sets the solutions (e.g. from a previous simulation) for the points set with `set_points`
+        """
+        results = []
+        if(reflection is None):
+            reflection = np.zeros_like(C0s, dtype=np.int)
+            reflection_case = np.ones_like(C0s, dtype=np.int)
+        for i in range(len(C0s)):
+            if(not np.isnan(C0s[i])):
+                results.append({'type': solution_types[i],
+                                'C0': C0s[i],
+                                'C1': C1s[i],
+                                'reflection': reflection[i],
+                                'reflection_case': reflection_case[i]})
+        self._stored = None
+        self._fill_result(results)
+
+    def _to_3d(self, vector_2d):
+        # inverse rotation of a vector in the vertical plane of the 2D problem
+        return np.array([self._cos * vector_2d[0], -self._sin * vector_2d[0], vector_2d[1]])
+
+    def _fill_result(self, results):
+        result = self.result
+        result.n_solutions = len(results)
+        for iS, solution in enumerate(results):
+            C_0 = solution['C0']
+            reflection = solution['reflection']
+            reflection_case = solution['reflection_case']
+            result.C0[iS] = C_0
+            result.C1[iS] = solution['C1']
+            result.reflection[iS] = reflection
+            result.reflection_case[iS] = reflection_case
+            if('launch_vector' in solution):  # from the solution store
+                result.solution_type[iS] = solution['solution_type']
+                result.launch_vector[iS] = solution['launch_vector']
+                result.receive_vector[iS] = solution['receive_vector']
+                result.path_length[iS] = solution['path_length']
+                result.travel_time[iS] = solution['travel_time']
+            else:
+                result.solution_type[iS] = self._r2d.determine_solution_type(self._x1, self._x2, C_0)
+                alpha_launch = self._r2d.get_launch_angle(self._x1, C_0, reflection=reflection, reflection_case=reflection_case)
+                alpha_receive = self._r2d.get_receive_angle(self._x1, self._x2, C_0, reflection=reflection, reflection_case=reflection_case)
+                if(self._swap):
+                    result.launch_vector[iS] = self._to_3d((-np.sin(alpha_receive), np.cos(alpha_receive)))
+                    result.receive_vector[iS] = self._to_3d((np.sin(alpha_launch), np.cos(alpha_launch)))
+                else:
+                    result.launch_vector[iS] = self._to_3d((np.sin(alpha_launch), np.cos(alpha_launch)))
+                    result.receive_vector[iS] = self._to_3d((-np.sin(alpha_receive), np.cos(alpha_receive)))
+                result.path_length[iS] = self._get_analytic_quantity(self._r2d.get_path_length_analytic, self._r2d.get_path_length,
+                                                                     C_0, reflection, reflection_case)
+                result.travel_time[iS] = self._get_analytic_quantity(self._r2d.get_travel_time_analytic, self._r2d.get_travel_time,
+                                                                     C_0, reflection, reflection_case)
+            result.reflection_angle[iS] = self._r2d.get_reflection_angle(self._x1, self._x2, C_0, reflection=reflection,
+                                                                        reflection_case=reflection_case)
+
+    def _get_analytic_quantity(self, analytic_function, numeric_function, C_0, reflection, reflection_case):
+        try:
+            value = analytic_function(self._x1, self._x2, C_0, reflection=reflection, reflection_case=reflection_case)
+            if(value is not None):
+                return value
+        except:
+            self._logger.warning("analytic calculation failed, switching to numerical integration")
+        return numeric_function(self._x1, self._x2, C_0, reflection=reflection, reflection_case=reflection_case)
+
+    def _check_solution_index(self, iS):
+        n = self.result.n_solutions
+        if(iS >= n):
+            self._logger.error("solution number {:d} requested but only {:d} solutions exist".format(iS + 1, n))
+            raise IndexError
+
+    def has_solution(self):
+        """
+        checks if ray tracing solution exists
+        """
+        return self.result.n_solutions > 0
+
+    def get_number_of_solutions(self):
+        """
+        returns the number of solutions
+        """
+        return self.result.n_solutions
+
+    def get_results(self):
+        """
+        returns dictionary of results (the parameters of the analytic ray path function)
+        """
+        result = self.result
+        return [{'type': result.solution_type[iS],
+                 'C0': result.C0[iS],
+                 'C1': result.C1[iS],
+                 'reflection': result.reflection[iS],
+                 'reflection_case': result.reflection_case[iS]} for iS in range(result.n_solutions)]
+
+    def get_C0_hints(self):
+        """
+        returns the C0 values of all solutions grouped by (reflection, reflection_case), see `ray_tracing.get_C0_hints`
+        """
+        C0_hints = {}
+        for iS in range(self.result.n_solutions):
+            C0_hints.setdefault((int(self.result.reflection[iS]), int(self.result.reflection_case[iS])), []).append(self.result.C0[iS])
+        return C0_hints
+
+    def get_solution_type(self, iS):
+        """
+        returns the type of the solution (1: 'direct', 2: 'refracted', 3: 'reflected')
+        """
+        self._check_solution_index(iS)
+        return self.result.solution_type[iS]
+
+    def get_launch_vector(self, iS):
+        """
+        returns the launch vector (in 3D) of solution iS
+        """
+        self._check_solution_index(iS)
+        return np.array(self.result.launch_vector[iS])
+
+    def get_receive_vector(self, iS):
+        """
+        returns the receive vector (in 3D) of solution iS
+        """
+        self._check_solution_index(iS)
+        return np.array(self.result.receive_vector[iS])
+
+    def get_reflection_angle(self, iS):
+        """
+        returns the angle of reflection at the surface of solution iS, or None for direct and refracted rays
+        """
+        self._check_solution_index(iS)
+        return self.result.reflection_angle[iS]
+
+    def get_path_length(self, iS, analytic=True):
+        """
+        returns the path length of solution iS
+
+        Parameters
+        ----------
+        iS: int
+            choose for which solution to compute the path length, counting starts at zero
+        analytic: bool
+            If True the analytic solution is used. If False, a numerical integration is used. (default: True)
+        """
+        self._check_solution_index(iS)
+        if(analytic):
+            return self.result.path_length[iS]
+        return self._r2d.get_path_length(self._x1, self._x2, self.result.C0[iS], reflection=self.result.reflection[iS],
+                                         reflection_case=self.result.reflection_case[iS])
+
+    def get_travel_time(self, iS, analytic=True):
+        """
+        returns the travel time of solution iS
+
+        Parameters
+        ----------
+        iS: int
+            choose for which solution to compute the travel time, counting starts at zero
+        analytic: bool
+            If True the analytic solution is used. If False, a numerical integration is used. (default: True)
+        """
+        self._check_solution_index(iS)
+        if(analytic):
+            return self.result.travel_time[iS]
+        return self._r2d.get_travel_time(self._x1, self._x2, self.result.C0[iS], reflection=self.result.reflection[iS],
+                                         reflection_case=self.result.reflection_case[iS])
+
+    def get_attenuation(self, iS, frequency, max_detector_freq=None):
+        """
+        calculates the signal attenuation due to attenuation in the medium (ice), see `ray_tracing.get_attenuation`
+        """
+        self._check_solution_index(iS)
+        C_0 = self.result.C0[iS]
+        reflection = self.result.reflection[iS]
+        reflection_case = self.result.reflection_case[iS]
+        frequency_key = (len(frequency), float(frequency[0]), float(frequency[-1]), max_detector_freq, self._n_frequencies_integration,
+                         self._attenuation_tolerance)
+        attenuation = None
+        if(self._stored is not None):
+            attenuation = self._stored[iS]['attenuation']
+        if(attenuation is None or frequency_key not in attenuation):
+            start_frequencies = None
+            if(self._attenuation_frequencies is not None and self._attenuation_frequencies[0] == frequency_key):
+                start_frequencies = self._attenuation_frequencies[1]
+            reference_points = self._r2d.get_attenuation_reference_points(self._x1, self._x2, C_0, frequency, max_detector_freq,
+                                                                          reflection=reflection, reflection_case=reflection_case,
+                                                                          start_frequencies=start_frequencies)
+            self._attenuation_frequencies = (frequency_key, reference_points[0])
+            if(attenuation is None):
+                return interpolate_attenuation(frequency, *reference_points)
+            attenuation[frequency_key] = reference_points
+            self._solution_store.put(self._store_key, self._stored)
+        freqs, attenuations = attenuation[frequency_key]
+        return interpolate_attenuation(frequency, freqs, attenuations)
+
+    def get_focusing(self, iS, dz, limit=2.):
+        """
+        calculate the focusing effect in the medium, see `ray_tracing.get_focusing`
+        """
+        recVec = -1.0 * self.get_receive_vector(iS)
+        recAng = np.arccos(recVec[2] / np.sqrt(recVec[0] ** 2 + recVec[1] ** 2 + recVec[2] ** 2))
+        lauVec = self.get_launch_vector(iS)
+        lauAng = np.arccos(lauVec[2] / np.sqrt(lauVec[0] ** 2 + lauVec[1] ** 2 + lauVec[2] ** 2))
+        distance = self.get_path_length(iS)
+        # if X1 (the emitter) is above X2 (the receiver) the positions are swapped, we want to change the receiver position
+        if self._swap:
+            vetPos = self._X2
+            recPos = self._X1
+        else:
+            vetPos = self._X1
+            recPos = self._X2
+        recPos1 = np.array([recPos[0], recPos[1], recPos[2] + dz])
+        if(self._focusing_solver is None):
+            self._focusing_solver = ray_tracing_solver(self._medium, self._attenuation_model, logging.WARNING,
+                                                       self._n_frequencies_integration, self._n_reflections, self._solution_store)
+        if(not self._focusing_valid):
+            self._focusing_solver.solve(vetPos, recPos1)
+            self._focusing_valid = True
+        r1 = self._focusing_solver
+        if iS < r1.get_number_of_solutions():
+            lauVec1 = r1.get_launch_vector(iS)
+            lauAng1 = np.arccos(lauVec1[2] / np.sqrt(lauVec1[0] ** 2 + lauVec1[1] ** 2 + lauVec1[2] ** 2))
+            focusing = np.sqrt(distance / np.sin(recAng) * np.abs((lauAng1 - lauAng) / (recPos1[2] - recPos[2])))
+            if(self.get_solution_type(iS) != r1.get_solution_type(iS)):
+                self._logger.error("solution types are not the same")
+        else:
+            focusing = 1.0
+            self._logger.info("too few ray tracing solutions, setting focusing factor to 1")
+        self._logger.debug(f'amplification due to focusing of solution {iS:d} = {focusing:.3f}')
+        if(focusing > limit):
+            self._logger.warning(f"amplification due to focusing is {focusing:.1f}x -> limiting amplification factor to {limit:.1f}x")
+            focusing = limit
+
+        # now also correct for differences in refractive index between emitter and receiver position
+        n1 = self._medium.get_index_of_refraction(vetPos)  # emitter
+        n2 = self._medium.get_index_of_refraction(recPos)  # receiver
+        return focusing * (n1 / n2) ** 0.5
+
+
+def find_solutions_batch(x1s, x2s, medium, attenuation_model="SP1", log_level=logging.WARNING,
+                         n_frequencies_integration=6, n_reflections=0, max_distance=10 * units.m):
+    """
+    finds the ray tracing solutions for many pairs of points
+
+    The pairs are ordered by their geometry, i.e., by the depth of the upper point, the depth of the lower
+    point and the horizontal distance. Each root finding is started from the solutions of the previous pair
+    (warm start) if the geometries differ by less than `max_distance`. If the warm start fails,
+    the full search is performed.
+
+    Parameters
+    ----------
+    x1s: array of shape (N, 3)
+        the start points of the rays
+    x2s: array of shape (N, 3)
+        the stop points of the rays
+    medium: medium class
+        class describing the index-of-refraction profile
+    attenuation_model: string
+        signal attenuation model
+    log_level: logging object
+        the log level of the ray tracing class
+    n_frequencies_integration: int
+        the number of frequencies for which the frequency dependent attenuation length is calculated
+    n_reflections: int (default 0)
+        in case of a medium with a reflective layer at the bottom, how many reflections should be considered
+    max_distance: float
+        the maximum difference in geometry (horizontal distance and depths) for which the solutions
+        of the previous pair are used as start values
+
+    Returns
+    -------
+    ray_tracers: list of ray_tracing objects
+        the ray tracing objects (with solutions) in the order of the input points
+    """
+    x1s = np.atleast_2d(np.array(x1s, dtype=np.float))
+    x2s = np.atleast_2d(np.array(x2s, dtype=np.float))
+    d = np.linalg.norm(x2s[:, :2] - x1s[:, :2], axis=1)
+    z_low = np.minimum(x1s[:, 2], x2s[:, 2])
+    z_high = np.maximum(x1s[:, 2], x2s[:, 2])
+    # the 2D problem only depends on the two depths and the horizontal distance. We sort in bins of the
+    # depths and alternate the sorting direction of the distance to keep consecutive pairs close to each other
+    i_high = np.floor(z_high / max_distance).astype(int)
+    i_low = np.floor(z_low / max_distance).astype(int)
+    direction = np.where((i_high + i_low) % 2, -1, 1)
+    order = np.lexsort((direction * d, i_low, i_high))
+    geometry = np.array([d, z_low, z_high]).T
+
+    ray_tracers = [None] * len(x1s)
+    n_warm_start = 0
+    previous = None
+    for i in order:
+        r = ray_tracing(x1s[i], x2s[i], medium, attenuation_model, log_level=log_level,
+                        n_frequencies_integration=n_frequencies_integration, n_reflections=n_reflections)
+        C0_hints = None
+        if(previous is not None and np.all(np.abs(geometry[i] - geometry[previous]) < max_distance)):
+            C0_hints = ray_tracers[previous].get_C0_hints()
+            n_warm_start += 1
+        r.find_solutions(C0_hints=C0_hints)
+        ray_tracers[i] = r
+        previous = i
+    logging.getLogger('ray_tracing').info(f"solutions of {n_warm_start:d} of {len(x1s):d} pairs were warm started")
+    return ray_tracers
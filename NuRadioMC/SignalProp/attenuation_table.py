@@ -0,0 +1,381 @@
+from __future__ import absolute_import, division, print_function
+import numpy as np
+import hashlib
+import math
+import os
+from NuRadioReco.utilities import units
+from NuRadioMC.utilities import attenuation as attenuation_util
+import logging
+logger = logging.getLogger("attenuation_table")
+
+# frequencies at which the attenuation length of a model is not smooth (the frequency interpolation does not cross them)
+_frequency_kinks = {"SP1": [1 * units.GHz]}
+
+# depths below the table by less than this are treated as the bottom of the table
+_z_tolerance = 1 * units.mm
+
+# the tables that were already loaded or built, see `get_attenuation_table`
+_tables = {}
+
+
+class attenuation_table():
+    """
+    Precomputed depth-cumulative attenuation integrals of the analytic ray tracer
+
+    The path element of the analytic ray path ds/dz = n(z) / (n(z)^2 - C_0^-2)^0.5 only depends on the
+    parameter C_0 of the ray and the depth z. For every ice model and attenuation model, the cumulative integral
+
+        H(C_0, z, f) = int_z^z_turn ds / L(z', f)
+
+    from a depth z up to the turning point z_turn of the ray (or the surface for rays that are reflected off the surface)
+    is tabulated on a grid of (log(C_0 - 1/n_ice), (z_turn - z)^0.5, log(f)). The attenuation of a path segment from
+    z1 to z2 is then a difference (H(z1) - H(z2)) or, if the segment passes the turning point, a sum (H(z1) + H(z2))
+    of table lookups. This also holds for the segments between bottom reflections, see
+    `ray_tracing_2D.get_path_segments`.
+
+    The square root of the distance to the turning point is used as coordinate because H is linear in it close to the
+    turning point (the integrand has an integrable 1/sqrt singularity at the turning point). The table is interpolated
+    logarithmically in C_0, linearly in depth and cubically in log-log in frequency. The attenuation factors agree with
+    the direct integration to better than 1e-3 (the direct integration itself has a relative precision of 1%).
+
+    The table is built once per ice model and attenuation model (which takes a few seconds) and stored as a .npz file.
+    Rays outside of the table (e.g. points below `z_min` or frequencies outside of the frequency grid) return None,
+    the attenuation is then integrated directly.
+    """
+
+    def __init__(self, medium, attenuation_model="SP1", folder=None, z_min=None,
+                 n_C0_refracted=192, n_C0_reflected=32, n_z=128,
+                 frequency_range=(0.1 * units.MHz, 10 * units.GHz), n_frequencies=81):
+        """
+        Loads the table from `folder` or builds it (and stores it in `folder`) if it does not exist yet.
+
+        Parameters
+        ----------
+        medium: medium class
+            class describing the index-of-refraction profile
+        attenuation_model: string
+            the attenuation model
+        folder: string or None
+            the folder in which the table is stored. If None, the table is only kept in memory.
+        z_min: float or None
+            the minimum depth of the table. If None, the reflective layer at the bottom of the medium or -3km if the
+            medium does not have a reflective layer
+        n_C0_refracted: int
+            the number of grid points in C_0 for rays with a turning point below the surface
+        n_C0_reflected: int
+            the number of grid points in C_0 for rays that are reflected off the surface
+        n_z: int
+            the number of grid points in depth
+        frequency_range: tuple of floats
+            the minimum and maximum frequency of the table
+        n_frequencies: int
+            the number of logarithmically spaced grid points in frequency. The frequency grid ends below the first
+            frequency at which the attenuation length of the model is not positive (e.g. above 2.5GHz for MB1).
+        """
+        if(attenuation_model not in attenuation_util.model_to_int):
+            raise NotImplementedError("attenuation model {} is not implemented".format(attenuation_model))
+        self._n_ice = medium.n_ice
+        self._delta_n = medium.delta_n
+        self._z_0 = medium.z_0
+        self._attenuation_model = attenuation_model
+        if(z_min is None):
+            z_min = -3 * units.km
+            if(getattr(medium, "reflection", None) is not None):
+                z_min = medium.reflection
+        self._z_min = z_min
+
+        # log(C_0 - 1/n_ice) of the ray turning at z_min, of the ray turning at the surface and of an almost vertical ray
+        self._logC0_min = self.get_logC0_from_turning_point(z_min)
+        self._logC0_crit = self.get_logC0_from_turning_point(0)
+        self._logC0_max = 10.
+        # the attenuation of rays that are reflected off the surface at a shallow angle scales with the square root of
+        # log(C_0 - 1/n_ice) - logC0_crit, hence, the grid points are quadratically spaced
+        self._logC0 = np.append(np.linspace(self._logC0_min, self._logC0_crit, n_C0_refracted),
+                                self._logC0_crit + (self._logC0_max - self._logC0_crit) * np.linspace(0, 1, n_C0_reflected + 1)[1:] ** 2)
+        self._u = np.linspace(0, (-z_min) ** 0.5, n_z)
+        self._du = self._u[1] - self._u[0]
+        self._frequencies = np.geomspace(frequency_range[0], frequency_range[1], n_frequencies)
+        self._frequency_interpolation = {}
+
+        self._filename = None
+        if(folder is not None):
+            self._filename = os.path.join(folder, "attenuation_table_{}_{}.npz".format(attenuation_model, self.get_key()))
+        if(self._filename is not None and os.path.exists(self._filename)):
+            logger.info(f"loading attenuation table {self._filename}")
+            self._H = np.load(self._filename)['H']
+            self._set_frequencies()
+        else:
+            self._H = self.build()
+            self._set_frequencies()
+            if(self._filename is not None):
+                self.save(self._filename)
+
+    def _set_frequencies(self):
+        """
+        restricts the frequency grid to the frequencies of the table
+        """
+        self._frequencies = self._frequencies[:self._H.shape[2]]
+        self._log_frequencies = np.log(self._frequencies)
+        self._kinks = [iF for iF, frequency in enumerate(self._frequencies)
+                       if np.any(np.isclose(frequency, _frequency_kinks.get(self._attenuation_model, []), rtol=1e-6))]
+
+    def get_key(self):
+        """
+        returns a hash of the ice model, the attenuation model and the grid of the table
+        """
+        key = "_".join([repr(x) for x in [self._n_ice, self._delta_n, self._z_0, self._attenuation_model, self._z_min,
+                                          len(self._logC0), len(self._u), self._frequencies[0], self._frequencies[-1],
+                                          len(self._frequencies)]])
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def get_logC0_from_turning_point(self, z_turn):
+        """
+        returns log(C_0 - 1/n_ice) of the ray with the turning point z_turn
+        """
+        gamma = self._delta_n * np.exp(z_turn / self._z_0)
+        return np.log(gamma / (self._n_ice * (self._n_ice - gamma)))
+
+    def _get_turning_point(self, logC0):
+        """
+        returns the C_0, gamma = n_ice - 1/C_0 and the turning point z_turn (at most 0) for log(C_0 - 1/n_ice)
+        """
+        C_0 = 1. / self._n_ice + np.exp(logC0)
+        gamma_turn = self._n_ice * np.exp(logC0) / C_0
+        z_turn = np.minimum(np.log(gamma_turn / self._delta_n) * self._z_0, 0)
+        return C_0, gamma_turn, z_turn
+
+    def build(self, n_gauss=8):
+        """
+        calculates the table, the integral between two depth grid points is calculated with Gauss-Legendre quadrature
+
+        Returns
+        -------
+        H: 3dim array of floats
+            the cumulative attenuation integral for each C_0, depth and frequency grid point (up to the last
+            frequency with a positive attenuation length)
+        """
+        logger.warning(f"building attenuation table for the {self._attenuation_model} attenuation model "
+                       f"(n_ice = {self._n_ice}, delta_n = {self._delta_n}, z_0 = {self._z_0})")
+        nodes, weights = np.polynomial.legendre.leggauss(n_gauss)
+        du = np.diff(self._u)
+        # quadrature points (C_0, depth interval, gauss point) in the coordinate u = (z_turn - z)^0.5
+        u = (0.5 * (self._u[:-1] + self._u[1:]))[:, None] + 0.5 * du[:, None] * nodes[None, :]
+        C_0, gamma_turn, z_turn = self._get_turning_point(self._logC0)
+        gamma_0 = self._delta_n * np.exp(z_turn / self._z_0)  # equals gamma_turn for rays with a turning point below the surface
+        gamma_0[z_turn < 0] = gamma_turn[z_turn < 0]
+        z = z_turn[:, None, None] - u[None] ** 2
+        n = self._n_ice - gamma_0[:, None, None] * np.exp(-u[None] ** 2 / self._z_0)
+        # n - 1/C_0 is calculated without cancellation close to the turning point
+        n_minus_p = (gamma_turn - gamma_0)[:, None, None] - gamma_0[:, None, None] * np.expm1(-u[None] ** 2 / self._z_0)
+        # ds/du = ds/dz * dz/du
+        ds_du = 2 * u[None] * n / (n_minus_p * (n + 1. / C_0[:, None, None])) ** 0.5
+        # below the table the attenuation length is continued constantly
+        z_attenuation = np.maximum(z, self._z_min).flatten()
+        H = np.zeros((len(self._logC0), len(self._u), len(self._frequencies)))
+        for iF, frequency in enumerate(self._frequencies):
+            attenuation_length = attenuation_util.get_attenuation_length(z_attenuation, frequency, self._attenuation_model)
+            if(not np.all(attenuation_length > 0)):
+                logger.warning(f"the attenuation length is not positive at {frequency / units.MHz:.0f}MHz, "
+                               f"the table ends at {self._frequencies[iF - 1] / units.MHz:.0f}MHz")
+                H = H[:, :, :iF]
+                break
+            integrand = ds_du / attenuation_length.reshape(z.shape)
+            H[:, 1:, iF] = np.cumsum(np.sum(integrand * weights, axis=-1) * 0.5 * du, axis=1)
+        return H.astype(np.float32)
+
+    def save(self, filename):
+        """
+        stores the table as .npz file (the file is written atomically, i.e., several jobs can build the same table)
+        """
+        folder = os.path.dirname(os.path.abspath(filename))
+        if(not os.path.exists(folder)):
+            os.makedirs(folder)
+        tmp_filename = "{}.{:d}.tmp.npz".format(filename[:-4], os.getpid())
+        np.savez(tmp_filename, H=self._H, logC0=self._logC0, u=self._u, frequencies=self._frequencies,
+                 ice=np.array([self._n_ice, self._delta_n, self._z_0, self._z_min]), attenuation_model=self._attenuation_model)
+        os.replace(tmp_filename, filename)
+        logger.warning(f"saved attenuation table to {filename}")
+
+    def get_filename(self):
+        """
+        returns the filename of the table or None if the table is only kept in memory
+        """
+        return self._filename
+
+    def get_cumulative_attenuation(self, z, C_0, frequencies):
+        """
+        returns the cumulative attenuation integral H from the depth z up to the turning point of the ray
+
+        Parameters
+        ----------
+        z: float
+            the (unmirrored) depth, needs to be below the turning point of the ray
+        C_0: float
+            C_0 parameter of the analytic ray path
+        frequencies: array of floats
+            the frequencies
+
+        Returns
+        -------
+        H: array of floats or None
+            the integral of ds / L(z, f) at the frequencies or None if the ray is outside of the table
+        """
+        ray = self._get_ray(C_0)
+        if(ray is None or z < self._z_min - _z_tolerance):
+            return None
+        return self._interpolate_frequencies(self._lookup(z, *ray), frequencies)
+
+    def get_attenuation(self, z1, z2_mirrored, C_0, frequencies):
+        """
+        returns the attenuation factor of a path segment
+
+        Parameters
+        ----------
+        z1: float
+            the depth of the start point of the segment (the ray goes upwards at the start point)
+        z2_mirrored: float
+            the mirrored depth of the stop point of the segment, i.e., if the segment passes the turning point,
+            the depth of the stop point mirrored at the turning point (see `ray_tracing_2D.get_z_mirrored`)
+        C_0: float
+            C_0 parameter of the analytic ray path
+        frequencies: array of floats
+            the frequencies
+
+        Returns
+        -------
+        attenuation: array of floats or None
+            the attenuation factor at the frequencies or None if the segment is outside of the table
+        """
+        ray = self._get_ray(C_0)
+        if(ray is None):
+            return None
+        z_turn = ray[2]
+        if(z2_mirrored > z_turn):
+            z2 = 2 * z_turn - z2_mirrored
+            sign = 1
+        else:
+            z2 = z2_mirrored
+            sign = -1
+        # the start points of segments after a bottom reflection are at the bottom of the table
+        if(z1 < self._z_min - _z_tolerance or z2 < self._z_min - _z_tolerance):
+            return None
+        iC, wC, z_turn = ray
+        u1 = max(z_turn - z1, 0) ** 0.5 / self._du
+        u2 = max(z_turn - z2, 0) ** 0.5 / self._du
+        iU1 = min(int(u1), len(self._u) - 2)
+        iU2 = min(int(u2), len(self._u) - 2)
+        H = self._H[iC:iC + 2, [iU1, iU1 + 1, iU2, iU2 + 1]]
+        # the exponent at the two neighboring C_0 grid points
+        exponent = ((1 - u1 + iU1) * H[:, 0] + (u1 - iU1) * H[:, 1] +
+                    sign * ((1 - u2 + iU2) * H[:, 2] + (u2 - iU2) * H[:, 3]))
+        exponent = self._interpolate_frequencies(_interpolate_logarithmic(exponent[0], exponent[1], wC), frequencies)
+        if(exponent is None):
+            return None
+        return np.exp(-exponent)
+
+    def _get_ray(self, C_0):
+        """
+        returns the index and weight of the C_0 grid point and the turning point of the ray or None if the ray is
+        outside of the table
+        """
+        if(C_0 <= 1. / self._n_ice):
+            return None
+        # almost vertical rays are approximated by the most vertical ray of the table
+        logC0 = min(math.log(C_0 - 1. / self._n_ice), self._logC0_max)
+        if(logC0 < self._logC0_min):
+            return None
+        z_turn = min(math.log(self._n_ice * (C_0 - 1. / self._n_ice) / (C_0 * self._delta_n)) * self._z_0, 0)
+        iC = min(int(np.searchsorted(self._logC0, logC0, side='right')) - 1, len(self._logC0) - 2)
+        wC = (logC0 - self._logC0[iC]) / (self._logC0[iC + 1] - self._logC0[iC])
+        return iC, wC, z_turn
+
+    def _lookup(self, z, iC, wC, z_turn):
+        """
+        interpolates the table at the depth z of a ray (for all frequency grid points)
+        """
+        u = max(z_turn - z, 0) ** 0.5 / self._du
+        iU = min(int(u), len(self._u) - 2)
+        wU = u - iU
+        H1 = (1 - wU) * self._H[iC, iU] + wU * self._H[iC, iU + 1]
+        H2 = (1 - wU) * self._H[iC + 1, iU] + wU * self._H[iC + 1, iU + 1]
+        return _interpolate_logarithmic(H1, H2, wC)
+
+    def _interpolate_frequencies(self, H, frequencies):
+        """
+        interpolates H (given at the frequency grid points) to the frequencies
+
+        A cubic Lagrange interpolation of log(H) in log(f) is used (or of H if it is not positive).
+        The interpolation matrix is cached for the last frequency arrays.
+        """
+        frequencies = np.atleast_1d(frequencies)
+        key = (len(frequencies), frequencies.tobytes())
+        if(key not in self._frequency_interpolation):
+            if(len(self._frequency_interpolation) > 16):
+                self._frequency_interpolation.clear()
+            self._frequency_interpolation[key] = self._get_frequency_interpolation(frequencies)
+        weights, used = self._frequency_interpolation[key]
+        if(weights is None):
+            return None
+        if(H[used].min() > 0):
+            tmp = np.exp(np.dot(weights[:, used], np.log(H[used])))
+        else:
+            tmp = np.dot(weights, H)
+        if(not np.all(np.isfinite(tmp))):
+            return None
+        return tmp
+
+    def _get_frequency_interpolation(self, frequencies):
+        """
+        returns the interpolation matrix from the frequency grid to the frequencies and the used grid points
+        """
+        if(np.any(frequencies < self._frequencies[0]) or np.any(frequencies > self._frequencies[-1])):
+            return None, None
+        t = (np.log(frequencies) - self._log_frequencies[0]) / (self._log_frequencies[1] - self._log_frequencies[0])
+        iF = np.clip(t.astype(int), 0, len(self._frequencies) - 2)
+        # the four grid points of the interpolation must not enclose a kink of the attenuation model
+        i0 = iF - 1
+        for iK in self._kinks:
+            i0[iF + 1 == iK] = iF[iF + 1 == iK] - 2
+            i0[iF == iK] = iK
+        i0 = np.clip(i0, 0, len(self._frequencies) - 4)
+        x = t - i0
+        weights = np.zeros((len(frequencies), len(self._frequencies)))
+        index = np.arange(len(frequencies))
+        weights[index, i0] = -(x - 1) * (x - 2) * (x - 3) / 6
+        weights[index, i0 + 1] = x * (x - 2) * (x - 3) / 2
+        weights[index, i0 + 2] = -x * (x - 1) * (x - 3) / 2
+        weights[index, i0 + 3] = x * (x - 1) * (x - 2) / 6
+        return weights, np.any(weights != 0, axis=0)
+
+
+def _interpolate_logarithmic(a, b, w):
+    """
+    interpolates between a and b logarithmically where both are positive and linearly otherwise
+    """
+    if(a.min() > 0 and b.min() > 0):
+        return a * (b / a) ** w
+    result = (1 - w) * a + w * b
+    positive = (a > 0) & (b > 0)
+    result[positive] = a[positive] * (b[positive] / a[positive]) ** w
+    return result
+
+
+def get_attenuation_table(medium, attenuation_model="SP1", folder=None):
+    """
+    returns the attenuation table of the ice and attenuation model
+
+    The table is loaded from (or stored in) `folder` and kept in memory, i.e., it is only loaded once per process.
+
+    Parameters
+    ----------
+    medium: medium class
+        class describing the index-of-refraction profile
+    attenuation_model: string
+        the attenuation model
+    folder: string or None
+        the folder in which the table is stored. If None, the table is only kept in memory.
+    """
+    key = (medium.n_ice, medium.delta_n, medium.z_0, attenuation_model, folder)
+    if(key not in _tables):
+        _tables[key] = attenuation_table(medium, attenuation_model, folder)
+    return _tables[key]
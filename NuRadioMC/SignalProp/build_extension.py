@@ -0,0 +1,65 @@
+"""
+builds the C++ implementation of the analytic ray tracer (`CPPAnalyticRayTracing/wrapper`)
+
+The extension is not compiled when the ray tracer is imported. It needs to be built once after the
+installation (and after every update of the C++ code) by running
+
+    nuradiomc-build-raytracer
+
+or `python -m NuRadioMC.SignalProp.build_extension`. The build requires cython and the GSL library. The location
+of GSL is taken from the environment variable `GSLDIR` or determined via `gsl-config --prefix`.
+"""
+from __future__ import absolute_import, division, print_function
+import argparse
+import os
+import subprocess
+import sys
+import logging
+logger = logging.getLogger("build_extension")
+
+
+def get_extension_folder():
+    """
+    returns the folder of the C++ implementation of the ray tracer
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "CPPAnalyticRayTracing")
+
+
+def build(gsl_dir=None):
+    """
+    compiles the cython wrapper of the C++ ray tracer in place
+
+    Parameters
+    ----------
+    gsl_dir: string or None
+        the installation prefix of GSL. If None, the environment variable `GSLDIR` or the output of
+        `gsl-config --prefix` is used.
+    """
+    env = os.environ.copy()
+    if(gsl_dir is None):
+        gsl_dir = env.get("GSLDIR", None)
+    if(gsl_dir is None):
+        try:
+            gsl_dir = subprocess.check_output(["gsl-config", "--prefix"]).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            raise RuntimeError("the location of the GSL library could not be determined, please set the environment variable GSLDIR")
+    env["GSLDIR"] = gsl_dir
+    logger.warning(f"building the C++ ray tracer with GSLDIR = {gsl_dir}")
+    subprocess.check_call([sys.executable, "setup.py", "build_ext", "--inplace"], cwd=get_extension_folder(), env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='builds the C++ implementation of the analytic ray tracer')
+    parser.add_argument('--gsl-dir', type=str, default=None,
+                        help='the installation prefix of GSL (default: $GSLDIR or `gsl-config --prefix`)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    build(args.gsl_dir)
+
+    from NuRadioMC.SignalProp import analyticraytracing
+    analyticraytracing.set_backend('cpp')
+    print("the C++ ray tracer was built successfully")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+numba-compiled implementation of the core functions of the analytic ray tracer
+
+This module is used by `NuRadioMC.SignalProp.analyticraytracing` if the C++ implementation is not available
+and numba is installed. It implements the analytic ray path (`get_gamma`, `get_y`, ...), the objective function
+of the root finding (`get_delta_y`) and the line integrals along the ray path (path length, travel time and
+attenuation) for an exponential index-of-refraction profile n(z) = n_ice - delta_n * exp(z / z_0).
+The functions operate on plain floats, the medium is specified via its parameters `n_ice`, `delta_n` and `z_0`.
+
+The line integrals are calculated with an adaptive Gauss-Kronrod (7-15) quadrature. The integrand diverges
+like 1/sqrt(z_turn - z) at the turning point of the ray, the integration intervals adjacent to the turning point
+are therefore transformed with z = z_turn +- L * u^2 which removes the singularity.
+"""
+from __future__ import absolute_import, division, print_function
+import numpy as np
+import numba
+import scipy.constants
+from NuRadioReco.utilities import units
+
+speed_of_light = scipy.constants.c * units.m / units.s
+
+# nodes and weights of the 7-point Gauss and 15-point Kronrod rule (from QUADPACK)
+_xgk = np.array([0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+                 0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+                 0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+                 0.207784955007898467600689403773245, 0.000000000000000000000000000000000])
+_wgk = np.array([0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+                 0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+                 0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+                 0.204432940075298892414161999234649, 0.209482141084727828012999174891714])
+_wg = np.array([0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+                0.381830050505118944950369775488975, 0.417959183673469387755102040816327])
+
+_epmach = np.finfo(np.float64).eps
+_uflow = np.finfo(np.float64).tiny
+
+# quantities that can be integrated along the ray path (see `integrate_path`)
+PATH_LENGTH = 0
+TRAVEL_TIME = 1
+ATTENUATION = 2
+
+
+@numba.njit(cache=True)
+def n(z, n_ice, delta_n, z_0):
+    """
+    refractive index as a function of depth
+    """
+    return n_ice - delta_n * np.exp(z / z_0)
+
+
+@numba.njit(cache=True)
+def get_gamma(z, delta_n, z_0):
+    """
+    transforms z coordinate into gamma
+    """
+    return delta_n * np.exp(z / z_0)
+
+
+@numba.njit(cache=True)
+def get_turning_point(c, n_ice, delta_n, z_0):
+    """
+    calculates the turning point (gamma, z) of the ray, see `ray_tracing_2D.get_turning_point`
+    """
+    b = 2 * n_ice
+    gamma2 = b * 0.5 - (0.25 * b ** 2 - c) ** 0.5  # first solution discarded
+    z2 = np.log(gamma2 / delta_n) * z_0
+    if(z2 > 0):
+        z2 = 0.  # a reflection is just a turning point at z = 0
+        gamma2 = get_gamma(z2, delta_n, z_0)
+    return gamma2, z2
+
+
+@numba.njit(cache=True)
+def get_y(gamma, C_0, C_1, n_ice, z_0):
+    """
+    analytic form of the ray path y(gamma), see `ray_tracing_2D.get_y`
+    """
+    b = 2 * n_ice
+    c = n_ice ** 2 - C_0 ** -2
+    root = np.abs(gamma ** 2 - gamma * b + c)
+    logargument = gamma / (2 * c ** 0.5 * (root) ** 0.5 - b * gamma + 2 * c)
+    return z_0 * (n_ice ** 2 * C_0 ** 2 - 1) ** -0.5 * np.log(logargument) + C_1
+
+
+@numba.njit(cache=True)
+def get_y_with_z_mirror(z, C_0, C_1, n_ice, delta_n, z_0):
+    """
+    analytic form of the ray path y(z) that mirrors z values above the turning point,
+    see `ray_tracing_2D.get_y_with_z_mirror`
+    """
+    c = n_ice ** 2 - C_0 ** -2
+    gamma_turn, z_turn = get_turning_point(c, n_ice, delta_n, z_0)
+    y_turn = get_y(gamma_turn, C_0, C_1, n_ice, z_0)
+    if(z < z_turn):
+        return get_y(get_gamma(z, delta_n, z_0), C_0, C_1, n_ice, z_0)
+    else:
+        return 2 * y_turn - get_y(get_gamma(2 * z_turn - z, delta_n, z_0), C_0, C_1, n_ice, z_0)
+
+
+@numba.njit(cache=True)
+def get_y_turn(C_0, x1_y, x1_z, n_ice, delta_n, z_0):
+    """
+    calculates the y-coordinate of the turning point of the ray starting at (x1_y, x1_z)
+    """
+    c = n_ice ** 2 - C_0 ** -2
+    gamma_turn, z_turn = get_turning_point(c, n_ice, delta_n, z_0)
+    C_1 = x1_y - get_y_with_z_mirror(x1_z, C_0, 0., n_ice, delta_n, z_0)
+    return get_y(gamma_turn, C_0, C_1, n_ice, z_0)
+
+
+@numba.njit(cache=True)
+def get_delta_y(C_0, x1_y, x1_z, x2_y, x2_z, reflection, reflection_case, n_ice, delta_n, z_0, z_reflection):
+    """
+    calculates the difference in the y position between the analytic ray path specified by C_0
+    and the position x2, see `ray_tracing_2D.get_delta_y`
+    """
+    if(C_0 < 1. / n_ice):
+        return -np.inf
+    c = n_ice ** 2 - C_0 ** -2
+    if(reflection > 0 and reflection_case == 2):
+        # the rays start decreasing -> shift the start point to the left so that the ray is rising
+        dy = get_y_turn(C_0, x1_y, x1_z, n_ice, delta_n, z_0) - x1_y
+        x1_y = x1_y - 2 * dy
+    for i in range(reflection):
+        # continue the ray tracing from the point of the bottom reflection
+        C_1 = x1_y - get_y_with_z_mirror(x1_z, C_0, 0., n_ice, delta_n, z_0)
+        gamma_turn, z_turn = get_turning_point(c, n_ice, delta_n, z_0)
+        x1_y = get_y_with_z_mirror(-z_reflection + 2 * z_turn, C_0, C_1, n_ice, delta_n, z_0)
+        x1_z = z_reflection
+
+    C_1 = x1_y - get_y_with_z_mirror(x1_z, C_0, 0., n_ice, delta_n, z_0)
+    gamma_turn, z_turn = get_turning_point(c, n_ice, delta_n, z_0)
+    y_turn = get_y(gamma_turn, C_0, C_1, n_ice, z_0)
+    if(z_turn < x2_z):  # turning points is deeper that x2 positions, can't reach target
+        return -(((z_turn - x2_z) ** 2 + (y_turn - x2_y) ** 2) ** 0.5 + 10 * np.abs(z_turn - x2_z))
+    if(y_turn > x2_y):  # direct ray
+        return x2_y - get_y(get_gamma(x2_z, delta_n, z_0), C_0, C_1, n_ice, z_0)
+    else:  # refracted/reflected ray, x2 is on the mirrored part of the path
+        y2_fit = 2 * y_turn - get_y(get_gamma(x2_z, delta_n, z_0), C_0, C_1, n_ice, z_0)
+        return -1 * (x2_y - y2_fit)
+
+
+@numba.njit(cache=True)
+def obj_delta_y(logC_0, x1_y, x1_z, x2_y, x2_z, reflection, reflection_case, n_ice, delta_n, z_0, z_reflection):
+    """
+    objective function of the root finding in logC_0, see `ray_tracing_2D.obj_delta_y`
+    """
+    C_0 = np.exp(logC_0) + 1. / n_ice
+    return get_delta_y(C_0, x1_y, x1_z, x2_y, x2_z, reflection, reflection_case, n_ice, delta_n, z_0, z_reflection)
+
+
+@numba.njit(cache=True)
+def get_y_diff(z, C_0, n_ice, delta_n, z_0):
+    """
+    absolute value of the derivative dy(z)/dz of the unmirrored ray path
+    """
+    b = 2 * n_ice
+    c = n_ice ** 2 - C_0 ** -2
+    e = np.exp(z / z_0)
+    E = -b * delta_n * e + delta_n ** 2 * e ** 2 + c
+    B = 2 * c ** 0.5 * E ** 0.5 - b * delta_n * e + 2 * c
+    D = n_ice ** 2 * C_0 ** 2 - 1
+    res = (-c ** 0.5 * e * b * delta_n + 2 * E ** 0.5 * c + 2 * c ** 1.5) / B * E ** -0.5 * D ** -0.5
+    return np.abs(res)
+
+
+@numba.njit(cache=True)
+def get_temperature(z):
+    """
+    temperature in Celsius as a function of depth at the South Pole, see `attenuation.get_temperature`
+    """
+    z2 = np.abs(z / units.m)
+    return 1.83415e-09 * z2 ** 3 + (-1.59061e-08 * z2 ** 2) + 0.00267687 * z2 + (-51.0696)
+
+
+@numba.njit(cache=True)
+def get_attenuation_length(z, frequency, model):
+    """
+    attenuation length in ice, see `attenuation.get_attenuation_length`
+
+    Parameters
+    ----------
+    z: float
+        depth
+    frequency: float
+        frequency of the signal
+    model: int
+        the attenuation model (see `attenuation.model_to_int`: 1 = SP1, 2 = GL1, 3 = MB1)
+    """
+    if(model == 1):
+        t = get_temperature(z)
+        f0 = 0.0001
+        f2 = 3.16
+        w0 = np.log(f0)
+        w1 = 0.0
+        w2 = np.log(f2)
+        w = np.log(frequency / units.GHz)
+        b0 = -6.74890 + t * (0.026709 - t * 0.000884)
+        b1 = -6.22121 - t * (0.070927 + t * 0.001773)
+        b2 = -4.09468 - t * (0.002213 + t * 0.000332)
+        if(frequency < 1. * units.GHz):
+            a = (b1 * w0 - b0 * w1) / (w0 - w1)
+            bb = (b1 - b0) / (w1 - w0)
+        else:
+            a = (b2 * w1 - b1 * w2) / (w1 - w2)
+            bb = (b2 - b1) / (w2 - w1)
+        return 1. / np.exp(a + bb * w)
+    elif(model == 2):
+        zm = z / units.m
+        att_length_75 = (1.16052586e+03 + 6.87257150e-02 * zm - 9.82378264e-05 * zm ** 2 - 3.50628312e-07 * zm ** 3 -
+                         2.21040482e-10 * zm ** 4 - 3.63912864e-14 * zm ** 5)
+        min_length = 100 * units.m
+        if(att_length_75 < min_length):
+            att_length_75 = min_length
+        att_length_f = att_length_75 - 0.55 * units.m * (frequency / units.MHz - 75)
+        if(att_length_f < min_length):
+            att_length_f = min_length
+        return att_length_f
+    else:
+        R = 0.82
+        d_ice = 576 * units.m
+        att_length = 460 * units.m - 180 * units.m / units.GHz * frequency
+        att_length *= (1 + att_length / (2 * d_ice) * np.log(R)) ** -1
+        d = -z * 420. * units.m / d_ice
+        L = (1250. * 0.08886 * np.exp(-0.048827 * (225.6746 - 86.517596 * np.log10(848.870 - (d)))))
+        att_length *= L / 231.21 * units.m
+        return att_length
+
+
+@numba.njit(cache=True)
+def _integrand(quantity, z, C_0, z_turn, frequency, attenuation_model, n_ice, delta_n, z_0):
+    if(z > z_turn):  # transform mirrored z coordinate
+        z = 2 * z_turn - z
+    ds = (get_y_diff(z, C_0, n_ice, delta_n, z_0) ** 2 + 1) ** 0.5
+    if(quantity == PATH_LENGTH):
+        return ds
+    elif(quantity == TRAVEL_TIME):
+        return ds / speed_of_light * n(z, n_ice, delta_n, z_0)
+    else:
+        return ds / get_attenuation_length(z, frequency, attenuation_model)
+
+
+@numba.njit(cache=True)
+def _evaluate(quantity, x, z_turn, L, C_0, frequency, attenuation_model, n_ice, delta_n, z_0):
+    if(L == 0):
+        return _integrand(quantity, x, C_0, z_turn, frequency, attenuation_model, n_ice, delta_n, z_0)
+    # substitution z = z_turn + L * x^2 for integration intervals that end at the turning point
+    return _integrand(quantity, z_turn + L * x ** 2, C_0, z_turn, frequency, attenuation_model, n_ice, delta_n, z_0) * 2 * np.abs(L) * x
+
+
+@numba.njit(cache=True)
+def _qk15(quantity, a, b, z_turn, L, C_0, frequency, attenuation_model, n_ice, delta_n, z_0):
+    """
+    15-point Gauss-Kronrod rule with the error estimate of QUADPACK's qk15
+    """
+    center = 0.5 * (a + b)
+    half_length = 0.5 * (b - a)
+    fc = _evaluate(quantity, center, z_turn, L, C_0, frequency, attenuation_model, n_ice, delta_n, z_0)
+    resg = fc * _wg[3]
+    resk = fc * _wgk[7]
+    resabs = np.abs(resk)
+    fv1 = np.zeros(7)
+    fv2 = np.zeros(7)
+    for j in range(7):
+        dx = half_length * _xgk[j]
+        f1 = _evaluate(quantity, center - dx, z_turn, L, C_0, frequency, attenuation_model, n_ice, delta_n, z_0)
+        f2 = _evaluate(quantity, center + dx, z_turn, L, C_0, frequency, attenuation_model, n_ice, delta_n, z_0)
+        fv1[j] = f1
+        fv2[j] = f2
+        resk += _wgk[j] * (f1 + f2)
+        resabs += _wgk[j] * (np.abs(f1) + np.abs(f2))
+        if(j % 2 == 1):
+            resg += _wg[j // 2] * (f1 + f2)
+    reskh = resk * 0.5
+    resasc = _wgk[7] * np.abs(fc - reskh)
+    for j in range(7):
+        resasc += _wgk[j] * (np.abs(fv1[j] - reskh) + np.abs(fv2[j] - reskh))
+    result = resk * half_length
+    resabs *= np.abs(half_length)
+    resasc *= np.abs(half_length)
+    abserr = np.abs((resk - resg) * half_length)
+    if(resasc != 0 and abserr != 0):
+        abserr = resasc * min(1., (200 * abserr / resasc) ** 1.5)
+    if(resabs > _uflow / (50 * _epmach)):
+        abserr = max(_epmach * 50 * resabs, abserr)
+    return result, abserr
+
+
+@numba.njit(cache=True)
+def _integrate(quantity, a, b, z_turn, L, C_0, frequency, attenuation_model, n_ice, delta_n, z_0, epsabs, epsrel, limit):
+    """
+    globally adaptive integration (bisection of the interval with the largest error estimate)
+    """
+    lower = np.zeros(limit)
+    upper = np.zeros(limit)
+    results = np.zeros(limit)
+    errors = np.zeros(limit)
+    lower[0] = a
+    upper[0] = b
+    results[0], errors[0] = _qk15(quantity, a, b, z_turn, L, C_0, frequency, attenuation_model, n_ice, delta_n, z_0)
+    n_intervals = 1
+    while(n_intervals < limit):
+        result = np.sum(results[:n_intervals])
+        if(np.sum(errors[:n_intervals]) <= max(epsabs, epsrel * np.abs(result))):
+            break
+        i = np.argmax(errors[:n_intervals])
+        center = 0.5 * (lower[i] + upper[i])
+        lower[n_intervals] = center
+        upper[n_intervals] = upper[i]
+        results[n_intervals], errors[n_intervals] = _qk15(quantity, center, upper[i], z_turn, L, C_0, frequency,
+                                                          attenuation_model, n_ice, delta_n, z_0)
+        upper[i] = center
+        results[i], errors[i] = _qk15(quantity, lower[i], center, z_turn, L, C_0, frequency,
+                                      attenuation_model, n_ice, delta_n, z_0)
+        n_intervals += 1
+    return np.sum(results[:n_intervals])
+
+
+@numba.njit(cache=True)
+def integrate_path(quantity, z_start, z_stop, C_0, n_ice, delta_n, z_0, frequency=0., attenuation_model=1,
+                   epsabs=1e-4, epsrel=1.49e-8, limit=50):
+    """
+    calculates a line integral along the ray path between z_start and z_stop (mirrored z coordinates)
+
+    Parameters
+    ----------
+    quantity: int
+        PATH_LENGTH: path length, TRAVEL_TIME: travel time, ATTENUATION: integral of 1/attenuation length
+    z_start: float
+        start of the integration (z coordinate of the start point)
+    z_stop: float
+        end of the integration (mirrored z coordinate of the stop point, see `ray_tracing_2D.get_z_mirrored`)
+    C_0: float
+        C_0 parameter of the ray path
+    n_ice, delta_n, z_0: float
+        parameters of the index-of-refraction profile
+    frequency: float
+        frequency (only used for the attenuation)
+    attenuation_model: int
+        the attenuation model, see `get_attenuation_length`
+    epsabs: float
+        absolute tolerance
+    epsrel: float
+        relative tolerance
+    limit: int
+        maximum number of subintervals (per side of the turning point)
+    """
+    c = n_ice ** 2 - C_0 ** -2
+    gamma_turn, z_turn = get_turning_point(c, n_ice, delta_n, z_0)
+    if(z_start < z_turn and z_turn < z_stop):
+        # split at the turning point and remove the 1/sqrt singularity on both sides
+        return (_integrate(quantity, 0., 1., z_turn, z_start - z_turn, C_0, frequency, attenuation_model, n_ice, delta_n, z_0, epsabs, epsrel, limit) +
+                _integrate(quantity, 0., 1., z_turn, z_stop - z_turn, C_0, frequency, attenuation_model, n_ice, delta_n, z_0, epsabs, epsrel, limit))
+    elif(z_stop == z_turn or z_start == z_turn):
+        z_other = z_start if z_stop == z_turn else z_stop
+        return _integrate(quantity, 0., 1., z_turn, z_other - z_turn, C_0, frequency, attenuation_model, n_ice, delta_n, z_0, epsabs, epsrel, limit)
+    return _integrate(quantity, z_start, z_stop, z_turn, 0., C_0, frequency, attenuation_model, n_ice, delta_n, z_0, epsabs, epsrel, limit)
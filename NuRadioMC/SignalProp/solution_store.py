@@ -0,0 +1,265 @@
+from __future__ import absolute_import, division, print_function
+import numpy as np
+import hashlib
+import pickle
+import sqlite3
+import time
+import os
+from NuRadioReco.utilities import units
+import logging
+logger = logging.getLogger("solution_store")
+
+
+class solution_store():
+    """
+    On-disk store of ray tracing solutions that persists between simulation runs
+
+    The solutions are stored in a sqlite database (one file per ice model). Each entry is
+    addressed by the hash of the start and stop point of the ray (quantized to `quantization`),
+    the parameters of the ice model, the attenuation model and the number of bottom reflections.
+    An entry holds all ray tracing solutions between the two points, i.e., the parameters of the
+    analytic ray path (C0, C1, solution type, reflection, reflection case), the path length, the travel
+    time, the launch and receive vector and the attenuation at the reference frequencies of the
+    attenuation calculation.
+
+    The database is opened in write-ahead-log mode, hence, several processes can read from the store
+    while another process writes to it. New entries are buffered and committed in batches. If the size of
+    the store exceeds `max_size`, the least recently used entries are deleted.
+
+    Note that the stored results are those of the first pair of points that was calculated
+    for a given key, the quantization should therefore be small compared to the scale on
+    which the results vary.
+    """
+
+    def __init__(self, filename, max_size=2 ** 30,
+                 quantization=1 * units.cm, commit_interval=100):
+        """
+        Parameters
+        ----------
+        filename: string
+            the path to the sqlite file
+        max_size: int or None
+            the maximum size of the stored entries in bytes. If None, no entries are evicted.
+        quantization: float
+            the positions are rounded to this precision to compute the key of an entry
+        commit_interval: int
+            the number of new entries that are buffered before they are written to disk
+        """
+        self._filename = filename
+        self._max_size = max_size
+        self._quantization = quantization
+        self._commit_interval = commit_interval
+        self._pending = {}
+        self._accessed = {}
+        self._n_hits = 0
+        self._n_misses = 0
+        folder = os.path.dirname(os.path.abspath(filename))
+        if(not os.path.exists(folder)):
+            os.makedirs(folder)
+        self._connection = sqlite3.connect(filename, timeout=60)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, data BLOB, size INTEGER, last_access REAL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS last_access_index ON solutions (last_access)")
+        self._connection.commit()
+
+    def get_key(self, x1, x2, medium, attenuation_model, n_reflections):
+        """
+        returns the key of the ray tracing solutions between two points
+
+        Parameters
+        ----------
+        x1: 3dim np.array
+            start point of the ray
+        x2: 3dim np.array
+            stop point of the ray
+        medium: medium class
+            class describing the index-of-refraction profile
+        attenuation_model: string
+            the attenuation model
+        n_reflections: int
+            the maximum number of bottom reflections
+        """
+        positions = np.round(np.append(x1, x2) / self._quantization).astype(np.int64)
+        medium_parameters = [getattr(medium, name, None) for name in ['n_ice', 'delta_n', 'z_0', 'reflection', 'reflection_coefficient']]
+        key = "{}_{}_{}_{}_{:d}".format("_".join([str(x) for x in positions]), medium.__class__.__name__,
+                                        "_".join([repr(x) for x in medium_parameters]), attenuation_model, int(n_reflections))
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def get(self, key):
+        """
+        returns the stored ray tracing solutions (list of dictionaries, one per solution) or None
+
+        Parameters
+        ----------
+        key: string
+            the key of the entry, see `get_key`
+        """
+        if(key in self._pending):
+            self._n_hits += 1
+            return self._pending[key]
+        row = self._connection.execute("SELECT data FROM solutions WHERE key=?", (key,)).fetchone()
+        if(row is None):
+            self._n_misses += 1
+            return None
+        self._n_hits += 1
+        self._accessed[key] = time.time()
+        return pickle.loads(row[0])
+
+    def put(self, key, solutions):
+        """
+        adds (or replaces) an entry
+
+        Parameters
+        ----------
+        key: string
+            the key of the entry, see `get_key`
+        solutions: list of dictionaries
+            the ray tracing solutions
+        """
+        self._pending[key] = solutions
+        if(len(self._pending) >= self._commit_interval):
+            self.commit()
+
+    def commit(self):
+        """
+        writes all buffered entries to disk and evicts the least recently used entries if the store is too large
+        """
+        if(not len(self._pending) and not len(self._accessed)):
+            return
+        now = time.time()
+        with self._connection:
+            self._connection.executemany("UPDATE solutions SET last_access=? WHERE key=?",
+                                         [(t, key) for key, t in self._accessed.items()])
+            rows = []
+            for key, solutions in self._pending.items():
+                data = pickle.dumps(solutions, protocol=4)
+                rows.append((key, sqlite3.Binary(data), len(data), now))
+            self._connection.executemany("INSERT OR REPLACE INTO solutions (key, data, size, last_access) VALUES (?, ?, ?, ?)", rows)
+            if(self._max_size is not None):
+                size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM solutions").fetchone()[0]
+                if(size > self._max_size):
+                    # evict the least recently used entries until the store is filled to 90%
+                    n_deleted = 0
+                    for key, entry_size in self._connection.execute("SELECT key, size FROM solutions ORDER BY last_access ASC").fetchall():
+                        if(size <= 0.9 * self._max_size):
+                            break
+                        self._connection.execute("DELETE FROM solutions WHERE key=?", (key,))
+                        size -= entry_size
+                        n_deleted += 1
+                    logger.info(f"evicted {n_deleted:d} entries from the ray tracing solution store {self._filename}")
+        self._pending = {}
+        self._accessed = {}
+
+    def get_number_of_entries(self):
+        """
+        returns the number of entries in the store (including entries that are not yet committed)
+        """
+        n = self._connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        return n + len([key for key in self._pending if self._connection.execute("SELECT 1 FROM solutions WHERE key=?", (key,)).fetchone() is None])
+
+    def get_hit_rate(self):
+        """
+        returns the fraction of lookups that were found in the store
+        """
+        return self._n_hits / max(1, self._n_hits + self._n_misses)
+
+    def close(self):
+        """
+        commits all pending entries and closes the database
+        """
+        self.commit()
+        self._connection.close()
+
+
+class memory_solution_store():
+    """
+    In-memory store of ray tracing solutions with the interface of `solution_store`
+
+    It is used to share the ray tracing solutions between several ray tracers, e.g., between the detector
+    layouts of a multi-layout simulation, where the channels at the same position need to be ray traced only once.
+    Optionally, the lookups that are not found in memory are forwarded to a persistent `solution_store`
+    and new entries are written to it.
+    """
+
+    def __init__(self, backend=None, quantization=1 * units.mm):
+        """
+        Parameters
+        ----------
+        backend: solution_store or None
+            optional persistent store. If set, its keys are used.
+        quantization: float
+            the positions are rounded to this precision to compute the key of an entry (only used without backend)
+        """
+        self._backend = backend
+        self._quantization = quantization
+        self._solutions = {}
+        self._n_hits = 0
+        self._n_misses = 0
+
+    def get_key(self, x1, x2, medium, attenuation_model, n_reflections):
+        """
+        returns the key of the ray tracing solutions between two points, see `solution_store.get_key`
+        """
+        if(self._backend is not None):
+            return self._backend.get_key(x1, x2, medium, attenuation_model, n_reflections)
+        positions = np.round(np.append(x1, x2) / self._quantization).astype(np.int64)
+        medium_parameters = [getattr(medium, name, None) for name in ['n_ice', 'delta_n', 'z_0', 'reflection', 'reflection_coefficient']]
+        return (tuple(positions), medium.__class__.__name__, tuple(medium_parameters), attenuation_model, int(n_reflections))
+
+    def get(self, key):
+        """
+        returns the stored ray tracing solutions (list of dictionaries, one per solution) or None
+        """
+        if(key in self._solutions):
+            self._n_hits += 1
+            return self._solutions[key]
+        solutions = None
+        if(self._backend is not None):
+            solutions = self._backend.get(key)
+        if(solutions is None):
+            self._n_misses += 1
+            return None
+        self._n_hits += 1
+        self._solutions[key] = solutions
+        return solutions
+
+    def put(self, key, solutions):
+        """
+        adds (or replaces) an entry
+        """
+        self._solutions[key] = solutions
+        if(self._backend is not None):
+            self._backend.put(key, solutions)
+
+    def clear(self):
+        """
+        removes all entries from memory (the entries of the persistent store are kept)
+        """
+        self._solutions = {}
+
+    def commit(self):
+        """
+        writes all buffered entries of the persistent store to disk
+        """
+        if(self._backend is not None):
+            self._backend.commit()
+
+    def get_number_of_entries(self):
+        """
+        returns the number of entries in memory
+        """
+        return len(self._solutions)
+
+    def get_hit_rate(self):
+        """
+        returns the fraction of lookups that were found in memory or in the persistent store
+        """
+        return self._n_hits / max(1, self._n_hits + self._n_misses)
+
+    def close(self):
+        """
+        clears the store and closes the persistent store
+        """
+        self.clear()
+        if(self._backend is not None):
+            self._backend.close()
@@ -4,6 +4,7 @@ from radiotools import helper as hp
 from radiotools import plthelpers as php
 from matplotlib import pyplot as plt
 from NuRadioReco.utilities import units
+from NuRadioMC.utilities import categorical
 import h5py
 import argparse
 import json
@@ -41,7 +42,7 @@ for input_filename in args.inputfilename:
     azimuths.extend(np.array(fin['azimuths']))
     inelasticity.extend(np.array(fin['inelasticity']))
     flavors.extend(np.array(fin['flavors']))
-    interaction_type.extend(np.array(fin['interaction_type']))
+    interaction_type.extend(categorical.read_strings(fin, 'interaction_type'))
 
 print(f"starting plotting")
 ###########################
@@ -53,20 +54,20 @@ flavor_labels = ['e cc', r'$\bar{e}$ cc', 'e nc', r'$\bar{e}$ nc',
 flavors = np.array(flavors)
 interaction_type = np.array(interaction_type)
 flavor_sum = np.zeros(len(flavor_labels))
-flavor_sum[0] = np.sum((flavors == 12) & (interaction_type == b'cc'))
-flavor_sum[1] = np.sum((flavors == -12) & (interaction_type == b'cc'))
-flavor_sum[2] = np.sum((flavors == 12) & (interaction_type == b'nc'))
-flavor_sum[3] = np.sum((flavors == -12) & (interaction_type == b'nc'))
+flavor_sum[0] = np.sum((flavors == 12) & (interaction_type == 'cc'))
+flavor_sum[1] = np.sum((flavors == -12) & (interaction_type == 'cc'))
+flavor_sum[2] = np.sum((flavors == 12) & (interaction_type == 'nc'))
+flavor_sum[3] = np.sum((flavors == -12) & (interaction_type == 'nc'))
 
-flavor_sum[4] = np.sum((flavors == 14) & (interaction_type == b'cc'))
-flavor_sum[5] = np.sum((flavors == -14) & (interaction_type == b'cc'))
-flavor_sum[6] = np.sum((flavors == 14) & (interaction_type == b'nc'))
-flavor_sum[7] = np.sum((flavors == -14) & (interaction_type == b'nc'))
+flavor_sum[4] = np.sum((flavors == 14) & (interaction_type == 'cc'))
+flavor_sum[5] = np.sum((flavors == -14) & (interaction_type == 'cc'))
+flavor_sum[6] = np.sum((flavors == 14) & (interaction_type == 'nc'))
+flavor_sum[7] = np.sum((flavors == -14) & (interaction_type == 'nc'))
 
-flavor_sum[8] = np.sum((flavors == 16) & (interaction_type == b'cc'))
-flavor_sum[9] = np.sum((flavors == -16) & (interaction_type == b'cc'))
-flavor_sum[10] = np.sum((flavors == 16) & (interaction_type == b'nc'))
-flavor_sum[11] = np.sum((flavors == -16) & (interaction_type == b'nc'))
+flavor_sum[8] = np.sum((flavors == 16) & (interaction_type == 'cc'))
+flavor_sum[9] = np.sum((flavors == -16) & (interaction_type == 'cc'))
+flavor_sum[10] = np.sum((flavors == 16) & (interaction_type == 'nc'))
+flavor_sum[11] = np.sum((flavors == -16) & (interaction_type == 'nc'))
 
 fig, ax = plt.subplots(1, 1, figsize=(8, 6))
 ax.bar(range(len(flavor_labels)), flavor_sum)
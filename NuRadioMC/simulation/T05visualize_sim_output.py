@@ -6,6 +6,8 @@ from matplotlib import pyplot as plt
 from NuRadioReco.utilities import units
 from NuRadioMC.utilities import medium
 from NuRadioMC.utilities import plotting
+from NuRadioMC.utilities import trigger_masks
+from NuRadioMC.utilities import categorical
 from six import iteritems
 import h5py
 import argparse
@@ -42,14 +44,12 @@ else:
         plot_folder = os.path.join(dirname, 'plots', filename, args.trigger_name[0])
         if(not os.path.exists(plot_folder)):
             os.makedirs(plot_folder)
-        triggered = np.zeros(len(fin['multiple_triggers'][:, 0]), dtype=np.bool)
-        for trigger in args.trigger_name[1:]:
-            iTrigger = np.squeeze(np.argwhere(fin.attrs['trigger_names'] == trigger))
-            triggered = triggered | np.array(fin['multiple_triggers'][:, iTrigger], dtype=np.bool)
+        trigger_names, masks = trigger_masks.read(fin)
+        triggered = trigger_masks.evaluate(masks, trigger_names, args.trigger_name[1:])
     else:
         trigger_name = args.trigger_name[0]
-        iTrigger = np.argwhere(fin.attrs['trigger_names'] == trigger_name)
-        triggered = np.array(fin['multiple_triggers'][:, iTrigger], dtype=np.bool)
+        trigger_names, masks = trigger_masks.read(fin)
+        triggered = trigger_masks.evaluate(masks, trigger_names, trigger_name)
         print("\tyou selected '{}'".format(trigger_name))
         plot_folder = os.path.join(dirname, 'plots', filename, trigger_name)
         if(not os.path.exists(plot_folder)):
@@ -257,20 +257,21 @@ for key, station in iteritems(fin):
                    '$\mu$ cc', r'$\bar{\mu}$ cc', '$\mu$ nc', r'$\bar{\mu}$ nc',
                    r'$\tau$ cc', r'$\bar{\tau}$ cc', r'$\tau$ nc', r'$\bar{\tau}$ nc']
         yy = np.zeros(len(flavor_labels))
-        yy[0] = np.sum(weights[(fin['flavors'][triggered] == 12) & (fin['interaction_type'][triggered] == b'cc')])
-        yy[1] = np.sum(weights[(fin['flavors'][triggered] == -12) & (fin['interaction_type'][triggered] == b'cc')])
-        yy[2] = np.sum(weights[(fin['flavors'][triggered] == 12) & (fin['interaction_type'][triggered] == b'nc')])
-        yy[3] = np.sum(weights[(fin['flavors'][triggered] == -12) & (fin['interaction_type'][triggered] == b'nc')])
+        interaction_type = categorical.read_strings(fin, 'interaction_type')
+        yy[0] = np.sum(weights[(fin['flavors'][triggered] == 12) & (interaction_type[triggered] == 'cc')])
+        yy[1] = np.sum(weights[(fin['flavors'][triggered] == -12) & (interaction_type[triggered] == 'cc')])
+        yy[2] = np.sum(weights[(fin['flavors'][triggered] == 12) & (interaction_type[triggered] == 'nc')])
+        yy[3] = np.sum(weights[(fin['flavors'][triggered] == -12) & (interaction_type[triggered] == 'nc')])
 
-        yy[4] = np.sum(weights[(fin['flavors'][triggered] == 14) & (fin['interaction_type'][triggered] == b'cc')])
-        yy[5] = np.sum(weights[(fin['flavors'][triggered] == -14) & (fin['interaction_type'][triggered] == b'cc')])
-        yy[6] = np.sum(weights[(fin['flavors'][triggered] == 14) & (fin['interaction_type'][triggered] == b'nc')])
-        yy[7] = np.sum(weights[(fin['flavors'][triggered] == -14) & (fin['interaction_type'][triggered] == b'nc')])
+        yy[4] = np.sum(weights[(fin['flavors'][triggered] == 14) & (interaction_type[triggered] == 'cc')])
+        yy[5] = np.sum(weights[(fin['flavors'][triggered] == -14) & (interaction_type[triggered] == 'cc')])
+        yy[6] = np.sum(weights[(fin['flavors'][triggered] == 14) & (interaction_type[triggered] == 'nc')])
+        yy[7] = np.sum(weights[(fin['flavors'][triggered] == -14) & (interaction_type[triggered] == 'nc')])
 
-        yy[8] = np.sum(weights[(fin['flavors'][triggered] == 16) & (fin['interaction_type'][triggered] == b'cc')])
-        yy[9] = np.sum(weights[(fin['flavors'][triggered] == -16) & (fin['interaction_type'][triggered] == b'cc')])
-        yy[10] = np.sum(weights[(fin['flavors'][triggered] == 16) & (fin['interaction_type'][triggered] == b'nc')])
-        yy[11] = np.sum(weights[(fin['flavors'][triggered] == -16) & (fin['interaction_type'][triggered] == b'nc')])
+        yy[8] = np.sum(weights[(fin['flavors'][triggered] == 16) & (interaction_type[triggered] == 'cc')])
+        yy[9] = np.sum(weights[(fin['flavors'][triggered] == -16) & (interaction_type[triggered] == 'cc')])
+        yy[10] = np.sum(weights[(fin['flavors'][triggered] == 16) & (interaction_type[triggered] == 'nc')])
+        yy[11] = np.sum(weights[(fin['flavors'][triggered] == -16) & (interaction_type[triggered] == 'nc')])
 
         fig, ax = plt.subplots(1, 1, figsize=(8, 6))
         ax.bar(range(len(flavor_labels)), yy)
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function
 import numpy as np
 from NuRadioReco.utilities import units
+from NuRadioMC.utilities import categorical
 from radiotools import helper as hp
 from radiotools import plthelpers as php
 import argparse
@@ -15,7 +16,7 @@ fin = h5py.File(args.hdf5input[0], 'r')
 event_ids = np.array(fin['event_ids'])
 flavors = np.array(fin['flavors'])
 energies = np.array(fin['energies'])
-ccncs = np.array(fin['interaction_type'])
+ccncs = categorical.read_strings(fin, 'interaction_type')
 xx = np.array(fin['xx'])
 yy = np.array(fin['yy'])
 zz = np.array(fin['zz'])
@@ -0,0 +1,91 @@
+from __future__ import absolute_import, division, print_function
+import threading
+import queue
+import logging
+logger = logging.getLogger("sim.async_event_writer")
+
+
+class async_event_writer():
+    """
+    Writes events with an eventWriter module in a background thread
+
+    Events are passed to a bounded queue and are serialized and written to disk
+    by a worker thread while the simulation continues. If the queue is full, `run`
+    blocks until the worker has caught up (backpressure), which limits the number
+    of events held in memory. Exceptions raised by the worker are re-raised in the
+    calling thread at the next call of `run` or `end`.
+    """
+
+    def __init__(self, event_writer, max_queue_size=10):
+        """
+        Parameters
+        ----------
+        event_writer: eventWriter
+            an initialized NuRadioReco eventWriter module (i.e. `begin` was already called)
+        max_queue_size: int
+            the maximum number of events that are waiting to be written
+        """
+        self._event_writer = event_writer
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._exception = None
+        self._thread = threading.Thread(target=self._worker, name="async_event_writer", daemon=True)
+        self._thread.start()
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if(item is None):
+                    return
+                if(self._exception is None):  # skip all remaining events after an error
+                    evt, det = item
+                    if det is None:
+                        self._event_writer.run(evt)
+                    else:
+                        self._event_writer.run(evt, det)
+            except Exception as e:
+                logger.error(f"writing of event failed: {e}")
+                self._exception = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_exception(self):
+        if(self._exception is not None):
+            exception = self._exception
+            self._exception = None
+            raise exception
+
+    def run(self, evt, det=None):
+        """
+        adds an event to the write queue, blocks if the queue is full
+
+        The event must not be modified after it was passed to this function.
+
+        Parameters
+        ----------
+        evt: Event
+            the event to be written
+        det: Detector or None
+            the detector description that is written together with the event
+        """
+        self._raise_exception()
+        if(not self._thread.is_alive()):
+            raise RuntimeError("the writer thread has already been stopped")
+        self._queue.put((evt, det))
+
+    def flush(self):
+        """
+        blocks until all queued events are written
+        """
+        self._queue.join()
+        self._raise_exception()
+
+    def end(self):
+        """
+        writes all remaining events, stops the worker thread and finalizes the eventWriter
+        """
+        if(self._thread.is_alive()):
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_exception()
+        return self._event_writer.end()
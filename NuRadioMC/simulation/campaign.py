@@ -0,0 +1,244 @@
+"""
+local orchestration of a NuRadioMC simulation campaign over many input files
+
+A campaign simulates all input files (`*.hdf5.partNNNN`, as created by the event generator or `split_hdf5`) of a
+directory, either directly in the directory or in one subdirectory per energy bin. Every part file is simulated in a
+separate process by running the steering script (or module) with the usual positional arguments
+
+    python steering.py inputfilename detectordescription config outputfilename [outputfilenameNuRadioReco]
+
+The parts are distributed over a local pool of workers, failed parts are retried and parts whose output file already
+exists and is complete are skipped, i.e., an interrupted campaign can be restarted with the same command. The outputs
+of all parts of an energy bin are merged as soon as the last part of the bin has finished. Run it via
+
+    nuradiomc-campaign steering.py input_dir detector.json config.yaml output_dir --n-cores 8
+
+The outputs of the parts are written to `output_dir` with the same relative path as the input files, the logs of the
+simulations to `output_dir/logs` and the merged files of the energy bins to `output_dir/merged` (again with the relative
+path of the energy bin, so bins in different subdirectories never share a merged file).
+"""
+from __future__ import absolute_import, division, print_function
+import argparse
+import glob
+import os
+import re
+import subprocess
+import sys
+import time
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import h5py
+import logging
+logger = logging.getLogger("sim.campaign")
+
+_part_pattern = re.compile(r"\.part\d{4,}$")
+
+
+def get_part_files(input_dir):
+    """
+    returns the relative paths of all part files of the input directory (and its subdirectories)
+    """
+    filenames = glob.glob(os.path.join(input_dir, "*.part????*")) + glob.glob(os.path.join(input_dir, "*", "*.part????*"))
+    return sorted([os.path.relpath(filename, input_dir) for filename in filenames if _part_pattern.search(filename)])
+
+
+def get_bin_name(part_filename):
+    """
+    returns the name of the energy bin of a part file, i.e., the relative path without the `.partNNNN` suffix
+    """
+    return _part_pattern.sub("", part_filename)
+
+
+def is_finished(filename):
+    """
+    returns True if the hdf5 output file of a part exists and is complete
+
+    The simulation writes the hdf5 output file at the very end of the run, a file that can not be read or that is
+    missing the `n_events` attribute is the remnant of a crashed run.
+    """
+    if(not os.path.exists(filename)):
+        return False
+    try:
+        with h5py.File(filename, 'r') as fin:
+            return 'n_events' in fin.attrs and 'triggered' in fin
+    except (OSError, KeyError):
+        return False
+
+
+def get_steering_command(steering):
+    """
+    returns the command that runs the steering script (a python file) or module (a python module name)
+    """
+    if(steering.endswith(".py")):
+        return [sys.executable, os.path.abspath(steering)]
+    return [sys.executable, "-m", steering]
+
+
+def _run_part(job):
+    """
+    simulates one part file with retries (runs in a thread of the pool, the simulation runs in a subprocess)
+
+    Returns
+    -------
+    tuple of the job, the success and the number of attempts
+    """
+    for attempt in range(1, job['n_retries'] + 2):
+        # remove the output of a previous failed attempt, the simulation refuses to overwrite existing files
+        for filename in [job['output'], job['output_nur']]:
+            if(filename is not None and os.path.exists(filename)):
+                os.remove(filename)
+        cmd = job['command'] + [job['input'], job['detector'], job['config'], job['output']]
+        if(job['output_nur'] is not None):
+            cmd.append(job['output_nur'])
+        t_start = time.time()
+        with open(job['log'], 'a') as flog:
+            flog.write(f"attempt {attempt:d}: {' '.join(cmd)}\n")
+            flog.flush()
+            returncode = subprocess.call(cmd, stdout=flog, stderr=subprocess.STDOUT, cwd=job['cwd'])
+        if(returncode == 0 and is_finished(job['output'])):
+            logger.info(f"{job['input']} finished after {time.time() - t_start:.0f}s (attempt {attempt:d})")
+            return job, True, attempt
+        logger.warning(f"{job['input']} failed with return code {returncode:d} (attempt {attempt:d} of {job['n_retries'] + 1:d}), see {job['log']}")
+    return job, False, job['n_retries'] + 1
+
+
+def merge_bin(part_outputs, output_filename):
+    """
+    merges the hdf5 outputs of the parts of an energy bin
+
+    The parts are merged with `merge_hdf5.merge_stream`, i.e., one data set of one part is held in memory at a time.
+    The merge is skipped if the merged file is newer than all parts.
+    """
+    if(os.path.exists(output_filename)):
+        if(os.path.getmtime(output_filename) >= max([os.path.getmtime(filename) for filename in part_outputs])):
+            logger.info(f"{output_filename} is up to date, skipping merge")
+            return False
+        os.remove(output_filename)
+    folder = os.path.dirname(output_filename)
+    if(folder != '' and not os.path.exists(folder)):
+        os.makedirs(folder)
+    # imported here because the merger module configures the logging on import
+    from NuRadioMC.utilities import merge_hdf5
+    merge_hdf5.merge_stream(sorted(part_outputs), output_filename)
+    logger.warning(f"merged {len(part_outputs):d} parts into {output_filename}")
+    return True
+
+
+def run_campaign(steering, input_dir, detectorfile, config_file, output_dir, n_cores=None, n_retries=2,
+                 nur_output=False, merge=True):
+    """
+    simulates all part files of the input directory and merges the outputs per energy bin
+
+    Parameters
+    ----------
+    steering: string
+        the steering script (a python file) or module (name of a python module) of the simulation
+    input_dir: string
+        the directory that contains the part files (directly or in one subdirectory per energy bin)
+    detectorfile: string
+        the detector description
+    config_file: string
+        the NuRadioMC config file
+    output_dir: string
+        the output directory
+    n_cores: int or None
+        the number of simulations that run at the same time, if None the number of cores is used
+    n_retries: int
+        the number of times a failed part is restarted
+    nur_output: bool
+        if True, the steering script also writes the NuRadioReco output file (`<output>.nur`)
+    merge: bool
+        if True, the outputs of each energy bin are merged once all of its parts have finished
+
+    Returns
+    -------
+    dict with the keys 'finished', 'skipped', 'failed' (lists of part files) and 'merged' (list of merged files)
+    """
+    part_files = get_part_files(input_dir)
+    if(not len(part_files)):
+        raise FileNotFoundError(f"no input files (*.partNNNN) found in {input_dir}")
+    command = get_steering_command(steering)
+    summary = {'finished': [], 'skipped': [], 'failed': [], 'merged': []}
+    bins = {}
+    todo = []
+    for part_file in part_files:
+        output = os.path.join(output_dir, part_file)
+        bins.setdefault(get_bin_name(part_file), []).append(output)
+        if(is_finished(output)):
+            logger.info(f"{output} exists, skipping {part_file}")
+            summary['skipped'].append(part_file)
+            continue
+        log = os.path.join(output_dir, "logs", part_file + ".log")
+        for filename in [output, log]:
+            if(not os.path.exists(os.path.dirname(filename))):
+                os.makedirs(os.path.dirname(filename))
+        todo.append({'input': os.path.abspath(os.path.join(input_dir, part_file)),
+                     'part_file': part_file,
+                     'detector': os.path.abspath(detectorfile),
+                     'config': os.path.abspath(config_file),
+                     'output': os.path.abspath(output),
+                     'output_nur': os.path.abspath(output) + ".nur" if nur_output else None,
+                     'log': os.path.abspath(log),
+                     'cwd': os.path.abspath(output_dir),
+                     'command': command,
+                     'n_retries': int(n_retries)})
+    logger.warning(f"{len(part_files):d} part files in {len(bins):d} energy bins, {len(todo):d} parts need to be simulated")
+
+    def merge_if_complete(bin_name):
+        outputs = bins[bin_name]
+        if(merge and all([is_finished(output) for output in outputs])):
+            merged = os.path.join(output_dir, "merged", bin_name)
+            if(merge_bin(outputs, merged)):
+                summary['merged'].append(merged)
+
+    # bins without parts to simulate are merged right away (if not already done)
+    bins_todo = set([get_bin_name(job['part_file']) for job in todo])
+    for bin_name in bins:
+        if(bin_name not in bins_todo):
+            merge_if_complete(bin_name)
+
+    if(len(todo)):
+        # the simulations run in subprocesses (the detector classes are singletons), threads are sufficient to
+        # schedule them
+        pool = ThreadPool(min(n_cores or multiprocessing.cpu_count(), len(todo)))
+        try:
+            for job, success, n_attempts in pool.imap_unordered(_run_part, todo):
+                if(success):
+                    summary['finished'].append(job['part_file'])
+                    merge_if_complete(get_bin_name(job['part_file']))
+                else:
+                    summary['failed'].append(job['part_file'])
+                    logger.error(f"{job['part_file']} failed {n_attempts:d} times, giving up")
+        finally:
+            pool.close()
+            pool.join()
+    logger.warning(f"campaign finished: {len(summary['finished']):d} parts simulated, {len(summary['skipped']):d} skipped, {len(summary['failed']):d} failed, {len(summary['merged']):d} energy bins merged")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='runs a NuRadioMC simulation campaign over all part files of a directory on the local machine')
+    parser.add_argument('steering', type=str,
+                        help='the steering script (python file) or module (python module name) of the simulation')
+    parser.add_argument('input_dir', type=str, help='the directory with the input part files (*.partNNNN)')
+    parser.add_argument('detectordescription', type=str, help='path to file containing the detector description')
+    parser.add_argument('config', type=str, help='NuRadioMC yaml config file')
+    parser.add_argument('output_dir', type=str, help='the output directory')
+    parser.add_argument('--n-cores', type=int, default=None,
+                        help='the number of simulations that run at the same time (default: number of cores)')
+    parser.add_argument('--retries', type=int, default=2, help='the number of retries of failed parts (default: 2)')
+    parser.add_argument('--nur', action='store_true', help='also write the NuRadioReco output files')
+    parser.add_argument('--no-merge', action='store_true', help='do not merge the outputs per energy bin')
+    parser.add_argument('--loglevel', type=str, default='WARNING', help='DEBUG, INFO or WARNING')
+    args = parser.parse_args()
+    logging.basicConfig()
+    logger.setLevel(getattr(logging, args.loglevel))
+    summary = run_campaign(args.steering, args.input_dir, args.detectordescription, args.config, args.output_dir,
+                           n_cores=args.n_cores, n_retries=args.retries, nur_output=args.nur, merge=not args.no_merge)
+    if(len(summary['failed'])):
+        print(f"{len(summary['failed']):d} parts failed: {summary['failed']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+from __future__ import absolute_import, division, print_function
+import numpy as np
+from NuRadioReco.utilities import units, fft
+import NuRadioReco.modules.channelGenericNoiseAdder
+import logging
+logger = logging.getLogger("sim.noise_bank")
+
+
+class noise_bank():
+    """
+    Bank of filtered thermal noise realizations
+
+    For each channel, `n_realizations` noise realizations are generated once in the frequency
+    domain (with the same normalization as the `channelGenericNoiseAdder` module) and multiplied
+    with the filter response of the channel. New realizations are drawn by combining two random
+    realizations of the bank, each shifted circularly by a random number of samples, with
+    a random rotation angle phi: `cos(phi) * n1 + sin(phi) * n2`. As the realizations are independent,
+    this preserves the power spectrum and thereby the Vrms and the spectral shape of the noise.
+    """
+
+    def __init__(self, frequencies, sampling_rate, filters, amplitudes, n_realizations=100,
+                 noise_type='rayleigh', seed=None):
+        """
+        Parameters
+        ----------
+        frequencies: array of floats
+            the frequencies of the noise spectrum, i.e., `np.fft.rfftfreq(n_samples, 1 / sampling_rate)`
+        sampling_rate: float
+            the sampling rate of the noise traces
+        filters: dict of arrays of complex
+            the filter response (on `frequencies`) that is applied to the noise for each channel id
+        amplitudes: dict of floats
+            the Vrms of the unfiltered noise for each channel id (normalized to the bandwidth from 0 to the
+            Nyquist frequency, see `channelGenericNoiseAdder.bandlimited_noise`)
+        n_realizations: int
+            the number of noise realizations that are stored per channel
+        noise_type: string
+            the type of the noise, see `channelGenericNoiseAdder.bandlimited_noise`
+        seed: int or None
+            the random seed
+        """
+        self._ff = frequencies
+        self._sampling_rate = sampling_rate
+        self._n_samples = 2 * (len(self._ff) - 1)
+        self._random_generator = np.random.RandomState(seed)
+        noise_adder = NuRadioReco.modules.channelGenericNoiseAdder.channelGenericNoiseAdder()
+        noise_adder.begin(seed=self._random_generator.randint(0, 2 ** 31 - 1))
+        self._bank = {}
+        for channel_id, filt in filters.items():
+            self._bank[channel_id] = np.zeros((n_realizations, len(self._ff)), dtype=np.complex)
+            for i in range(n_realizations):
+                self._bank[channel_id][i] = noise_adder.bandlimited_noise(0, None, self._n_samples, self._sampling_rate,
+                                                                          amplitudes[channel_id], type=noise_type,
+                                                                          time_domain=False) * filt
+        logger.info(f"created noise bank with {n_realizations:d} realizations for {len(filters):d} channels")
+
+    def get_number_of_samples(self):
+        """
+        returns the number of samples of the noise traces in the time domain
+        """
+        return self._n_samples
+
+    def get_noise_spectrum(self, channel_id, random_state=None):
+        """
+        returns a new noise realization in the frequency domain
+
+        Parameters
+        ----------
+        channel_id: int
+            the channel id
+        random_state: numpy.random.RandomState or None
+            the generator of the random combination of the bank realizations, if None the generator of the bank is used
+        """
+        if(random_state is None):
+            random_state = self._random_generator
+        bank = self._bank[channel_id]
+        i1, i2 = random_state.choice(len(bank), 2, replace=False)
+        shifts = random_state.randint(0, self._n_samples, 2) / self._sampling_rate
+        phi = random_state.uniform(0, 2 * np.pi)
+        noise = np.cos(phi) * bank[i1] * np.exp(-2j * np.pi * self._ff * shifts[0])
+        noise += np.sin(phi) * bank[i2] * np.exp(-2j * np.pi * self._ff * shifts[1])
+        return noise
+
+    def get_noise_trace(self, channel_id, random_state=None):
+        """
+        returns a new noise realization in the time domain
+
+        Parameters
+        ----------
+        channel_id: int
+            the channel id
+        random_state: numpy.random.RandomState or None
+            the generator of the random combination of the bank realizations, if None the generator of the bank is used
+        """
+        return fft.freq2time(self.get_noise_spectrum(channel_id, random_state), self._sampling_rate, n=self._n_samples)
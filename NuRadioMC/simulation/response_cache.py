@@ -0,0 +1,198 @@
+from __future__ import absolute_import, division, print_function
+import numpy as np
+import hashlib
+import pickle
+import os
+from NuRadioReco.utilities import units
+from NuRadioReco.utilities import trace_utilities
+import NuRadioReco.detector.antennapattern
+import logging
+logger = logging.getLogger("sim.response_cache")
+
+
+def get_detector_hash(detectorfile):
+    """
+    returns the sha1 hash of the content of a detector description file
+
+    Parameters
+    ----------
+    detectorfile: string
+        path to the json file containing the detector description
+    """
+    with open(detectorfile, 'rb') as fin:
+        return hashlib.sha1(fin.read()).hexdigest()
+
+
+class response_cache():
+    """
+    Caches the linear response of all channels of a detector on a fixed frequency grid
+
+    The response of a channel is the product of the antenna vector effective length (VEL)
+    for the signal direction and the product of the filters of all detector simulation
+    modules that provide a `get_filter` function (amplifiers, bandpass filters, ...).
+    The VEL is calculated on a regular (zenith, azimuth) grid and bilinearly interpolated.
+    Grid nodes are only calculated when they are needed and shared between all channels
+    with the same antenna model, orientation and the same side of the ice surface.
+
+    If a cache folder is specified, the VEL grid nodes are stored on disk and reused in
+    later simulations with the same detector description (identified via its hash), frequency
+    grid and angular binning. The filters depend on the arguments of the detector simulation
+    modules and are recalculated in each run, which is cheap.
+    """
+
+    def __init__(self, det, detector_hash, frequencies, modules=None, cache_folder=None,
+                 zenith_step=2 * units.deg, azimuth_step=10 * units.deg):
+        """
+        Parameters
+        ----------
+        det: Detector
+            the detector description
+        detector_hash: string
+            the hash of the detector description (see `get_detector_hash`)
+        frequencies: array of floats
+            the frequency grid on which the responses are calculated
+        modules: dict or None
+            the detector simulation modules per station id as list of (name, instance, kwargs) tuples
+            (as returned by `Event.iter_modules`). If None, no filters are applied.
+        cache_folder: string or None
+            folder where the VEL grid is stored. If None, the cache is only held in memory
+        zenith_step: float
+            the zenith binning of the VEL grid
+        azimuth_step: float
+            the azimuth binning of the VEL grid
+        """
+        self._det = det
+        self._ff = frequencies
+        self._modules = modules
+        self._zenith_step = zenith_step
+        self._azimuth_step = azimuth_step
+        self._antenna_pattern_provider = NuRadioReco.detector.antennapattern.AntennaPatternProvider()
+        self._filters = {}
+        self._vel = {}
+        self._n_new_nodes = 0
+        self._filename = None
+        if(cache_folder is not None):
+            key = f"{detector_hash}_{len(self._ff):d}_{self._ff[1] - self._ff[0]:.8g}_{zenith_step:.8g}_{azimuth_step:.8g}"
+            self._filename = os.path.join(cache_folder, "response_{}.pkl".format(hashlib.sha1(key.encode()).hexdigest()))
+            if(os.path.exists(self._filename)):
+                with open(self._filename, 'rb') as fin:
+                    self._vel = pickle.load(fin)
+                logger.info(f"loaded {np.sum([len(x) for x in self._vel.values()])} VEL grid nodes from {self._filename}")
+
+    def _get_antenna_key(self, station_id, channel_id):
+        return (self._det.get_antenna_model(station_id, channel_id),
+                tuple(self._det.get_antenna_orientation(station_id, channel_id)),
+                bool(self._det.get_relative_position(station_id, channel_id)[2] > 0))
+
+    def get_filter(self, station_id, channel_id, first_module=0):
+        """
+        returns the product of the filters of all detector simulation modules for one channel
+
+        Parameters
+        ----------
+        station_id: int
+            the station id
+        channel_id: int
+            the channel id
+        first_module: int (default 0)
+            only the filters of the modules starting with this index are included
+        """
+        key = (station_id, channel_id, first_module)
+        if(key not in self._filters):
+            filt = np.ones_like(self._ff, dtype=np.complex)
+            if(self._modules is not None):
+                for name, instance, kwargs in self._modules[station_id][first_module:]:
+                    if hasattr(instance, "get_filter"):
+                        filt *= instance.get_filter(self._ff, station_id, channel_id, self._det, **kwargs)
+            self._filters[key] = np.nan_to_num(filt)
+        return self._filters[key]
+
+    def _get_node(self, station, channel_id, antenna_key, iZen, iAz):
+        nodes = self._vel.setdefault(antenna_key, {})
+        if((iZen, iAz) not in nodes):
+            zenith = iZen * self._zenith_step
+            azimuth = iAz * self._azimuth_step
+            VEL = trace_utilities.get_efield_antenna_factor(station, self._ff, [channel_id], self._det,
+                                                            zenith, azimuth, self._antenna_pattern_provider)
+            if VEL is None:  # this can happen if there is no signal path to the antenna
+                nodes[(iZen, iAz)] = np.zeros((2, len(self._ff)), dtype=np.complex64)
+            else:
+                nodes[(iZen, iAz)] = np.nan_to_num(VEL[0]).astype(np.complex64)
+            self._n_new_nodes += 1
+        return nodes[(iZen, iAz)]
+
+    def get_vector_effective_length(self, station, channel_id, zenith, azimuth):
+        """
+        returns the interpolated antenna response (eTheta and ePhi component) for a signal direction
+
+        Parameters
+        ----------
+        station: Station or SimStation
+            the station
+        channel_id: int
+            the channel id
+        zenith: float
+            the zenith angle of the signal direction
+        azimuth: float
+            the azimuth angle of the signal direction
+        """
+        antenna_key = self._get_antenna_key(station.get_id(), channel_id)
+        azimuth = azimuth % (2 * np.pi)
+        x = zenith / self._zenith_step
+        y = azimuth / self._azimuth_step
+        iZen = int(np.floor(x))
+        iAz = int(np.floor(y))
+        wZen = x - iZen
+        wAz = y - iAz
+        n_az = int(np.round(2 * np.pi / self._azimuth_step))
+        iAz2 = (iAz + 1) % n_az
+        VEL = (1 - wZen) * (1 - wAz) * self._get_node(station, channel_id, antenna_key, iZen, iAz)
+        VEL = VEL + (1 - wZen) * wAz * self._get_node(station, channel_id, antenna_key, iZen, iAz2)
+        if(wZen > 0):
+            VEL = VEL + wZen * (1 - wAz) * self._get_node(station, channel_id, antenna_key, iZen + 1, iAz)
+            VEL = VEL + wZen * wAz * self._get_node(station, channel_id, antenna_key, iZen + 1, iAz2)
+        return VEL
+
+    def get_response(self, station, channel_id, zenith, azimuth):
+        """
+        returns the full linear response (antenna and filters) of a channel for a signal direction
+
+        The voltage spectrum of the channel is obtained by a single multiplication
+        `np.sum(response * np.array([eTheta, ePhi]), axis=0)`.
+
+        Parameters
+        ----------
+        station: Station or SimStation
+            the station
+        channel_id: int
+            the channel id
+        zenith: float
+            the zenith angle of the signal direction
+        azimuth: float
+            the azimuth angle of the signal direction
+        """
+        return self.get_vector_effective_length(station, channel_id, zenith, azimuth) * self.get_filter(station.get_id(), channel_id)
+
+    def save(self):
+        """
+        stores the VEL grid on disk (only if a cache folder was specified and new grid nodes were calculated)
+        """
+        if(self._filename is None or self._n_new_nodes == 0):
+            return
+        folder = os.path.dirname(self._filename)
+        if(not os.path.exists(folder)):
+            os.makedirs(folder)
+        if(os.path.exists(self._filename)):
+            # another job might have added grid nodes in the meantime
+            with open(self._filename, 'rb') as fin:
+                vel = pickle.load(fin)
+            for antenna_key, nodes in vel.items():
+                for node, value in nodes.items():
+                    self._vel.setdefault(antenna_key, {}).setdefault(node, value)
+        # write into a temporary file first, so that parallel jobs never read a partially written file
+        tmp_filename = f"{self._filename}.{os.getpid()}"
+        with open(tmp_filename, 'wb') as fout:
+            pickle.dump(self._vel, fout, protocol=4)
+        os.replace(tmp_filename, self._filename)
+        logger.info(f"saved {self._n_new_nodes} new VEL grid nodes to {self._filename}")
+        self._n_new_nodes = 0
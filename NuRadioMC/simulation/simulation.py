@@ -7,7 +7,13 @@ from NuRadioReco.utilities import units
 from NuRadioMC.utilities import medium
 from NuRadioReco.utilities import fft
 from NuRadioMC.utilities.earth_attenuation import get_weight
+from NuRadioMC.utilities import trigger_masks
+from NuRadioMC.utilities import random_streams
+from NuRadioMC.utilities import categorical
 from NuRadioMC.SignalProp import propagation
+from NuRadioMC.SignalProp import solution_store
+from NuRadioMC.SignalProp import attenuation_table
+from NuRadioMC.SignalProp import analyticraytracing
 import h5py
 import time
 import six
@@ -23,6 +29,11 @@ import NuRadioReco.detector.generic_detector as gdetector
 import NuRadioReco.framework.sim_station
 import NuRadioReco.framework.electric_field
 from NuRadioReco.utilities import geometryUtilities as geo_utl
+from NuRadioMC.simulation import response_cache
+from NuRadioMC.simulation import noise_bank
+from NuRadioMC.simulation import async_event_writer
+from NuRadioMC.simulation import trigger_replay
+from scipy import signal
 from NuRadioReco.framework.parameters import stationParameters as stnp
 from NuRadioReco.framework.parameters import channelParameters as chp
 from NuRadioReco.framework.parameters import electricFieldParameters as efp
@@ -31,8 +42,10 @@ import datetime
 import logging
 from six import iteritems
 import yaml
+import json
 import os
 import collections
+import hashlib
 # import confuse
 logger = logging.getLogger("sim")
 
@@ -91,6 +104,88 @@ def get_distance_cut(shower_energy, intercept, slope):
     return distance_cut
 
 
+def get_channel_geometry_hash(position, ice_model, attenuation_model, n_reflections):
+    """
+    returns a hash that identifies the ray tracing geometry of a channel
+
+    Two channels with the same hash have identical ray tracing solutions for all vertex positions.
+
+    Parameters
+    ----------
+    position: array of floats
+        the absolute position of the channel (rounded to mm)
+    ice_model: string
+        the name of the ice model
+    attenuation_model: string
+        the name of the attenuation model
+    n_reflections: int
+        the maximum number of bottom reflections
+
+    Returns
+    -------
+    hash: string
+    """
+    position = np.round(np.array(position) / units.mm).astype(int)
+    key = f"{position[0]:d}_{position[1]:d}_{position[2]:d}_{ice_model}_{attenuation_model}_{int(n_reflections):d}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def get_number_of_consumed_events(event_ids, attributes, n_entries):
+    """
+    returns the number of simulated events (including the events without interaction in the simulation volume that are
+    not stored in the input file) that correspond to the first `n_entries` entries of an input file
+
+    Parameters
+    ----------
+    event_ids: array of ints
+        the event ids of all entries of the input file
+    attributes: dict
+        the attributes of the input file
+    n_entries: int
+        the number of entries of the input file, needs to be the first entry of an event
+
+    Returns
+    -------
+    n_events: float
+    """
+    n_events = attributes['n_events']
+    if(n_entries >= len(event_ids)):
+        return n_events
+    if(n_events == attributes.get('total_number_of_events', n_events)):
+        # the input file contains all simulated events, the event ids are counted from 'start_event_id'
+        return event_ids[n_entries] - attributes.get('start_event_id', 0)
+    # the input file is one part of a larger event list, the simulated events are distributed uniformly over the events of the file
+    unique_ids = np.unique(event_ids)
+    return int(round(n_events * np.sum(unique_ids < event_ids[n_entries]) / len(unique_ids)))
+
+
+def read_detector_description(filename):
+    """
+    reads a json detector description into a dictionary that can be passed to the detector classes (source 'dictionary')
+
+    All json detector descriptions that are opened by the detector classes share the same TinyDB storage middleware,
+    i.e., the detector descriptions of several detector objects that exist at the same time get mixed up. Detector
+    objects that are created from dictionaries (with `create_new=True`) are independent of each other.
+
+    Parameters
+    ----------
+    filename: string
+        the path to the json file
+
+    Returns
+    -------
+    dictionary with the keys 'stations' and 'channels'
+    """
+    with open(filename, 'r') as fin:
+        description = json.load(fin)
+    for table in ['stations', 'channels']:
+        for entry in description[table].values():
+            for key, value in entry.items():
+                if(isinstance(value, str) and value.startswith("{TinyDate}:")):
+                    entry[key] = datetime.datetime.strptime(value[len("{TinyDate}:"):], '%Y-%m-%dT%H:%M:%S')
+    return description
+
+
 class simulation():
 
     def __init__(self, inputfilename,
@@ -115,14 +210,17 @@ class simulation():
         ----------
         inputfilename: string
             the path to the hdf5 file containing the list of neutrino events
-        outputfilename: string
-            specify hdf5 output filename.
-        detectorfile: string
-            path to the json file containing the detector description
+        outputfilename: string or list of strings
+            specify hdf5 output filename. If several detector layouts are simulated, one output file per layout.
+        detectorfile: string or list of strings
+            path to the json file containing the detector description. If a list of files is given, all detector
+            layouts are simulated in a single pass over the event list: the input file is read once, the weights
+            and the Askaryan signals are calculated once per event and the ray tracing solutions are shared
+            between channels at the same position of the different layouts. One output file is written per layout.
         station_id: int
             the station id for which the simulation is performed. Must match a station
             deself._fined in the detector description
-        outputfilenameNuRadioReco: string or None
+        outputfilenameNuRadioReco: string or None (or list of strings or None for several detector layouts)
             outputfilename of NuRadioReco detector sim file, this file contains all
             waveforms of the triggered events
             default: None, i.e., no output file will be written which is useful for
@@ -173,8 +271,28 @@ class simulation():
             # random seed once and save this seed to the config setting. If the simulation is rerun, we can get
             # the same random sequence.
             self._cfg['seed'] = np.random.randint(0, 2 ** 32 - 1)
+        # the data shared between the simulations of several detector layouts (set before `__init__` is called,
+        # see `_init_layouts`), None for a simulation of a single detector layout
+        self._layout_data = getattr(self, '_layout_data', None)
+        if(self._layout_data is not None):
+            self._cfg['seed'] = self._layout_data['seed']
+
+        # if True, the random numbers of every event are drawn from streams that only depend on the seed, the event
+        # and the station (see `NuRadioMC.utilities.random_streams`)
+        self._per_event_seeds = bool(self._cfg['per_event_seeds'])
+        self._event_random_state = None
+        self._station_random_state = None
 
         self._inputfilename = inputfilename
+        self._layouts = None
+        if(isinstance(detectorfile, (list, tuple))):
+            self._init_layouts(outputfilename, detectorfile, outputfilenameNuRadioReco,
+                               dict(debug=debug, write_mode=write_mode, evt_time=evt_time, config_file=config_file,
+                                    log_level=log_level, default_detector_station=default_detector_station,
+                                    default_detector_channel=default_detector_channel, file_overwrite=file_overwrite,
+                                    write_detector=write_detector, event_list=event_list,
+                                    log_level_propagation=log_level_propagation))
+            return
         self._outputfilename = outputfilename
         if(os.path.exists(self._outputfilename)):
             msg = f"hdf5 output file {self._outputfilename} already exists"
@@ -196,6 +314,30 @@ class simulation():
         self._prop = propagation.get_propagation_module(self._cfg['propagation']['module'])
 
         self._ice = medium.get_ice_model(self._cfg['propagation']['ice_model'])
+        # the shadow zone classifier relies on the analytic solution of the exponential index of refraction profile
+        self._shadow_zone_classifier = bool(self._cfg['speedup']['shadow_zone_classifier']) and self._cfg['propagation']['module'] == 'analytic'
+        self._solution_store = None
+        self._event_cache = None
+        if(self._layout_data is not None):
+            # the ray tracing solutions and the per-event quantities are shared between the detector layouts
+            self._solution_store = self._layout_data['solution_store']
+            self._event_cache = self._layout_data['event_cache']
+        else:
+            self._solution_store = self._create_solution_store()
+        self._attenuation_table = None
+        if(self._cfg['speedup']['attenuation_table_folder'] is not None and self._cfg['propagation']['module'] == 'analytic'):
+            self._attenuation_table = attenuation_table.get_attenuation_table(self._ice, self._cfg['propagation']['attenuation_model'],
+                                                                              self._cfg['speedup']['attenuation_table_folder'])
+        # for the analytic ray tracer, one reusable solver object is used for all vertex-channel pairs
+        self._ray_tracing_solver = None
+        if(self._cfg['propagation']['module'] == 'analytic'):
+            self._ray_tracing_solver = analyticraytracing.ray_tracing_solver(self._ice, self._cfg['propagation']['attenuation_model'],
+                                                                             log_level=self._log_level_ray_propagation,
+                                                                             n_frequencies_integration=int(self._cfg['propagation']['n_freq']),
+                                                                             n_reflections=self._n_reflections,
+                                                                             solution_store=self._solution_store,
+                                                                             attenuation_tolerance=self._cfg['propagation']['attenuation_tolerance'],
+                                                                             attenuation_table=self._attenuation_table)
 
         self._mout = collections.OrderedDict()
         self._mout_groups = collections.OrderedDict()
@@ -204,12 +346,18 @@ class simulation():
         # read in detector positions
         logger.warning("Detectorfile {}".format(os.path.abspath(self._detectorfile)))
         self._det = None
+        detector_kwargs = {'json_filename': self._detectorfile}
+        if(self._layout_data is not None):
+            # the detector objects of all layouts exist at the same time, by default the detector classes return
+            # the already existing instance
+            detector_kwargs = {'json_filename': None, 'source': 'dictionary', 'dictionary': read_detector_description(self._detectorfile),
+                               'create_new': True}
         if(default_detector_station):
             logger.warning(f"Default detector station provided (station {default_detector_station}) -> Using generic detector")
-            self._det = gdetector.GenericDetector(json_filename=self._detectorfile, default_station=default_detector_station,
-                                                 default_channel=default_detector_channel, antenna_by_depth=False)
+            self._det = gdetector.GenericDetector(default_station=default_detector_station,
+                                                 default_channel=default_detector_channel, antenna_by_depth=False, **detector_kwargs)
         else:
-            self._det = detector.Detector(json_filename=self._detectorfile, antenna_by_depth=False)
+            self._det = detector.Detector(antenna_by_depth=False, **detector_kwargs)
         self._det.update(evt_time)
 
         self._station_ids = self._det.get_station_ids()
@@ -225,11 +373,29 @@ class simulation():
 
         self._read_input_hdf5()  # we read in the full input file into memory at the beginning to limit io to the beginning and end of the run
 
+        # the channel traces before the trigger modules are stored only during the event loop (see `run`)
+        self._pre_trigger_traces = None
+        if(self._cfg['trigger']['save_pre_trigger_traces'] and type(self)._detector_simulation is not simulation._detector_simulation):
+            msg = "saving the pre-trigger traces requires the detector simulation to be split into the functions `_detector_simulation_filter_amp` and `_detector_simulation_trigger` instead of overriding `_detector_simulation`"
+            logger.error(msg)
+            raise AttributeError(msg)
+        if(self._cfg['speedup']['add_noise_from_bank'] and type(self)._detector_simulation is not simulation._detector_simulation):
+            msg = "adding the noise from the noise bank requires the detector simulation to be split into the functions `_detector_simulation_filter_amp` and `_detector_simulation_trigger` instead of overriding `_detector_simulation`"
+            logger.error(msg)
+            raise AttributeError(msg)
+
         ################################
         # perfom a dummy detector simulation to determine how the signals are filtered
         self._bandwidth_per_channel = {}
         self._amplification_per_channel = {}
         self.__noise_adder_normalization = {}
+        self._detector_modules = {}
+        self._response_caches = {}
+        self._response_stations = {}
+        self._detector_hash = None
+        self._noise_module_index = {}
+        self._noise_banks = {}
+        self._noise_bank_seeds = {}
 
         # first create dummy event and station with channels
         self._Vrms = 1
@@ -243,6 +409,7 @@ class simulation():
 #                 logger.warning('internal sampling rate is {:.3g}GHz, final detector sampling rate is {:.3g}GHz'.format(self.get_sampling_rate(), self._sampling_rate_detector))
             self._n_samples = self._det.get_number_of_samples(self._station_id, 0) / self._sampling_rate_detector / self._dt
             self._n_samples = int(np.ceil(self._n_samples / 2.) * 2)  # round to nearest even integer
+            self._n_samples_window = self._n_samples
             self._ff = np.fft.rfftfreq(self._n_samples, self._dt)
             self._tt = np.arange(0, self._n_samples * self._dt, self._dt)
 
@@ -265,6 +432,7 @@ class simulation():
             self._evt.set_station(self._station)
 
             self._detector_simulation()
+            self._detector_modules[self._station_id] = list(self._evt.iter_modules(self._station_id))
             self._bandwidth_per_channel[self._station_id] = {}
             self._amplification_per_channel[self._station_id] = {}
             self.__noise_adder_normalization[self._station_id] = {}
@@ -300,6 +468,7 @@ class simulation():
                                 filt_noise *= instance.get_filter(ff, self._station_id, channel_id, self._det, **kwargs)
                         norm = np.trapz(np.abs(filt_noise) ** 2, ff)
                         self.__noise_adder_normalization[self._station_id][channel_id] = norm
+                        self._noise_module_index[self._station_id] = noise_module_index[0]
                         logger.info(f"noise normalization of station {self._station_id} channel {channel_id} is {norm/units.MHz:.1g}MHz")
         ################################
 
@@ -325,20 +494,50 @@ class simulation():
         tmp_cut = float(self._cfg['speedup']['min_efield_amplitude'])
         logger.warning(f"final Vrms {self._Vrms/units.V:.2g}V corresponds to an efield of {self._Vrms_efield/units.V/units.m/units.micro:.2g} muV/m for a VEL = 1m (amplification factor of system is {amplification:.1f}).\n -> all signals with less then {tmp_cut:.1f} x Vrms_efield = {tmp_cut * self._Vrms_efield/units.m/units.V/units.micro:.2g}muV/m will be skipped")
 
+        self._fast_trigger_threshold = self._cfg['speedup']['fast_trigger_threshold']
+        if(self._fast_trigger_threshold is not None):
+            if(bool(self._cfg['signal']['zerosignal'])):
+                logger.warning("fast trigger path is not compatible with 'zerosignal', using the full detector simulation for all events")
+                self._fast_trigger_threshold = None
+            else:
+                self._fast_trigger_threshold = float(self._fast_trigger_threshold)
+                logger.warning(f"using fast trigger path: detector simulation is only performed if the signal envelope of any channel exceeds {self._fast_trigger_threshold:.1f} x Vrms")
+                if(bool(self._cfg['noise'])):
+                    logger.warning("the fast trigger path does not include noise. Make sure that 'fast_trigger_threshold' is sufficiently below the trigger thresholds.")
+
     def run(self):
         """
         run the NuRadioMC simulation
         """
+        if(self._layouts is not None):
+            self._run_layouts()
+            return
+        for iE in self._run_event_loop():
+            pass
+
+    def _run_event_loop(self):
+        """
+        generator that runs the NuRadioMC simulation
+
+        The index of every event is yielded before the event is simulated, which allows to simulate
+        several detector layouts event by event (see `_run_layouts`).
+        """
 
         self._channelSignalReconstructor = NuRadioReco.modules.channelSignalReconstructor.channelSignalReconstructor()
         self._eventWriter = NuRadioReco.modules.io.eventWriter.eventWriter()
         self._channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
         self._electricFieldResampler = NuRadioReco.modules.electricFieldResampler.electricFieldResampler()
+        self._async_event_writer = None
         if(self._outputfilenameNuRadioReco is not None):
             self._eventWriter.begin(self._outputfilenameNuRadioReco)
+            if(int(self._cfg['speedup']['nur_writer_queue_size']) > 0):
+                self._async_event_writer = async_event_writer.async_event_writer(
+                    self._eventWriter, max_queue_size=int(self._cfg['speedup']['nur_writer_queue_size']))
         self._n_events = len(self._fin['event_ids'])
 
         self._create_meta_output_datastructures()
+        if(self._cfg['trigger']['save_pre_trigger_traces']):
+            self._pre_trigger_traces = trigger_replay.pre_trigger_trace_store(float(self._cfg['trigger']['pre_trigger_threshold']) * self._Vrms)
 
         # check if the same detector was simulated before (then we can save the ray tracing part)
         pre_simulated = self._check_if_was_pre_simulated()
@@ -352,9 +551,62 @@ class simulation():
         detSimTime = 0.0
         outputTime = 0.0
         time_attenuation_length = 0.
+        n_screened = 0
+        n_screened_total = 0
+        if(self._cfg['speedup']['amplitude_screening'] and not signalgen.has_amplitude_upper_bound(self._cfg['signal']['model'])):
+            logger.warning(f"the amplitude screening is not available for the signal model {self._cfg['signal']['model']}, no ray tracing solutions are skipped")
+        n_fast_trigger_rejected = 0
+        n_channels_reused = 0
+        n_channels_raytraced = 0
+        n_shadow_zone_rejected = 0
+        n_shadow_zone_total = 0
+        n_fast_trigger_total = 0
+        # the last event and station with a detector simulation, their modules are listed in the timing summary
+        # (the event of the dummy detector simulation of the __init__ function if no station passes the cuts)
+        timing_evt = self._evt
+        timing_station_id = self._station.get_id()
+        attenuation_statistics_start = dict(analyticraytracing.attenuation_statistics)
+        if(self._fast_trigger_threshold is not None):
+            fast_trigger_amplitudes = {}
+            for station_id in self._station_ids:
+                fast_trigger_amplitudes[station_id] = np.zeros(self._det.get_number_of_channels(station_id))
+        if(self._event_cache is not None):
+            channel_geometry_hashes = {}
+            for station_id in self._station_ids:
+                channel_geometry_hashes[station_id] = self._get_channel_geometry_hashes(station_id)
         t_start = time.time()
+        # optional stop criterion, evaluated on the weighted sum of the triggered events
+        Veff_target_uncertainty = self._cfg['speedup']['Veff_target_uncertainty']
+        cpu_time_budget = self._cfg['speedup']['cpu_time_budget']
+        early_stopping = Veff_target_uncertainty is not None or cpu_time_budget is not None
+        cpu_time_start = time.process_time()
+        n_triggered_weighted = 0
+        n_triggered_weighted2 = 0  # sum of the weights times the squared sampling weights
+        sampling_weights = np.ones(self._n_events)
+        if('sampling_weights' in self._fin):
+            sampling_weights = self._fin['sampling_weights']
+        self._n_events_processed = self._n_events
 
         for self._iE in range(self._n_events):
+            yield self._iE
+            if(early_stopping and self._iE > 0 and self._mout['triggered'][self._iE - 1]):
+                n_triggered_weighted += self._mout['weights'][self._iE - 1] * sampling_weights[self._iE - 1]
+                n_triggered_weighted2 += self._mout['weights'][self._iE - 1] * sampling_weights[self._iE - 1] ** 2
+            # the criterion is only evaluated between events, i.e., all interactions of an event are simulated
+            if(early_stopping and self._iE > 0 and self._fin['event_ids'][self._iE] != self._fin['event_ids'][self._iE - 1]):
+                stop_reason = None
+                # the relative uncertainty of the effective volume, same definition as in `Veff.get_Veff_and_uncertainty`
+                if(Veff_target_uncertainty is not None and n_triggered_weighted > 0 and
+                   n_triggered_weighted2 ** 0.5 / n_triggered_weighted <= Veff_target_uncertainty):
+                    stop_reason = f"relative Veff uncertainty {n_triggered_weighted2 ** 0.5 / n_triggered_weighted:.3g} reached the target of {Veff_target_uncertainty:.3g}"
+                elif(cpu_time_budget is not None and time.process_time() - cpu_time_start > cpu_time_budget):
+                    stop_reason = f"CPU time budget of {pretty_time_delta(cpu_time_budget)} is exhausted"
+                if(stop_reason is not None):
+                    self._n_events_processed = self._iE
+                    self._mout_attrs['n_events'] = self._get_number_of_consumed_events(self._iE)
+                    self._mout_attrs['early_stopping'] = stop_reason
+                    logger.warning(f"stopping the simulation after {self._iE:d} of {self._n_events:d} entries of the input file, {stop_reason}. This corresponds to {self._mout_attrs['n_events']:.0f} of {self._fin_attrs['n_events']:.0f} simulated events.")
+                    break
             same_shower = False  # a varibale that tracks if a new event comes in to allow to use the same shower realization for each station, channel and ray tracing solution
             if(self._event_list is not None and self._fin['event_ids'][self._iE] not in self._event_list):
                 logger.debug(f"skipping event {self._fin['event_ids'][self._iE]} because it is not in the event list provided to the __init__ function")
@@ -371,6 +623,9 @@ class simulation():
 
             # read all quantities from hdf5 file and store them in local variables
             self._read_input_neutrino_properties()
+            if(self._per_event_seeds):
+                # the shower realization is drawn from a random stream that only depends on the event
+                self._event_random_state = self._get_random_state(None, 'signal')
 
             # skip vertices not in fiducial volume. This is required because 'mother' events are added to the event list
             # if daugthers (e.g. tau decay) have their vertex in the fiducial volume
@@ -390,7 +645,10 @@ class simulation():
             x1 = np.array([self._x, self._y, self._z])  # the interaction point
             # calculate weight
             # if we have a second interaction, the weight needs to be calculated from the initial neutrino
-            if(self._n_interaction > 1):
+            if(self._event_cache is not None and ('weight', self._iE) in self._event_cache):
+                # the weight was already calculated for another detector layout
+                self._mout['weights'][self._iE] = self._event_cache[('weight', self._iE)]
+            elif(self._n_interaction > 1):
                 iE_mother = np.argwhere(self._fin['event_ids'] == self._fin['event_ids'][self._iE]).min()  # get index of mother neutrino
                 x_int_mother = np.array([self._fin['xx'][iE_mother], self._fin['yy'][iE_mother], self._fin['zz'][iE_mother]])
                 self._mout['weights'][self._iE] = get_weight(self._fin['zeniths'][iE_mother],
@@ -406,6 +664,8 @@ class simulation():
                                                              cross_section_type=self._cfg['weights']['cross_section_type'],
                                                              vertex_position=x1,
                                                              phi_nu=self._azimuth_nu)
+            if(self._event_cache is not None):
+                self._event_cache[('weight', self._iE)] = self._mout['weights'][self._iE]
             # skip all events where neutrino weights is zero, i.e., do not
             # simulate neutrino that propagate through the Earth
             if(self._mout['weights'][self._iE] < self._cfg['speedup']['minimum_weight_cut']):
@@ -421,8 +681,8 @@ class simulation():
             n_index = self._ice.get_index_of_refraction(x1)
             cherenkov_angle = np.arccos(1. / n_index)
 
-            self._evt = NuRadioReco.framework.event.Event(0, self._event_id)
-            self._evt.set_parameter(evp.sim_config, self._cfg)
+            # the event is only created if a station passes the amplitude cuts (see below)
+            self._evt = None
 
             # first step: peorform raytracing to see if solution exists
             t2 = time.time()
@@ -434,17 +694,47 @@ class simulation():
 #                 logger.warning('internal sampling rate is {:.3g}GHz, final detector sampling rate is {:.3g}GHz'.format(self.get_sampling_rate(), self._sampling_rate_detector))
                 self._n_samples = self._det.get_number_of_samples(self._station_id, 0) / self._sampling_rate_detector / self._dt
                 self._n_samples = int(np.ceil(self._n_samples / 2.) * 2)  # round to nearest even integer
-                self._ff = np.fft.rfftfreq(self._n_samples, self._dt)
-                self._tt = np.arange(0, self._n_samples * self._dt, self._dt)
+                # the number of samples of the simulated electric fields
+                self._n_samples_window = self._n_samples
+                if(self._cfg['speedup']['pulse_window'] is not None):
+                    # the electric fields are only simulated in a short window around the pulse. The efieldToVoltageConverter
+                    # places them at the correct time into the channel traces
+                    n_samples_window = int(np.ceil(float(self._cfg['speedup']['pulse_window']) / self._dt / 2.) * 2)
+                    self._n_samples_window = min(self._n_samples, n_samples_window)
+                self._ff = np.fft.rfftfreq(self._n_samples_window, self._dt)
+                self._tt = np.arange(0, self._n_samples_window * self._dt, self._dt)
 
                 sg = self._mout_groups[self._station_id]
-                ray_tracing_performed = ('ray_tracing_C0' in sg) and (self._was_pre_simulated)
-                self._create_sim_station()
+                # mapping of channel ids to the channel ids of the input file with identical geometry
+                pre_simulated_channels = self._pre_simulated_channels.get(self._station_id, {})
+                # the electric fields of the station (channel id, spectrum, trace start time and parameters), the
+                # NuRadioReco objects are only created if the station passes the amplitude cuts
+                efields = []
+                if(self._fast_trigger_threshold is not None):
+                    fast_trigger_amplitudes[self._station_id][:] = 0
+                previous_raytracing = None  # position and ray tracing solutions (C0 values) of the previous channel
+                if(self._shadow_zone_classifier):
+                    # decide for all channels at once which channels can not be reached by any ray
+                    x2s = np.array([self._det.get_relative_position(self._station_id, channel_id) + self._det.get_absolute_position(self._station_id)
+                                    for channel_id in range(self._det.get_number_of_channels(self._station_id))])
+                    solution_existence = analyticraytracing.classify_solution_existence(np.tile(x1, (len(x2s), 1)), x2s, self._ice,
+                                                                                        n_reflections=self._n_reflections)
                 for channel_id in range(self._det.get_number_of_channels(self._station_id)):
                     x2 = self._det.get_relative_position(self._station_id, channel_id) + self._det.get_absolute_position(self._station_id)
-                    r = self._prop(x1, x2, self._ice, self._cfg['propagation']['attenuation_model'], log_level=self._log_level_ray_propagation,
-                                   n_frequencies_integration=int(self._cfg['propagation']['n_freq']),
-                                   n_reflections=self._n_reflections)
+                    if(self._shadow_zone_classifier):
+                        n_shadow_zone_total += 1
+                        if(solution_existence[channel_id] == 0):
+                            logger.debug(f"channel {channel_id:d} is in the shadow zone of the vertex, skipping ray tracing")
+                            n_shadow_zone_rejected += 1
+                            continue
+                    if(self._ray_tracing_solver is not None):
+                        r = self._ray_tracing_solver
+                        r.set_points(x1, x2)
+                    else:
+                        r = self._prop(x1, x2, self._ice, self._cfg['propagation']['attenuation_model'], log_level=self._log_level_ray_propagation,
+                                       n_frequencies_integration=int(self._cfg['propagation']['n_freq']),
+                                       n_reflections=self._n_reflections, solution_store=self._solution_store,
+                                       attenuation_tolerance=self._cfg['propagation']['attenuation_tolerance'])
 
                     if self._cfg['speedup']['distance_cut']:
 
@@ -463,17 +753,28 @@ class simulation():
                             logger.debug('Distance to vertex: {:.2f} m'.format(distance / units.m))
                             continue
 
-                    if(pre_simulated and ray_tracing_performed and not self._cfg['speedup']['redo_raytracing']):  # check if raytracing was already performed
+                    channel_id_pre = pre_simulated_channels.get(channel_id, None)
+                    ray_tracing_performed = pre_simulated and (channel_id_pre is not None) and not self._cfg['speedup']['redo_raytracing']
+                    if(ray_tracing_performed):  # check if raytracing was already performed
+                        n_channels_reused += 1
                         sg_pre = self._fin_stations["station_{:d}".format(self._station_id)]
                         temp_reflection = None
                         temp_reflection_case = None
                         if('ray_tracing_reflection' in sg_pre):  # for backward compatibility: Check if reflection layer information exists in data file
-                            temp_reflection = sg_pre['ray_tracing_reflection'][self._iE][channel_id]
-                            temp_reflection_case = sg_pre['ray_tracing_reflection_case'][self._iE][channel_id]
-                        r.set_solution(sg_pre['ray_tracing_C0'][self._iE][channel_id], sg_pre['ray_tracing_C1'][self._iE][channel_id],
-                                       sg_pre['ray_tracing_solution_type'][self._iE][channel_id], temp_reflection, temp_reflection_case)
+                            temp_reflection = sg_pre['ray_tracing_reflection'][self._iE][channel_id_pre]
+                            temp_reflection_case = sg_pre['ray_tracing_reflection_case'][self._iE][channel_id_pre]
+                        r.set_solution(sg_pre['ray_tracing_C0'][self._iE][channel_id_pre], sg_pre['ray_tracing_C1'][self._iE][channel_id_pre],
+                                       sg_pre['ray_tracing_solution_type'][self._iE][channel_id_pre], temp_reflection, temp_reflection_case)
                     else:
-                        r.find_solutions()
+                        n_channels_raytraced += 1
+                        C0_hints = None
+                        if(self._cfg['speedup']['warm_start_raytracing'] and previous_raytracing is not None and
+                           np.linalg.norm(x2 - previous_raytracing[0]) < float(self._cfg['speedup']['warm_start_raytracing'])):
+                            # the solutions of a close-by channel are used as start values of the root finding
+                            C0_hints = previous_raytracing[1]
+                        r.find_solutions(C0_hints=C0_hints)
+                    if(self._cfg['speedup']['warm_start_raytracing']):
+                        previous_raytracing = (x2, r.get_C0_hints())
 
                     if(not r.has_solution()):
                         logger.debug("event {} and station {}, channel {} does not have any ray tracing solution ({} to {})".format(
@@ -482,11 +783,12 @@ class simulation():
                     delta_Cs = []
                     viewing_angles = []
                     # loop through all ray tracing solution
+                    ray_tracing_results = r.get_results()
                     for iS in range(r.get_number_of_solutions()):
-                        sg['ray_tracing_C0'][self._iE, channel_id, iS] = r.get_results()[iS]['C0']
-                        sg['ray_tracing_C1'][self._iE, channel_id, iS] = r.get_results()[iS]['C1']
-                        sg['ray_tracing_reflection'][self._iE, channel_id, iS] = r.get_results()[iS]['reflection']
-                        sg['ray_tracing_reflection_case'][self._iE, channel_id, iS] = r.get_results()[iS]['reflection_case']
+                        sg['ray_tracing_C0'][self._iE, channel_id, iS] = ray_tracing_results[iS]['C0']
+                        sg['ray_tracing_C1'][self._iE, channel_id, iS] = ray_tracing_results[iS]['C1']
+                        sg['ray_tracing_reflection'][self._iE, channel_id, iS] = ray_tracing_results[iS]['reflection']
+                        sg['ray_tracing_reflection_case'][self._iE, channel_id, iS] = ray_tracing_results[iS]['reflection_case']
                         sg['ray_tracing_solution_type'][self._iE, channel_id, iS] = r.get_solution_type(iS)
                         self._launch_vector = r.get_launch_vector(iS)
                         sg['launch_vectors'][self._iE, channel_id, iS] = self._launch_vector
@@ -510,10 +812,10 @@ class simulation():
                         if(np.abs(delta_Cs[iS]) > self._cfg['speedup']['delta_C_cut']):
                             logger.debug('delta_C too large, ray tracing solution unlikely to be observed, skipping event')
                             continue
-                        if(pre_simulated and ray_tracing_performed and not self._cfg['speedup']['redo_raytracing']):
+                        if(ray_tracing_performed):
                             sg_pre = self._fin_stations["station_{:d}".format(self._station_id)]
-                            R = sg_pre['travel_distances'][self._iE, channel_id, iS]
-                            T = sg_pre['travel_times'][self._iE, channel_id, iS]
+                            R = sg_pre['travel_distances'][self._iE, channel_id_pre, iS]
+                            T = sg_pre['travel_times'][self._iE, channel_id_pre, iS]
                         else:
                             R = r.get_path_length(iS)  # calculate path length
                             T = r.get_travel_time(iS)  # calculate travel time
@@ -528,30 +830,54 @@ class simulation():
                         zenith, azimuth = hp.cartesian_to_spherical(*receive_vector)
 
                         fem, fhad = self._get_em_had_fraction(self._inelasticity, self._inttype, self._flavor)
-                        # get neutrino pulse from Askaryan module
-                        t_ask = time.time()
-                        spectrum = signalgen.get_frequency_spectrum(
-                            self._energy * fhad, viewing_angles[iS], self._n_samples, self._dt, "HAD", n_index, R,
-                            self._cfg['signal']['model'], same_shower=same_shower, seed=self._cfg['seed'])
-                        askaryan_time += (time.time() - t_ask)
-
-                        # apply frequency dependent attenuation
-                        t_att = time.time()
-                        if self._cfg['propagation']['attenuate_ice']:
-                            attn = r.get_attenuation(iS, self._ff, 0.5 * self._sampling_rate_detector)
-                            spectrum *= attn
-                        time_attenuation_length += (time.time() - t_att)
-
-                        if(fem > 0):
+                        if(self._cfg['speedup']['amplitude_screening']):
+                            # skip ray tracing solutions that can not reach the minimum efield amplitude
+                            # before the Askaryan pulse is generated
+                            n_screened_total += 1
+                            max_amplitude = self._get_amplitude_upper_bound(r, iS, R, viewing_angles[iS], n_index, fem, fhad)
+                            if(max_amplitude < float(self._cfg['speedup']['min_efield_amplitude']) * self._Vrms_efield):
+                                logger.debug(f"channel {channel_id:d}, solution {iS:d}: efield amplitude upper bound {max_amplitude / units.micro / units.V * units.m:.2g}muV/m too small, skipping ray tracing solution")
+                                n_screened += 1
+                                continue
+                        signal_key = None
+                        if(self._event_cache is not None):
+                            # the signal of a channel at the same position was possibly already calculated for another detector layout
+                            signal_key = (self._iE, channel_geometry_hashes[self._station_id][channel_id], iS, self._n_samples_window, self._sampling_rate_detector)
+                            same_shower = same_shower or ('same_shower', self._iE) in self._event_cache
+                        if(signal_key is not None and signal_key in self._event_cache):
+                            spectrum, attn = self._event_cache[signal_key]
+                            spectrum = np.copy(spectrum)
+                        else:
+                            # get neutrino pulse from Askaryan module
                             t_ask = time.time()
-                            spectrum_em = signalgen.get_frequency_spectrum(
-                                self._energy * fem, viewing_angles[iS], self._n_samples, self._dt, "EM", n_index, R,
-                                self._cfg['signal']['model'], same_shower=same_shower, seed=self._cfg['seed'])
+                            spectrum = signalgen.get_frequency_spectrum(
+                                self._energy * fhad, viewing_angles[iS], self._n_samples_window, self._dt, "HAD", n_index, R,
+                                self._cfg['signal']['model'], same_shower=same_shower, seed=self._cfg['seed'],
+                                random_state=self._event_random_state)
                             askaryan_time += (time.time() - t_ask)
+
+                            # apply frequency dependent attenuation
+                            t_att = time.time()
+                            attn = None
                             if self._cfg['propagation']['attenuate_ice']:
-                                spectrum_em *= attn
-                            # add EM signal to had signal in the time domain
-                            spectrum = fft.time2freq(fft.freq2time(spectrum, 1 / self._dt) + fft.freq2time(spectrum_em, 1 / self._dt), 1 / self._dt)
+                                attn = r.get_attenuation(iS, self._ff, 0.5 * self._sampling_rate_detector)
+                                spectrum *= attn
+                            time_attenuation_length += (time.time() - t_att)
+
+                            if(fem > 0):
+                                t_ask = time.time()
+                                spectrum_em = signalgen.get_frequency_spectrum(
+                                    self._energy * fem, viewing_angles[iS], self._n_samples_window, self._dt, "EM", n_index, R,
+                                    self._cfg['signal']['model'], same_shower=same_shower, seed=self._cfg['seed'],
+                                    random_state=self._event_random_state)
+                                askaryan_time += (time.time() - t_ask)
+                                if self._cfg['propagation']['attenuate_ice']:
+                                    spectrum_em *= attn
+                                # add EM signal to had signal in the time domain
+                                spectrum = fft.time2freq(fft.freq2time(spectrum, 1 / self._dt) + fft.freq2time(spectrum_em, 1 / self._dt), 1 / self._dt)
+                            if(signal_key is not None):
+                                self._event_cache[signal_key] = (np.copy(spectrum), attn)
+                                self._event_cache[('same_shower', self._iE)] = True
 
                         same_shower = True
                         # apply the focusing effect
@@ -577,7 +903,7 @@ class simulation():
                         # reflection at the surface
                         r_theta = None
                         r_phi = None
-                        i_reflections = r.get_results()[iS]['reflection']
+                        i_reflections = ray_tracing_results[iS]['reflection']
                         zenith_reflections = np.atleast_1d(r.get_reflection_angle(iS))  # lets handle the general case of multiple reflections off the surface (possible if also a reflective bottom layer exists)
                         n_surface_reflections = np.sum(zenith_reflections != None)
                         logger.debug(f"st {self._station_id}, ch {channel_id}, solutino {iS}: n_ref bottom = {i_reflections:d}," + \
@@ -627,8 +953,7 @@ class simulation():
                             fig.subplots_adjust(top=0.9)
                             plt.show()
 
-                        electric_field = NuRadioReco.framework.electric_field.ElectricField([channel_id], self._det.get_relative_position(self._sim_station.get_id(), channel_id))
-                        electric_field.set_frequency_spectrum(np.array([eR, eTheta, ePhi]), 1. / self._dt)
+                        efield_trace = fft.freq2time(np.array([eR, eTheta, ePhi]), 1. / self._dt)
                         # Trace start time is equal to the interaction time relative to the first
                         # interaction plus the wave travel time.
                         if hasattr(self, '_vertex_time'):
@@ -640,26 +965,28 @@ class simulation():
                         # The centre of the trace corresponds to the instant when the signal from the shower
                         # vertex arrives at the observer. The next line makes sure that the centre time
                         # of the trace is equal to vertex_time + T (wave propagation time)
-                        trace_start_time -= 0.5 * electric_field.get_number_of_samples() / electric_field.get_sampling_rate()
-
-                        electric_field.set_trace_start_time(trace_start_time)
-                        electric_field[efp.azimuth] = azimuth
-                        electric_field[efp.zenith] = zenith
-                        electric_field[efp.ray_path_type] = self._prop.solution_types[r.get_solution_type(iS)]
-                        electric_field[efp.nu_vertex_distance] = sg['travel_distances'][self._iE, channel_id, iS]
-                        electric_field[efp.nu_viewing_angle] = viewing_angles[iS]
-                        electric_field[efp.reflection_coefficient_theta] = r_theta
-                        electric_field[efp.reflection_coefficient_phi] = r_phi
+                        trace_start_time -= 0.5 * self._n_samples_window / (1. / self._dt)
+
+                        efields.append((channel_id, efield_trace, trace_start_time,
+                                        {efp.azimuth: azimuth,
+                                         efp.zenith: zenith,
+                                         efp.ray_path_type: self._prop.solution_types[r.get_solution_type(iS)],
+                                         efp.nu_vertex_distance: sg['travel_distances'][self._iE, channel_id, iS],
+                                         efp.nu_viewing_angle: viewing_angles[iS],
+                                         efp.reflection_coefficient_theta: r_theta,
+                                         efp.reflection_coefficient_phi: r_phi}))
                         if(self._cfg['signal']['model'] in ['ARZ2019', 'ARZ2020']):
                             from NuRadioMC.SignalGen.ARZ import ARZ
                             gARZ = ARZ.ARZ(arz_version=self._cfg['signal']['model'])
-                        self._sim_station.add_electric_field(electric_field)
 
                         # apply a simple threshold cut to speed up the simulation,
                         # application of antenna response will just decrease the
                         # signal amplitude
-                        if(np.max(np.abs(electric_field.get_trace())) > float(self._cfg['speedup']['min_efield_amplitude']) * self._Vrms_efield):
+                        if(np.max(np.abs(efield_trace)) > float(self._cfg['speedup']['min_efield_amplitude']) * self._Vrms_efield):
                             candidate_station = True
+                        if(self._fast_trigger_threshold is not None):
+                            # the envelope of the sum of pulses is at most the sum of the individual envelopes
+                            fast_trigger_amplitudes[self._station_id][channel_id] += self._get_fast_trigger_amplitude(channel_id, eTheta, ePhi, zenith, azimuth)
 
                 t3 = time.time()
                 rayTracingTime += t3 - t2
@@ -668,17 +995,38 @@ class simulation():
                 if(not candidate_station):
                     logger.debug("electric field amplitude too small in all channels, skipping to next event")
                     continue
+                if(self._fast_trigger_threshold is not None):
+                    n_fast_trigger_total += 1
+                    if(np.max(fast_trigger_amplitudes[self._station_id]) < self._fast_trigger_threshold * self._Vrms):
+                        logger.debug("signal envelope below the fast trigger threshold in all channels, skipping detector simulation")
+                        n_fast_trigger_rejected += 1
+                        continue
                 logger.debug("performing detector simulation")
                 # self._finalize NuRadioReco event structure
+                if(self._evt is None):
+                    self._evt = NuRadioReco.framework.event.Event(0, self._event_id)
+                    self._evt.set_parameter(evp.sim_config, self._cfg)
+                self._create_sim_station()
+                for channel_id, efield_trace, trace_start_time, parameters in efields:
+                    electric_field = NuRadioReco.framework.electric_field.ElectricField([channel_id], self._det.get_relative_position(self._station_id, channel_id))
+                    electric_field.set_trace(efield_trace, 1. / self._dt)
+                    electric_field.set_trace_start_time(trace_start_time)
+                    for key, value in parameters.items():
+                        electric_field[key] = value
+                    self._sim_station.add_electric_field(electric_field)
                 self._station = NuRadioReco.framework.station.Station(self._station_id)
                 self._station.set_sim_station(self._sim_station)
 
                 self._station.set_station_time(self._evt_time)
                 self._evt.set_station(self._station)
+                timing_evt = self._evt
+                timing_station_id = self._station_id
                 if(bool(self._cfg['signal']['zerosignal'])):
                     self._increase_signal(None, 0)
                 if(self._cfg['speedup']['amp_per_ray_solution']):
                     self._calculate_amplitude_per_ray_tracing_solution()
+                if(self._per_event_seeds):
+                    self._seed_station_random_streams()
 
                 self._detector_simulation()
                 self._calculate_signal_properties()
@@ -690,15 +1038,39 @@ class simulation():
                 self._channelResampler.run(self._evt, self._station, self._det, sampling_rate=self._sampling_rate_detector)
                 self._electricFieldResampler.run(self._evt, self._station.get_sim_station(), self._det, sampling_rate=self._sampling_rate_detector)
 
-                if self.__write_detector:
+                if(self._async_event_writer is not None):
+                    t_write = time.time()
+                    self._async_event_writer.run(self._evt, self._det if self.__write_detector else None)
+                    outputTime += time.time() - t_write
+                elif self.__write_detector:
                     self._eventWriter.run(self._evt, self._det)
                 else:
                     self._eventWriter.run(self._evt)
 
-        # Create trigger structures if there are no triggering events.
-        # This is done to ensure that files with no triggering n_events
-        # merge properly.
-        self._create_empty_multiple_triggers()
+        if(self._async_event_writer is not None):
+            # wait until all events are written
+            t_write = time.time()
+            self._async_event_writer.end()
+            outputTime += time.time() - t_write
+
+        # store the trigger names and the triggers of the individual triggers
+        self._create_multiple_triggers()
+
+        if(self._cfg['speedup']['amplitude_screening']):
+            self._mout_attrs['n_amplitude_screened'] = n_screened
+            logger.warning(f"amplitude screening: {n_screened:d} of {n_screened_total:d} ray tracing solutions ({100. * n_screened / max(1, n_screened_total):.1f}%) were skipped before the Askaryan pulse was generated")
+        if(self._fast_trigger_threshold is not None):
+            logger.warning(f"fast trigger path: {n_fast_trigger_rejected:d} of {n_fast_trigger_total:d} candidate stations were rejected without running the detector simulation")
+
+        for cache in self._response_caches.values():
+            cache.save()
+        if(self._solution_store is not None):
+            self._solution_store.commit()
+            logger.warning(f"{100. * self._solution_store.get_hit_rate():.1f}% of the ray tracing solutions were found in the solution store")
+        n_attenuation_solutions = analyticraytracing.attenuation_statistics['n_solutions'] - attenuation_statistics_start['n_solutions']
+        if(n_attenuation_solutions):
+            n_attenuation_integrations = analyticraytracing.attenuation_statistics['n_integrations'] - attenuation_statistics_start['n_integrations']
+            logger.warning(f"the attenuation was calculated at {n_attenuation_integrations / n_attenuation_solutions:.1f} reference frequencies per ray tracing solution on average")
 
         # save simulation run in hdf5 format (only triggered events)
         t5 = time.time()
@@ -710,26 +1082,246 @@ class simulation():
             logger.error("error in calculating effective volume")
 
         t_total = time.time() - t_start
-        outputTime = time.time() - t5
-
-        output_NuRadioRecoTime = "Timing of NuRadioReco modules \n"
-        ts = []
-        for iM, (name, instance, kwargs) in enumerate(self._evt.iter_modules(self._station.get_id())):
-            ts.append(instance.run.time[instance])
-        ttot = np.sum(np.array(ts))
-        for i, (name, instance, kwargs) in enumerate(self._evt.iter_modules(self._station.get_id())):
-            t = pretty_time_delta(ts[i])
-            trel = 100.*ts[i] / ttot
-            output_NuRadioRecoTime += f"{name}: {t} {trel:.1f}%\n"
-        logger.warning(output_NuRadioRecoTime)
-
-        logger.warning("{:d} events processed in {} = {:.2f}ms/event ({:.1f}% input, {:.1f}% ray tracing, {:.1f}% askaryan, {:.1f}% detector simulation, {:.1f}% output)".format(self._n_events,
-                                                                                         pretty_time_delta(t_total), 1.e3 * t_total / self._n_events,
+        outputTime += time.time() - t5
+
+        if(timing_evt is not None):
+            output_NuRadioRecoTime = "Timing of NuRadioReco modules \n"
+            ts = []
+            for iM, (name, instance, kwargs) in enumerate(timing_evt.iter_modules(timing_station_id)):
+                ts.append(instance.run.time[instance])
+            ttot = np.sum(np.array(ts))
+            for i, (name, instance, kwargs) in enumerate(timing_evt.iter_modules(timing_station_id)):
+                t = pretty_time_delta(ts[i])
+                trel = 100.*ts[i] / ttot
+                output_NuRadioRecoTime += f"{name}: {t} {trel:.1f}%\n"
+            logger.warning(output_NuRadioRecoTime)
+
+        logger.warning("{:d} events processed in {} = {:.2f}ms/event ({:.1f}% input, {:.1f}% ray tracing, {:.1f}% askaryan, {:.1f}% detector simulation, {:.1f}% output)".format(self._n_events_processed,
+                                                                                         pretty_time_delta(t_total), 1.e3 * t_total / max(1, self._n_events_processed),
                                                                                          100 * inputTime / t_total,
                                                                                          100 * rayTracingTime / t_total,
                                                                                          100 * askaryan_time / t_total,
                                                                                          100 * detSimTime / t_total,
                                                                                          100 * outputTime / t_total))
+        if(self._shadow_zone_classifier):
+            logger.warning(f"{n_shadow_zone_rejected:d} of {n_shadow_zone_total:d} vertex-channel pairs ({100. * n_shadow_zone_rejected / max(1, n_shadow_zone_total):.1f}%) are in the shadow zone, the ray tracing was skipped")
+        if(pre_simulated):
+            logger.warning(f"ray tracing solutions of the input file were reused for {n_channels_reused:d} of {n_channels_reused + n_channels_raytraced:d} channels ({100. * n_channels_reused / max(1, n_channels_reused + n_channels_raytraced):.1f}%)")
+
+    def get_channel_response(self, channel_id, zenith, azimuth):
+        """
+        returns the cached linear response of a channel of the current station on the frequency grid `self._ff`
+
+        The response is the product of the interpolated antenna vector effective length and the
+        filters of all detector simulation modules that provide a `get_filter` function. It can be used
+        in a detector simulation to obtain the voltage spectrum of a channel with a single multiplication:
+        `np.sum(response * np.array([eTheta, ePhi]), axis=0)`
+
+        Parameters
+        ----------
+        channel_id: int
+            the channel id
+        zenith: float
+            the zenith angle of the signal direction at the antenna
+        azimuth: float
+            the azimuth angle of the signal direction at the antenna
+
+        Returns
+        -------
+        response: array of complex with shape (2, len(self._ff))
+            the response to the eTheta and ePhi component of the electric field
+        """
+        if(self._station_id not in self._response_stations):
+            # the antenna response only depends on the station id and the type of the station, so the
+            # response can be calculated before the sim station of the event is created
+            station = NuRadioReco.framework.sim_station.SimStation(self._station_id)
+            station.set_is_neutrino()
+            self._response_stations[self._station_id] = station
+        return self._get_response_cache().get_response(self._response_stations[self._station_id], channel_id, zenith, azimuth)
+
+    def _get_response_cache(self, frequencies=None):
+        """
+        returns the response cache for a frequency grid
+
+        Parameters
+        ----------
+        frequencies: array of floats or None
+            the frequency grid, if None the frequency grid of the current station `self._ff` is used
+        """
+        if(frequencies is None):
+            frequencies = self._ff
+        if(len(frequencies) not in self._response_caches):
+            if(self._detector_hash is None):
+                self._detector_hash = response_cache.get_detector_hash(self._detectorfile)
+            self._response_caches[len(frequencies)] = response_cache.response_cache(
+                self._det, self._detector_hash, frequencies, modules=self._detector_modules,
+                cache_folder=self._cfg['speedup']['response_cache_folder'])
+        return self._response_caches[len(frequencies)]
+
+    def _get_noise_bank(self, n_samples):
+        """
+        returns a noise bank of the current station with noise traces of at least `n_samples` samples
+
+        The noise is filtered with the filters of all detector simulation modules that follow the
+        noise adder module of the dummy detector simulation (or all modules if no noise adder
+        is used) and is normalized such that the Vrms after filtering equals `self._Vrms`.
+        The noise bank is created at the first call and recreated with a larger number of
+        samples (rounded up to the next power of two) if longer noise traces are requested.
+        Every station has its own random stream (see `_get_noise_bank_seed`), a recreated bank
+        continues this stream instead of repeating the realizations of the previous bank.
+
+        Parameters
+        ----------
+        n_samples: int
+            the minimum number of samples of the noise traces
+        """
+        if(self._station_id not in self._noise_banks or self._noise_banks[self._station_id].get_number_of_samples() < n_samples):
+            n_samples = max(self._n_samples, int(2 ** np.ceil(np.log2(n_samples))))
+            ff = np.fft.rfftfreq(n_samples, self._dt)
+            cache = self._get_response_cache(ff)
+            first_module = self._noise_module_index.get(self._station_id, 0)
+            max_freq = 0.5 / self._dt
+            filters = {}
+            amplitudes = {}
+            for channel_id in range(self._det.get_number_of_channels(self._station_id)):
+                filters[channel_id] = cache.get_filter(self._station_id, channel_id, first_module)
+                norm = np.trapz(np.abs(filters[channel_id]) ** 2, ff)
+                amplitudes[channel_id] = self._Vrms / (norm / max_freq) ** 0.5
+            self._noise_banks[self._station_id] = noise_bank.noise_bank(ff, 1. / self._dt, filters, amplitudes,
+                                                                        n_realizations=int(self._cfg['speedup']['noise_bank']),
+                                                                        seed=self._get_noise_bank_seed(self._station_id))
+        return self._noise_banks[self._station_id]
+
+    def _get_noise_bank_seed(self, station_id):
+        """
+        returns the seed of the next noise bank of a station
+
+        The seeds are spawned from a seed sequence that depends on the run seed and the station id
+        (see `NuRadioMC.utilities.random_streams.get_station_seed_sequence`), so every station gets
+        different noise realizations and every call returns a new seed.
+        """
+        if(station_id not in self._noise_bank_seeds):
+            self._noise_bank_seeds[station_id] = random_streams.get_station_seed_sequence(self._cfg['seed'], station_id)
+        return int(self._noise_bank_seeds[station_id].spawn(1)[0].generate_state(1)[0])
+
+    def _add_noise_from_bank(self, amplitude=None, excluded_channels=None):
+        """
+        adds filtered noise from the noise bank to all channels of the current station
+
+        This function replaces the `channelGenericNoiseAdder` module in the detector simulation.
+        As the noise of the bank is already filtered, it needs to be called after all filters
+        have been applied (and before the trigger modules). The channel traces need to be sampled
+        with the internal sampling rate of the simulation. The size of the bank is set via the
+        config option `speedup/noise_bank`. With the config option `speedup/add_noise_from_bank`,
+        it is called automatically between `_detector_simulation_filter_amp` and
+        `_detector_simulation_trigger`.
+
+        Parameters
+        ----------
+        amplitude: float or None
+            the Vrms of the noise after filtering. If None, `self._Vrms` is used.
+        excluded_channels: list of ints or None
+            the channels ids of channels where no noise will be added
+        """
+        if(self._station_id not in self._detector_modules):  # dummy detector simulation of the __init__ function
+            return
+        if(amplitude is None):
+            amplitude = self._Vrms
+        if(excluded_channels is None):
+            excluded_channels = []
+        for channel in self._station.iter_channels():
+            if(channel.get_id() in excluded_channels):
+                continue
+            trace = channel.get_trace()
+            if(not np.isclose(channel.get_sampling_rate(), 1. / self._dt)):
+                raise ValueError(f"sampling rate of channel {channel.get_id()} ({channel.get_sampling_rate() / units.GHz:.2f}GHz) does not match the internal sampling rate of the noise bank ({1. / self._dt / units.GHz:.2f}GHz)")
+            # the noise is stationary, so we can use the beginning of a longer noise trace
+            bank = self._get_noise_bank(len(trace))
+            noise = bank.get_noise_trace(channel.get_id(), self._station_random_state)[:len(trace)] * amplitude / self._Vrms
+            channel.set_trace(trace + noise, channel.get_sampling_rate())
+
+    def _get_fast_trigger_amplitude(self, channel_id, eTheta, ePhi, zenith, azimuth):
+        """
+        returns the maximum of the Hilbert envelope of the voltage trace induced by a single electric field
+
+        Only the cached linear response of the channel (see `get_channel_response`) is applied,
+        no NuRadioReco objects are created.
+
+        Parameters
+        ----------
+        channel_id: int
+            the channel id
+        eTheta: array of complex
+            the frequency spectrum of the eTheta component of the electric field
+        ePhi: array of complex
+            the frequency spectrum of the ePhi component of the electric field
+        zenith: float
+            the zenith angle of the signal direction at the antenna
+        azimuth: float
+            the azimuth angle of the signal direction at the antenna
+        """
+        voltage_fft = np.sum(self.get_channel_response(channel_id, zenith, azimuth) * np.array([eTheta, ePhi]), axis=0)
+        voltage_fft[self._ff < 5 * units.MHz] = 0  # the efieldToVoltageConverter removes the DC offset
+        return np.max(np.abs(signal.hilbert(fft.freq2time(voltage_fft, 1. / self._dt))))
+
+    def _get_signal_amplitude_estimate(self):
+        """
+        returns an estimate of the maximum noiseless channel amplitude of the current station
+
+        The envelopes of all electric fields of a channel (see `_get_fast_trigger_amplitude`) are summed, the
+        estimate is therefore not smaller than the maximum of the noiseless voltage trace (up to the interpolation
+        of the antenna response). It is used to decide if the pre-trigger traces are stored if the noise is added
+        within `_detector_simulation_filter_amp`.
+        """
+        estimates = {}
+        for efield in self._station.get_sim_station().get_electric_fields():
+            spectrum = efield.get_frequency_spectrum()
+            for channel_id in efield.get_channel_ids():
+                estimates[channel_id] = estimates.get(channel_id, 0) + self._get_fast_trigger_amplitude(
+                    channel_id, spectrum[1], spectrum[2], efield[efp.zenith], efield[efp.azimuth])
+        return max(list(estimates.values()) + [0])
+
+    def _get_amplitude_upper_bound(self, r, iS, R, viewing_angle, n_index, fem, fhad):
+        """
+        returns a conservative upper bound of the maximum electric-field amplitude of a ray tracing solution
+
+        The bound is calculated from the frequency spectrum of the signal model (see
+        `askaryan.get_amplitude_upper_bound`), the 1/R scaling,
+        the attenuation at a single reference frequency (the attenuation at this frequency is
+        applied to all higher frequencies, lower frequencies are not attenuated) and the
+        maximum focusing factor. Fresnel and bottom reflection coefficients as well as the
+        polarization can only reduce the amplitude and are neglected.
+
+        Parameters
+        ----------
+        r: ray tracing instance
+            the ray tracing instance with the solutions of the current channel
+        iS: int
+            the index of the ray tracing solution
+        R: float
+            the path length of the ray tracing solution
+        viewing_angle: float
+            the angle between shower axis and launch vector
+        n_index: float
+            the index of refraction at the vertex
+        fem: float
+            the electromagnetic fraction of the neutrino energy
+        fhad: float
+            the hadronic fraction of the neutrino energy
+        """
+        attn = np.ones_like(self._ff)
+        if self._cfg['propagation']['attenuate_ice']:
+            f_ref = float(self._cfg['speedup']['amplitude_screening_reference_frequency'])
+            attn[self._ff >= f_ref] = r.get_attenuation(iS, np.array([f_ref]))[0]
+        model = self._cfg['signal']['model']
+        max_amplitude = signalgen.get_amplitude_upper_bound(self._energy * fhad, viewing_angle, n_index, R, model, self._ff, attn,
+                                                            shower_type="HAD")
+        if(fem > 0):
+            max_amplitude += signalgen.get_amplitude_upper_bound(self._energy * fem, viewing_angle, n_index, R, model, self._ff,
+                                                                 attn, shower_type="EM")
+        if self._cfg['propagation']['focusing']:
+            max_amplitude *= float(self._cfg['propagation']['focusing_limit'])
+        return max_amplitude * float(self._cfg['speedup']['amplitude_screening_safety_factor'])
 
     def _is_simulate_noise(self):
         """
@@ -809,19 +1401,33 @@ class simulation():
         """
         reads input file into memory
         """
+        if(self._layout_data is not None and 'input' in self._layout_data):
+            # the input file was already read for all detector layouts
+            self._fin, self._fin_stations, self._fin_stations_attrs, self._fin_attrs = self._layout_data['input']
+            self._interaction_types = categorical.get_categories(self._fin['interaction_type'])
+            return
         fin = h5py.File(self._inputfilename, 'r')
         self._fin = {}
         self._fin_stations = {}
+        self._fin_stations_attrs = {}
         self._fin_attrs = {}
         for key, value in iteritems(fin):
             if isinstance(value, h5py._hl.group.Group):
                 self._fin_stations[key] = {}
+                self._fin_stations_attrs[key] = {}
+                for key2, value2 in iteritems(value.attrs):
+                    self._fin_stations_attrs[key][key2] = value2
                 for key2, value2 in iteritems(value):
                     self._fin_stations[key][key2] = np.array(value2)
-            self._fin[key] = np.array(value)
+            if(isinstance(value, h5py.Dataset) and (value.dtype.kind in ['S', 'U'] or categorical.is_categorical(value))):
+                # string columns are held as integer codes, the categories are stored in the data type
+                self._fin[key] = categorical.read(fin, key)
+            else:
+                self._fin[key] = np.array(value)
         for key, value in iteritems(fin.attrs):
             self._fin_attrs[key] = value
         fin.close()
+        self._interaction_types = categorical.get_categories(self._fin['interaction_type'])
 
     def _check_vertex_times(self):
 
@@ -843,59 +1449,95 @@ class simulation():
 
             sg['SNRs'][self._iE] = self._station.get_parameter(stnp.channels_max_amplitude) / self._Vrms
 
-    def _create_empty_multiple_triggers(self):
-        if ('trigger_names' not in self._mout_attrs):
+    def _create_multiple_triggers(self):
+        """
+        stores the trigger names and creates the 'multiple_triggers' arrays of bools (one column per trigger) from the
+        bit-packed trigger masks
+        """
+        trigger_names = self._trigger_registry.get_trigger_names()
+        if(len(trigger_names) == 0):
             self._mout_attrs['trigger_names'] = np.array([])
-            self._mout['multiple_triggers'] = np.zeros((self._n_events, 1), dtype=np.bool)
+        else:
+            self._mout_attrs['trigger_names'] = trigger_names
+        if(self._cfg['trigger']['save_multiple_triggers']):
+            # files without any triggers get one (empty) column so that they merge properly
+            n_triggers = max(1, len(trigger_names))
+            self._mout['multiple_triggers'] = trigger_masks.unpack(self._mout['multiple_triggers_mask'], n_triggers)
             for station_id in self._station_ids:
                 sg = self._mout_groups[station_id]
-                sg['multiple_triggers'] = np.zeros((self._n_events, 1), dtype=np.bool)
-
-    def _create_trigger_structures(self):
+                sg['multiple_triggers'] = trigger_masks.unpack(sg['multiple_triggers_mask'], n_triggers)
 
-        if('trigger_names' not in self._mout_attrs):
-            self._mout_attrs['trigger_names'] = []
-        extend_array = False
+    def _save_triggers_to_hdf5(self):
+        # every trigger has a fixed bit in the trigger masks, new triggers do not require to resize the output arrays
+        sg = self._mout_groups[self._station_id]
+        mask = np.uint64(0)
         for trigger in six.itervalues(self._station.get_triggers()):
-            if(trigger.get_name() not in self._mout_attrs['trigger_names']):
-                self._mout_attrs['trigger_names'].append((trigger.get_name()))
-                extend_array = True
-        # the 'multiple_triggers' output array is not initialized in the constructor because the number of
-        # simulated triggers is unknown at the beginning. So we check if the key already exists and if not,
-        # we first create this data structure
-        if('multiple_triggers' not in self._mout):
-            self._mout['multiple_triggers'] = np.zeros((self._n_events, len(self._mout_attrs['trigger_names'])), dtype=np.bool)
-            for station_id in self._station_ids:
-                sg = self._mout_groups[station_id]
-                sg['multiple_triggers'] = np.zeros((self._n_events, len(self._mout_attrs['trigger_names'])), dtype=np.bool)
-        elif(extend_array):
-            tmp = np.zeros((self._n_events, len(self._mout_attrs['trigger_names'])), dtype=np.bool)
-            nx, ny = self._mout['multiple_triggers'].shape
-            tmp[:, 0:ny] = self._mout['multiple_triggers']
-            self._mout['multiple_triggers'] = tmp
+            bit = self._trigger_registry.register(trigger.get_name())
+            if(trigger.has_triggered()):
+                mask |= np.left_shift(np.uint64(1), np.uint64(bit))
+        self._mout['multiple_triggers_mask'][self._iE] |= mask
+        sg['multiple_triggers_mask'][self._iE] = mask
+
+        self._mout['triggered'][self._iE] = self._mout['multiple_triggers_mask'][self._iE] != 0
+        sg['triggered'][self._iE] = mask != 0
+        if(self._mout['triggered'][self._iE]):
+            logger.debug("event triggered")
 
-            for station_id in self._station_ids:
-                sg = self._mout_groups[station_id]
-                tmp = np.zeros((self._n_events, len(self._mout_attrs['trigger_names'])), dtype=np.bool)
-                nx, ny = sg['multiple_triggers'].shape
-                tmp[:, 0:ny] = sg['multiple_triggers']
-                sg['multiple_triggers'] = tmp
+    def _get_random_state(self, station_id, stream):
+        """
+        returns the random number generator of the current event, see `NuRadioMC.utilities.random_streams`
+        """
+        return random_streams.get_random_state(self._cfg['seed'], self._fin['event_ids'][self._iE], station_id,
+                                               self._n_interaction, stream)
 
-    def _save_triggers_to_hdf5(self):
+    def _seed_station_random_streams(self):
+        """
+        sets the random number generators of the current station before the detector simulation
 
-        self._create_trigger_structures()
-        sg = self._mout_groups[self._station_id]
-        for iT, trigger_name in enumerate(self._mout_attrs['trigger_names']):
-            if(self._station.has_trigger(trigger_name)):
-                self._mout['multiple_triggers'][self._iE, iT] |= self._station.get_trigger(trigger_name).has_triggered()
-                sg['multiple_triggers'][self._iE, iT] = self._station.get_trigger(trigger_name).has_triggered()
-            else:
-                sg['multiple_triggers'][self._iE, iT] = False
+        The noise of the noise bank is drawn from the station's random stream and the `channelGenericNoiseAdder`
+        modules of the detector simulation are reseeded, so that the noise only depends on the event and the station.
+        """
+        self._station_random_state = self._get_random_state(self._station_id, 'noise')
+        seed = random_streams.get_seed(self._cfg['seed'], self._fin['event_ids'][self._iE], self._station_id,
+                                       self._n_interaction, 'detector')
+        for name, instance, kwargs in self._detector_modules.get(self._station_id, []):
+            if(name == 'channelGenericNoiseAdder'):
+                instance.begin(seed=seed)
+
+    def _detector_simulation(self):
+        """
+        simulates the detector response of the current station
 
-        self._mout['triggered'][self._iE] = np.any(self._mout['multiple_triggers'][self._iE])
-        sg['triggered'][self._iE] = np.any(sg['multiple_triggers'][self._iE])
-        if(self._mout['triggered'][self._iE]):
-            logger.debug("event triggered")
+        Either this function or the two functions `_detector_simulation_filter_amp` (signal chain) and
+        `_detector_simulation_trigger` (trigger modules) need to be implemented in the derived class. The split
+        is required to store the pre-trigger traces (config setting `trigger: save_pre_trigger_traces`) and to add
+        the noise from the noise bank (config setting `speedup: add_noise_from_bank`).
+        """
+        signal_amplitude = None
+        noise_from_bank = self._cfg['speedup']['add_noise_from_bank'] and self._is_simulate_noise()
+        if(self._pre_trigger_traces is not None and self._is_simulate_noise() and not noise_from_bank):
+            # the noise is added in the signal chain, the noiseless amplitude is estimated from the electric fields
+            signal_amplitude = self._get_signal_amplitude_estimate()
+        self._detector_simulation_filter_amp(self._evt, self._station, self._det)
+        if(noise_from_bank):
+            if(self._pre_trigger_traces is not None):
+                signal_amplitude = max([np.max(np.abs(channel.get_trace())) for channel in self._station.iter_channels()] + [0])
+            self._add_noise_from_bank()
+        if(self._pre_trigger_traces is not None):
+            self._pre_trigger_traces.add(self._iE, self._station, signal_amplitude)
+        self._detector_simulation_trigger(self._evt, self._station, self._det)
+
+    def _detector_simulation_filter_amp(self, evt, station, det):
+        """
+        simulates the signal chain (filters and amplifiers) of the station
+        """
+        raise NotImplementedError("the detector simulation needs to be implemented in the derived class (`_detector_simulation` or `_detector_simulation_filter_amp` and `_detector_simulation_trigger`)")
+
+    def _detector_simulation_trigger(self, evt, station, det):
+        """
+        runs the trigger modules of the station
+        """
+        raise NotImplementedError("the detector simulation needs to be implemented in the derived class (`_detector_simulation` or `_detector_simulation_filter_amp` and `_detector_simulation_trigger`)")
 
     def get_Vrms(self):
         return self._Vrms
@@ -906,16 +1548,136 @@ class simulation():
     def get_bandwidth(self):
         return self._bandwidth
 
+    def _create_solution_store(self):
+        """
+        returns the on-disk store of ray tracing solutions if it is enabled in the config, otherwise None
+        """
+        if(self._cfg['speedup']['raytracing_store_folder'] is None):
+            return None
+        store_filename = os.path.join(self._cfg['speedup']['raytracing_store_folder'],
+                                      "raytracing_{}.sqlite".format(self._cfg['propagation']['ice_model']))
+        logger.warning(f"using ray tracing solution store {store_filename}")
+        return solution_store.solution_store(store_filename,
+                                             max_size=int(float(self._cfg['speedup']['raytracing_store_max_size']) * 2 ** 30))
+
+    def _init_layouts(self, outputfilenames, detectorfiles, outputfilenamesNuRadioReco, kwargs):
+        """
+        initializes the simulation of several detector layouts in a single pass over the event list
+
+        One simulation object (of the same class) is created per layout. All of them use the same input data,
+        random seed, in-memory store of ray tracing solutions and cache of per-event quantities.
+
+        Parameters
+        ----------
+        outputfilenames: list of strings
+            the hdf5 output files, one per layout
+        detectorfiles: list of strings
+            the detector descriptions, one per layout
+        outputfilenamesNuRadioReco: list of strings or None
+            the NuRadioReco output files, one per layout
+        kwargs: dict
+            the remaining arguments of `__init__`
+        """
+        if(isinstance(outputfilenames, str) or len(outputfilenames) != len(detectorfiles)):
+            raise ValueError("one hdf5 output file per detector layout needs to be specified")
+        if(outputfilenamesNuRadioReco is None):
+            outputfilenamesNuRadioReco = [None] * len(detectorfiles)
+        elif(isinstance(outputfilenamesNuRadioReco, str) or len(outputfilenamesNuRadioReco) != len(detectorfiles)):
+            raise ValueError("one NuRadioReco output file per detector layout needs to be specified")
+        self._outputfilename = outputfilenames
+        self._detectorfile = detectorfiles
+        self._read_input_hdf5()
+        layout_data = {'seed': self._cfg['seed'],
+                       'input': (self._fin, self._fin_stations, self._fin_stations_attrs, self._fin_attrs),
+                       'solution_store': solution_store.memory_solution_store(self._create_solution_store()),
+                       'event_cache': {}}
+        self._layouts = []
+        for outputfilename, detectorfile, outputfilenameNuRadioReco in zip(outputfilenames, detectorfiles, outputfilenamesNuRadioReco):
+            logger.warning(f"initializing the simulation of detector layout {detectorfile}")
+            layout = self.__class__.__new__(self.__class__)
+            layout._layout_data = layout_data
+            layout.__init__(self._inputfilename, outputfilename, detectorfile, outputfilenameNuRadioReco=outputfilenameNuRadioReco, **kwargs)
+            self._layouts.append(layout)
+        self._layout_data = layout_data
+
+    def _run_layouts(self):
+        """
+        simulates all detector layouts event by event
+
+        The simulations of the layouts are advanced in lockstep, i.e., every event is simulated for all layouts
+        before the next event is processed. Hence, the shared ray tracing solutions and per-event quantities only
+        need to be kept in memory for the current event.
+        """
+        event_loops = [layout._run_event_loop() for layout in self._layouts]
+        while(len(event_loops)):
+            # all entries of the cache belong to the event that was simulated last
+            self._layout_data['solution_store'].clear()
+            self._layout_data['event_cache'].clear()
+            for event_loop in list(event_loops):
+                try:
+                    next(event_loop)
+                except StopIteration:
+                    event_loops.remove(event_loop)
+        self._layout_data['solution_store'].close()
+        logger.warning(f"{len(self._layouts):d} detector layouts were simulated, {100. * self._layout_data['solution_store'].get_hit_rate():.1f}% of the ray tracing solutions were shared")
+
+    def _get_channel_geometry_hashes(self, station_id):
+        """
+        returns the geometry hashes of all channels of a station of the current detector
+
+        Parameters
+        ----------
+        station_id: int
+            the station id
+        """
+        hashes = []
+        for channel_id in range(self._det.get_number_of_channels(station_id)):
+            position = self._det.get_relative_position(station_id, channel_id) + self._det.get_absolute_position(station_id)
+            hashes.append(get_channel_geometry_hash(position, self._cfg['propagation']['ice_model'],
+                                                    self._cfg['propagation']['attenuation_model'], self._n_reflections))
+        return np.array(hashes, dtype='S')
+
     def _check_if_was_pre_simulated(self):
         """
-        checks if the same detector was simulated before (then we can save the ray tracing part)
+        checks which channels were simulated before (then we can save the ray tracing part)
+
+        A channel is considered as pre-simulated if a channel of the input file has the same geometry
+        hash, i.e., the same position, ice model, attenuation model and number of bottom reflections.
+        The channel geometry hashes are read from the input file. For files of older versions, they are
+        calculated from the antenna positions and the config settings stored in the input file.
+        The mapping of channel ids to the channel ids of the input file is stored in
+        `self._pre_simulated_channels`.
         """
         self._was_pre_simulated = False
-        if('detector' in self._fin_attrs):
-            with open(self._detectorfile, 'r') as fdet:
-                if(fdet.read() == self._fin_attrs['detector']):
-                    self._was_pre_simulated = True
-                    print("the simulation was already performed with the same detector")
+        self._pre_simulated_channels = {}
+        for station_id in self._station_ids:
+            key = "station_{:d}".format(station_id)
+            if(key not in self._fin_stations or 'ray_tracing_C0' not in self._fin_stations[key]):
+                continue
+            attrs = self._fin_stations_attrs[key]
+            if('channel_geometry_hashes' in attrs):
+                hashes_pre = attrs['channel_geometry_hashes']
+            elif('antenna_positions' in attrs and 'config' in self._fin_attrs):
+                try:
+                    cfg_pre = yaml.load(self._fin_attrs['config'], Loader=yaml.FullLoader)
+                    hashes_pre = np.array([get_channel_geometry_hash(position, cfg_pre['propagation']['ice_model'],
+                                                                     cfg_pre['propagation']['attenuation_model'],
+                                                                     int(cfg_pre['propagation'].get('n_reflections', 0)))
+                                           for position in attrs['antenna_positions']], dtype='S')
+                except Exception:
+                    logger.warning(f"could not read the config of the input file, ray tracing solutions of station {station_id} can not be reused")
+                    continue
+            else:
+                continue
+            self._pre_simulated_channels[station_id] = {}
+            for channel_id, channel_hash in enumerate(self._get_channel_geometry_hashes(station_id)):
+                matches = np.argwhere(hashes_pre == channel_hash)
+                if(len(matches)):
+                    self._pre_simulated_channels[station_id][channel_id] = int(matches[0][0])
+            n_reused = len(self._pre_simulated_channels[station_id])
+            if(n_reused):
+                self._was_pre_simulated = True
+                logger.warning(f"{n_reused:d} of {self._det.get_number_of_channels(station_id):d} channels of station {station_id} were already simulated with the same geometry, the ray tracing solutions will be reused")
         return self._was_pre_simulated
 
     def _create_meta_output_datastructures(self):
@@ -926,8 +1688,9 @@ class simulation():
         self._mout_attributes = {}
         self._mout['weights'] = np.zeros(self._n_events)
         self._mout['triggered'] = np.zeros(self._n_events, dtype=np.bool)
-#         self._mout['multiple_triggers'] = np.zeros((self._n_events, self._number_of_triggers), dtype=np.bool)
-        self._mout_attributes['trigger_names'] = None
+        # the triggers of every event are stored bit-packed, the bits are assigned by the trigger registry
+        self._mout['multiple_triggers_mask'] = np.zeros(self._n_events, dtype=np.uint64)
+        self._trigger_registry = trigger_masks.trigger_registry(self._cfg['trigger']['trigger_names'])
 
         for station_id in self._station_ids:
             n_antennas = self._det.get_number_of_channels(station_id)
@@ -935,6 +1698,7 @@ class simulation():
             sg = self._mout_groups[station_id]
             nS = 2 + 4 * self._n_reflections  # number of possible ray-tracing solutions
             sg['triggered'] = np.zeros(self._n_events, dtype=np.bool)
+            sg['multiple_triggers_mask'] = np.zeros(self._n_events, dtype=np.uint64)
             sg['launch_vectors'] = np.zeros((self._n_events, n_antennas, nS, 3)) * np.nan
             sg['receive_vectors'] = np.zeros((self._n_events, n_antennas, nS, 3)) * np.nan
             sg['ray_tracing_C0'] = np.zeros((self._n_events, n_antennas, nS)) * np.nan
@@ -950,11 +1714,18 @@ class simulation():
             sg['maximum_amplitudes_envelope'] = np.zeros((self._n_events, n_antennas)) * np.nan
             sg['focusing_factor'] = np.ones((self._n_events, n_antennas, nS))
 
+    def _get_number_of_consumed_events(self, n_entries):
+        """
+        returns the number of simulated events that correspond to the first `n_entries` entries of the input file,
+        see `get_number_of_consumed_events`
+        """
+        return get_number_of_consumed_events(self._fin['event_ids'], self._fin_attrs, n_entries)
+
     def _read_input_neutrino_properties(self):
         self._event_id = self._fin['event_ids'][self._iE]
         self._flavor = self._fin['flavors'][self._iE]
         self._energy = self._fin['energies'][self._iE]
-        self._inttype = self._fin['interaction_type'][self._iE].astype('str')
+        self._inttype = self._interaction_types[self._fin['interaction_type'][self._iE]]
         self._x = self._fin['xx'][self._iE]
         self._y = self._fin['yy'][self._iE]
         self._z = self._fin['zz'][self._iE]
@@ -989,6 +1760,8 @@ class simulation():
         fout = h5py.File(self._outputfilename, 'w')
 
         saved = np.ones(len(self._mout['triggered']), dtype=np.bool)
+        # if the simulation was stopped early, the events that were not simulated are not saved
+        saved[self._n_events_processed:] = False
         if (self._cfg['save_all'] == False):
             logger.info("saving only triggered events")
             # Careful! saved should be a copy of the triggered array, and not
@@ -1005,6 +1778,9 @@ class simulation():
                     saved[ np.intersect1d(parent_indices, event_indices)[0] ] = True
         else:
             logger.info("saving all events")
+        if(self._pre_trigger_traces is not None):
+            # events with pre-trigger traces are saved so that their triggers can be re-evaluated later
+            saved[self._pre_trigger_traces.get_entry_indices()] = True
 
         # save data sets
         for (key, value) in iteritems(self._mout):
@@ -1030,6 +1806,7 @@ class simulation():
             for channel_id in range(n_channels):
                 positions[channel_id] = self._det.get_relative_position(station_id, channel_id) + self._det.get_absolute_position(station_id)
             fout["station_{:d}".format(station_id)].attrs['antenna_positions'] = positions
+            fout["station_{:d}".format(station_id)].attrs['channel_geometry_hashes'] = self._get_channel_geometry_hashes(station_id)
 
         fout.attrs.create("Tnoise", self._Tnoise, dtype=np.float)
         fout.attrs.create("Vrms", self._Vrms, dtype=np.float)
@@ -1049,18 +1826,26 @@ class simulation():
         # now we also save all input parameters back into the out file
         for key in self._fin.keys():
             if(not key in fout.keys()):  # only save data sets that havn't been recomputed and saved already
-                fout[key] = np.array(self._fin[key])[saved]
+                if(categorical.is_categorical(self._fin[key])):
+                    categorical.write(fout, key, self._fin[key][saved])
+                else:
+                    fout[key] = np.array(self._fin[key])[saved]
 
         for key in self._fin_attrs.keys():
             if(not key in fout.attrs.keys()):  # only save atrributes sets that havn't been recomputed and saved already
                 fout.attrs[key] = self._fin_attrs[key]
         fout.close()
 
+        if(self._pre_trigger_traces is not None):
+            self._pre_trigger_traces.write(trigger_replay.get_pre_trigger_trace_filename(self._outputfilename),
+                                           np.cumsum(saved) - 1,
+                                           attributes={'threshold': float(self._cfg['trigger']['pre_trigger_threshold'])})
+
     def calculate_Veff(self):
         # calculate effective
         n_triggered = np.sum(self._mout['triggered'])
         n_triggered_weighted = np.sum(self._mout['weights'][self._mout['triggered']])
-        logger.warning(f'fraction of triggered events = {n_triggered:.0f}/{self._n_events:.0f} = {n_triggered / self._n_events:.3f} (sum of weights = {n_triggered_weighted:.2f})')
+        logger.warning(f'fraction of triggered events = {n_triggered:.0f}/{self._n_events_processed:.0f} = {n_triggered / self._n_events_processed:.3f} (sum of weights = {n_triggered_weighted:.2f})')
 
         V = None
         if('xmax' in self._fin_attrs):
@@ -1073,7 +1858,7 @@ class simulation():
             rmax = self._fin_attrs['rmax']
             dZ = self._fin_attrs['zmax'] - self._fin_attrs['zmin']
             V = np.pi * (rmax ** 2 - rmin ** 2) * dZ
-        Veff = V * 4 * np.pi * n_triggered_weighted / self._n_events
+        Veff = V * 4 * np.pi * n_triggered_weighted / self._n_events_processed
         logger.warning("Veff = {:.4g} km^3 sr".format(Veff / units.km ** 3))
 
     def _get_em_had_fraction(self, inelasticity, inttype, flavor):
@@ -0,0 +1,324 @@
+"""
+re-evaluation of the triggers of a NuRadioMC simulation from stored pre-trigger channel traces
+
+If the config setting `trigger: save_pre_trigger_traces` is enabled, the simulation stores the channel traces
+after the signal chain and before the trigger modules (i.e., after `_detector_simulation_filter_amp`) of all
+stations where the noiseless signal of any channel exceeds `trigger: pre_trigger_threshold` x Vrms into a separate
+hdf5 file next to the hdf5 output file (see `get_pre_trigger_trace_filename`). These events are saved in the hdf5
+output file even if they did not trigger. `replay` runs new trigger settings on the stored traces and updates the
+triggers of the hdf5 output files, without repeating the ray tracing, signal generation and signal chain simulation.
+Trigger settings that would trigger on signals below the loose threshold of the pre-trigger trace store can not be
+evaluated (in particular triggers on pure noise fluctuations are not replayed).
+"""
+from __future__ import absolute_import, division, print_function
+import numpy as np
+import h5py
+import glob
+import os
+import json
+import tempfile
+import datetime
+import multiprocessing
+import six
+import NuRadioReco.framework.event
+import NuRadioReco.framework.station
+import NuRadioReco.framework.channel
+import NuRadioReco.detector.detector as detector
+import NuRadioReco.detector.generic_detector as gdetector
+from NuRadioMC.utilities import trigger_masks
+import logging
+logger = logging.getLogger("sim.trigger_replay")
+
+
+def get_pre_trigger_trace_filename(filename):
+    """
+    returns the filename of the pre-trigger trace store of a NuRadioMC hdf5 output file
+    """
+    return os.path.splitext(filename)[0] + ".pre_trigger_traces.hdf5"
+
+
+class pre_trigger_trace_store():
+    """
+    collects the channel traces before the trigger modules during the simulation and writes them to disk
+    """
+
+    def __init__(self, threshold):
+        """
+        Parameters
+        ----------
+        threshold: float
+            the traces of a station are stored if the maximum absolute amplitude of any channel exceeds this threshold
+        """
+        self._threshold = threshold
+        self._stations = {}
+
+    def add(self, entry_index, station, signal_amplitude=None):
+        """
+        stores the channel traces of a station if any channel exceeds the threshold
+
+        Parameters
+        ----------
+        entry_index: int
+            the index of the event in the input file
+        station: NuRadioReco station
+            the station after the simulation of the signal chain
+        signal_amplitude: float or None
+            the maximum noiseless amplitude of the channels that is compared to the threshold. If None, the
+            maximum of the channel traces is used (only meaningful for simulations without noise)
+
+        Returns
+        -------
+        bool: True if the traces were stored
+        """
+        channels = list(station.iter_channels())
+        if(not len(channels)):
+            return False
+        if(signal_amplitude is None):
+            signal_amplitude = max([np.max(np.abs(channel.get_trace())) for channel in channels])
+        if(signal_amplitude <= self._threshold):
+            return False
+        station_id = station.get_id()
+        if(station_id not in self._stations):
+            self._stations[station_id] = {'entry_index': [], 'channel_ids': [channel.get_id() for channel in channels],
+                                          'sampling_rate': channels[0].get_sampling_rate(),
+                                          'traces': [], 'trace_start_times': []}
+        data = self._stations[station_id]
+        if([channel.get_id() for channel in channels] != data['channel_ids']):
+            logger.error(f"the channels of station {station_id} changed between events, the pre-trigger traces of event {entry_index} are not stored")
+            return False
+        data['entry_index'].append(entry_index)
+        data['traces'].append([np.array(channel.get_trace(), dtype=np.float32) for channel in channels])
+        data['trace_start_times'].append([channel.get_trace_start_time() for channel in channels])
+        return True
+
+    def get_entry_indices(self):
+        """
+        returns the indices (in the input file) of all events with stored traces
+        """
+        indices = [np.array(data['entry_index'], dtype=int) for data in self._stations.values()]
+        return np.unique(np.concatenate(indices + [np.zeros(0, dtype=int)]))
+
+    def write(self, filename, output_indices, attributes=None):
+        """
+        writes the pre-trigger traces to disk
+
+        Parameters
+        ----------
+        filename: string
+            the filename of the pre-trigger trace store
+        output_indices: array of ints
+            the index in the hdf5 output file of every event of the input file
+        attributes: dict or None
+            additional attributes of the file
+        """
+        with h5py.File(filename, 'w') as fout:
+            if(attributes is not None):
+                for key, value in six.iteritems(attributes):
+                    fout.attrs[key] = value
+            for station_id, data in six.iteritems(self._stations):
+                sg = fout.create_group(f"station_{station_id:d}")
+                n_samples = np.array([[len(trace) for trace in traces] for traces in data['traces']], dtype=int)
+                # traces of different lengths are padded with zeros
+                traces = np.zeros((len(data['traces']), len(data['channel_ids']), np.max(n_samples)), dtype=np.float32)
+                for iE, event_traces in enumerate(data['traces']):
+                    for iCh, trace in enumerate(event_traces):
+                        traces[iE, iCh, :len(trace)] = trace
+                sg['event_index'] = np.asarray(output_indices)[data['entry_index']]
+                sg['traces'] = traces
+                sg['n_samples'] = n_samples
+                sg['trace_start_times'] = np.array(data['trace_start_times'])
+                sg.attrs['channel_ids'] = data['channel_ids']
+                sg.attrs['sampling_rate'] = data['sampling_rate']
+        logger.warning(f"pre-trigger traces of {len(self.get_entry_indices()):d} events were written to {filename}")
+
+
+def read_pre_trigger_traces(filename):
+    """
+    reads a pre-trigger trace store
+
+    Parameters
+    ----------
+    filename: string
+        the filename of the pre-trigger trace store
+
+    Returns
+    -------
+    dict with the station ids as keys, the values are dicts with the keys 'event_index' (the index of the event in the
+    hdf5 output file), 'traces', 'n_samples', 'trace_start_times', 'channel_ids' and 'sampling_rate'
+    """
+    stations = {}
+    with h5py.File(filename, 'r') as fin:
+        for key, group in six.iteritems(fin):
+            data = {key2: np.array(value) for key2, value in six.iteritems(group)}
+            data['channel_ids'] = list(group.attrs['channel_ids'])
+            data['sampling_rate'] = group.attrs['sampling_rate']
+            stations[int(key.split("_")[1])] = data
+    return stations
+
+
+def _get_detector(fin, detectorfile, default_detector_station, default_detector_channel, evt_time):
+    """
+    returns the detector of a NuRadioMC hdf5 output file (the detector description stored in the file is used if
+    `detectorfile` is None)
+    """
+    temp_filename = None
+    if(detectorfile is None):
+        with tempfile.NamedTemporaryFile('w', suffix=".json", delete=False) as fdet:
+            fdet.write(fin.attrs['detector'])
+            temp_filename = fdet.name
+        detectorfile = temp_filename
+    try:
+        if(default_detector_station):
+            det = gdetector.GenericDetector(json_filename=detectorfile, default_station=default_detector_station,
+                                            default_channel=default_detector_channel, antenna_by_depth=False, create_new=True)
+        else:
+            det = detector.Detector(json_filename=detectorfile, antenna_by_depth=False, create_new=True)
+        det.update(evt_time)
+    finally:
+        if(temp_filename is not None):
+            os.remove(temp_filename)
+    return det
+
+
+def replay_file(filename, trigger_function, trigger_names=None, detectorfile=None, default_detector_station=None,
+                default_detector_channel=None, evt_time=datetime.datetime(2018, 1, 1)):
+    """
+    re-evaluates the triggers of one NuRadioMC hdf5 output file from its pre-trigger traces and updates the file
+
+    The triggers that are evaluated by `trigger_function` replace the triggers of the same name (for all events and
+    stations, the triggers of events without stored traces are set to False). Triggers with new names are added,
+    all other triggers of the file are kept. The data sets 'multiple_triggers_mask', 'multiple_triggers' and 'triggered'
+    (of all events and of the stations) are updated. All other quantities (e.g. SNRs) and the NuRadioReco output
+    files are not changed.
+
+    Parameters
+    ----------
+    filename: string
+        the NuRadioMC hdf5 output file
+    trigger_function: function
+        is called as `trigger_function(evt, station, det, Vrms)` for every stored station and needs to run the trigger
+        modules with the new settings. It needs to be picklable (i.e. a module level function) for parallel processing.
+    trigger_names: list of strings or None
+        the names of the triggers that are set by `trigger_function`. If None, all triggers that are found in the
+        stations after running the trigger function are replaced.
+    detectorfile: string or None
+        the detector description. If None, the detector description stored in the hdf5 file is used.
+    default_detector_station: int or None
+        the default station of the generic detector (as in the simulation)
+    default_detector_channel: int or None
+        the default channel of the generic detector (as in the simulation)
+    evt_time: datetime object
+        the time of the events (as in the simulation)
+
+    Returns
+    -------
+    tuple of the number of triggered events before and after the replay
+    """
+    trace_filename = get_pre_trigger_trace_filename(filename)
+    if(not os.path.exists(trace_filename)):
+        raise FileNotFoundError(f"the pre-trigger traces {trace_filename} of {filename} do not exist, enable 'save_pre_trigger_traces' in the simulation")
+    stations = read_pre_trigger_traces(trace_filename)
+    with h5py.File(filename, 'r+') as fout:
+        det = _get_detector(fout, detectorfile, default_detector_station, default_detector_channel, evt_time)
+        Vrms = fout.attrs['Vrms']
+        old_trigger_names, masks = trigger_masks.read(fout)
+        n_triggered_before = np.sum(np.array(fout['triggered']))
+        registry = trigger_masks.trigger_registry(old_trigger_names)
+        replayed_trigger_names = []
+        if(trigger_names is not None):
+            for trigger_name in trigger_names:
+                registry.register(trigger_name)
+                replayed_trigger_names.append(trigger_name)
+        station_ids = [int(key.split("_")[1]) for key in fout.keys() if key.startswith("station_")]
+        new_masks = {}
+        for station_id in station_ids:
+            new_masks[station_id] = np.zeros(len(masks), dtype=np.uint64)
+        for station_id, data in six.iteritems(stations):
+            for iE, event_index in enumerate(data['event_index']):
+                evt = NuRadioReco.framework.event.Event(0, int(fout['event_ids'][event_index]))
+                station = NuRadioReco.framework.station.Station(station_id)
+                station.set_station_time(evt_time)
+                for iCh, channel_id in enumerate(data['channel_ids']):
+                    channel = NuRadioReco.framework.channel.Channel(channel_id)
+                    channel.set_trace(np.array(data['traces'][iE, iCh, :data['n_samples'][iE, iCh]], dtype=float), data['sampling_rate'])
+                    channel.set_trace_start_time(data['trace_start_times'][iE, iCh])
+                    station.add_channel(channel)
+                evt.set_station(station)
+                trigger_function(evt, station, det, Vrms)
+                mask = np.uint64(0)
+                for trigger in six.itervalues(station.get_triggers()):
+                    bit = registry.register(trigger.get_name())
+                    if(trigger.get_name() not in replayed_trigger_names):
+                        replayed_trigger_names.append(trigger.get_name())
+                    if(trigger.has_triggered()):
+                        mask |= np.left_shift(np.uint64(1), np.uint64(bit))
+                new_masks[station_id][event_index] = mask
+
+        new_trigger_names = registry.get_trigger_names()
+        replayed = trigger_masks.get_mask(new_trigger_names, replayed_trigger_names)
+        global_masks = np.zeros(len(masks), dtype=np.uint64)
+        for station_id in station_ids:
+            sg = fout[f"station_{station_id:d}"]
+            station_masks = trigger_masks.remap(trigger_masks.read(fout, station_id)[1], old_trigger_names, new_trigger_names)
+            station_masks = (station_masks & ~replayed) | new_masks[station_id]
+            global_masks |= station_masks
+            _replace_data_set(sg, 'multiple_triggers_mask', station_masks)
+            _replace_data_set(sg, 'triggered', station_masks != 0)
+            if('multiple_triggers' in sg):
+                _replace_data_set(sg, 'multiple_triggers', trigger_masks.unpack(station_masks, max(1, len(new_trigger_names))))
+        if(not len(station_ids)):
+            global_masks = trigger_masks.remap(masks, old_trigger_names, new_trigger_names) & ~replayed
+        _replace_data_set(fout, 'multiple_triggers_mask', global_masks)
+        _replace_data_set(fout, 'triggered', global_masks != 0)
+        if('multiple_triggers' in fout):
+            _replace_data_set(fout, 'multiple_triggers', trigger_masks.unpack(global_masks, max(1, len(new_trigger_names))))
+        fout.attrs['trigger_names'] = new_trigger_names if len(new_trigger_names) else np.array([])
+        n_triggered_after = np.sum(global_masks != 0)
+    logger.info(f"{filename}: {n_triggered_before:d} triggered events before, {n_triggered_after:d} after the replay of the triggers {replayed_trigger_names}")
+    return n_triggered_before, n_triggered_after
+
+
+def _replace_data_set(group, key, value):
+    if(key in group):
+        del group[key]
+    group[key] = value
+
+
+def _replay_file(args):
+    # helper for the multiprocessing pool
+    filename, trigger_function, kwargs = args
+    return replay_file(filename, trigger_function, **kwargs)
+
+
+def replay(filenames, trigger_function, n_cores=None, **kwargs):
+    """
+    re-evaluates the triggers of NuRadioMC hdf5 output files from their pre-trigger traces, see `replay_file`
+
+    Parameters
+    ----------
+    filenames: string or list of strings
+        the hdf5 output files or a folder (all hdf5 files of the folder that have pre-trigger traces are used)
+    trigger_function: function
+        the trigger function, see `replay_file`
+    n_cores: int or None
+        the number of processes, if None all cores are used
+    kwargs: dict
+        the remaining arguments of `replay_file`
+
+    Returns
+    -------
+    dict with the filenames as keys and the number of triggered events before and after the replay as values
+    """
+    if(isinstance(filenames, str)):
+        filenames = sorted([filename for filename in glob.glob(os.path.join(filenames, "*.hdf5"))
+                            if os.path.exists(get_pre_trigger_trace_filename(filename))])
+    if(len(filenames) > 1 and n_cores != 1):
+        pool = multiprocessing.Pool(min(n_cores or multiprocessing.cpu_count(), len(filenames)))
+        try:
+            results = pool.map(_replay_file, [(filename, trigger_function, kwargs) for filename in filenames])
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [replay_file(filename, trigger_function, **kwargs) for filename in filenames]
+    return dict(zip(filenames, results))
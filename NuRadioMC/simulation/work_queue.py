@@ -0,0 +1,544 @@
+"""
+work queue on a shared file system that distributes event ranges of an input file over any number of workers
+
+The cost of simulating an event varies by orders of magnitude, hence, a static split of the input files leaves most
+workers idle while a few run for a long time. Here, the input file is divided into small ranges of events that are
+handed out to workers on request. A worker leases a range, simulates it in a subprocess (by running the steering
+script with the usual positional arguments, see `NuRadioMC.simulation.campaign`) and reports the output. While the
+simulation runs, the worker renews its lease. If a worker dies, its lease expires and the range is handed out again.
+The worker that completes the last range merges the outputs of all ranges into the final output file.
+
+The state of the queue is a json file in the queue directory. All changes of the state are made while holding a
+lock file that is created atomically (`O_CREAT | O_EXCL`), which works on shared file systems without any external
+service. The clocks of the nodes need to be synchronized to well below the lease time. Create a queue and start any
+number of workers (on any node that sees the queue directory) via
+
+    nuradiomc-work-queue create queue_dir inputfile.hdf5 output.hdf5 steering.py detector.json config.yaml --events-per-range 100
+    nuradiomc-work-queue worker queue_dir
+
+A range that fails `max_attempts` times is marked as failed. The outputs are then not merged and the workers exit with
+an error. After fixing the cause, the failed ranges are handed out again via
+
+    nuradiomc-work-queue retry queue_dir
+"""
+from __future__ import absolute_import, division, print_function
+import argparse
+import concurrent.futures
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+import numpy as np
+import h5py
+from six import iteritems
+from NuRadioMC.simulation.campaign import get_steering_command, is_finished
+from NuRadioMC.utilities import categorical
+import logging
+logger = logging.getLogger("sim.work_queue")
+
+_state_filename = "queue.json"
+_lock_filename = "queue.lock"
+
+
+class file_lock():
+    """
+    lock file that is created atomically, usable as context manager
+
+    A lock file that is older than `stale_time` is considered to be left over from a crashed process and is removed.
+    Every lock file contains a unique owner token, a stale lock is only removed if its owner and modification time did
+    not change since it was found to be stale (otherwise another process has broken it and acquired a new lock).
+    """
+
+    def __init__(self, filename, timeout=600, stale_time=60, poll_interval=0.05):
+        """
+        Parameters
+        ----------
+        filename: string
+            the lock file
+        timeout: float
+            the maximum time (in seconds) to wait for the lock
+        stale_time: float
+            the age (in seconds) after which a lock is broken, needs to be much longer than the lock is held
+        poll_interval: float
+            the time (in seconds) between two attempts to acquire the lock
+        """
+        self._filename = filename
+        self._timeout = timeout
+        self._stale_time = stale_time
+        self._poll_interval = poll_interval
+        self._owner = None
+
+    def _read_owner(self):
+        """
+        returns the owner token and the modification time of the lock file (raises FileNotFoundError)
+        """
+        with open(self._filename, 'r') as fin:
+            owner = fin.read()
+        return owner, os.path.getmtime(self._filename)
+
+    def __enter__(self):
+        t_start = time.time()
+        while True:
+            try:
+                fd = os.open(self._filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+                os.write(fd, self._owner.encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    owner, mtime = self._read_owner()
+                    if(time.time() - mtime > self._stale_time):
+                        # check again right before removing the lock, another process might have broken the stale
+                        # lock and acquired a new one in the meantime
+                        if(self._read_owner() == (owner, mtime)):
+                            logger.warning(f"removing stale lock {self._filename} of {owner}")
+                            os.remove(self._filename)
+                        continue
+                except FileNotFoundError:
+                    continue
+            if(time.time() - t_start > self._timeout):
+                raise TimeoutError(f"could not acquire the lock {self._filename} within {self._timeout:.0f}s")
+            time.sleep(self._poll_interval * (1 + np.random.uniform()))
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if(self._read_owner()[0] != self._owner):
+                # the lock was considered to be stale and was broken by another process, which holds the lock now
+                logger.warning(f"the lock {self._filename} was broken by another process")
+                return
+            os.remove(self._filename)
+        except FileNotFoundError:
+            logger.warning(f"the lock {self._filename} was removed by another process")
+
+
+def _read_state(queue_dir):
+    with open(os.path.join(queue_dir, _state_filename), 'r') as fin:
+        return json.load(fin)
+
+
+def _write_state(queue_dir, state):
+    # the state is written to a temporary file first so that it is replaced atomically
+    filename = os.path.join(queue_dir, _state_filename)
+    with open(filename + ".tmp", 'w') as fout:
+        json.dump(state, fout, indent=1)
+    os.replace(filename + ".tmp", filename)
+
+
+def get_event_ranges(event_ids, events_per_range):
+    """
+    divides the entries of an input file into ranges of `events_per_range` events
+
+    All interactions of an event (entries with the same event id) are in the same range.
+
+    Returns
+    -------
+    list of tuples of the first and the last + 1 entry of the ranges
+    """
+    event_ids = np.asarray(event_ids)
+    event_starts = np.append(0, np.flatnonzero(event_ids[1:] != event_ids[:-1]) + 1)
+    starts = event_starts[::int(events_per_range)]
+    stops = np.append(starts[1:], len(event_ids))
+    return [(int(start), int(stop)) for start, stop in zip(starts, stops)]
+
+
+def create_queue(queue_dir, inputfilename, outputfilename, steering, detectorfile, config_file, events_per_range=100,
+                 max_attempts=3):
+    """
+    creates the work queue of an input file (nothing is done if the queue already exists)
+
+    Parameters
+    ----------
+    queue_dir: string
+        the queue directory, needs to be accessible from all workers
+    inputfilename: string
+        the input file
+    outputfilename: string
+        the final (merged) hdf5 output file
+    steering: string
+        the steering script (a python file) or module (name of a python module) of the simulation
+    detectorfile: string
+        the detector description
+    config_file: string
+        the NuRadioMC config file
+    events_per_range: int
+        the number of events per range
+    max_attempts: int
+        the number of attempts to simulate a range before it is marked as failed
+
+    Returns
+    -------
+    bool: True if the queue was created
+    """
+    from NuRadioMC.simulation.simulation import get_number_of_consumed_events
+    for folder in [queue_dir, os.path.join(queue_dir, "inputs"), os.path.join(queue_dir, "outputs"),
+                   os.path.join(queue_dir, "logs")]:
+        if(not os.path.exists(folder)):
+            os.makedirs(folder, exist_ok=True)
+    with file_lock(os.path.join(queue_dir, _lock_filename)):
+        if(os.path.exists(os.path.join(queue_dir, _state_filename))):
+            logger.info(f"the queue {queue_dir} already exists")
+            return False
+        with h5py.File(inputfilename, 'r') as fin:
+            event_ids = np.array(fin['event_ids'])
+            attributes = dict(fin.attrs)
+        ranges = []
+        n_consumed = 0  # the events before the first entry (without interaction) are assigned to the first range
+        for start, stop in get_event_ranges(event_ids, events_per_range):
+            n_events = get_number_of_consumed_events(event_ids, attributes, stop) - n_consumed
+            n_consumed += n_events
+            ranges.append({'start': start, 'stop': stop, 'n_events': int(n_events), 'status': 'pending',
+                           'worker': None, 'expires': None, 'attempts': 0, 'output': None})
+        state = {'input': os.path.abspath(inputfilename),
+                 'output': os.path.abspath(outputfilename),
+                 'steering': steering if not steering.endswith(".py") else os.path.abspath(steering),
+                 'detector': os.path.abspath(detectorfile),
+                 'config': os.path.abspath(config_file),
+                 'max_attempts': int(max_attempts),
+                 'ranges': ranges,
+                 'merge': {'status': 'pending', 'worker': None, 'expires': None}}
+        _write_state(queue_dir, state)
+    logger.warning(f"created the work queue {queue_dir} with {len(ranges):d} ranges of {events_per_range:d} events of {inputfilename}")
+    return True
+
+
+def get_status(queue_dir):
+    """
+    returns the number of ranges per status ('pending', 'leased', 'done', 'failed') and the status of the merge
+    ('pending', 'running', 'done' or 'failed' if ranges failed)
+    """
+    state = _read_state(queue_dir)
+    status = {key: 0 for key in ['pending', 'leased', 'done', 'failed']}
+    for r in state['ranges']:
+        status[r['status']] += 1
+    status['merge'] = state['merge']['status']
+    return status
+
+
+def lease(queue_dir, worker_id, lease_time):
+    """
+    leases a pending range or a range with an expired lease
+
+    Returns
+    -------
+    tuple of the index of the range and the range (dict), or None if no range is available
+    """
+    with file_lock(os.path.join(queue_dir, _lock_filename)):
+        state = _read_state(queue_dir)
+        now = time.time()
+        for iR, r in enumerate(state['ranges']):
+            if(r['status'] == 'leased' and r['expires'] < now):
+                logger.warning(f"the lease of range {iR:d} by worker {r['worker']} expired")
+                r['status'] = 'pending'
+                if(r['attempts'] >= state['max_attempts']):
+                    r['status'] = 'failed'
+                    logger.error(f"range {iR:d} failed {r['attempts']:d} times, giving up")
+            if(r['status'] == 'pending'):
+                r['status'] = 'leased'
+                r['worker'] = worker_id
+                r['expires'] = now + lease_time
+                r['attempts'] += 1
+                _write_state(queue_dir, state)
+                return iR, r
+        _write_state(queue_dir, state)
+    return None
+
+
+def renew(queue_dir, index, worker_id, lease_time):
+    """
+    extends the lease of a range
+
+    Returns
+    -------
+    bool: False if the range is no longer leased by this worker
+    """
+    with file_lock(os.path.join(queue_dir, _lock_filename)):
+        state = _read_state(queue_dir)
+        r = state['ranges'][index]
+        if(r['status'] != 'leased' or r['worker'] != worker_id):
+            return False
+        r['expires'] = time.time() + lease_time
+        _write_state(queue_dir, state)
+    return True
+
+
+def complete(queue_dir, index, worker_id, output=None):
+    """
+    reports the result of a leased range
+
+    Parameters
+    ----------
+    output: string or None
+        the hdf5 output of the range, None if the simulation failed
+
+    Returns
+    -------
+    bool: True if the result was accepted
+    """
+    with file_lock(os.path.join(queue_dir, _lock_filename)):
+        state = _read_state(queue_dir)
+        r = state['ranges'][index]
+        if(r['status'] == 'done' or (r['status'] == 'leased' and r['worker'] != worker_id)):
+            # the lease expired and the range was handed out again
+            logger.warning(f"range {index:d} was reassigned, discarding the result of worker {worker_id}")
+            return False
+        if(output is None):
+            r['status'] = 'pending'
+            if(r['attempts'] >= state['max_attempts']):
+                r['status'] = 'failed'
+                logger.error(f"range {index:d} failed {r['attempts']:d} times, giving up")
+        else:
+            r['status'] = 'done'
+            r['output'] = output
+        r['worker'] = None
+        r['expires'] = None
+        _write_state(queue_dir, state)
+    return True
+
+
+def retry_failed(queue_dir):
+    """
+    hands out the failed ranges again (with `max_attempts` new attempts)
+
+    Returns
+    -------
+    int: the number of failed ranges
+    """
+    n_failed = 0
+    with file_lock(os.path.join(queue_dir, _lock_filename)):
+        state = _read_state(queue_dir)
+        for r in state['ranges']:
+            if(r['status'] == 'failed'):
+                r.update({'status': 'pending', 'worker': None, 'expires': None, 'attempts': 0})
+                n_failed += 1
+        if(state['merge']['status'] == 'failed'):
+            state['merge']['status'] = 'pending'
+        _write_state(queue_dir, state)
+    logger.warning(f"{n_failed:d} failed ranges of {queue_dir} are handed out again")
+    return n_failed
+
+
+def write_range_input_file(inputfilename, filename, start, stop, n_events):
+    """
+    writes the entries `start` to `stop` of an input file into a new input file
+
+    The number of simulated events (attribute 'n_events') is set to the share of the range, such that the merged
+    outputs of all ranges have the number of simulated events of the input file.
+    """
+    with h5py.File(inputfilename, 'r') as fin, h5py.File(filename, 'w') as fout:
+        for key, value in iteritems(fin.attrs):
+            fout.attrs[key] = value
+        fout.attrs['n_events'] = n_events
+        fout.attrs['total_number_of_events'] = fin.attrs.get('total_number_of_events', fin.attrs['n_events'])
+        for key in fin:
+            if(isinstance(fin[key], h5py.Group)):
+                g = fout.create_group(key)
+                for key2, value in iteritems(fin[key].attrs):
+                    g.attrs[key2] = value
+                for key2 in fin[key]:
+                    g[key2] = fin[key][key2][start:stop]
+            elif(categorical.is_categorical(fin[key])):
+                categorical.write(fout, key, fin[key][start:stop])
+            else:
+                fout[key] = fin[key][start:stop]
+
+
+def _renew_merge(queue_dir, worker_id, lease_time):
+    """
+    extends the merge lease
+
+    Returns
+    -------
+    bool: False if the merge is no longer leased by this worker
+    """
+    with file_lock(os.path.join(queue_dir, _lock_filename)):
+        state = _read_state(queue_dir)
+        if(state['merge']['status'] != 'running' or state['merge']['worker'] != worker_id):
+            return False
+        state['merge']['expires'] = time.time() + lease_time
+        _write_state(queue_dir, state)
+    return True
+
+
+def _merge(queue_dir, worker_id, lease_time):
+    """
+    merges the outputs of all ranges if all ranges are done and no other worker is merging
+
+    The merge lease is renewed while the merge runs. The outputs are merged into a temporary file that replaces the
+    output file only if the merge lease of this worker is still valid, i.e., a worker that takes over an expired merge
+    never sees a partially written output file. If ranges failed, the merge is marked as failed instead.
+    """
+    with file_lock(os.path.join(queue_dir, _lock_filename)):
+        state = _read_state(queue_dir)
+        merge = state['merge']
+        if(merge['status'] in ['done', 'failed'] or (merge['status'] == 'running' and merge['expires'] > time.time())):
+            return False
+        if(not all([r['status'] in ['done', 'failed'] for r in state['ranges']])):
+            return False
+        failed = [iR for iR, r in enumerate(state['ranges']) if r['status'] == 'failed']
+        if(len(failed)):
+            merge.update({'status': 'failed', 'worker': None, 'expires': None})
+            _write_state(queue_dir, state)
+            logger.error(f"the ranges {failed} failed {state['max_attempts']:d} times (see {os.path.join(queue_dir, 'logs')}), the outputs are not merged. Use `retry_failed` to simulate them again.")
+            return False
+        merge.update({'status': 'running', 'worker': worker_id, 'expires': time.time() + lease_time})
+        _write_state(queue_dir, state)
+    from NuRadioMC.utilities import merge_hdf5
+    folder = os.path.dirname(state['output'])
+    if(folder != '' and not os.path.exists(folder)):
+        os.makedirs(folder, exist_ok=True)
+    tmp_filename = f"{state['output']}.{uuid.uuid4().hex}.tmp"
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        future = executor.submit(merge_hdf5.merge_stream, [r['output'] for r in state['ranges']], tmp_filename)
+        while True:
+            try:
+                future.result(timeout=lease_time / 3.)
+                break
+            except concurrent.futures.TimeoutError:
+                _renew_merge(queue_dir, worker_id, lease_time)
+    with file_lock(os.path.join(queue_dir, _lock_filename)):
+        state = _read_state(queue_dir)
+        merge = state['merge']
+        if(merge['status'] != 'running' or merge['worker'] != worker_id):
+            # the merge lease expired and another worker took over
+            logger.warning(f"worker {worker_id} lost the merge lease, discarding the merged file")
+            os.remove(tmp_filename)
+            return False
+        os.replace(tmp_filename, state['output'])
+        merge.update({'status': 'done', 'worker': None, 'expires': None})
+        _write_state(queue_dir, state)
+    logger.warning(f"merged the outputs of {len(state['ranges']):d} ranges into {state['output']}")
+    return True
+
+
+def run_worker(queue_dir, worker_id=None, lease_time=300, poll_interval=None, wait=True):
+    """
+    simulates ranges of the queue until all ranges are done
+
+    Parameters
+    ----------
+    queue_dir: string
+        the queue directory
+    worker_id: string or None
+        a unique name of the worker, if None the host name and process id are used
+    lease_time: float
+        the time (in seconds) after which a lease expires if it is not renewed. The lease is renewed every
+        `lease_time / 3` while the simulation of the range runs.
+    poll_interval: float or None
+        the time (in seconds) between two requests for a range if all ranges are leased by other workers. If None,
+        `lease_time / 3` is used.
+    wait: bool
+        if True, the worker waits until all ranges are done (to take over ranges of crashed workers), otherwise it
+        stops as soon as no range is available
+
+    Returns
+    -------
+    int: the number of ranges that were simulated by this worker (see `get_status` for failed ranges)
+    """
+    queue_dir = os.path.abspath(queue_dir)
+    if(worker_id is None):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    if(poll_interval is None):
+        poll_interval = lease_time / 3.
+    state = _read_state(queue_dir)
+    command = get_steering_command(state['steering'])
+    n_simulated = 0
+    while True:
+        leased = lease(queue_dir, worker_id, lease_time)
+        if(leased is None):
+            status = get_status(queue_dir)
+            if(status['done'] + status['failed'] == sum([status[key] for key in ['pending', 'leased', 'done', 'failed']])):
+                break
+            if(not wait):
+                break
+            time.sleep(poll_interval)
+            continue
+        index, r = leased
+        name = f"range{index:06d}_attempt{r['attempts']:d}"
+        inputfilename = os.path.join(queue_dir, "inputs", name + ".hdf5")
+        output = os.path.join(queue_dir, "outputs", name + ".hdf5")
+        for filename in [inputfilename, output]:
+            if(os.path.exists(filename)):
+                os.remove(filename)
+        write_range_input_file(state['input'], inputfilename, r['start'], r['stop'], r['n_events'])
+        cmd = command + [inputfilename, state['detector'], state['config'], output]
+        logger.info(f"worker {worker_id} simulates range {index:d} (entries {r['start']:d} to {r['stop']:d})")
+        lost = False
+        with open(os.path.join(queue_dir, "logs", name + ".log"), 'w') as flog:
+            process = subprocess.Popen(cmd, stdout=flog, stderr=subprocess.STDOUT, cwd=queue_dir)
+            while True:
+                try:
+                    process.wait(timeout=lease_time / 3.)
+                    break
+                except subprocess.TimeoutExpired:
+                    if(not renew(queue_dir, index, worker_id, lease_time)):
+                        logger.warning(f"worker {worker_id} lost the lease of range {index:d}, stopping the simulation")
+                        process.kill()
+                        process.wait()
+                        lost = True
+                        break
+        os.remove(inputfilename)
+        if(lost):
+            continue
+        success = process.returncode == 0 and is_finished(output)
+        if(not success):
+            logger.warning(f"the simulation of range {index:d} failed with return code {process.returncode:d}")
+        if(complete(queue_dir, index, worker_id, output if success else None) and success):
+            n_simulated += 1
+        _merge(queue_dir, worker_id, lease_time)
+    # a merge that was interrupted (e.g. by a crash of the merging worker) is repeated
+    _merge(queue_dir, worker_id, lease_time)
+    status = get_status(queue_dir)
+    if(status['failed']):
+        logger.error(f"worker {worker_id} finished after simulating {n_simulated:d} ranges, {status['failed']:d} ranges of the queue failed")
+    else:
+        logger.warning(f"worker {worker_id} finished after simulating {n_simulated:d} ranges")
+    return n_simulated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='work queue on a shared file system that distributes event ranges of a NuRadioMC input file over many workers')
+    subparsers = parser.add_subparsers(dest='command')
+    p_create = subparsers.add_parser('create', help='creates the work queue of an input file')
+    p_create.add_argument('queue_dir', type=str, help='the queue directory (on a shared file system)')
+    p_create.add_argument('inputfilename', type=str, help='the input file')
+    p_create.add_argument('outputfilename', type=str, help='the merged hdf5 output file')
+    p_create.add_argument('steering', type=str, help='the steering script (python file) or module of the simulation')
+    p_create.add_argument('detectordescription', type=str, help='path to file containing the detector description')
+    p_create.add_argument('config', type=str, help='NuRadioMC yaml config file')
+    p_create.add_argument('--events-per-range', type=int, default=100, help='the number of events per range (default: 100)')
+    p_create.add_argument('--max-attempts', type=int, default=3, help='the number of attempts per range (default: 3)')
+    p_worker = subparsers.add_parser('worker', help='runs a worker')
+    p_worker.add_argument('queue_dir', type=str, help='the queue directory')
+    p_worker.add_argument('--lease-time', type=float, default=300, help='the lease time in seconds (default: 300)')
+    p_worker.add_argument('--worker-id', type=str, default=None, help='the name of the worker (default: host:pid)')
+    p_status = subparsers.add_parser('status', help='prints the status of the queue')
+    p_status.add_argument('queue_dir', type=str, help='the queue directory')
+    p_retry = subparsers.add_parser('retry', help='hands out the failed ranges again')
+    p_retry.add_argument('queue_dir', type=str, help='the queue directory')
+    args = parser.parse_args()
+    logging.basicConfig()
+    logger.setLevel(logging.INFO)
+    if(args.command == 'create'):
+        create_queue(args.queue_dir, args.inputfilename, args.outputfilename, args.steering, args.detectordescription,
+                     args.config, events_per_range=args.events_per_range, max_attempts=args.max_attempts)
+    elif(args.command == 'worker'):
+        run_worker(args.queue_dir, worker_id=args.worker_id, lease_time=args.lease_time)
+        status = get_status(args.queue_dir)
+        if(status['failed']):
+            print(f"{status['failed']:d} ranges failed, the outputs were not merged: {status}")
+            sys.exit(1)
+    elif(args.command == 'status'):
+        print(get_status(args.queue_dir))
+    elif(args.command == 'retry'):
+        retry_failed(args.queue_dir)
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
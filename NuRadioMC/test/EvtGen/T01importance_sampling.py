@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+import numpy as np
+import h5py
+import tempfile
+import shutil
+import os
+from NuRadioMC.EvtGen import generator
+from NuRadioMC.utilities import Veff
+from NuRadioReco.utilities import units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_importance_sampling')
+
+"""
+generates event lists with and without importance sampling of the vertex positions and compares the effective
+volumes of a toy detector (an event triggers if its vertex is close to a station)
+"""
+
+np.random.seed(10)  # set seed to have reproducible results
+station_positions = np.array([[-1.5 * units.km, 0], [1.5 * units.km, 0]])
+trigger_distance = 1 * units.km
+rmax = 5 * units.km
+zmin = -2.7 * units.km
+n_events = 20000
+Veff_expected = len(station_positions) * np.pi * trigger_distance ** 2 * -zmin
+
+# the sampling weights are the ratio of the uniform density and the proposal density
+xx = np.random.uniform(-rmax, rmax, 200000)
+yy = np.random.uniform(-rmax, rmax, 200000)
+mask = xx ** 2 + yy ** 2 < rmax ** 2
+sampling_weights = generator.get_importance_sampling_weights(xx[mask], yy[mask], 1 * units.km, station_positions, 0, rmax, 0.2)
+testing.assert_allclose(np.mean(1. / sampling_weights), 1, rtol=1e-2)
+
+# the sampling weights match the density the vertices are drawn from, i.e., the mean weight of the drawn vertices
+# is 1 (a bias of the mean weight biases the effective volume)
+for positions, energy, atol in [(np.array([[2.5 * units.km, 0]]), 1e20 * units.eV, 3e-4),
+                                (station_positions, 1e19 * units.eV, 5e-4)]:
+    xx, yy, sampling_weights = generator.draw_vertices_importance_sampling(np.ones(2000000) * energy, positions, 0, rmax)
+    logger.info(f"mean sampling weight = {np.mean(sampling_weights):.5f} +- {np.std(sampling_weights) / len(sampling_weights) ** 0.5:.5f}")
+    testing.assert_allclose(np.mean(sampling_weights), 1, atol=atol)
+
+folder = tempfile.mkdtemp()
+try:
+    results = {}
+    for name, kwargs in [('uniform', {}), ('importance', {'station_positions': station_positions, 'importance_radius': 1 * units.km})]:
+        filename = os.path.join(folder, name, "1e17.hdf5")
+        os.mkdir(os.path.dirname(filename))
+        generator.generate_eventlist_cylinder(filename, n_events, 1e17 * units.eV, 1e17 * units.eV, 0, rmax, zmin, 0, **kwargs)
+        # add the output of a toy simulation to the event list
+        with h5py.File(filename, 'a') as fout:
+            xx = np.array(fout['xx'])
+            yy = np.array(fout['yy'])
+            distances = np.min([((xx - x) ** 2 + (yy - y) ** 2) ** 0.5 for x, y in station_positions], axis=0)
+            triggered = distances < trigger_distance
+            fout['triggered'] = triggered
+            fout['multiple_triggers'] = triggered[:, np.newaxis]
+            fout['weights'] = np.ones(len(xx))
+            fout.attrs['trigger_names'] = ['toy']
+            fout.attrs['Vrms'] = 1
+            if(name == 'importance'):
+                assert('sampling_weights' in fout)
+        results[name] = Veff.get_Veff(os.path.dirname(filename))[0]['Veffs']['toy']
+        logger.info(f"{name}: Veff = {results[name][0] / units.km ** 3:.3f} +- {results[name][1] / units.km ** 3:.3f} km^3 (expected {Veff_expected / units.km ** 3:.3f} km^3)")
+        testing.assert_allclose(results[name][0], Veff_expected, atol=4 * results[name][1])
+    # the importance sampling reaches the same precision with fewer events
+    assert(results['importance'][1] < 0.5 * results['uniform'][1])
+finally:
+    shutil.rmtree(folder)
+
+print("importance sampling test passed")
@@ -0,0 +1,4 @@
+#!/bin/bash
+set -e
+cd NuRadioMC/test/EvtGen/
+python T01importance_sampling.py
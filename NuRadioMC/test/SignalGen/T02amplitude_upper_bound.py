@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+import numpy as np
+from NuRadioMC.SignalGen import askaryan
+from NuRadioReco.utilities import units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger('test_amplitude_upper_bound')
+
+"""
+checks that the analytic upper bound of the pulse amplitude (used by the amplitude screening of the simulation) is
+larger than the maximum amplitude of the generated pulses for all signal models, shower types, energies and
+viewing angles
+"""
+
+N = 512
+dt = 0.1 * units.ns
+n_index = 1.78
+R = 1 * units.km
+frequencies = np.fft.rfftfreq(N, dt)
+cherenkov_angle = np.arccos(1. / n_index)
+energies = 10 ** np.arange(15, 20.1, 0.5) * units.eV
+dthetas = np.array([0, 0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30]) * units.deg
+
+for model in ['ZHS1992', 'Alvarez2000', 'Alvarez2009', 'spherical']:
+    max_ratio = 0
+    for shower_type in ["HAD", "EM"]:
+        for energy in energies:
+            for dtheta in np.append(dthetas, -dthetas[1:]):
+                theta = cherenkov_angle + dtheta
+                bound = askaryan.get_amplitude_upper_bound(energy, theta, n_index, R, model, frequencies, shower_type=shower_type)
+                testing.assert_equal(bound <= askaryan.get_amplitude_upper_bound(energy, theta, n_index, R, model, frequencies), True)
+                # the electromagnetic showers of the Alvarez2009 model are random shower realizations
+                n_realizations = 20 if (model == 'Alvarez2009' and shower_type == "EM") else 1
+                for i in range(n_realizations):
+                    trace = askaryan.get_time_trace(energy, theta, N, dt, shower_type, n_index, R, model, seed=i)
+                    max_amplitude = np.max(np.abs(trace))
+                    # the bound is reached if only one frequency contributes (far off the cone)
+                    if(max_amplitude > bound * (1 + 1e-9)):
+                        raise AssertionError(f"{model} {shower_type} E = {energy / units.eV:.1e}eV, dtheta = {dtheta / units.deg:.1f}deg: maximum amplitude {max_amplitude:.3g} exceeds the upper bound {bound:.3g}")
+                    if(bound > 0):
+                        max_ratio = max(max_ratio, max_amplitude / bound)
+    logger.warning(f"{model}: the largest ratio of the pulse amplitude and the upper bound is {max_ratio:.4f}")
+
+# there is no analytic bound for the models without an analytic frequency spectrum
+for model in ['HCRB2017', 'ARZ2019', 'ARZ2020']:
+    testing.assert_equal(askaryan.has_amplitude_upper_bound(model), False)
+    testing.assert_equal(askaryan.get_amplitude_upper_bound(1 * units.EeV, cherenkov_angle, n_index, R, model, frequencies), np.inf)
+
+print("T02amplitude_upper_bound passed without issues")
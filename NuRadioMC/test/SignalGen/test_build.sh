@@ -2,3 +2,4 @@
 
 set -e
 NuRadioMC/test/SignalGen/U01unit_test.py NuRadioMC/test/SignalGen/reference_v1.pkl
+python NuRadioMC/test/SignalGen/T02amplitude_upper_bound.py
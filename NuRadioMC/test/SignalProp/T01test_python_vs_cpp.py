@@ -9,6 +9,9 @@ from numpy import testing
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('test_raytracing')
 
+# the test fails if the C++ ray tracer was not built (`nuradiomc-build-raytracer`)
+ray.set_backend('cpp')
+
 ice = medium.southpole_simple()
 
 np.random.seed(0)  # set seed to have reproducible results
@@ -49,7 +52,7 @@ print("CPP time = {:.1f} seconds = {:.2f}ms/event".format(t_cpp, 1000. * t_cpp /
 
 results_C0s_python = np.zeros((n_events, 2))
 results_A_python = np.zeros((n_events, 2, n_freqs))
-ray.cpp_available = False
+ray.set_backend('python')
 t_start = time.time()
 for iX, x in enumerate(points):
     r = ray.ray_tracing(x, x_receiver, ice)
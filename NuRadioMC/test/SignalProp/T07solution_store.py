@@ -0,0 +1,86 @@
+import numpy as np
+import os
+import tempfile
+import multiprocessing
+from NuRadioMC.SignalProp import analyticraytracing as ray
+from NuRadioMC.SignalProp.solution_store import solution_store
+from NuRadioMC.utilities import medium
+from NuRadioReco.utilities import units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_solution_store')
+
+ice = medium.mooresbay_simple()
+
+np.random.seed(10)  # set seed to have reproducible results
+n_events = 20
+rr = np.random.triangular(50 * units.m, 2 * units.km, 2 * units.km, n_events)
+phiphi = np.random.uniform(0, 2 * np.pi, n_events)
+zz = np.random.uniform(-10 * units.m, -0.5 * units.km, n_events)
+points = np.array([rr * np.cos(phiphi), rr * np.sin(phiphi), zz]).T
+x_receiver = np.array([0., 0., -5.])
+ff = np.linspace(0, 500 * units.MHz, 129)
+
+
+def get_results(store=None):
+    results = []
+    for x in points:
+        r = ray.ray_tracing(x, x_receiver, ice, n_reflections=1, solution_store=store)
+        r.find_solutions()
+        result = []
+        for iS in range(r.get_number_of_solutions()):
+            result.append([r.get_results()[iS]['C0'], r.get_solution_type(iS), r.get_path_length(iS), r.get_travel_time(iS),
+                           r.get_launch_vector(iS), r.get_receive_vector(iS), r.get_attenuation(iS, ff, 250 * units.MHz)])
+        results.append(result)
+    return results
+
+
+def compare(results1, results2):
+    assert(len(results1) == len(results2))
+    for result1, result2 in zip(results1, results2):
+        assert(len(result1) == len(result2))
+        for solution1, solution2 in zip(result1, result2):
+            for value1, value2 in zip(solution1, solution2):
+                testing.assert_allclose(value1, value2, rtol=1e-10)
+
+
+def count_entries(filename, queue):
+    queue.put(solution_store(filename).get_number_of_entries())
+
+
+with tempfile.TemporaryDirectory() as folder:
+    filename = os.path.join(folder, "raytracing_mooresbay_simple.sqlite")
+    reference = get_results()
+
+    # first pass fills the store
+    store = solution_store(filename)
+    compare(reference, get_results(store))
+    store.close()
+
+    # second pass reads all solutions from disk
+    store = solution_store(filename)
+    compare(reference, get_results(store))
+    testing.assert_equal(store.get_hit_rate(), 1)
+    n_entries = store.get_number_of_entries()
+    testing.assert_equal(n_entries, n_events)
+
+    # several processes can read the store at the same time
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=count_entries, args=(filename, queue)) for i in range(3)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    for p in processes:
+        testing.assert_equal(queue.get(), n_entries)
+    store.close()
+
+    # least recently used entries are evicted if the store exceeds the size limit
+    store = solution_store(filename, max_size=1)
+    store.put("dummy", [])
+    store.commit()
+    assert(store.get_number_of_entries() <= 1)
+    store.close()
+
+print("solution store test passed")
@@ -0,0 +1,40 @@
+import numpy as np
+from NuRadioMC.SignalProp import analyticraytracing as ray
+from NuRadioMC.utilities import medium
+from NuRadioReco.utilities import units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_warm_start')
+
+np.random.seed(10)  # set seed to have reproducible results
+x_receiver = np.array([0., 0., -5.])
+
+for ice, n_reflections in [(medium.southpole_2015(), 0), (medium.mooresbay_simple(), 1)]:
+    n_events = 100
+    rr = np.random.uniform(300 * units.m, 400 * units.m, n_events)
+    phiphi = np.random.uniform(0, 2 * np.pi, n_events)
+    zz = np.random.uniform(-100 * units.m, -150 * units.m, n_events)
+    points = np.array([rr * np.cos(phiphi), rr * np.sin(phiphi), zz]).T
+
+    # the batched driver with warm starts must find the same solutions as the full search
+    ray_tracers = ray.find_solutions_batch(points, np.tile(x_receiver, (n_events, 1)), ice, n_reflections=n_reflections)
+    for x, r_batch in zip(points, ray_tracers):
+        r = ray.ray_tracing(x, x_receiver, ice, n_reflections=n_reflections)
+        r.find_solutions()
+        testing.assert_equal(r_batch.get_number_of_solutions(), r.get_number_of_solutions())
+        for result, result_batch in zip(r.get_results(), r_batch.get_results()):
+            testing.assert_allclose(result_batch['C0'], result['C0'], rtol=1e-5)
+            testing.assert_equal(result_batch['reflection'], result['reflection'])
+            testing.assert_equal(result_batch['reflection_case'], result['reflection_case'])
+
+    # hints that do not match the geometry fall back to the full search
+    r = ray.ray_tracing(points[0], x_receiver, ice, n_reflections=n_reflections)
+    r.find_solutions()
+    r_hint = ray.ray_tracing(points[0], x_receiver, ice, n_reflections=n_reflections)
+    r_hint.find_solutions(C0_hints={(0, 1): [1. / ice.n_ice + 1e-6, 100.]})
+    testing.assert_equal(r_hint.get_number_of_solutions(), r.get_number_of_solutions())
+    for result, result_hint in zip(r.get_results(), r_hint.get_results()):
+        testing.assert_allclose(result_hint['C0'], result['C0'], rtol=1e-5)
+
+print("warm start test passed")
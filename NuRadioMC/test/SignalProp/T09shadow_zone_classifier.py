@@ -0,0 +1,40 @@
+import numpy as np
+from NuRadioMC.SignalProp import analyticraytracing as ray
+from NuRadioMC.utilities import medium
+from NuRadioReco.utilities import units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_shadow_zone_classifier')
+
+np.random.seed(10)  # set seed to have reproducible results
+n_events = 100
+
+for ice_model in ['southpole_2015', 'greenland_simple', 'mooresbay_simple']:
+    ice = medium.get_ice_model(ice_model)
+    zz = np.random.uniform(-1 * units.m, -2.5 * units.km, n_events)
+    x2s = np.array([np.zeros(n_events), np.zeros(n_events), np.random.uniform(-1 * units.m, -200 * units.m, n_events)]).T
+    # sample the horizontal distances around the shadow zone boundary
+    d_max = ray.get_maximum_horizontal_distance(zz, x2s[:, 2], ice)
+    rr = d_max * np.random.uniform(0.9, 1.1, n_events)
+    phiphi = np.random.uniform(0, 2 * np.pi, n_events)
+    x1s = np.array([rr * np.cos(phiphi), rr * np.sin(phiphi), zz]).T
+
+    classification = ray.classify_solution_existence(x1s, x2s, ice)
+    n_solutions = np.zeros(n_events, dtype=int)
+    for i in range(n_events):
+        r = ray.ray_tracing(x1s[i], x2s[i], ice)
+        r.find_solutions()
+        n_solutions[i] = r.get_number_of_solutions()
+    # pairs classified as 'no solution' must not have any solution
+    testing.assert_equal(n_solutions[classification == 0], 0)
+    # nearly all pairs classified as 'solution expected' have a solution (the numerical root search might
+    # fail very close to the boundary)
+    assert(np.mean(n_solutions[classification == 1] > 0) > 0.9)
+    logger.info(f"{ice_model}: {np.sum(classification == 0)} pairs without solution, {np.sum(classification == 1)} with solution, {np.sum(classification == 2)} uncertain")
+
+    # with bottom reflections, no pair is rejected
+    if(getattr(ice, "reflection", None) is not None):
+        testing.assert_equal(np.sum(ray.classify_solution_existence(x1s, x2s, ice, n_reflections=1) == 0), 0)
+
+print("shadow zone classifier test passed")
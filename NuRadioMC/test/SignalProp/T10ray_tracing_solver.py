@@ -0,0 +1,44 @@
+import numpy as np
+from NuRadioMC.SignalProp import analyticraytracing as ray
+from NuRadioMC.utilities import medium
+from NuRadioReco.utilities import units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_ray_tracing_solver')
+
+np.random.seed(10)  # set seed to have reproducible results
+x_receiver = np.array([10., -5., -50.])
+ff = np.linspace(0, 500 * units.MHz, 129)
+
+for ice, n_reflections in [(medium.southpole_2015(), 0), (medium.mooresbay_simple(), 1)]:
+    n_events = 50
+    rr = np.random.uniform(50 * units.m, 1.5 * units.km, n_events)
+    phiphi = np.random.uniform(0, 2 * np.pi, n_events)
+    zz = np.random.uniform(-1 * units.m, -500 * units.m, n_events)
+    points = np.array([rr * np.cos(phiphi), rr * np.sin(phiphi), zz]).T
+
+    # the same solver object is reused for all pairs and must give the same results as the ray_tracing class
+    solver = ray.ray_tracing_solver(ice, n_reflections=n_reflections)
+    for i, x in enumerate(points):
+        x1, x2 = (x, x_receiver) if i % 2 else (x_receiver, x)  # alternate the order of start and stop point
+        r = ray.ray_tracing(x1, x2, ice, n_reflections=n_reflections)
+        r.find_solutions()
+        result = solver.solve(x1, x2)
+        testing.assert_equal(result.n_solutions, r.get_number_of_solutions())
+        for iS in range(r.get_number_of_solutions()):
+            testing.assert_equal(result.C0[iS], r.get_results()[iS]['C0'])
+            testing.assert_equal(result.solution_type[iS], r.get_solution_type(iS))
+            testing.assert_allclose(result.launch_vector[iS], r.get_launch_vector(iS), rtol=1e-9, atol=1e-12)
+            testing.assert_allclose(result.receive_vector[iS], r.get_receive_vector(iS), rtol=1e-9, atol=1e-12)
+            testing.assert_allclose(result.path_length[iS], r.get_path_length(iS), rtol=1e-9)
+            testing.assert_allclose(result.travel_time[iS], r.get_travel_time(iS), rtol=1e-9)
+            if(r.get_reflection_angle(iS) is None):
+                assert(result.reflection_angle[iS] is None)
+            else:
+                testing.assert_allclose(np.array(result.reflection_angle[iS], dtype=float),
+                                        np.array(r.get_reflection_angle(iS), dtype=float), rtol=1e-9)
+            testing.assert_allclose(solver.get_attenuation(iS, ff, 250 * units.MHz), r.get_attenuation(iS, ff, 250 * units.MHz), rtol=1e-9)
+            testing.assert_allclose(solver.get_focusing(iS, -1 * units.cm), r.get_focusing(iS, -1 * units.cm), rtol=1e-6)
+
+print("ray tracing solver test passed")
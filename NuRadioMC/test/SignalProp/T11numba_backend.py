@@ -0,0 +1,59 @@
+import numpy as np
+from NuRadioMC.SignalProp import analyticraytracing as ray
+from NuRadioMC.utilities import medium
+from NuRadioReco.utilities import io_utilities, units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_numba_backend')
+
+# numba is part of the test requirements, the test fails if it is not installed
+ray.set_backend('numba')
+
+x_receiver = np.array([0., 0., -5.])
+ff = np.linspace(0, 500 * units.MHz, 129)
+
+
+def get_points(n_events, zmax):
+    np.random.seed(10)  # set seed to have reproducible results (same points as in T05 and T06)
+    rr = np.random.triangular(50. * units.m, 3. * units.km, 3. * units.km, n_events)
+    phiphi = np.random.uniform(0, 2 * np.pi, n_events)
+    zz = np.random.uniform(0. * units.m, zmax, n_events)
+    return np.array([rr * np.cos(phiphi), rr * np.sin(phiphi), zz]).T
+
+
+# the solutions of the numba backend agree with the reference solutions
+for ice, n_reflections, zmax, n_solutions, filename in [(medium.southpole_simple(), 0, -3. * units.km, 2, "reference_C0.pkl"),
+                                                        (medium.mooresbay_simple(), 2, -0.5 * units.km, 10, "reference_C0_MooresBay.pkl")]:
+    points = get_points(int(1e3), zmax)
+    results_C0s = np.zeros((len(points), n_solutions))
+    for iX, x in enumerate(points):
+        r = ray.ray_tracing(x, x_receiver, ice, n_reflections=n_reflections)
+        r.find_solutions()
+        for iS in range(r.get_number_of_solutions()):
+            results_C0s[iX, iS] = r.get_results()[iS]['C0']
+    testing.assert_allclose(results_C0s, io_utilities.read_pickle(filename, encoding='latin1'), rtol=1.e-6)
+
+# the numerical integrals along the ray path agree with the integration of the python version
+for ice, n_reflections, attenuation_model in [(medium.southpole_simple(), 0, "SP1"), (medium.greenland_simple(), 0, "GL1"),
+                                              (medium.mooresbay_simple(), 1, "MB1")]:
+    results = {}
+    for numba_available in [True, False]:
+        ray.set_backend('numba' if numba_available else 'python')
+        results[numba_available] = []
+        for x in get_points(10, -0.5 * units.km):
+            r = ray.ray_tracing(x, x_receiver, ice, attenuation_model=attenuation_model, n_reflections=n_reflections)
+            r.find_solutions()
+            for iS in range(r.get_number_of_solutions()):
+                results[numba_available].append([r.get_results()[iS]['C0'], r.get_path_length(iS, analytic=False),
+                                                 r.get_travel_time(iS, analytic=False), r.get_attenuation(iS, ff, 250 * units.MHz)])
+    ray.set_backend('numba')
+    testing.assert_equal(len(results[True]), len(results[False]))
+    for result_numba, result_python in zip(results[True], results[False]):
+        testing.assert_allclose(result_numba[0], result_python[0], rtol=1e-6)
+        testing.assert_allclose(result_numba[1], result_python[1], rtol=1e-6)
+        testing.assert_allclose(result_numba[2], result_python[2], rtol=1e-6)
+        # the attenuation is integrated with a relative precision of 1%
+        testing.assert_allclose(result_numba[3], result_python[3], rtol=1e-2)
+
+print("numba backend test passed")
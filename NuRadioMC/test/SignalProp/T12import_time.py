@@ -0,0 +1,29 @@
+import subprocess
+import sys
+import json
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_import_time')
+
+# maximum time of a cold import of the simulation module (in seconds)
+import_time_budget = 5.
+
+code = """
+import time, sys, json
+t = time.time()
+import NuRadioMC.simulation.simulation
+dt = time.time() - t
+print(json.dumps({'time': dt, 'modules': [m for m in ['numba', 'NuRadioMC.SignalProp.CPPAnalyticRayTracing.wrapper',
+                                                      'NuRadioMC.SignalProp.numba_analytic_raytracing'] if m in sys.modules]}))
+"""
+
+# a fresh interpreter is used to measure the cold import
+output = subprocess.check_output([sys.executable, "-c", code])
+result = json.loads(output.decode().strip().split("\n")[-1])
+logger.info(f"importing NuRadioMC.simulation.simulation took {result['time']:.2f}s")
+
+# the backends of the ray tracer are loaded lazily, i.e., when the first ray tracing object is created
+assert(len(result['modules']) == 0), f"the modules {result['modules']} were imported together with the simulation module"
+assert(result['time'] < import_time_budget), f"importing the simulation module took {result['time']:.2f}s (budget is {import_time_budget:.1f}s)"
+
+print("import time test passed")
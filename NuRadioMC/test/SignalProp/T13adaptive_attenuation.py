@@ -0,0 +1,46 @@
+import numpy as np
+from NuRadioMC.SignalProp import analyticraytracing as ray
+from NuRadioMC.utilities import medium
+from NuRadioReco.utilities import units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_adaptive_attenuation')
+
+ice = medium.southpole_2015()
+
+np.random.seed(10)  # set seed to have reproducible results
+n_events = 20
+rr = np.random.triangular(50 * units.m, 2 * units.km, 2 * units.km, n_events)
+phiphi = np.random.uniform(0, 2 * np.pi, n_events)
+zz = np.random.uniform(-100 * units.m, -2 * units.km, n_events)
+points = np.array([rr * np.cos(phiphi), rr * np.sin(phiphi), zz]).T
+x_receiver = np.array([0., 0., -100.])
+ff = np.fft.rfftfreq(1280, 1. / (5 * units.GHz))
+max_detector_freq = 500 * units.MHz
+
+for tolerance in [1e-2, 1e-3]:
+    errors = []
+    n_integrations = 0
+    n_solutions = 0
+    for x in points:
+        r = ray.ray_tracing(x, x_receiver, ice, attenuation_tolerance=tolerance)
+        r.find_solutions()
+        # the attenuation calculated at all frequencies is used as reference
+        r_reference = ray.ray_tracing(x, x_receiver, ice, n_frequencies_integration=len(ff))
+        r_reference.set_solution([result['C0'] for result in r.get_results()], [result['C1'] for result in r.get_results()],
+                                 [result['type'] for result in r.get_results()])
+        for iS in range(r.get_number_of_solutions()):
+            n_integrations -= ray.attenuation_statistics['n_integrations']
+            attenuation = r.get_attenuation(iS, ff, max_detector_freq)
+            n_integrations += ray.attenuation_statistics['n_integrations']
+            n_solutions += 1
+            attenuation_reference = r_reference.get_attenuation(iS, ff)
+            errors.append(np.max(np.abs(attenuation - attenuation_reference)[ff <= max_detector_freq]))
+    logger.info(f"tolerance {tolerance:.0e}: {n_integrations / n_solutions:.1f} integrations per solution, maximum error {np.max(errors):.2g}")
+    # the numerical integration itself has a relative precision of 1%
+    assert(np.max(errors) < max(3 * tolerance, 3e-3))
+    if(tolerance == 1e-2):
+        assert(n_integrations / n_solutions < 25)
+
+print("adaptive attenuation test passed")
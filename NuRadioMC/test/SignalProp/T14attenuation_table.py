@@ -0,0 +1,61 @@
+import numpy as np
+import tempfile
+import shutil
+import os
+from NuRadioMC.SignalProp import analyticraytracing as ray
+from NuRadioMC.SignalProp import attenuation_table
+from NuRadioMC.utilities import medium
+from NuRadioReco.utilities import units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_attenuation_table')
+
+np.random.seed(10)  # set seed to have reproducible results
+ff = np.fft.rfftfreq(1280, 1. / (5 * units.GHz))
+max_detector_freq = 1 * units.GHz
+folder = tempfile.mkdtemp()
+
+try:
+    for ice, attenuation_model, n_reflections, zmin in [(medium.southpole_2015(), "SP1", 0, -2.5 * units.km),
+                                                         (medium.greenland_simple(), "GL1", 0, -2.5 * units.km),
+                                                         (medium.mooresbay_simple(), "MB1", 1, -0.5 * units.km)]:
+        table = attenuation_table.attenuation_table(ice, attenuation_model, folder)
+        # the table is stored on disk and loaded again
+        assert(os.path.exists(table.get_filename()))
+        table_loaded = attenuation_table.attenuation_table(ice, attenuation_model, folder)
+        testing.assert_equal(table_loaded._H, table._H)
+
+        n_events = 10
+        rr = np.random.triangular(50 * units.m, 2 * units.km, 2 * units.km, n_events)
+        phiphi = np.random.uniform(0, 2 * np.pi, n_events)
+        zz = np.random.uniform(-5 * units.m, zmin, n_events)
+        points = np.array([rr * np.cos(phiphi), rr * np.sin(phiphi), zz]).T
+        errors = []
+        for x_receiver in [np.array([0., 0., -5.]), np.array([0., 0., -100.])]:
+            for x in points:
+                r = ray.ray_tracing(x, x_receiver, ice, attenuation_model=attenuation_model, n_reflections=n_reflections,
+                                    n_frequencies_integration=25, attenuation_table=table)
+                r.find_solutions()
+                # the attenuation integrated directly along the path is used as reference
+                r_reference = ray.ray_tracing(x, x_receiver, ice, attenuation_model=attenuation_model, n_reflections=n_reflections,
+                                              n_frequencies_integration=25)
+                r_reference.set_solution([result['C0'] for result in r.get_results()], [result['C1'] for result in r.get_results()],
+                                         [result['type'] for result in r.get_results()],
+                                         [result['reflection'] for result in r.get_results()],
+                                         [result['reflection_case'] for result in r.get_results()])
+                for iS in range(r.get_number_of_solutions()):
+                    attenuation = r.get_attenuation(iS, ff, max_detector_freq)
+                    attenuation_reference = r_reference.get_attenuation(iS, ff, max_detector_freq)
+                    errors.append(np.max(np.abs(attenuation - attenuation_reference)))
+        logger.info(f"{attenuation_model}: maximum difference of the attenuation factor for {len(errors)} solutions {np.max(errors):.2g}")
+        # the direct integration has a relative precision of 1%
+        assert(np.max(errors) < 5e-3)
+
+        # the segments outside of the table are integrated directly
+        assert(table.get_attenuation(-10 * units.km, -100 * units.m, 1., ff[1:]) is None)
+        assert(table.get_attenuation(-100 * units.m, -10 * units.m, 1., np.array([20 * units.GHz])) is None)
+finally:
+    shutil.rmtree(folder)
+
+print("attenuation table test passed")
@@ -5,3 +5,11 @@ python T02test_analytic_D_T.py
 python T04MooresBay.py
 python T05unit_test_C0_SP.py
 python T06unit_test_C0_mooresbay.py
+python T07solution_store.py
+python T08warm_start.py
+python T09shadow_zone_classifier.py
+python T10ray_tracing_solver.py
+python T11numba_backend.py
+python T12import_time.py
+python T13adaptive_attenuation.py
+python T14attenuation_table.py
@@ -6,6 +6,7 @@ import numpy as np
 from numpy import testing
 import argparse
 from NuRadioReco.utilities import units
+from NuRadioMC.utilities import categorical
 import logging
 
 error = 0
@@ -66,7 +67,11 @@ keys = [u'azimuths',
  u'zz']
 for key in keys:
     try:
-        testing.assert_equal(np.array(fin1[key]), np.array(fin2[key]))
+        if(key == 'interaction_type'):
+            # compare the values, older files store the strings and newer ones the integer codes
+            testing.assert_equal(categorical.read_strings(fin1, key), categorical.read_strings(fin2, key))
+        else:
+            testing.assert_equal(np.array(fin1[key]), np.array(fin2[key]))
     except AssertionError as e:
         print("\narray {} not equal".format(key))
         print(e)
@@ -6,6 +6,7 @@ import numpy as np
 from numpy import testing
 import argparse
 from NuRadioReco.utilities import units
+from NuRadioMC.utilities import categorical
 import logging
 
 file1 = sys.argv[1]
@@ -47,7 +48,11 @@ def test_equal_station_keys(keys, fin1=fin1, fin2=fin2, error=error):
 def test_equal_keys(keys, fin1=fin1, fin2=fin2, error=error):
     for key in keys:
         try:
-            testing.assert_equal(np.array(fin1[key]), np.array(fin2[key]))
+            if(key == 'interaction_type'):
+                # compare the values, older files store the strings and newer ones the integer codes
+                testing.assert_equal(categorical.read_strings(fin1, key), categorical.read_strings(fin2, key))
+            else:
+                testing.assert_equal(np.array(fin1[key]), np.array(fin2[key]))
         except AssertionError as e:
             print("\narray {} not almost equal".format(key))
             print("\Reference: {}, reconstruction: {}".format(fin2[key], fin1[key]))
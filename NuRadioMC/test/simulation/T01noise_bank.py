@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+import numpy as np
+from numpy import testing
+from scipy import signal
+from NuRadioReco.utilities import units, fft
+from NuRadioMC.simulation import noise_bank
+
+"""
+checks that the noise realizations drawn from the noise bank have the expected Vrms and spectral shape
+"""
+
+sampling_rate = 5 * units.GHz
+n_samples = 2048
+ff = np.fft.rfftfreq(n_samples, 1. / sampling_rate)
+max_freq = 0.5 * sampling_rate
+b, a = signal.butter(10, [80 * units.MHz, 500 * units.MHz], 'bandpass', analog=True)
+w, h = signal.freqs(b, a, ff)
+filters = {0: h, 1: 10 * h}
+
+Vrms = 10 * units.micro * units.V
+amplitudes = {}
+for channel_id, filt in filters.items():
+    norm = np.trapz(np.abs(filt) ** 2, ff)
+    amplitudes[channel_id] = Vrms / (norm / max_freq) ** 0.5
+
+bank = noise_bank.noise_bank(ff, sampling_rate, filters, amplitudes, n_realizations=50, seed=1234)
+testing.assert_equal(bank.get_number_of_samples(), n_samples)
+
+n_draws = 2000
+mask = np.abs(h) > 0.5
+for channel_id, filt in filters.items():
+    traces = np.array([bank.get_noise_trace(channel_id) for i in range(n_draws)])
+    testing.assert_allclose(np.std(traces), Vrms, rtol=0.03)
+    # the mean power spectrum needs to follow the filter response. As the power of a single
+    # frequency bin is only averaged over the realizations of the bank, we compare frequency bands
+    power = np.mean(np.abs(fft.time2freq(traces, sampling_rate)) ** 2, axis=0)
+    shape = power[mask] / np.abs(filt[mask]) ** 2
+    n_bands = len(shape) // 10
+    shape = np.mean(shape[:n_bands * 10].reshape(n_bands, 10), axis=1)
+    testing.assert_allclose(shape / np.mean(shape), 1, atol=0.15)
+    # realizations need to be uncorrelated
+    corr = np.corrcoef(traces[:200])[np.triu_indices(200, 1)]
+    testing.assert_array_less(np.abs(np.mean(corr)), 0.01)
+
+print("T01noise_bank passed without issues")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+import time
+from numpy import testing
+from NuRadioMC.simulation.async_event_writer import async_event_writer
+
+"""
+checks that the background event writer keeps the order of the events, applies backpressure
+and propagates errors of the writer thread
+"""
+
+
+class slowWriter():
+
+    def __init__(self, fail_at=None):
+        self.events = []
+        self.fail_at = fail_at
+        self.ended = False
+
+    def run(self, evt, det=None):
+        time.sleep(0.01)
+        if(evt == self.fail_at):
+            raise IOError("disk full")
+        self.events.append(evt)
+
+    def end(self):
+        self.ended = True
+        return len(self.events)
+
+
+writer = slowWriter()
+async_writer = async_event_writer(writer, max_queue_size=2)
+for i in range(20):
+    async_writer.run(i)
+    testing.assert_array_less(async_writer._queue.qsize(), 3)
+testing.assert_equal(async_writer.end(), 20)
+testing.assert_equal(writer.events, list(range(20)))
+testing.assert_equal(writer.ended, True)
+
+writer = slowWriter(fail_at=5)
+async_writer = async_event_writer(writer, max_queue_size=2)
+try:
+    for i in range(20):
+        async_writer.run(i)
+    async_writer.end()
+except IOError:
+    pass
+else:
+    raise AssertionError("exception of the writer thread was not propagated")
+
+print("T02async_event_writer passed without issues")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+import subprocess
+import sys
+import os
+import tempfile
+import shutil
+import yaml
+import h5py
+import numpy as np
+from numpy import testing
+from NuRadioMC.utilities import Veff
+
+"""
+runs the single event test simulation with a target uncertainty of the effective volume and checks that the
+simulation stops early and that the number of simulated events is adjusted in the output file
+"""
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+target_uncertainty = 0.5
+
+folder = tempfile.mkdtemp()
+try:
+    with open(os.path.join(path, "config.yaml"), 'r') as fin:
+        cfg = yaml.safe_load(fin)
+    cfg['speedup']['Veff_target_uncertainty'] = target_uncertainty
+    config_filename = os.path.join(folder, "config.yaml")
+    with open(config_filename, 'w') as fout:
+        yaml.dump(cfg, fout)
+    output_filename = os.path.join(folder, "output.hdf5")
+    subprocess.check_call([sys.executable, os.path.join(path, "T02RunSimulation.py"), input_filename,
+                           os.path.join(path, "surface_station_1GHz.json"), config_filename, output_filename])
+
+    with h5py.File(input_filename, 'r') as fin:
+        event_ids = np.array(fin['event_ids'])
+        triggered = np.array(fin['triggered'])
+        weights = np.array(fin['weights'])
+        start_event_id = fin.attrs['start_event_id']
+    # the simulation stops after the first event that reaches the target uncertainty
+    n_entries = np.argmax(np.cumsum(weights * triggered) ** -0.5 <= target_uncertainty) + 1
+    assert(n_entries < len(event_ids))
+    with h5py.File(output_filename, 'r') as fout:
+        assert('early_stopping' in fout.attrs)
+        testing.assert_equal(fout.attrs['n_events'], event_ids[n_entries] - start_event_id)
+        testing.assert_equal(np.array(fout['event_ids']), event_ids[:n_entries][triggered[:n_entries]])
+
+    # the effective volume is normalized to the number of simulated events
+    out = Veff.get_Veff(folder)[0]
+    assert(out['Veffs']['all_triggers'][1] / out['Veffs']['all_triggers'][0] <= target_uncertainty)
+finally:
+    shutil.rmtree(folder)
+
+print("T03early_stopping passed without issues")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+import os
+import sys
+import subprocess
+import json
+import tempfile
+import shutil
+import h5py
+import numpy as np
+from numpy import testing
+import NuRadioReco.modules.efieldToVoltageConverter
+import NuRadioReco.modules.channelResampler
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.modules.trigger.simpleThreshold
+from NuRadioReco.utilities import units
+from NuRadioMC.simulation import simulation
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+simulates two detector layouts, which share half of the channel positions, in a single pass over the event list
+and checks that the output files are identical to the ones of separate simulations of the layouts
+"""
+
+efieldToVoltageConverter = NuRadioReco.modules.efieldToVoltageConverter.efieldToVoltageConverter()
+efieldToVoltageConverter.begin()
+channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
+channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+triggerSimulator = NuRadioReco.modules.trigger.simpleThreshold.triggerSimulator()
+
+
+class mySimulation(simulation.simulation):
+
+    def _detector_simulation(self):
+        efieldToVoltageConverter.run(self._evt, self._station, self._det)
+        channelResampler.run(self._evt, self._station, self._det, sampling_rate=1. / self._dt)
+        channelBandPassFilter.run(self._evt, self._station, self._det, passband=[80 * units.MHz, 500 * units.MHz],
+                                  filter_type='butter', order=2)
+        triggerSimulator.run(self._evt, self._station, self._det,
+                             threshold=3 * self._Vrms,
+                             triggered_channels=None,
+                             number_concidences=1,
+                             trigger_name='simple_threshold')
+
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+config_filename = os.path.join(path, "config.yaml")
+
+if(len(sys.argv) == 3):
+    # simulation of a single layout, it runs in a separate process because the detector classes are singletons
+    sim = mySimulation(inputfilename=input_filename,
+                       outputfilename=sys.argv[2],
+                       detectorfile=sys.argv[1],
+                       config_file=config_filename,
+                       default_detector_station=101,
+                       file_overwrite=True)
+    sim.run()
+    sys.exit(0)
+
+folder = tempfile.mkdtemp()
+try:
+    # the second layout is obtained by moving the second half of the channels
+    with open(os.path.join(path, "surface_station_1GHz.json"), 'r') as fin:
+        detector_description = json.load(fin)
+    detector_filenames = [os.path.join(path, "surface_station_1GHz.json"), os.path.join(folder, "moved.json")]
+    for channel in detector_description['channels'].values():
+        if(channel['channel_id'] >= 4):
+            channel['ant_position_x'] += 2
+    with open(detector_filenames[1], 'w') as fout:
+        json.dump(detector_description, fout)
+
+    output_filenames = [os.path.join(folder, f"layout{i}.hdf5") for i in range(2)]
+    sim = mySimulation(inputfilename=input_filename,
+                       outputfilename=output_filenames,
+                       detectorfile=detector_filenames,
+                       config_file=config_filename,
+                       default_detector_station=101,
+                       file_overwrite=True)
+    sim.run()
+
+    for detector_filename, output_filename in zip(detector_filenames, output_filenames):
+        reference_filename = os.path.join(folder, "reference.hdf5")
+        subprocess.check_call([sys.executable, os.path.abspath(__file__), detector_filename, reference_filename])
+        with h5py.File(output_filename, 'r') as f1, h5py.File(reference_filename, 'r') as f2:
+            testing.assert_equal(f1.attrs['detector'], f2.attrs['detector'])
+            keys = []
+            f2.visit(lambda key: keys.append(key) if isinstance(f2[key], h5py.Dataset) else None)
+            for key in keys:
+                if(f2[key].dtype.kind == 'f'):
+                    testing.assert_allclose(np.array(f1[key]), np.array(f2[key]), rtol=1e-10, equal_nan=True, err_msg=key)
+                else:
+                    testing.assert_equal(np.array(f1[key]), np.array(f2[key]), err_msg=key)
+finally:
+    shutil.rmtree(folder)
+
+print("T04multi_layout passed without issues")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+import os
+import sys
+import subprocess
+import tempfile
+import shutil
+import yaml
+import h5py
+import numpy as np
+from numpy import testing
+import NuRadioReco.modules.efieldToVoltageConverter
+import NuRadioReco.modules.channelResampler
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.modules.trigger.simpleThreshold
+from NuRadioReco.utilities import units
+from NuRadioMC.simulation import simulation
+from NuRadioMC.simulation import trigger_replay
+from NuRadioMC.utilities import trigger_masks
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+simulates events with stored pre-trigger traces, replays the triggers with the same and with a higher threshold
+and compares the result to a full simulation with the higher threshold. A simulation with noise stores the traces of
+the stations whose noiseless signal exceeds the threshold of the pre-trigger trace store
+"""
+
+efieldToVoltageConverter = NuRadioReco.modules.efieldToVoltageConverter.efieldToVoltageConverter()
+efieldToVoltageConverter.begin()
+channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
+channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+triggerSimulator = NuRadioReco.modules.trigger.simpleThreshold.triggerSimulator()
+
+
+def run_trigger(evt, station, det, Vrms, threshold=3):
+    triggerSimulator.run(evt, station, det,
+                         threshold=threshold * Vrms,
+                         triggered_channels=None,
+                         number_concidences=1,
+                         trigger_name='simple_threshold')
+
+
+def run_high_trigger(evt, station, det, Vrms):
+    run_trigger(evt, station, det, Vrms, threshold=5)
+
+
+class mySimulation(simulation.simulation):
+
+    def _detector_simulation_filter_amp(self, evt, station, det):
+        efieldToVoltageConverter.run(evt, station, det)
+        channelResampler.run(evt, station, det, sampling_rate=1. / self._dt)
+        channelBandPassFilter.run(evt, station, det, passband=[80 * units.MHz, 500 * units.MHz],
+                                  filter_type='butter', order=2)
+
+    def _detector_simulation_trigger(self, evt, station, det):
+        run_trigger(evt, station, det, self._Vrms, threshold=self._threshold)
+
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+detector_filename = os.path.join(path, "surface_station_1GHz.json")
+
+
+def simulate(output_filename, config_filename, threshold):
+    mySimulation._threshold = threshold
+    sim = mySimulation(inputfilename=input_filename,
+                       outputfilename=output_filename,
+                       detectorfile=detector_filename,
+                       config_file=config_filename,
+                       default_detector_station=101,
+                       file_overwrite=True)
+    sim.run()
+
+
+def get_stored_stations(output_filename):
+    """
+    returns the (station id, event id) pairs with stored pre-trigger traces
+    """
+    with h5py.File(output_filename, 'r') as fin:
+        event_ids = np.array(fin['event_ids'])
+    stored = trigger_replay.read_pre_trigger_traces(trigger_replay.get_pre_trigger_trace_filename(output_filename))
+    return sorted([(station_id, event_id) for station_id, data in stored.items() for event_id in event_ids[data['event_index']]])
+
+
+if(len(sys.argv) == 4):
+    # full simulation with another threshold or config, it runs in a separate process because the detector classes are singletons
+    simulate(sys.argv[1], sys.argv[2], float(sys.argv[3]))
+    sys.exit(0)
+
+folder = tempfile.mkdtemp()
+try:
+    with open(os.path.join(path, "config.yaml"), 'r') as fin:
+        cfg = yaml.safe_load(fin)
+    cfg.setdefault('trigger', {})
+    cfg['trigger']['save_pre_trigger_traces'] = True
+    cfg['trigger']['pre_trigger_threshold'] = 2.
+    config_filename = os.path.join(folder, "config.yaml")
+    with open(config_filename, 'w') as fout:
+        yaml.dump(cfg, fout)
+
+    output_filename = os.path.join(folder, "output.hdf5")
+    simulate(output_filename, config_filename, 3)
+    if(not os.path.exists(trigger_replay.get_pre_trigger_trace_filename(output_filename))):
+        raise AssertionError("the pre-trigger traces were not written")
+    with h5py.File(output_filename, 'r') as fin:
+        triggered = np.array(fin['triggered'])
+        masks = np.array(fin['multiple_triggers_mask'])
+        event_ids = np.array(fin['event_ids'])
+
+    # replaying the same trigger settings does not change the triggers
+    result = trigger_replay.replay([output_filename], run_trigger, trigger_names=['simple_threshold'], n_cores=1)
+    testing.assert_equal(result[output_filename], (np.sum(triggered), np.sum(triggered)))
+    trigger_names, replayed_masks = trigger_masks.read(output_filename)
+    testing.assert_equal(trigger_names, ['simple_threshold'])
+    testing.assert_equal(replayed_masks, masks)
+
+    # a higher threshold triggers a subset of the events
+    trigger_replay.replay([output_filename], run_high_trigger, trigger_names=['simple_threshold'], n_cores=1)
+    with h5py.File(output_filename, 'r') as fin:
+        triggered_high = np.array(fin['triggered'])
+        testing.assert_equal(np.array(fin['multiple_triggers'])[:, 0], triggered_high)
+    if(np.any(triggered_high & ~triggered)):
+        raise AssertionError("the replay with the higher threshold triggered events that did not trigger before")
+
+    # the triggered events agree with a full simulation with the higher threshold
+    reference_filename = os.path.join(folder, "reference.hdf5")
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), reference_filename, config_filename, "5"])
+    with h5py.File(reference_filename, 'r') as fin:
+        reference_triggered = np.array(fin['triggered'])
+        reference_event_ids = np.array(fin['event_ids'])
+    testing.assert_equal(np.unique(event_ids[triggered_high]), np.unique(reference_event_ids[reference_triggered]))
+
+    # with noise, the traces of the stations whose noiseless signal exceeds the threshold are stored
+    pre_trigger_threshold = 4.5
+    expected = []
+    with h5py.File(output_filename, 'r') as fin:
+        for station_id in [101, 102]:
+            group = f"station_{station_id:d}"
+            if(group in fin):
+                above = np.max(np.array(fin[group]['maximum_amplitudes']), axis=1) > pre_trigger_threshold * fin.attrs['Vrms']
+                expected.extend([(station_id, event_id) for event_id in np.array(fin['event_ids'])[above]])
+    if(len(expected) == 0):
+        raise AssertionError("no station exceeds the threshold of the pre-trigger trace store")
+    cfg['noise'] = True
+    cfg['speedup']['add_noise_from_bank'] = True
+    cfg['trigger']['pre_trigger_threshold'] = pre_trigger_threshold
+    config_filename_noise = os.path.join(folder, "config_noise.yaml")
+    with open(config_filename_noise, 'w') as fout:
+        yaml.dump(cfg, fout)
+    noise_filename = os.path.join(folder, "noise.hdf5")
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), noise_filename, config_filename_noise, "3"])
+    testing.assert_equal(get_stored_stations(noise_filename), sorted(expected))
+finally:
+    shutil.rmtree(folder)
+
+print("T05trigger_replay passed without issues")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+import os
+import sys
+import subprocess
+import tempfile
+import shutil
+import yaml
+import h5py
+import numpy as np
+from numpy import testing
+import NuRadioReco.modules.efieldToVoltageConverter
+import NuRadioReco.modules.channelResampler
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.modules.channelGenericNoiseAdder
+import NuRadioReco.modules.trigger.simpleThreshold
+from NuRadioReco.utilities import units
+from NuRadioMC.simulation import simulation
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+simulates all events of an input file and every second event with per-event random streams
+(random shower realizations and noise) and checks that the events of the subset are identical
+"""
+
+efieldToVoltageConverter = NuRadioReco.modules.efieldToVoltageConverter.efieldToVoltageConverter()
+efieldToVoltageConverter.begin()
+channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
+channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+channelGenericNoiseAdder = NuRadioReco.modules.channelGenericNoiseAdder.channelGenericNoiseAdder()
+triggerSimulator = NuRadioReco.modules.trigger.simpleThreshold.triggerSimulator()
+
+
+class mySimulation(simulation.simulation):
+
+    def _detector_simulation(self):
+        efieldToVoltageConverter.run(self._evt, self._station, self._det)
+        channelResampler.run(self._evt, self._station, self._det, sampling_rate=1. / self._dt)
+        if self._is_simulate_noise():
+            max_freq = 0.5 / self._dt
+            norm = self._get_noise_normalization(self._station.get_id())
+            Vrms = self._Vrms / (norm / (max_freq)) ** 0.5
+            channelGenericNoiseAdder.run(self._evt, self._station, self._det, amplitude=Vrms, min_freq=0 * units.MHz,
+                                         max_freq=max_freq, type='rayleigh')
+        channelBandPassFilter.run(self._evt, self._station, self._det, passband=[80 * units.MHz, 500 * units.MHz],
+                                  filter_type='butter', order=2)
+        triggerSimulator.run(self._evt, self._station, self._det,
+                             threshold=3 * self._Vrms,
+                             triggered_channels=None,
+                             number_concidences=1,
+                             trigger_name='simple_threshold')
+
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+detector_filename = os.path.join(path, "surface_station_1GHz.json")
+
+
+def simulate(output_filename, config_filename, event_list=None):
+    sim = mySimulation(inputfilename=input_filename,
+                       outputfilename=output_filename,
+                       detectorfile=detector_filename,
+                       config_file=config_filename,
+                       default_detector_station=101,
+                       event_list=event_list,
+                       file_overwrite=True)
+    sim.run()
+
+
+if(len(sys.argv) > 3):
+    # simulation of a subset of the events, it runs in a separate process because the detector classes are singletons
+    simulate(sys.argv[1], sys.argv[2], [int(event_id) for event_id in sys.argv[3:]])
+    sys.exit(0)
+
+folder = tempfile.mkdtemp()
+try:
+    with open(os.path.join(path, "config.yaml"), 'r') as fin:
+        cfg = yaml.safe_load(fin)
+    cfg['noise'] = True
+    cfg['per_event_seeds'] = True
+    cfg['signal']['model'] = 'Alvarez2009'
+    config_filename = os.path.join(folder, "config.yaml")
+    with open(config_filename, 'w') as fout:
+        yaml.dump(cfg, fout)
+
+    output_filename = os.path.join(folder, "all.hdf5")
+    simulate(output_filename, config_filename)
+
+    with h5py.File(input_filename, 'r') as fin:
+        event_ids = np.unique(np.array(fin['event_ids']))
+    subset = event_ids[::-2]
+    subset_filename = os.path.join(folder, "subset.hdf5")
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), subset_filename, config_filename] + [str(event_id) for event_id in subset])
+
+    with h5py.File(output_filename, 'r') as f1, h5py.File(subset_filename, 'r') as f2:
+        mask = np.isin(np.array(f1['event_ids']), subset)
+        testing.assert_equal(np.array(f2['event_ids']), np.array(f1['event_ids'])[mask])
+        keys = []
+        f2.visit(lambda key: keys.append(key) if isinstance(f2[key], h5py.Dataset) else None)
+        for key in keys:
+            if(f2[key].dtype.kind == 'f'):
+                testing.assert_allclose(np.array(f2[key]), np.array(f1[key])[mask], rtol=1e-10, equal_nan=True, err_msg=key)
+            else:
+                testing.assert_equal(np.array(f2[key]), np.array(f1[key])[mask], err_msg=key)
+finally:
+    shutil.rmtree(folder)
+
+print("T06per_event_seeds passed without issues")
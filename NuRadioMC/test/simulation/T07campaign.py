@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+import os
+import sys
+import tempfile
+import shutil
+import subprocess
+import h5py
+import numpy as np
+from numpy import testing
+import NuRadioReco.modules.efieldToVoltageConverter
+import NuRadioReco.modules.channelResampler
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.modules.trigger.simpleThreshold
+from NuRadioReco.utilities import units
+from NuRadioMC.utilities import split_hdf5
+from NuRadioMC.utilities import merge_hdf5
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+runs a simulation campaign over the parts of two split input files with the same name in different directories on a
+local pool with a part that fails once, restarts the campaign (all parts are skipped) and compares the merged outputs
+with a simulation of the full input file and with the in-memory merge
+"""
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+detector_filename = os.path.join(path, "surface_station_1GHz.json")
+config_filename = os.path.join(path, "config.yaml")
+
+if(len(sys.argv) == 5):
+    # the steering script of the campaign
+    from NuRadioMC.simulation import simulation
+    efieldToVoltageConverter = NuRadioReco.modules.efieldToVoltageConverter.efieldToVoltageConverter()
+    efieldToVoltageConverter.begin()
+    channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
+    channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+    triggerSimulator = NuRadioReco.modules.trigger.simpleThreshold.triggerSimulator()
+
+    class mySimulation(simulation.simulation):
+
+        def _detector_simulation(self):
+            efieldToVoltageConverter.run(self._evt, self._station, self._det)
+            channelResampler.run(self._evt, self._station, self._det, sampling_rate=1. / self._dt)
+            channelBandPassFilter.run(self._evt, self._station, self._det, passband=[80 * units.MHz, 500 * units.MHz],
+                                      filter_type='butter', order=2)
+            triggerSimulator.run(self._evt, self._station, self._det,
+                                 threshold=3 * self._Vrms,
+                                 triggered_channels=None,
+                                 number_concidences=1,
+                                 trigger_name='simple_threshold')
+
+    marker = os.environ.get("T07_FAIL_ONCE", None)
+    if(marker is not None and sys.argv[1].endswith("part0001") and not os.path.exists(marker)):
+        # simulate a crash of the first attempt of one part
+        open(marker, 'w').close()
+        sys.exit(1)
+    sim = mySimulation(inputfilename=sys.argv[1],
+                       outputfilename=sys.argv[4],
+                       detectorfile=sys.argv[2],
+                       config_file=sys.argv[3],
+                       default_detector_station=101)
+    sim.run()
+    sys.exit(0)
+
+from NuRadioMC.simulation import campaign
+
+folder = tempfile.mkdtemp()
+try:
+    input_dir = os.path.join(folder, "input")
+    output_dir = os.path.join(folder, "output")
+    # two energy bins whose input files have the same name
+    bin_names = [os.path.join("1e18", "1e18.hdf5"), os.path.join("other", "1e18.hdf5")]
+    for bin_name, n_events_per_file in zip(bin_names, [4, 6]):
+        os.makedirs(os.path.dirname(os.path.join(input_dir, bin_name)))
+        split_hdf5.split_hdf5_input_file(input_filename, os.path.join(input_dir, bin_name), n_events_per_file)
+    part_files = [f"{bin_names[0]}.part{i:04d}" for i in range(3)] + [f"{bin_names[1]}.part{i:04d}" for i in range(2)]
+    testing.assert_equal(campaign.get_part_files(input_dir), part_files)
+
+    os.environ["T07_FAIL_ONCE"] = os.path.join(folder, "failed_once")
+    summary = campaign.run_campaign(os.path.abspath(__file__), input_dir, detector_filename, config_filename, output_dir,
+                                    n_cores=2, n_retries=1)
+    testing.assert_equal(sorted(summary['finished']), campaign.get_part_files(input_dir))
+    testing.assert_equal(summary['failed'], [])
+    if(not os.path.exists(os.environ["T07_FAIL_ONCE"])):
+        raise AssertionError("the failing part was not simulated")
+    merged_filenames = [os.path.join(output_dir, "merged", bin_name) for bin_name in bin_names]
+    testing.assert_equal(sorted(summary['merged']), merged_filenames)
+
+    # a restarted campaign skips all finished parts and the merge
+    summary = campaign.run_campaign(os.path.abspath(__file__), input_dir, detector_filename, config_filename, output_dir,
+                                    n_cores=2, n_retries=1)
+    testing.assert_equal(len(summary['skipped']), 5)
+    testing.assert_equal(summary['finished'] + summary['merged'], [])
+
+    reference_filename = os.path.join(folder, "reference.hdf5")
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), input_filename, detector_filename, config_filename, reference_filename])
+    for merged_filename, n_events in zip(merged_filenames, [12, 12]):
+        with h5py.File(merged_filename, 'r') as f1, h5py.File(reference_filename, 'r') as f2:
+            testing.assert_equal(f1.attrs['n_events'], n_events)  # the split files store the number of events per file
+            testing.assert_equal(np.array(f1['event_ids']), np.array(f2['event_ids']))
+            testing.assert_equal(np.array(f1['triggered']), np.array(f2['triggered']))
+            testing.assert_allclose(np.array(f1['station_101/maximum_amplitudes']), np.array(f2['station_101/maximum_amplitudes']), rtol=1e-10)
+
+    # the stream merge gives the same result as the in-memory merge
+    merged_filename = os.path.join(folder, "merge2.hdf5")
+    merge_hdf5.merge2([os.path.join(output_dir, part_file) for part_file in part_files[:3]], merged_filename)
+    with h5py.File(merged_filenames[0], 'r') as f1, h5py.File(merged_filename, 'r') as f2:
+        keys = {}
+        for f in [f1, f2]:
+            keys[f] = []
+            f.visit(lambda key: keys[f].append(key) if isinstance(f[key], h5py.Dataset) else None)
+        testing.assert_equal(sorted(keys[f1]), sorted(keys[f2]))
+        for key in keys[f2]:
+            testing.assert_equal(np.array(f1[key]), np.array(f2[key]), err_msg=key)
+        testing.assert_equal(sorted(f1.attrs.keys()), sorted(f2.attrs.keys()))
+finally:
+    shutil.rmtree(folder)
+
+print("T07campaign passed without issues")
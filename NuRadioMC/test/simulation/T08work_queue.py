@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+import os
+import sys
+import tempfile
+import shutil
+import subprocess
+import multiprocessing
+import h5py
+import numpy as np
+from numpy import testing
+import NuRadioReco.modules.efieldToVoltageConverter
+import NuRadioReco.modules.channelResampler
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.modules.trigger.simpleThreshold
+from NuRadioReco.utilities import units
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+simulates an input file with three worker processes of a work queue, one range is leased by a worker that never
+reports back and is reassigned after its lease expired. The merged output is compared with a simulation of the full
+input file. Checks that failed ranges are reported instead of blocking the merge and that a stale lock is not removed
+if another process acquired the lock in the meantime.
+"""
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+detector_filename = os.path.join(path, "surface_station_1GHz.json")
+config_filename = os.path.join(path, "config.yaml")
+
+if(len(sys.argv) == 5):
+    # the steering script of the simulation
+    from NuRadioMC.simulation import simulation
+    efieldToVoltageConverter = NuRadioReco.modules.efieldToVoltageConverter.efieldToVoltageConverter()
+    efieldToVoltageConverter.begin()
+    channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
+    channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+    triggerSimulator = NuRadioReco.modules.trigger.simpleThreshold.triggerSimulator()
+
+    class mySimulation(simulation.simulation):
+
+        def _detector_simulation(self):
+            efieldToVoltageConverter.run(self._evt, self._station, self._det)
+            channelResampler.run(self._evt, self._station, self._det, sampling_rate=1. / self._dt)
+            channelBandPassFilter.run(self._evt, self._station, self._det, passband=[80 * units.MHz, 500 * units.MHz],
+                                      filter_type='butter', order=2)
+            triggerSimulator.run(self._evt, self._station, self._det,
+                                 threshold=3 * self._Vrms,
+                                 triggered_channels=None,
+                                 number_concidences=1,
+                                 trigger_name='simple_threshold')
+
+    sim = mySimulation(inputfilename=sys.argv[1],
+                       outputfilename=sys.argv[4],
+                       detectorfile=sys.argv[2],
+                       config_file=sys.argv[3],
+                       default_detector_station=101)
+    sim.run()
+    sys.exit(0)
+
+from NuRadioMC.simulation import work_queue
+
+
+class racing_lock(work_queue.file_lock):
+    """
+    lock where another process breaks the stale lock and acquires a new lock right after it was found to be stale
+    """
+
+    def _read_owner(self):
+        owner, mtime = super()._read_owner()
+        if(owner == "crashed process"):
+            os.remove(self._filename)
+            with open(self._filename, 'w') as fout:
+                fout.write("other process")
+        return owner, mtime
+
+
+folder = tempfile.mkdtemp()
+try:
+    # a stale lock is removed, but not if another process acquired the lock after it was found to be stale
+    lock_filename = os.path.join(folder, "test.lock")
+    for lock_class, acquired in [(work_queue.file_lock, True), (racing_lock, False)]:
+        with open(lock_filename, 'w') as fout:
+            fout.write("crashed process")
+        os.utime(lock_filename, (0, 0))
+        try:
+            with lock_class(lock_filename, timeout=1, stale_time=10):
+                testing.assert_equal(acquired, True)
+            testing.assert_equal(os.path.exists(lock_filename), False)
+        except TimeoutError:
+            testing.assert_equal(acquired, False)
+            with open(lock_filename, 'r') as fin:
+                testing.assert_equal(fin.read(), "other process")
+            os.remove(lock_filename)
+    # a lock that was broken by another process is not removed when it is released
+    with work_queue.file_lock(lock_filename):
+        with open(lock_filename, 'w') as fout:
+            fout.write("other process")
+    testing.assert_equal(os.path.exists(lock_filename), True)
+    os.remove(lock_filename)
+
+    # ranges that fail `max_attempts` times are reported and the outputs are not merged
+    failing_queue_dir = os.path.join(folder, "failing_queue")
+    failing_output_filename = os.path.join(folder, "failing_output.hdf5")
+    work_queue.create_queue(failing_queue_dir, input_filename, failing_output_filename, "NuRadioMC.no_such_module",
+                            detector_filename, config_filename, events_per_range=6, max_attempts=2)
+    work_queue.run_worker(failing_queue_dir, "worker", lease_time=30, poll_interval=1)
+    status = work_queue.get_status(failing_queue_dir)
+    testing.assert_equal((status['failed'], status['merge']), (2, 'failed'))
+    testing.assert_equal(os.path.exists(failing_output_filename), False)
+    testing.assert_equal(work_queue.retry_failed(failing_queue_dir), 2)
+    status = work_queue.get_status(failing_queue_dir)
+    testing.assert_equal((status['pending'], status['merge']), (2, 'pending'))
+
+    queue_dir = os.path.join(folder, "queue")
+    output_filename = os.path.join(folder, "output.hdf5")
+    work_queue.create_queue(queue_dir, input_filename, output_filename, os.path.abspath(__file__), detector_filename,
+                            config_filename, events_per_range=2)
+    if(work_queue.create_queue(queue_dir, input_filename, output_filename, os.path.abspath(__file__), detector_filename,
+                               config_filename, events_per_range=2)):
+        raise AssertionError("an existing queue was created again")
+    testing.assert_equal(work_queue.get_status(queue_dir)['pending'], 6)
+
+    # a worker that dies after leasing a range
+    work_queue.lease(queue_dir, "dead worker", lease_time=2)
+
+    workers = [multiprocessing.Process(target=work_queue.run_worker, args=(queue_dir, f"worker{i:d}"),
+                                       kwargs={'lease_time': 30, 'poll_interval': 1}) for i in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        testing.assert_equal(worker.exitcode, 0)
+    status = work_queue.get_status(queue_dir)
+    testing.assert_equal(status['done'], 6)
+    testing.assert_equal(status['merge'], 'done')
+    # the output is merged into a temporary file that replaces the output file
+    testing.assert_equal([filename for filename in os.listdir(folder) if filename.endswith(".tmp")], [])
+    if(work_queue.complete(queue_dir, 0, "dead worker", "late.hdf5")):
+        raise AssertionError("the result of an expired lease was accepted")
+
+    reference_filename = os.path.join(folder, "reference.hdf5")
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), input_filename, detector_filename, config_filename, reference_filename])
+    with h5py.File(output_filename, 'r') as f1, h5py.File(reference_filename, 'r') as f2:
+        testing.assert_equal(f1.attrs['n_events'], f2.attrs['n_events'])
+        testing.assert_equal(np.array(f1['event_ids']), np.array(f2['event_ids']))
+        testing.assert_equal(np.array(f1['triggered']), np.array(f2['triggered']))
+        testing.assert_allclose(np.array(f1['station_101/maximum_amplitudes']), np.array(f2['station_101/maximum_amplitudes']), rtol=1e-10)
+finally:
+    shutil.rmtree(folder)
+
+print("T08work_queue passed without issues")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+import os
+import tempfile
+import shutil
+import yaml
+import numpy as np
+from numpy import testing
+import NuRadioReco.modules.efieldToVoltageConverter
+import NuRadioReco.modules.channelResampler
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.modules.trigger.simpleThreshold
+from NuRadioReco.utilities import units
+from NuRadioMC.simulation import simulation
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+simulates events with noise from the noise bank (config setting `speedup: add_noise_from_bank`) and checks
+that the noise added to the channels has the expected Vrms, that every station draws different noise and that
+a recreated noise bank continues the random stream of the station
+"""
+
+efieldToVoltageConverter = NuRadioReco.modules.efieldToVoltageConverter.efieldToVoltageConverter()
+efieldToVoltageConverter.begin()
+channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
+channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+triggerSimulator = NuRadioReco.modules.trigger.simpleThreshold.triggerSimulator()
+
+
+class mySimulation(simulation.simulation):
+    # the noise that was added to the channels of every simulated station
+    noise = {}
+
+    def _detector_simulation_filter_amp(self, evt, station, det):
+        efieldToVoltageConverter.run(evt, station, det)
+        channelResampler.run(evt, station, det, sampling_rate=1. / self._dt)
+        channelBandPassFilter.run(evt, station, det, passband=[80 * units.MHz, 500 * units.MHz],
+                                  filter_type='butter', order=2)
+        self._noiseless_traces = [channel.get_trace() for channel in station.iter_channels()]
+
+    def _detector_simulation_trigger(self, evt, station, det):
+        if(self._station_id in self._detector_modules):  # skip the dummy detector simulation of the __init__ function
+            self.noise[(self._iE, self._station_id)] = np.array([channel.get_trace() - trace for channel, trace in
+                                                                 zip(station.iter_channels(), self._noiseless_traces)])
+        triggerSimulator.run(evt, station, det,
+                             threshold=3 * self._Vrms,
+                             triggered_channels=None,
+                             number_concidences=1,
+                             trigger_name='simple_threshold')
+
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+detector_filename = os.path.join(path, "surface_station_1GHz.json")
+
+folder = tempfile.mkdtemp()
+try:
+    with open(os.path.join(path, "config.yaml"), 'r') as fin:
+        cfg = yaml.safe_load(fin)
+    cfg['noise'] = True
+    cfg['speedup']['add_noise_from_bank'] = True
+    cfg['speedup']['noise_bank'] = 20
+    config_filename = os.path.join(folder, "config.yaml")
+    with open(config_filename, 'w') as fout:
+        yaml.dump(cfg, fout)
+
+    sim = mySimulation(inputfilename=input_filename,
+                       outputfilename=os.path.join(folder, "output.hdf5"),
+                       detectorfile=detector_filename,
+                       config_file=config_filename,
+                       default_detector_station=101,
+                       file_overwrite=True)
+    sim.run()
+    if(len(mySimulation.noise) == 0):
+        raise AssertionError("no station was simulated")
+
+    # the noise added to the channels has the Vrms of the simulation
+    noise = np.concatenate([station_noise.ravel() for station_noise in mySimulation.noise.values()])
+    testing.assert_allclose(np.std(noise), sim.get_Vrms(), rtol=0.05)
+
+    # every station has its own noise bank with different realizations
+    n_samples = sim._noise_banks[101].get_number_of_samples()
+    for station_id in [101, 102]:
+        sim._station_id = station_id
+        sim._get_noise_bank(n_samples)
+    if(np.allclose(sim._noise_banks[101]._bank[0][0], sim._noise_banks[102]._bank[0][0])):
+        raise AssertionError("the noise banks of station 101 and 102 are identical")
+
+    # a recreated bank (for longer traces) gets the next seed of the random stream of the station
+    sim._station_id = 101
+    n_spawned = sim._noise_bank_seeds[101].n_children_spawned
+    sim._get_noise_bank(2 * n_samples)
+    testing.assert_equal(sim._noise_banks[101].get_number_of_samples(), 2 * n_samples)
+    testing.assert_equal(sim._noise_bank_seeds[101].n_children_spawned, n_spawned + 1)
+    seeds = [sim._get_noise_bank_seed(101) for i in range(10)] + [sim._get_noise_bank_seed(102) for i in range(10)]
+    testing.assert_equal(len(set(seeds)), len(seeds))
+finally:
+    shutil.rmtree(folder)
+
+print("T09noise_bank_simulation passed without issues")
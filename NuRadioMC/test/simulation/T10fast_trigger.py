@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+import os
+import sys
+import subprocess
+import tempfile
+import shutil
+import yaml
+import h5py
+import numpy as np
+from numpy import testing
+from scipy import signal
+import NuRadioReco.modules.efieldToVoltageConverter
+import NuRadioReco.modules.channelResampler
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.modules.trigger.simpleThreshold
+from NuRadioReco.framework.parameters import electricFieldParameters as efp
+from NuRadioReco.utilities import units
+from NuRadioMC.simulation import simulation
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+simulates events with and without the fast trigger path (config setting `speedup: fast_trigger_threshold`) and
+checks that the envelope estimate of the fast path is not below the full detector simulation and that the fast
+path does not reject any station that triggers in the full simulation
+"""
+
+efieldToVoltageConverter = NuRadioReco.modules.efieldToVoltageConverter.efieldToVoltageConverter()
+efieldToVoltageConverter.begin()
+channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
+channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+triggerSimulator = NuRadioReco.modules.trigger.simpleThreshold.triggerSimulator()
+# the thresholds (in units of Vrms) are chosen such that the fast trigger path rejects a part of the stations
+trigger_threshold = 10
+fast_trigger_threshold = 9
+
+
+class mySimulation(simulation.simulation):
+    # the envelope maximum of the fast path and of the full detector simulation for every simulated channel
+    envelopes = []
+
+    def _detector_simulation_filter_amp(self, evt, station, det):
+        efieldToVoltageConverter.run(evt, station, det)
+        channelResampler.run(evt, station, det, sampling_rate=1. / self._dt)
+        channelBandPassFilter.run(evt, station, det, passband=[80 * units.MHz, 500 * units.MHz],
+                                  filter_type='butter', order=2)
+
+    def _detector_simulation_trigger(self, evt, station, det):
+        if(self._station_id in self._detector_modules):  # skip the dummy detector simulation of the __init__ function
+            for channel in station.iter_channels():
+                estimate = 0
+                for efield in station.get_sim_station().get_electric_fields_for_channels([channel.get_id()]):
+                    spectrum = efield.get_frequency_spectrum()
+                    estimate += self._get_fast_trigger_amplitude(channel.get_id(), spectrum[1], spectrum[2],
+                                                                 efield[efp.zenith], efield[efp.azimuth])
+                self.envelopes.append([estimate, np.max(np.abs(signal.hilbert(channel.get_trace())))])
+        triggerSimulator.run(evt, station, det,
+                             threshold=trigger_threshold * self._Vrms,
+                             triggered_channels=None,
+                             number_concidences=1,
+                             trigger_name='simple_threshold')
+
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+detector_filename = os.path.join(path, "surface_station_1GHz.json")
+
+
+def simulate(output_filename, config_filename):
+    sim = mySimulation(inputfilename=input_filename,
+                       outputfilename=output_filename,
+                       detectorfile=detector_filename,
+                       config_file=config_filename,
+                       default_detector_station=101,
+                       file_overwrite=True)
+    sim.run()
+
+
+if(len(sys.argv) == 3):
+    # simulation with the fast trigger path, it runs in a separate process because the detector classes are singletons
+    simulate(sys.argv[1], sys.argv[2])
+    sys.exit(0)
+
+folder = tempfile.mkdtemp()
+try:
+    with open(os.path.join(path, "config.yaml"), 'r') as fin:
+        cfg = yaml.safe_load(fin)
+    config_filename = os.path.join(folder, "config.yaml")
+    with open(config_filename, 'w') as fout:
+        yaml.dump(cfg, fout)
+    cfg['speedup']['fast_trigger_threshold'] = fast_trigger_threshold
+    config_filename_fast = os.path.join(folder, "config_fast.yaml")
+    with open(config_filename_fast, 'w') as fout:
+        yaml.dump(cfg, fout)
+
+    output_filename = os.path.join(folder, "full.hdf5")
+    simulate(output_filename, config_filename)
+    output_filename_fast = os.path.join(folder, "fast.hdf5")
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), output_filename_fast, config_filename_fast])
+
+    # the envelope estimate of the fast path is not smaller than the envelope of the full detector simulation (up to
+    # the interpolation of the antenna response), the estimate is larger if a channel sees several pulses
+    envelopes = np.array(mySimulation.envelopes)
+    mask = envelopes[:, 1] > 0.1 * np.max(envelopes[:, 1])
+    testing.assert_array_less(0.9 * envelopes[mask, 1], envelopes[mask, 0])
+
+    # every station that triggers in the full simulation also triggers with the fast trigger path
+    with h5py.File(output_filename, 'r') as f1, h5py.File(output_filename_fast, 'r') as f2:
+        if(np.sum(f1['triggered']) == 0):
+            raise AssertionError("no event triggered")
+        for station_id in [101, 102]:
+            group = f"station_{station_id:d}"
+            triggered = dict(zip(np.array(f1['event_ids']), np.array(f1[group]['triggered'])))
+            triggered_fast = dict(zip(np.array(f2['event_ids']), np.array(f2[group]['triggered'])))
+            for event_id, station_triggered in triggered.items():
+                if(station_triggered and not triggered_fast.get(event_id, False)):
+                    raise AssertionError(f"the fast trigger path rejected station {station_id:d} of event {event_id:d}, which triggers in the full simulation")
+        testing.assert_equal(np.array(f2['event_ids'])[np.array(f2['triggered'])],
+                             np.array(f1['event_ids'])[np.array(f1['triggered'])])
+
+    # the simulation finishes if no station passes the fast trigger path (no NuRadioReco event is created)
+    cfg['speedup']['fast_trigger_threshold'] = 1e6
+    config_filename_rejected = os.path.join(folder, "config_rejected.yaml")
+    with open(config_filename_rejected, 'w') as fout:
+        yaml.dump(cfg, fout)
+    output_filename_rejected = os.path.join(folder, "rejected.hdf5")
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), output_filename_rejected, config_filename_rejected])
+    with h5py.File(output_filename_rejected, 'r') as fin:
+        testing.assert_equal(np.sum(fin['triggered']) if 'triggered' in fin else 0, 0)
+finally:
+    shutil.rmtree(folder)
+
+print("T10fast_trigger passed without issues")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+import os
+import sys
+import subprocess
+import tempfile
+import shutil
+import yaml
+import h5py
+import numpy as np
+from numpy import testing
+import NuRadioReco.modules.efieldToVoltageConverter
+import NuRadioReco.modules.channelResampler
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.modules.trigger.simpleThreshold
+from NuRadioReco.utilities import units
+from NuRadioMC.simulation import simulation
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+simulates events with the full readout window and with a short pulse window (config setting `speedup: pulse_window`)
+and checks that the maximum amplitudes of the channels agree to better than 0.5% and that the output file reports
+the number of samples of the readout window
+"""
+
+efieldToVoltageConverter = NuRadioReco.modules.efieldToVoltageConverter.efieldToVoltageConverter()
+efieldToVoltageConverter.begin()
+channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
+channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+triggerSimulator = NuRadioReco.modules.trigger.simpleThreshold.triggerSimulator()
+
+
+class mySimulation(simulation.simulation):
+
+    def _detector_simulation_filter_amp(self, evt, station, det):
+        efieldToVoltageConverter.run(evt, station, det)
+        channelResampler.run(evt, station, det, sampling_rate=1. / self._dt)
+        channelBandPassFilter.run(evt, station, det, passband=[80 * units.MHz, 500 * units.MHz],
+                                  filter_type='butter', order=2)
+
+    def _detector_simulation_trigger(self, evt, station, det):
+        triggerSimulator.run(evt, station, det,
+                             threshold=3 * self._Vrms,
+                             triggered_channels=None,
+                             number_concidences=1,
+                             trigger_name='simple_threshold')
+
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+detector_filename = os.path.join(path, "surface_station_1GHz.json")
+
+
+def simulate(output_filename, config_filename):
+    sim = mySimulation(inputfilename=input_filename,
+                       outputfilename=output_filename,
+                       detectorfile=detector_filename,
+                       config_file=config_filename,
+                       default_detector_station=101,
+                       file_overwrite=True)
+    sim.run()
+
+
+if(len(sys.argv) == 3):
+    # simulation with the pulse window, it runs in a separate process because the detector classes are singletons
+    simulate(sys.argv[1], sys.argv[2])
+    sys.exit(0)
+
+folder = tempfile.mkdtemp()
+try:
+    with open(os.path.join(path, "config.yaml"), 'r') as fin:
+        cfg = yaml.safe_load(fin)
+    config_filename = os.path.join(folder, "config.yaml")
+    with open(config_filename, 'w') as fout:
+        yaml.dump(cfg, fout)
+    cfg['speedup']['pulse_window'] = 64 * units.ns
+    config_filename_window = os.path.join(folder, "config_window.yaml")
+    with open(config_filename_window, 'w') as fout:
+        yaml.dump(cfg, fout)
+
+    output_filename = os.path.join(folder, "full.hdf5")
+    simulate(output_filename, config_filename)
+    output_filename_window = os.path.join(folder, "window.hdf5")
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), output_filename_window, config_filename_window])
+
+    with h5py.File(output_filename, 'r') as f1, h5py.File(output_filename_window, 'r') as f2:
+        testing.assert_equal(f2.attrs['n_samples'], f1.attrs['n_samples'])
+        testing.assert_equal(np.array(f2['triggered']), np.array(f1['triggered']))
+        n_compared = 0
+        for station_id in [101, 102]:
+            group = f"station_{station_id:d}"
+            for key in ['maximum_amplitudes', 'maximum_amplitudes_envelope']:
+                amplitudes = np.array(f1[group][key])
+                amplitudes_window = np.array(f2[group][key])
+                # channels without a signal only contain the numerical noise of the filters
+                mask = amplitudes > 1e-3 * np.max(amplitudes)
+                testing.assert_allclose(amplitudes_window[mask], amplitudes[mask], rtol=5e-3, err_msg=key)
+                n_compared += np.sum(mask)
+        if(n_compared == 0):
+            raise AssertionError("no channel with a signal was simulated")
+finally:
+    shutil.rmtree(folder)
+
+print("T11pulse_window passed without issues")
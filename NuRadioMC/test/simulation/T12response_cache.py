@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+import os
+import json
+import glob
+import tempfile
+import shutil
+import numpy as np
+from numpy import testing
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.detector.generic_detector as gdetector
+import NuRadioReco.detector.antennapattern
+import NuRadioReco.framework.sim_station
+from NuRadioReco.utilities import trace_utilities
+from NuRadioReco.utilities import units
+from NuRadioMC.simulation import response_cache
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+checks that the responses of the response cache agree with the direct calculation of the antenna response and the
+filters, that responses loaded from the cache folder are identical to freshly calculated responses and that the
+cache on disk is not used if the detector description or the frequency grid change
+"""
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+detector_filename = os.path.join(path, "surface_station_1GHz.json")
+station_id = 101
+channel_ids = [0, 1, 2, 3]
+# directions on the grid nodes and in between
+directions = [(40 * units.deg, 20 * units.deg), (97 * units.deg, 133 * units.deg), (150.3 * units.deg, 355 * units.deg)]
+
+channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+filter_kwargs = {'passband': [80 * units.MHz, 500 * units.MHz], 'filter_type': 'butter', 'order': 2}
+modules = {station_id: [('channelBandPassFilter', channelBandPassFilter, filter_kwargs)]}
+antenna_pattern_provider = NuRadioReco.detector.antennapattern.AntennaPatternProvider()
+
+
+def get_detector(filename):
+    return gdetector.GenericDetector(json_filename=filename, default_station=station_id, antenna_by_depth=False,
+                                     create_new=True)
+
+
+def get_station():
+    station = NuRadioReco.framework.sim_station.SimStation(station_id)
+    station.set_is_neutrino()
+    return station
+
+
+def get_responses(cache):
+    station = get_station()
+    return np.array([[cache.get_response(station, channel_id, zenith, azimuth) for zenith, azimuth in directions]
+                     for channel_id in channel_ids])
+
+
+folder = tempfile.mkdtemp()
+try:
+    det = get_detector(detector_filename)
+    detector_hash = response_cache.get_detector_hash(detector_filename)
+    ff = np.fft.rfftfreq(256, 1. / units.GHz)
+
+    # on the grid nodes, the response equals the antenna response times the filters
+    cache = response_cache.response_cache(det, detector_hash, ff, modules=modules)
+    station = get_station()
+    for channel_id in channel_ids:
+        VEL = np.nan_to_num(trace_utilities.get_efield_antenna_factor(station, ff, [channel_id], det, 40 * units.deg,
+                                                                      20 * units.deg, antenna_pattern_provider)[0])
+        filt = channelBandPassFilter.get_filter(ff, station_id, channel_id, det, **filter_kwargs)
+        # the grid nodes are stored in single precision
+        testing.assert_allclose(cache.get_response(station, channel_id, 40 * units.deg, 20 * units.deg), VEL * filt,
+                                rtol=1e-5, atol=1e-6 * np.max(np.abs(VEL)))
+    uncached = get_responses(cache)
+    if(np.max(np.abs(uncached)) == 0):
+        raise AssertionError("all responses are zero")
+
+    # responses calculated with and loaded from the cache folder are identical to the responses without the cache folder
+    cache = response_cache.response_cache(det, detector_hash, ff, modules=modules, cache_folder=folder)
+    testing.assert_equal(get_responses(cache), uncached)
+    cache.save()
+    testing.assert_equal(len(glob.glob(os.path.join(folder, "*.pkl"))), 1)
+    cache = response_cache.response_cache(det, detector_hash, ff, modules=modules, cache_folder=folder)
+    testing.assert_equal(get_responses(cache), uncached)
+    testing.assert_equal(cache._n_new_nodes, 0)
+
+    # a different frequency grid does not use the stored grid nodes
+    ff_long = np.fft.rfftfreq(512, 1. / units.GHz)
+    cache = response_cache.response_cache(det, detector_hash, ff_long, modules=modules, cache_folder=folder)
+    testing.assert_equal(len(cache._vel), 0)
+    responses = get_responses(cache)
+    testing.assert_equal(responses.shape[-1], len(ff_long))
+    testing.assert_equal(responses, get_responses(response_cache.response_cache(det, detector_hash, ff_long, modules=modules)))
+    cache.save()
+    testing.assert_equal(len(glob.glob(os.path.join(folder, "*.pkl"))), 2)
+
+    # a changed detector description (rotated antennas) does not use the stored grid nodes
+    with open(detector_filename, 'r') as fin:
+        description = json.load(fin)
+    for channel in description['channels'].values():
+        channel['ant_rotation_phi'] += 45.
+    detector_filename_rotated = os.path.join(folder, "detector_rotated.json")
+    with open(detector_filename_rotated, 'w') as fout:
+        json.dump(description, fout)
+    detector_hash_rotated = response_cache.get_detector_hash(detector_filename_rotated)
+    if(detector_hash_rotated == detector_hash):
+        raise AssertionError("the changed detector description has the same hash")
+    det_rotated = get_detector(detector_filename_rotated)
+    cache = response_cache.response_cache(det_rotated, detector_hash_rotated, ff, modules=modules, cache_folder=folder)
+    testing.assert_equal(len(cache._vel), 0)
+    responses = get_responses(cache)
+    testing.assert_equal(responses, get_responses(response_cache.response_cache(det_rotated, detector_hash_rotated, ff, modules=modules)))
+    if(np.allclose(responses, uncached)):
+        raise AssertionError("the responses of the rotated antennas are identical to the original responses")
+finally:
+    shutil.rmtree(folder)
+
+print("T12response_cache passed without issues")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+import os
+import sys
+import subprocess
+import json
+import tempfile
+import shutil
+import yaml
+import h5py
+import numpy as np
+from numpy import testing
+import NuRadioReco.modules.efieldToVoltageConverter
+import NuRadioReco.modules.channelResampler
+import NuRadioReco.modules.channelBandPassFilter
+import NuRadioReco.modules.trigger.simpleThreshold
+from NuRadioReco.utilities import units
+from NuRadioMC.simulation import simulation
+import logging
+logging.basicConfig(level=logging.WARNING)
+
+"""
+checks that the channel geometry hash changes with the channel position and the propagation settings and that the
+ray tracing solutions of a pre-simulated input file are only reused for channels with an identical geometry
+"""
+
+efieldToVoltageConverter = NuRadioReco.modules.efieldToVoltageConverter.efieldToVoltageConverter()
+efieldToVoltageConverter.begin()
+channelResampler = NuRadioReco.modules.channelResampler.channelResampler()
+channelBandPassFilter = NuRadioReco.modules.channelBandPassFilter.channelBandPassFilter()
+triggerSimulator = NuRadioReco.modules.trigger.simpleThreshold.triggerSimulator()
+
+
+class mySimulation(simulation.simulation):
+
+    def _detector_simulation_filter_amp(self, evt, station, det):
+        efieldToVoltageConverter.run(evt, station, det)
+        channelResampler.run(evt, station, det, sampling_rate=1. / self._dt)
+        channelBandPassFilter.run(evt, station, det, passband=[80 * units.MHz, 500 * units.MHz],
+                                  filter_type='butter', order=2)
+
+    def _detector_simulation_trigger(self, evt, station, det):
+        triggerSimulator.run(evt, station, det,
+                             threshold=3 * self._Vrms,
+                             triggered_channels=None,
+                             number_concidences=1,
+                             trigger_name='simple_threshold')
+
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SingleEvents")
+input_filename = os.path.join(path, "1e18_output_reference.hdf5")
+detector_filename = os.path.join(path, "surface_station_1GHz.json")
+
+
+def simulate(input_filename, output_filename, detector_filename, config_filename, reuse_filename=None):
+    sim = mySimulation(inputfilename=input_filename,
+                       outputfilename=output_filename,
+                       detectorfile=detector_filename,
+                       config_file=config_filename,
+                       default_detector_station=101,
+                       file_overwrite=True)
+    sim.run()
+    if(reuse_filename is not None):
+        # the mapping of the channel ids to the channel ids of the input file whose ray tracing solutions were reused
+        with open(reuse_filename, 'w') as fout:
+            json.dump({str(station_id): {str(channel_id): channel_id_pre for channel_id, channel_id_pre in channels.items()}
+                       for station_id, channels in sim._pre_simulated_channels.items()}, fout)
+
+
+def resimulate(name, detector_filename, config_filename):
+    """
+    simulates the pre-simulated file in a separate process (the detector classes are singletons) and returns the
+    mapping of reused channels and the ray tracing solutions of station 101
+    """
+    output_filename = os.path.join(folder, f"{name}.hdf5")
+    reuse_filename = os.path.join(folder, f"{name}.json")
+    subprocess.check_call([sys.executable, os.path.abspath(__file__), pre_simulated_filename, output_filename,
+                           detector_filename, config_filename, reuse_filename])
+    with open(reuse_filename, 'r') as fin:
+        reused = json.load(fin)
+    with h5py.File(output_filename, 'r') as fin:
+        C0 = np.array(fin['station_101']['ray_tracing_C0'])
+    return reused.get('101', {}), C0
+
+
+if(len(sys.argv) == 6):
+    simulate(*sys.argv[1:])
+    sys.exit(0)
+
+# the hash identifies the position (rounded to mm), the ice model, the attenuation model and the number of reflections
+position = np.array([10., -3., -1.]) * units.m
+geometry_hash = simulation.get_channel_geometry_hash(position, 'ARAsim_southpole', 'SP1', 0)
+testing.assert_equal(simulation.get_channel_geometry_hash(position + 0.1 * units.mm, 'ARAsim_southpole', 'SP1', 0), geometry_hash)
+changed_hashes = [simulation.get_channel_geometry_hash(position + np.array([0, 0, 1 * units.cm]), 'ARAsim_southpole', 'SP1', 0),
+                  simulation.get_channel_geometry_hash(position, 'southpole_2015', 'SP1', 0),
+                  simulation.get_channel_geometry_hash(position, 'ARAsim_southpole', 'GL1', 0),
+                  simulation.get_channel_geometry_hash(position, 'ARAsim_southpole', 'SP1', 1)]
+testing.assert_equal(len(set(changed_hashes + [geometry_hash])), 5)
+
+folder = tempfile.mkdtemp()
+try:
+    with open(os.path.join(path, "config.yaml"), 'r') as fin:
+        cfg = yaml.safe_load(fin)
+    cfg['save_all'] = True
+    config_filename = os.path.join(folder, "config.yaml")
+    with open(config_filename, 'w') as fout:
+        yaml.dump(cfg, fout)
+    pre_simulated_filename = os.path.join(folder, "pre_simulated.hdf5")
+    simulate(input_filename, pre_simulated_filename, detector_filename, config_filename)
+    with h5py.File(pre_simulated_filename, 'r') as fin:
+        C0_pre = np.array(fin['station_101']['ray_tracing_C0'])
+        n_channels = len(fin['station_101'].attrs['channel_geometry_hashes'])
+    if(np.all(np.isnan(C0_pre))):
+        raise AssertionError("no ray tracing solution was found")
+
+    # an identical detector and config reuses the ray tracing solutions of all channels
+    reused, C0 = resimulate("identical", detector_filename, config_filename)
+    testing.assert_equal(reused, {str(channel_id): channel_id for channel_id in range(n_channels)})
+    testing.assert_equal(C0, C0_pre)
+
+    # a moved channel is ray traced again, the solutions of the other channels are reused
+    with open(detector_filename, 'r') as fin:
+        description = json.load(fin)
+    moved_channel_id = 1
+    for channel in description['channels'].values():
+        if(channel['channel_id'] == moved_channel_id):
+            channel['ant_position_x'] += 1.
+    detector_filename_moved = os.path.join(folder, "detector_moved.json")
+    with open(detector_filename_moved, 'w') as fout:
+        json.dump(description, fout)
+    reused, C0 = resimulate("moved", detector_filename_moved, config_filename)
+    testing.assert_equal(reused, {str(channel_id): channel_id for channel_id in range(n_channels) if channel_id != moved_channel_id})
+    mask = np.ones(n_channels, dtype=bool)
+    mask[moved_channel_id] = False
+    testing.assert_equal(C0[:, mask], C0_pre[:, mask])
+    solutions = ~np.isnan(C0_pre[:, moved_channel_id])
+    if(np.allclose(C0[:, moved_channel_id][solutions], C0_pre[:, moved_channel_id][solutions])):
+        raise AssertionError("the ray tracing solutions of the moved channel were not recalculated")
+
+    # a different attenuation model changes the hash of all channels, nothing is reused
+    cfg['propagation']['attenuation_model'] = 'GL1'
+    config_filename_attenuation = os.path.join(folder, "config_attenuation.yaml")
+    with open(config_filename_attenuation, 'w') as fout:
+        yaml.dump(cfg, fout)
+    reused, C0 = resimulate("attenuation", detector_filename, config_filename_attenuation)
+    testing.assert_equal(reused, {})
+finally:
+    shutil.rmtree(folder)
+
+print("T13geometry_hash passed without issues")
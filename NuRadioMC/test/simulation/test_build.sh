@@ -0,0 +1,16 @@
+#!/bin/bash
+set -e
+cd NuRadioMC/test/simulation/
+python T01noise_bank.py
+python T02async_event_writer.py
+python T03early_stopping.py
+python T04multi_layout.py
+python T05trigger_replay.py
+python T06per_event_seeds.py
+python T07campaign.py
+python T08work_queue.py
+python T09noise_bank_simulation.py
+python T10fast_trigger.py
+python T11pulse_window.py
+python T12response_cache.py
+python T13geometry_hash.py
@@ -0,0 +1,137 @@
+import numpy as np
+import h5py
+import tempfile
+import shutil
+import os
+from NuRadioMC.utilities import Veff
+from NuRadioReco.utilities import units
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_Veff_engine')
+
+np.random.seed(10)  # set seed to have reproducible results
+trigger_names = ['LPDA_2of4', 'dipole_1.5sigma', 'dipole_2.5sigma']
+
+
+def write_file(filename, energy, n_events, double_bangs=False):
+    """
+    writes a (small) file with the structure of the NuRadioMC output
+    """
+    event_ids = np.arange(n_events)
+    n_interaction = np.ones(n_events, dtype=int)
+    if(double_bangs):
+        # every third event has a second interaction
+        event_ids = np.sort(np.append(event_ids, event_ids[::3]))
+        n_interaction = np.ones(len(event_ids), dtype=int)
+        n_interaction[1:][event_ids[1:] == event_ids[:-1]] = 2
+    n = len(event_ids)
+    multiple_triggers = np.random.uniform(size=(n, len(trigger_names))) < [0.3, 0.5, 0.2]
+    weights = np.random.uniform(0.1, 1, size=n_events)[event_ids]
+    zeniths = np.arccos(np.random.uniform(-1, 1, size=n_events))[event_ids]
+    with h5py.File(filename, 'w') as fout:
+        fout['event_ids'] = event_ids
+        fout['n_interaction'] = n_interaction
+        fout['multiple_triggers'] = multiple_triggers
+        fout['triggered'] = np.any(multiple_triggers, axis=1)
+        fout['weights'] = weights
+        fout['zeniths'] = zeniths
+        fout['max_amp_ray_solution'] = np.random.uniform(0, 5 * units.micro * units.V, size=(n, 4, 2))
+        fout.attrs['trigger_names'] = trigger_names
+        fout.attrs['n_events'] = 2 * n_events
+        fout.attrs['Emin'] = energy
+        fout.attrs['Emax'] = energy
+        fout.attrs['rmin'] = 0
+        fout.attrs['rmax'] = 3 * units.km
+        fout.attrs['zmin'] = -2.7 * units.km
+        fout.attrs['zmax'] = 0
+        fout.attrs['thetamin'] = 0
+        fout.attrs['thetamax'] = np.pi
+        fout.attrs['Vrms'] = 1 * units.micro * units.V
+        fout.attrs['deposited'] = False
+
+
+trigger_combinations = {'LPDA_or_dipole': {'triggers': ['LPDA_2of4', 'dipole_2.5sigma']},
+                        'dipole_and': {'triggers': ['dipole_1.5sigma'], 'triggerAND': 'dipole_2.5sigma'},
+                        'dipole_not': {'triggers': ['dipole_1.5sigma'], 'notriggers': ['LPDA_2of4']},
+                        'dipole_3sigma': {'triggers': ['dipole_1.5sigma'], 'min_sigma': 3, 'channels': [0, 1, 2, 3], 'n_channels': 2}}
+
+
+def compare(Veffs, Veffs_reference, keys):
+    testing.assert_equal(len(Veffs), len(Veffs_reference))
+    for out, out_reference in zip(Veffs, Veffs_reference):
+        for key in ['energy', 'domega', 'thetamin', 'thetamax', 'deposited']:
+            testing.assert_equal(out[key], out_reference[key])
+        for key in keys:
+            testing.assert_allclose(out['Veffs'][key], out_reference['Veffs'][key], rtol=1e-10)
+
+
+folder = tempfile.mkdtemp()
+try:
+    for iE, energy in enumerate([1e17, 1e18, 1e19]):
+        write_file(os.path.join(folder, f"{iE:02d}.hdf5"), energy * units.eV, 1000)
+
+    # without double bangs, the engine agrees with the direct calculation
+    Veffs = Veff.get_Veff_parallel(folder, trigger_combinations, correct_zenith_sampling=True, n_cores=2)
+    Veffs_reference = Veff.get_Veff(folder, trigger_combinations, correct_zenith_sampling=True)
+    compare(Veffs, Veffs_reference, trigger_names + list(trigger_combinations.keys()) + ['all_triggers'])
+    summary_filenames = [Veff.get_summary_filename(os.path.join(folder, f"{iE:02d}.hdf5")) for iE in range(3)]
+    for summary_filename in summary_filenames:
+        assert(os.path.exists(summary_filename))
+    mtimes = [os.stat(summary_filename).st_mtime_ns for summary_filename in summary_filenames]
+
+    # a 'min_sigma' combination with a list of conditions does not change the trigger combinations that follow
+    ordered_combinations = {'dipole_sigma_list': {'triggers': ['dipole_1.5sigma'], 'min_sigma': [3, 4],
+                                                  'channels': [[0, 1], [2, 3]], 'n_channels': [2, 1]},
+                            'LPDA_or_dipole': trigger_combinations['LPDA_or_dipole']}
+    Veffs = Veff.get_Veff(folder, ordered_combinations)
+    compare(Veffs, Veff.get_Veff(folder, {'LPDA_or_dipole': trigger_combinations['LPDA_or_dipole']}), ['LPDA_or_dipole'])
+    for out in Veffs:
+        with h5py.File(os.path.join(folder, f"{int(np.round(np.log10(out['energy'] / units.eV))) - 17:02d}.hdf5"), 'r') as fin:
+            multiple_triggers = np.array(fin['multiple_triggers'])
+            weights = np.array(fin['weights'])
+            As = np.max(np.array(fin['max_amp_ray_solution']), axis=-1)
+            Vrms = fin.attrs['Vrms']
+        sigma_mask = (np.sum(As[:, [0, 1]] >= 3 * Vrms, axis=1) >= 2) | (np.sum(As[:, [2, 3]] >= 4 * Vrms, axis=1) >= 1)
+        testing.assert_allclose(out['Veffs']['dipole_sigma_list'][2], np.sum(weights[multiple_triggers[:, 1] & sigma_mask]))
+        testing.assert_allclose(out['Veffs']['LPDA_or_dipole'][2],
+                                np.sum(weights[multiple_triggers[:, 0] | multiple_triggers[:, 2]]))
+
+    # new combinations of individual triggers are calculated from the summaries without reading the hdf5 files
+    new_combinations = {'dipoles': {'triggers': ['dipole_1.5sigma', 'dipole_2.5sigma']}}
+    Veffs = Veff.get_Veff_parallel(folder, new_combinations, n_cores=2)
+    compare(Veffs, Veff.get_Veff(folder, new_combinations), ['dipoles'])
+    testing.assert_equal([os.stat(summary_filename).st_mtime_ns for summary_filename in summary_filenames], mtimes)
+
+    # a modified file is read again, the summaries of the other files are reused
+    write_file(os.path.join(folder, "01.hdf5"), 1e18 * units.eV, 500)
+    Veffs = Veff.get_Veff_parallel(folder, trigger_combinations, n_cores=2)
+    compare(Veffs, Veff.get_Veff(folder, trigger_combinations), trigger_names + list(trigger_combinations.keys()))
+    mtimes_new = [os.stat(summary_filename).st_mtime_ns for summary_filename in summary_filenames]
+    testing.assert_equal(mtimes_new[0], mtimes[0])
+    assert(mtimes_new[1] != mtimes[1])
+
+    # interactions of the same event (double bangs) are counted once
+    shutil.rmtree(folder)
+    os.mkdir(folder)
+    filename = os.path.join(folder, "00.hdf5")
+    write_file(filename, 1e18 * units.eV, 1000, double_bangs=True)
+    Veffs = Veff.get_Veff_parallel(folder, trigger_combinations)
+    with h5py.File(filename, 'r') as fin:
+        event_ids = np.array(fin['event_ids'])
+        multiple_triggers = np.array(fin['multiple_triggers'])
+        weights = np.array(fin['weights'])
+        V = np.pi * (fin.attrs['rmax'] ** 2 - fin.attrs['rmin'] ** 2) * (fin.attrs['zmax'] - fin.attrs['zmin'])
+        n_events = fin.attrs['n_events']
+    for iT, trigger_name in enumerate(trigger_names):
+        weight_sum = 0
+        for event_id in np.unique(event_ids):
+            mask = event_ids == event_id
+            if(np.any(multiple_triggers[mask, iT])):
+                weight_sum += weights[mask][0]
+        testing.assert_allclose(Veffs[0]['Veffs'][trigger_name][2], weight_sum)
+        testing.assert_allclose(Veffs[0]['Veffs'][trigger_name][0], V * weight_sum / n_events)
+finally:
+    shutil.rmtree(folder)
+
+print("Veff engine test passed")
@@ -0,0 +1,77 @@
+import numpy as np
+import h5py
+import tempfile
+import shutil
+import os
+from NuRadioMC.utilities import trigger_masks
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_trigger_masks')
+
+np.random.seed(10)  # set seed to have reproducible results
+trigger_names = ['LPDA_2of4', 'dipole_1.5sigma', 'dipole_2.5sigma', 'phased_array']
+n_events = 1000
+
+# conversion between the old layout and the trigger masks
+multiple_triggers = np.random.uniform(size=(n_events, len(trigger_names))) < 0.3
+masks = trigger_masks.pack(multiple_triggers)
+testing.assert_equal(masks.dtype, np.uint64)
+testing.assert_equal(trigger_masks.unpack(masks, len(trigger_names)), multiple_triggers)
+all_triggers = trigger_masks.pack(np.ones((1, 64), dtype=bool))
+testing.assert_equal(trigger_masks.unpack(all_triggers, 64), np.ones((1, 64), dtype=bool))
+
+# trigger combinations
+testing.assert_equal(trigger_masks.evaluate(masks, trigger_names), np.any(multiple_triggers, axis=1))
+testing.assert_equal(trigger_masks.evaluate(masks, trigger_names, 'dipole_1.5sigma'), multiple_triggers[:, 1])
+testing.assert_equal(trigger_masks.evaluate(masks, trigger_names, ['LPDA_2of4', 'phased_array']),
+                     multiple_triggers[:, 0] | multiple_triggers[:, 3])
+testing.assert_equal(trigger_masks.evaluate(masks, trigger_names, ['LPDA_2of4'], triggerAND=['dipole_1.5sigma', 'dipole_2.5sigma']),
+                     multiple_triggers[:, 0] & multiple_triggers[:, 1] & multiple_triggers[:, 2])
+testing.assert_equal(trigger_masks.evaluate(masks, trigger_names, ['LPDA_2of4', 'dipole_1.5sigma'], notriggers='phased_array'),
+                     (multiple_triggers[:, 0] | multiple_triggers[:, 1]) & ~multiple_triggers[:, 3])
+testing.assert_raises(KeyError, trigger_masks.get_mask, trigger_names, 'unknown')
+
+# the registry assigns fixed bits, at most 64 triggers can be registered
+registry = trigger_masks.trigger_registry(['b', 'a'])
+testing.assert_equal(registry.register('a'), 1)
+testing.assert_equal(registry.register('c'), 2)
+testing.assert_equal(registry.get_trigger_names(), ['b', 'a', 'c'])
+for i in range(61):
+    registry.register(f"trigger{i}")
+testing.assert_raises(ValueError, registry.register, 'one_too_many')
+
+folder = tempfile.mkdtemp()
+try:
+    # files with the old layout, the new layout and a different order of the triggers
+    order = [2, 0, 3, 1]
+    filenames = [os.path.join(folder, f"{i}.hdf5") for i in range(3)]
+    with h5py.File(filenames[0], 'w') as fout:
+        fout.attrs['trigger_names'] = trigger_names
+        fout['triggered'] = np.any(multiple_triggers, axis=1)
+        fout['multiple_triggers'] = multiple_triggers
+    with h5py.File(filenames[1], 'w') as fout:
+        fout.attrs['trigger_names'] = trigger_names
+        fout['triggered'] = np.any(multiple_triggers, axis=1)
+        fout['multiple_triggers_mask'] = masks
+    with h5py.File(filenames[2], 'w') as fout:
+        fout.attrs['trigger_names'] = [trigger_names[i] for i in order]
+        fout['triggered'] = np.any(multiple_triggers, axis=1)
+        fout['multiple_triggers_mask'] = trigger_masks.pack(multiple_triggers[:, order])
+
+    for filename in filenames:
+        names, masks_file = trigger_masks.read(filename)
+        testing.assert_equal(trigger_masks.unpack(masks_file, len(names)), multiple_triggers[:, [trigger_names.index(name) for name in names]])
+
+    combinations = {'LPDA_or_phased': {'triggers': ['LPDA_2of4', 'phased_array']},
+                    'dipole_and': {'triggers': 'dipole_1.5sigma', 'triggerAND': 'dipole_2.5sigma'},
+                    'dipole_not': {'triggers': ['dipole_1.5sigma'], 'notriggers': ['LPDA_2of4']}}
+    result = trigger_masks.query(filenames, combinations)
+    for iF in range(len(filenames)):
+        testing.assert_equal(result['LPDA_or_phased'][iF], multiple_triggers[:, 0] | multiple_triggers[:, 3])
+        testing.assert_equal(result['dipole_and'][iF], multiple_triggers[:, 1] & multiple_triggers[:, 2])
+        testing.assert_equal(result['dipole_not'][iF], multiple_triggers[:, 1] & ~multiple_triggers[:, 0])
+finally:
+    shutil.rmtree(folder)
+
+print("trigger masks test passed")
@@ -0,0 +1,77 @@
+import numpy as np
+import h5py
+import tempfile
+import shutil
+import os
+from NuRadioMC.utilities import categorical
+from NuRadioMC.utilities import split_hdf5
+from NuRadioMC.utilities import merge_hdf5
+from numpy import testing
+import logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger('test_categorical')
+
+np.random.seed(10)  # set seed to have reproducible results
+n_events = 1000
+interaction_type = np.where(np.random.uniform(size=n_events) < 0.7, 'cc', 'nc').astype('U3')
+interaction_type[::7] = 'had'
+
+# conversion between strings and codes
+codes = categorical.encode(interaction_type, categorical.default_categories['interaction_type'])
+testing.assert_equal(codes.dtype.itemsize, 1)
+testing.assert_equal(categorical.get_categories(codes), ['cc', 'nc', 'had', 'em'])
+testing.assert_equal(categorical.decode(codes), interaction_type)
+testing.assert_equal(categorical.decode(categorical.encode(np.char.encode(interaction_type, 'utf8'))), interaction_type)
+testing.assert_equal(categorical.get_categories(categorical.encode(['b', '', 'a', 'b'])), ['', 'a', 'b'])
+testing.assert_equal(categorical.decode(categorical.encode(['b', '', 'a', 'b'])), ['b', '', 'a', 'b'])
+remapped = categorical.remap(codes, categorical.get_categories(codes), ['em', 'had', 'nc', 'cc'])
+testing.assert_equal(categorical.decode(remapped), interaction_type)
+testing.assert_equal(categorical.merge_categories([['cc', 'nc'], ['nc', 'had']]), ['cc', 'nc', 'had'])
+
+folder = tempfile.mkdtemp()
+try:
+    # files with the integer codes and files with the old layout (strings) are read as codes
+    filenames = []
+    for iF, (categories, old_layout) in enumerate([(None, False), (['had', 'nc', 'cc'], False), (None, True)]):
+        filename = os.path.join(folder, f"events{iF:d}.hdf5")
+        values = interaction_type[iF * 10:(iF + 1) * 10]
+        with h5py.File(filename, 'w') as fout:
+            fout.attrs['n_events'] = 10
+            fout['event_ids'] = np.arange(iF * 10, (iF + 1) * 10)
+            fout['triggered'] = np.ones(10, dtype=bool)
+            if(old_layout):
+                fout['interaction_type'] = [np.char.encode(c, 'utf8') for c in values]
+            else:
+                categorical.write(fout, 'interaction_type', values, categories=categories)
+        with h5py.File(filename, 'r') as fin:
+            testing.assert_equal(categorical.is_categorical(fin['interaction_type']), not old_layout)
+            if(not old_layout):
+                testing.assert_equal(list(fin['interaction_type'].attrs['categories']),
+                                     categorical.get_categories(fin['interaction_type']))
+            testing.assert_equal(categorical.is_categorical(categorical.read(fin, 'interaction_type')), True)
+            testing.assert_equal(categorical.read_strings(fin, 'interaction_type'), values)
+        filenames.append(filename)
+
+    # the merged file contains the values of all files, independent of their categories
+    merged_filename = os.path.join(folder, "merged.hdf5")
+    merge_hdf5.merge2(filenames, merged_filename)
+    merge_hdf5.merge_stream(filenames, os.path.join(folder, "merged_stream.hdf5"))
+    for filename in [merged_filename, os.path.join(folder, "merged_stream.hdf5")]:
+        with h5py.File(filename, 'r') as fin:
+            testing.assert_equal(categorical.is_categorical(fin['interaction_type']), True)
+            testing.assert_equal(categorical.read_strings(fin, 'interaction_type'), interaction_type[:30])
+            testing.assert_equal(np.array(fin['event_ids']), np.arange(30))
+            testing.assert_equal(fin.attrs['n_events'], 30)
+
+    # the parts of a split file keep the codes
+    split_hdf5.split_hdf5_input_file(merged_filename, os.path.join(folder, "split.hdf5"), 12)
+    values = []
+    for iF in range(3):
+        with h5py.File(os.path.join(folder, f"split.hdf5.part{iF:04d}"), 'r') as fin:
+            testing.assert_equal(categorical.is_categorical(fin['interaction_type']), True)
+            values.extend(categorical.read_strings(fin, 'interaction_type'))
+    testing.assert_equal(values, interaction_type[:30])
+finally:
+    shutil.rmtree(folder)
+
+print("T03categorical passed without issues")
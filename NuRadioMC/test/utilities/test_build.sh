@@ -0,0 +1,6 @@
+#!/bin/bash
+set -e
+cd NuRadioMC/test/utilities/
+python T01Veff_engine.py
+python T02trigger_masks.py
+python T03categorical.py
@@ -6,9 +6,12 @@ from six import iteritems
 import json
 import os
 import copy
+import pickle
+import multiprocessing
 
 from NuRadioReco.utilities import units
 from NuRadioMC.EvtGen.generator import get_projected_area_cylinder, get_projected_area_cylinder_integral
+from NuRadioMC.utilities import trigger_masks
 
 import logging
 logger = logging.getLogger("Veff")
@@ -34,27 +37,44 @@ def get_triggered(fin):
        The bools indicate if the events have triggered
     """
 
-    triggered = np.copy(fin['triggered'])
+    triggered = np.array(fin['triggered'], dtype=bool)
 
     if (len(triggered) == 0):
         return triggered
 
-    mask_secondaries = np.array(fin['n_interaction']) > 1
-    if (True not in mask_secondaries):
+    if (not np.any(np.array(fin['n_interaction']) > 1)):
         return triggered
 
-    # We count the multiple triggering bangs as a single triggered event
-    for event_id in np.unique(np.array(fin['event_ids'])[mask_secondaries]):
-        mask_interactions = np.array(fin['event_ids']) == event_id
-        multiple_interaction_indexes = np.squeeze(np.argwhere(np.array(fin['event_ids']) == event_id))
-        if (len(multiple_interaction_indexes) == 1):
-            continue
+    # We count the multiple triggering bangs as a single triggered event:
+    # the first interaction of each event is set to triggered if any of its interactions triggered
+    return _deduplicate(triggered, np.array(fin['event_ids']))
 
-        for int_index in multiple_interaction_indexes[1:]:
-            triggered[int_index] = False
-        triggered[multiple_interaction_indexes[0]] = True
 
-    return triggered
+def _group_events(event_ids):
+    """
+    groups the interactions by their event id (via sorting)
+
+    Returns
+    -------
+    first: array of ints
+        the index of the first interaction of each event
+    inverse: array of ints
+        the event (index into `first`) of each interaction
+    """
+    unique_ids, first, inverse = np.unique(event_ids, return_index=True, return_inverse=True)
+    return first, inverse
+
+
+def _deduplicate(triggered, event_ids):
+    """
+    returns a copy of `triggered` where only the first interaction of each event is triggered, if any of the
+    interactions of the event triggered
+    """
+    first, inverse = _group_events(event_ids)
+    triggered_events = np.bincount(inverse, weights=triggered, minlength=len(first)) > 0
+    deduplicated = np.zeros_like(triggered)
+    deduplicated[first[triggered_events]] = True
+    return deduplicated
 
 
 def get_Aeff_proposal(folder, trigger_combinations={}, station=101):
@@ -179,8 +199,9 @@ def get_Aeff_proposal(folder, trigger_combinations={}, station=101):
             for trigger_name, values in iteritems(trigger_combinations):
                 out['Aeffs'][trigger_name] = [0, 0, 0]
         else:
+            file_trigger_names, masks = trigger_masks.read(fin)
             for iT, trigger_name in enumerate(trigger_names):
-                triggered = np.array(fin['multiple_triggers'][:, iT], dtype=np.bool)
+                triggered = trigger_masks.evaluate(masks, file_trigger_names, trigger_name)
                 Aeff = proj_area * np.sum(weights[triggered]) / n_events
                 Aeff_error = 0
                 if(np.sum(weights[triggered]) > 0):
@@ -188,27 +209,12 @@ def get_Aeff_proposal(folder, trigger_combinations={}, station=101):
                 out['Aeffs'][trigger_name] = [Aeff, Aeff_error, np.sum(weights[triggered])]
 
             for trigger_name, values in iteritems(trigger_combinations):
-                indiv_triggers = values['triggers']
-                triggered = np.zeros_like(fin['multiple_triggers'][:, 0], dtype=np.bool)
-                if(isinstance(indiv_triggers, str)):
-                    triggered = triggered | np.array(fin['multiple_triggers'][:, trigger_names_dict[indiv_triggers]], dtype=np.bool)
-                else:
-                    for indiv_trigger in indiv_triggers:
-                        triggered = triggered | np.array(fin['multiple_triggers'][:, trigger_names_dict[indiv_trigger]], dtype=np.bool)
-                if 'triggerAND' in values:
-                    triggered = triggered & np.array(fin['multiple_triggers'][:, trigger_names_dict[values['triggerAND']]], dtype=np.bool)
-                if 'notriggers' in values:
-                    indiv_triggers = values['notriggers']
-                    if(isinstance(indiv_triggers, str)):
-                        triggered = triggered & ~np.array(fin['multiple_triggers'][:, trigger_names_dict[indiv_triggers]], dtype=np.bool)
-                    else:
-                        for indiv_trigger in indiv_triggers:
-                            triggered = triggered & ~np.array(fin['multiple_triggers'][:, trigger_names_dict[indiv_trigger]], dtype=np.bool)
+                triggered = trigger_masks.evaluate(masks, file_trigger_names, values['triggers'], values.get('triggerAND'), values.get('notriggers'))
                 if('min_sigma' in values.keys()):
                     if(isinstance(values['min_sigma'], list)):
-                        if(trigger_name not in out['SNR']):
-                            out['SNR'][trigger_name] = {}
-                        masks = np.zeros_like(triggered)
+                        if(trigger_name not in out['SNRs']):
+                            out['SNRs'][trigger_name] = {}
+                        sigma_mask = np.zeros_like(triggered)
                         for iS in range(len(values['min_sigma'])):
     #                         As = np.array(fin['maximum_amplitudes'])
                             As = np.max(np.nan_to_num(fin['max_amp_ray_solution']), axis=-1)  # we use the this quantity because it is always computed before noise is added!
@@ -216,9 +222,9 @@ def get_Aeff_proposal(folder, trigger_combinations={}, station=101):
                             # the smallest of the three largest amplitudes
                             max_amplitude = As_sorted[:, -values['n_channels'][iS]]
                             mask = np.sum(As[:, values['channels'][iS]] >= (values['min_sigma'][iS] * Vrms), axis=1) >= values['n_channels'][iS]
-                            masks = masks | mask
-                            out['SNR'][trigger_name][iS] = max_amplitude[mask] / Vrms
-                        triggered = triggered & masks
+                            sigma_mask = sigma_mask | mask
+                            out['SNRs'][trigger_name][iS] = max_amplitude[mask] / Vrms
+                        triggered = triggered & sigma_mask
                     else:
                         As = np.max(np.nan_to_num(fin['max_amp_ray_solution']), axis=-1)  # we use the this quantity because it is always computed before noise is added!
 
@@ -226,7 +232,7 @@ def get_Aeff_proposal(folder, trigger_combinations={}, station=101):
                         max_amplitude = As_sorted[:, -values['n_channels']]  # the smallest of the three largest amplitudes
                         mask = np.sum(As[:, values['channels']] >= (values['min_sigma'] * Vrms), axis=1) >= values['n_channels']
 
-                        out['SNR'][trigger_name] = As_sorted[mask] / Vrms
+                        out['SNRs'][trigger_name] = As_sorted[mask] / Vrms
                         triggered = triggered & mask
                 if('ray_solution' in values.keys()):
                     As = np.array(fin['max_amp_ray_solution'])
@@ -252,6 +258,24 @@ def get_Aeff_proposal(folder, trigger_combinations={}, station=101):
     return Aeff_output
 
 
+def get_zenith_sampling_weights(zeniths, thetamin, thetamax, R, d):
+    """
+    calculates a correction to the weight to go from a zenith distribution proportional from
+    theta ~ sin(theta) to an isotropic flux, i.e., the same number of events for the same
+    projected area perpendicular to the incoming direction.
+
+    """
+    zeniths = np.array(zeniths)
+    yy = get_projected_area_cylinder(zeniths, R, d)
+    # calculate the average value of Aproj within the zenith band -> int(Aproc(theta) dcostheta)/int(1, dcostheta)
+    norm = get_projected_area_cylinder_integral(thetamax, R, d) - get_projected_area_cylinder_integral(thetamin, R, d)  # int(Aproc(theta) dcostheta)
+    norm /= (np.cos(thetamin) - np.cos(thetamax))  # int(1, dcostheta)
+    weights = yy / norm
+    if(len(weights)):
+        logger.debug(f"{thetamin/units.deg:.0f} - {thetamax/units.deg:.0f}: average correction factor {weights.mean():.2f} max = {weights.max():.2f} min = {weights.min():.2f}")
+    return weights
+
+
 def get_Veff_water_equivalent(Veff, density_medium=0.917 * units.g / units.cm ** 3, density_water=1 * units.g / units.cm ** 3):
     """
     convenience function to converte the effective volume of a medium with density `density_medium` to the
@@ -271,6 +295,43 @@ def get_Veff_water_equivalent(Veff, density_medium=0.917 * units.g / units.cm **
     return Veff * density_medium / density_water
 
 
+def get_Veff_and_uncertainty(V, n_events, weights, sampling_weights=None, efficiency=None):
+    """
+    calculates the effective volume and its statistical uncertainty from the triggered events
+
+    Parameters
+    ----------
+    V: float
+        the simulated volume
+    n_events: float
+        the number of simulated events
+    weights: array of floats
+        the weights (survival probabilities) of the triggered events
+    sampling_weights: array of floats or None
+        the sampling weights of the triggered events (if the vertex positions were drawn with importance sampling,
+        see `NuRadioMC.EvtGen.generator.draw_vertices_importance_sampling`)
+    efficiency: array of floats or None
+        the signal efficiency of the triggered events
+
+    Returns
+    -------
+    [Veff, Veff uncertainty, weighted sum of triggered events]
+    """
+    if(sampling_weights is None):
+        sampling_weights = np.ones_like(weights)
+    weight_sum = np.sum(weights * sampling_weights)
+    if(efficiency is None):
+        Veff = V * weight_sum / n_events
+    else:
+        Veff = V * np.sum(weights * sampling_weights * efficiency) / n_events
+    Veff_error = 0
+    if(weight_sum > 0):
+        # the effective number of triggered events equals the sum of the weights without importance sampling
+        n_effective = weight_sum ** 2 / np.sum(weights * sampling_weights ** 2)
+        Veff_error = Veff / n_effective ** 0.5
+    return [Veff, Veff_error, weight_sum]
+
+
 def get_Veff(folder,
              trigger_combinations={},
              station=101,
@@ -361,6 +422,10 @@ def get_Veff(folder,
         out['energy'] = E
 
         weights = np.array(fin['weights'])
+        # the vertex positions might have been drawn with importance sampling
+        sampling_weights = np.ones_like(weights)
+        if('sampling_weights' in fin):
+            sampling_weights = np.array(fin['sampling_weights'])
         # triggered = np.array(fin['triggered'])
         triggered = get_triggered(fin)
         n_events = fin.attrs['n_events']
@@ -404,24 +469,7 @@ def get_Veff(folder,
 
         if(correct_zenith_sampling):
             if(len(weights) > 0):
-
-                def get_weights(zeniths, thetamin, thetamax, R, d):
-                    """
-                    calculates a correction to the weight to go from a zenith distribution proportional from
-                    theta ~ sin(theta) to an isotropic flux, i.e., the same number of events for the same
-                    projected area perpendicular to the incoming direction.
-
-                    """
-                    zeniths = np.array(zeniths)
-                    yy = get_projected_area_cylinder(zeniths, R, d)
-                    # calculate the average value of Aproj within the zenith band -> int(Aproc(theta) dcostheta)/int(1, dcostheta)
-                    norm = get_projected_area_cylinder_integral(thetamax, R, d) - get_projected_area_cylinder_integral(thetamin, R, d)  # int(Aproc(theta) dcostheta)
-                    norm /= (np.cos(thetamin) - np.cos(thetamax))  # int(1, dcostheta)
-                    weights = yy / norm
-                    logger.debug(f"{thetamin/units.deg:.0f} - {thetamax/units.deg:.0f}: average correction factor {weights.mean():.2f} max = {weights.max():.2f} min = {weights.min():.2f}")
-                    return weights
-
-                weights *= get_weights(fin['zeniths'], thetamin, thetamax, rmax, dZ)
+                weights *= get_zenith_sampling_weights(fin['zeniths'], thetamin, thetamax, rmax, dZ)
 
         # Solid angle needed for the effective volume calculations
         out['domega'] = np.abs(phimax - phimin) * np.abs(np.cos(thetamin) - np.cos(thetamax))
@@ -438,45 +486,27 @@ def get_Veff(folder,
             for trigger_name, values in iteritems(trigger_combinations):
                 out['Veffs'][trigger_name] = [0, 0, 0]
         else:
+            file_trigger_names, masks = trigger_masks.read(fin)
             for iT, trigger_name in enumerate(trigger_names):
-                triggered = np.array(fin['multiple_triggers'][:, iT], dtype=np.bool)
-                Veff = V * np.sum(weights[triggered]) / n_events
-                Veff_error = 0
-                if(np.sum(weights[triggered]) > 0):
-                    Veff_error = Veff / np.sum(weights[triggered]) ** 0.5
-                out['Veffs'][trigger_name] = [Veff, Veff_error, np.sum(weights[triggered])]
+                triggered = trigger_masks.evaluate(masks, file_trigger_names, trigger_name)
+                out['Veffs'][trigger_name] = get_Veff_and_uncertainty(V, n_events, weights[triggered], sampling_weights[triggered])
 
             for trigger_name, values in iteritems(trigger_combinations):
-                indiv_triggers = values['triggers']
-                triggered = np.zeros_like(fin['multiple_triggers'][:, 0], dtype=np.bool)
-                if(isinstance(indiv_triggers, str)):
-                    triggered = triggered | np.array(fin['multiple_triggers'][:, trigger_names_dict[indiv_triggers]], dtype=np.bool)
-                else:
-                    for indiv_trigger in indiv_triggers:
-                        triggered = triggered | np.array(fin['multiple_triggers'][:, trigger_names_dict[indiv_trigger]], dtype=np.bool)
-                if 'triggerAND' in values:
-                    triggered = triggered & np.array(fin['multiple_triggers'][:, trigger_names_dict[values['triggerAND']]], dtype=np.bool)
-                if 'notriggers' in values:
-                    indiv_triggers = values['notriggers']
-                    if(isinstance(indiv_triggers, str)):
-                        triggered = triggered & ~np.array(fin['multiple_triggers'][:, trigger_names_dict[indiv_triggers]], dtype=np.bool)
-                    else:
-                        for indiv_trigger in indiv_triggers:
-                            triggered = triggered & ~np.array(fin['multiple_triggers'][:, trigger_names_dict[indiv_trigger]], dtype=np.bool)
+                triggered = trigger_masks.evaluate(masks, file_trigger_names, values['triggers'], values.get('triggerAND'), values.get('notriggers'))
                 if('min_sigma' in values.keys()):
                     if(isinstance(values['min_sigma'], list)):
-                        if(trigger_name not in out['SNR']):
-                            out['SNR'][trigger_name] = {}
-                        masks = np.zeros_like(triggered)
+                        if(trigger_name not in out['SNRs']):
+                            out['SNRs'][trigger_name] = {}
+                        sigma_mask = np.zeros_like(triggered)
                         for iS in range(len(values['min_sigma'])):
                             As = np.max(np.nan_to_num(fin['max_amp_ray_solution']), axis=-1)  # we use the this quantity because it is always computed before noise is added!
                             As_sorted = np.sort(As[:, values['channels'][iS]], axis=1)
                             # the smallest of the three largest amplitudes
                             max_amplitude = As_sorted[:, -values['n_channels'][iS]]
                             mask = np.sum(As[:, values['channels'][iS]] >= (values['min_sigma'][iS] * Vrms), axis=1) >= values['n_channels'][iS]
-                            masks = masks | mask
-                            out['SNR'][trigger_name][iS] = max_amplitude[mask] / Vrms
-                        triggered = triggered & masks
+                            sigma_mask = sigma_mask | mask
+                            out['SNRs'][trigger_name][iS] = max_amplitude[mask] / Vrms
+                        triggered = triggered & sigma_mask
                     else:
                         As = np.max(np.nan_to_num(fin['max_amp_ray_solution']), axis=-1)  # we use the this quantity because it is always computed before noise is added!
 
@@ -484,7 +514,7 @@ def get_Veff(folder,
                         max_amplitude = As_sorted[:, -values['n_channels']]  # the smallest of the three largest amplitudes
 
                         mask = np.sum(As[:, values['channels']] >= (values['min_sigma'] * Vrms), axis=1) >= values['n_channels']
-                        out['SNR'][trigger_name] = As_sorted[mask] / Vrms
+                        out['SNRs'][trigger_name] = As_sorted[mask] / Vrms
                         triggered = triggered & mask
                 if('ray_solution' in values.keys()):
                     As = np.array(fin['max_amp_ray_solution'])
@@ -501,21 +531,396 @@ def get_Veff(folder,
                         # advanced indexing: selects the ray tracing solution per event with the highest amplitude
                         triggered = triggered & (np.array(fin[f'station_{station:d}/ray_tracing_reflection'])[..., max_amps, 0][:, 0] == values['n_reflections'])
 
-                Veff = V * np.sum(weights[triggered]) / n_events
-
+                e = None
                 if('efficiency' in values.keys()):
                     SNReff, eff = np.loadtxt("analysis_efficiency_{}.csv".format(values['efficiency']), delimiter=",", unpack=True)
                     get_eff = interpolate.interp1d(SNReff, eff, bounds_error=False, fill_value=(0, eff[-1]))
                     As = np.max(np.max(np.nan_to_num(fin['max_amp_ray_solution']), axis=-1)[:, np.append(range(0, 8), range(12, 20))], axis=-1)  # we use the this quantity because it is always computed before noise is added!
                     if('efficiency_scale' in values.keys()):
                         As *= values['efficiency_scale']
-                    e = get_eff(As / Vrms)
-                    Veff = V * np.sum((weights * e)[triggered]) / n_events
+                    e = get_eff(As / Vrms)[triggered]
 
-                Vefferror = 0
-                if(np.sum(weights[triggered]) > 0):
-                    Vefferror = Veff / np.sum(weights[triggered]) ** 0.5
-                out['Veffs'][trigger_name] = [Veff, Vefferror, np.sum(weights[triggered])]
+                out['Veffs'][trigger_name] = get_Veff_and_uncertainty(V, n_events, weights[triggered], sampling_weights[triggered], e)
+        Veff_output.append(out)
+
+    return Veff_output
+
+
+# version of the per-file Veff summaries, summaries of other versions are recreated
+summary_version = 3
+
+# the keys of trigger combinations that can be calculated from the individual triggers stored in the summary
+_simple_combination_keys = {'triggers', 'triggerAND', 'notriggers'}
+
+# the attributes of the hdf5 files that are needed for the effective volume calculation
+_summary_attributes = ['Emin', 'Emax', 'rmin', 'rmax', 'zmin', 'zmax', 'thetamin', 'thetamax', 'n_events', 'Vrms', 'deposited']
+
+
+def get_summary_filename(filename):
+    """
+    returns the filename of the Veff summary (sidecar file) of a NuRadioMC hdf5 file
+    """
+    return os.path.splitext(filename)[0] + ".veff_summary.pkl"
+
+
+def _get_combination_key(values, station):
+    """
+    returns a unique string of a trigger combination (used to store the combinations in the summaries)
+    """
+    return json.dumps([values, station], sort_keys=True, default=str)
+
+
+def _get_combination_mask(multiple_triggers, trigger_names_dict, values):
+    """
+    returns the interactions that fulfill the 'triggers', 'triggerAND' and 'notriggers' conditions of a trigger combination
+    """
+
+    def get_or(triggers):
+        if(isinstance(triggers, str)):
+            triggers = [triggers]
+        mask = np.zeros(len(multiple_triggers), dtype=bool)
+        for trigger in triggers:
+            if(trigger in trigger_names_dict):  # unavailable triggers are ignored
+                mask |= multiple_triggers[:, trigger_names_dict[trigger]]
+        return mask
+
+    triggered = get_or(values['triggers'])
+    if 'triggerAND' in values:
+        triggered &= multiple_triggers[:, trigger_names_dict[values['triggerAND']]]
+    if 'notriggers' in values:
+        triggered &= ~get_or(values['notriggers'])
+    return triggered
+
+
+def _get_advanced_combination(fin, multiple_triggers, trigger_names_dict, values, station):
+    """
+    evaluates a trigger combination with additional conditions ('min_sigma', 'ray_solution', 'n_reflections',
+    'efficiency') that need other data sets of the hdf5 file (same definition as in `get_Veff`)
+
+    Returns
+    -------
+    triggered: array of bools
+        the triggered interactions
+    efficiency: array of floats or None
+        the signal efficiency of each interaction (only if 'efficiency' is set)
+    """
+    triggered = _get_combination_mask(multiple_triggers, trigger_names_dict, values)
+    Vrms = fin.attrs['Vrms']
+    if('min_sigma' in values.keys()):
+        As = np.max(np.nan_to_num(fin['max_amp_ray_solution']), axis=-1)  # we use the this quantity because it is always computed before noise is added!
+        if(isinstance(values['min_sigma'], list)):
+            sigma_mask = np.zeros_like(triggered)
+            for iS in range(len(values['min_sigma'])):
+                sigma_mask = sigma_mask | (np.sum(As[:, values['channels'][iS]] >= (values['min_sigma'][iS] * Vrms), axis=1) >= values['n_channels'][iS])
+            triggered = triggered & sigma_mask
+        else:
+            triggered = triggered & (np.sum(As[:, values['channels']] >= (values['min_sigma'] * Vrms), axis=1) >= values['n_channels'])
+    if('ray_solution' in values.keys()):
+        As = np.array(fin['max_amp_ray_solution'])
+        max_amps = np.argmax(As[:, values['ray_channel']], axis=-1)
+        sol = np.array(fin['ray_tracing_solution_type'])
+        triggered = triggered & (sol[np.arange(len(max_amps)), values['ray_channel'], max_amps] == values['ray_solution'])
+    if('n_reflections' in values.keys()):
+        if(np.sum(triggered)):
+            As = np.array(fin[f'station_{station:d}/max_amp_ray_solution'])
+            # find the ray tracing solution that produces the largest amplitude
+            max_amps = np.argmax(np.argmax(As[:, :], axis=-1), axis=-1)
+            # advanced indexing: selects the ray tracing solution per event with the highest amplitude
+            triggered = triggered & (np.array(fin[f'station_{station:d}/ray_tracing_reflection'])[..., max_amps, 0][:, 0] == values['n_reflections'])
+    efficiency = None
+    if('efficiency' in values.keys()):
+        SNReff, eff = np.loadtxt("analysis_efficiency_{}.csv".format(values['efficiency']), delimiter=",", unpack=True)
+        get_eff = interpolate.interp1d(SNReff, eff, bounds_error=False, fill_value=(0, eff[-1]))
+        As = np.max(np.max(np.nan_to_num(fin['max_amp_ray_solution']), axis=-1)[:, np.append(range(0, 8), range(12, 20))], axis=-1)  # we use the this quantity because it is always computed before noise is added!
+        if('efficiency_scale' in values.keys()):
+            As *= values['efficiency_scale']
+        efficiency = get_eff(As / Vrms)
+    return triggered, efficiency
+
+
+def _read_summary(filename):
+    """
+    returns the summary of a hdf5 file or None if the summary does not exist or is stale
+    """
+    summary_filename = get_summary_filename(filename)
+    if(not os.path.exists(summary_filename)):
+        return None
+    try:
+        with open(summary_filename, 'rb') as fin:
+            summary = pickle.load(fin)
+    except Exception:
+        logger.warning(f"could not read summary {summary_filename}")
+        return None
+    stat = os.stat(filename)
+    if(summary.get('version') != summary_version or summary.get('source') != (stat.st_size, stat.st_mtime_ns)):
+        return None
+    return summary
+
+
+def create_summary(filename, combinations=[], write=True):
+    """
+    reads a NuRadioMC hdf5 file once and creates the compact summary that is needed for the effective volume calculation
+
+    The summary contains the relevant attributes of the file and, for all interactions with at least one trigger,
+    the trigger masks (see `NuRadioMC.utilities.trigger_masks`) and the event they belong to. The weight and zenith angle are stored once per
+    event, i.e., multiple interactions of the same event (double bangs) are grouped by sorting the event ids.
+    Trigger combinations that depend on other data sets of the file (e.g. 'min_sigma') are evaluated and
+    stored in the summary.
+
+    Parameters
+    ----------
+    filename: string
+        the NuRadioMC hdf5 file
+    combinations: list of tuples
+        the (values, station) of the trigger combinations that need other data sets of the file, see `get_Veff`
+    write: bool
+        if True, the summary is stored next to the hdf5 file (see `get_summary_filename`)
+
+    Returns
+    -------
+    summary: dict
+    """
+    logger.info(f"reading {filename}")
+    stat = os.stat(filename)
+    with h5py.File(filename, 'r') as fin:
+        summary = {'version': summary_version, 'source': (stat.st_size, stat.st_mtime_ns)}
+        summary['attrs'] = {key: fin.attrs[key] for key in _summary_attributes if key in fin.attrs}
+        trigger_names = []
+        if('trigger_names' in fin.attrs):
+            trigger_names = [name.decode() if isinstance(name, bytes) else str(name) for name in fin.attrs['trigger_names']]
+        summary['trigger_names'] = trigger_names
+        n_interactions = 0
+        if('triggered' in fin):
+            n_interactions = len(fin['triggered'])
+        masks = trigger_masks.read(fin)[1]
+        if(len(masks) != n_interactions):
+            masks = np.zeros(n_interactions, dtype=np.uint64)
+        multiple_triggers = trigger_masks.unpack(masks, len(trigger_names))
+        indices = np.flatnonzero(np.any(multiple_triggers, axis=1))
+        event_ids = np.zeros(0, dtype=int)
+        weights = np.zeros(0)
+        sampling_weights = np.ones(len(indices))
+        zeniths = np.zeros(0)
+        if(n_interactions):
+            event_ids = np.array(fin['event_ids'])[indices]
+            weights = np.array(fin['weights'])[indices]
+            if('sampling_weights' in fin):
+                sampling_weights = np.array(fin['sampling_weights'])[indices]
+            zeniths = np.array(fin['zeniths'])[indices]
+        first, inverse = _group_events(event_ids)
+        summary['weights'] = weights[first]
+        summary['sampling_weights'] = sampling_weights[first]
+        summary['zeniths'] = zeniths[first]
+        summary['event_index'] = inverse
+        summary['triggers'] = masks[indices]
+        summary['combinations'] = {}
+        trigger_names_dict = {trigger_name: iT for iT, trigger_name in enumerate(trigger_names)}
+        for values, station in combinations:
+            triggered = np.zeros(len(indices), dtype=bool)
+            efficiency = None
+            if(len(indices)):
+                triggered, efficiency = _get_advanced_combination(fin, multiple_triggers, trigger_names_dict, values, station)
+                triggered = triggered[indices]
+                if(efficiency is not None):
+                    efficiency = efficiency[indices]
+            summary['combinations'][_get_combination_key(values, station)] = {'values': values, 'station': station,
+                                                                              'triggered': triggered, 'efficiency': efficiency}
+    if(write):
+        summary_filename = get_summary_filename(filename)
+        tmp_filename = "{}.{:d}.tmp".format(summary_filename, os.getpid())
+        with open(tmp_filename, 'wb') as fout:
+            pickle.dump(summary, fout, protocol=4)
+        os.replace(tmp_filename, summary_filename)
+    return summary
+
+
+def _create_summary(args):
+    return create_summary(*args)
+
+
+def _get_Veff_from_summary(weights, sampling_weights, event_index, triggered, V, n_events, efficiency=None):
+    """
+    calculates the effective volume from the triggered interactions of a summary, every event is counted once
+
+    Returns
+    -------
+    [Veff, Veff uncertainty, weighted sum of triggered events]
+    """
+    triggered_events = np.bincount(event_index, weights=triggered, minlength=len(weights)) > 0
+    event_efficiency = None
+    if(efficiency is not None):
+        # the largest efficiency of the triggered interactions of an event is used
+        event_efficiency = np.zeros(len(weights))
+        np.maximum.at(event_efficiency, event_index[triggered], efficiency[triggered])
+        event_efficiency = event_efficiency[triggered_events]
+    return get_Veff_and_uncertainty(V, n_events, weights[triggered_events], sampling_weights[triggered_events], event_efficiency)
+
+
+def get_Veff_parallel(folder,
+                      trigger_combinations={},
+                      station=101,
+                      correct_zenith_sampling=False,
+                      point_bins=True,
+                      n_cores=None,
+                      use_summaries=True):
+    """
+    calculates the effective volume from NuRadioMC hdf5 files in parallel and incrementally
+
+    Same as `get_Veff` (and with the same output), but every hdf5 file is read only once by a pool of `n_cores`
+    processes and condensed into a summary (see `create_summary`) that is stored next to the hdf5 file. In later calls,
+    the summaries are used instead of the hdf5 files. A file is only read again if its summary is stale, i.e., if the
+    hdf5 file was modified or if a trigger combination with additional conditions (e.g. 'min_sigma') was not evaluated
+    yet. Trigger combinations of individual triggers ('triggers', 'triggerAND', 'notriggers') are always calculated
+    from the summaries.
+
+    In contrast to `get_Veff`, multiple interactions of the same event (double bangs) are counted only once for all
+    triggers and trigger combinations. The SNR distributions of the 'min_sigma' combinations are not returned.
+
+    Parameters
+    ----------
+    folder: string
+        folder conaining the hdf5 files, one per energy
+    trigger_combinations: dict, optional
+        the trigger combinations, see `get_Veff`
+    station: int
+        the station that should be considered
+    correct_zenith_sampling: bool
+        if True, correct a zenith sampling from np.sin(zenith) to an isotropic flux for a cylindrical geometry
+    point_bins: bool
+        if True, the bins are expected to only have one energy. If False, the
+        centre of the interval in log scale is taken as the bin energy
+    n_cores: int or None
+        the number of processes that read the hdf5 files. If None, the number of CPUs is used.
+    use_summaries: bool
+        if False, all files are read again (and the summaries are updated)
+
+    Returns
+    ----------
+    list of dictionary. Each file is one entry. The dictionary keys store all relevant properties
+    """
+    filenames = sorted(glob.glob(os.path.join(folder, '*.hdf5')))
+    if(len(filenames) == 0):
+        raise FileNotFoundError(f"couldnt find any hdf5 file in folder {folder}")
+
+    advanced_combinations = [(values, station) for values in trigger_combinations.values()
+                             if not set(values.keys()) <= _simple_combination_keys]
+    summaries = [None] * len(filenames)
+    stale = []
+    for iF, filename in enumerate(filenames):
+        summary = None
+        if(use_summaries):
+            summary = _read_summary(filename)
+        if(summary is not None and all([_get_combination_key(*combination) in summary['combinations'] for combination in advanced_combinations])):
+            summaries[iF] = summary
+        else:
+            combinations = copy.copy(advanced_combinations)
+            if(summary is not None):
+                # the combinations that were evaluated before are kept in the summary
+                keys = [_get_combination_key(*combination) for combination in combinations]
+                for key, value in summary['combinations'].items():
+                    if(key not in keys):
+                        combinations.append((value['values'], value['station']))
+            stale.append((iF, (filename, combinations, True)))
+    logger.info(f"reading {len(stale)} of {len(filenames)} files, using the summaries of the other files")
+    if(len(stale) > 1 and n_cores != 1):
+        pool = multiprocessing.Pool(min(n_cores or multiprocessing.cpu_count(), len(stale)))
+        try:
+            results = pool.map(_create_summary, [args for iF, args in stale])
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_create_summary(args) for iF, args in stale]
+    for (iF, args), summary in zip(stale, results):
+        summaries[iF] = summary
+
+    # the trigger names are taken from the first file with triggers and need to be the same for all files with triggers
+    trigger_names = None
+    for filename, summary in zip(filenames, summaries):
+        if(len(summary['trigger_names']) == 0):
+            continue
+        if(trigger_names is None):
+            trigger_names = summary['trigger_names']
+        elif(trigger_names != summary['trigger_names']):
+            logger.error("file {} has inconsistent trigger names: {}".format(filename, summary['trigger_names']))
+            raise AttributeError("file {} has inconsistent trigger names: {}".format(filename, summary['trigger_names']))
+    if(trigger_names is None):
+        trigger_names = []
+    logger.info(f"Trigger names: {trigger_names}")
+
+    # the summaries store the combinations as requested (before unavailable triggers are removed)
+    trigger_combinations_input = trigger_combinations
+    trigger_combinations = copy.deepcopy(trigger_combinations)
+    trigger_combinations['all_triggers'] = {'triggers': trigger_names}
+    for key, values in trigger_combinations.items():
+        triggers = values['triggers']
+        if(isinstance(triggers, str)):
+            triggers = [triggers]
+        for value in triggers:
+            if value not in trigger_names:
+                logger.warning(f"trigger {value} not available, removing this trigger from the trigger combination {key}")
+        values['triggers'] = [value for value in triggers if value in trigger_names]
+
+    Veff_output = []
+    prev_deposited = None
+    for filename, summary in zip(filenames, summaries):
+        attrs = summary['attrs']
+        deposited = False
+        if 'deposited' in attrs:
+            deposited = attrs['deposited']
+            if prev_deposited is None:
+                prev_deposited = deposited
+            elif prev_deposited != deposited:
+                raise AttributeError("The deposited parameter is not consistent among the input files!")
+        out = {}
+        if point_bins:
+            E = attrs['Emin']
+            if(attrs['Emax'] != E):
+                raise AttributeError("min and max energy do not match!")
+        else:
+            E = 10 ** (0.5 * (np.log10(attrs['Emin']) + np.log10(attrs['Emax'])))
+        out['energy'] = E
+
+        rmax = attrs['rmax']
+        thetamin = attrs.get('thetamin', 0)
+        thetamax = attrs.get('thetamax', np.pi)
+        phimin = 0
+        phimax = 2 * np.pi
+        dZ = attrs['zmax'] - attrs['zmin']
+        V = np.pi * (rmax ** 2 - attrs['rmin'] ** 2) * dZ
+        out['Aproj'] = get_projected_area_cylinder_integral(thetamax, R=rmax, d=dZ) - get_projected_area_cylinder_integral(thetamin, R=rmax, d=dZ)
+        out['domega'] = np.abs(phimax - phimin) * np.abs(np.cos(thetamin) - np.cos(thetamax))
+        out['thetamin'] = thetamin
+        out['thetamax'] = thetamax
+        out['deposited'] = deposited
+        out['Veffs'] = {}
+        out['n_triggered_weighted'] = {}
+        out['SNRs'] = {}
+
+        weights = summary['weights']
+        sampling_weights = summary['sampling_weights']
+        if(correct_zenith_sampling and len(weights) > 0):
+            weights = weights * get_zenith_sampling_weights(summary['zeniths'], thetamin, thetamax, rmax, dZ)
+        event_index = summary['event_index']
+        n_events = attrs['n_events']
+        multiple_triggers = trigger_masks.unpack(summary['triggers'], len(summary['trigger_names']))
+        trigger_names_dict = {trigger_name: iT for iT, trigger_name in enumerate(summary['trigger_names'])}
+        if(len(event_index) == 0):
+            for trigger_name in trigger_names:
+                out['Veffs'][trigger_name] = [0, 0, 0]
+            for trigger_name in trigger_combinations:
+                out['Veffs'][trigger_name] = [0, 0, 0]
+        else:
+            for iT, trigger_name in enumerate(trigger_names):
+                out['Veffs'][trigger_name] = _get_Veff_from_summary(weights, sampling_weights, event_index, multiple_triggers[:, iT], V, n_events)
+            for trigger_name, values in trigger_combinations.items():
+                if(set(values.keys()) <= _simple_combination_keys):
+                    triggered = _get_combination_mask(multiple_triggers, trigger_names_dict, values)
+                    out['Veffs'][trigger_name] = _get_Veff_from_summary(weights, sampling_weights, event_index, triggered, V, n_events)
+                else:
+                    combination = summary['combinations'][_get_combination_key(trigger_combinations_input[trigger_name], station)]
+                    out['Veffs'][trigger_name] = _get_Veff_from_summary(weights, sampling_weights, event_index, combination['triggered'], V, n_events,
+                                                                        efficiency=combination['efficiency'])
         Veff_output.append(out)
 
     return Veff_output
@@ -0,0 +1,203 @@
+"""
+integer-coded representation of the string columns of the NuRadioMC hdf5 files
+
+String columns with few distinct values (e.g. the 'interaction_type' of the events) are stored as an hdf5 enum data
+set of small integer codes, the category names are stored in the enum type and, as list of strings, in the attribute
+'categories' of the data set. All (vectorized) operations of the simulation work on the integer codes, the strings are
+only needed to present the values to the user. Files with the old layout (data sets of strings) are converted on
+reading.
+"""
+
+import numpy as np
+import h5py
+import logging
+logger = logging.getLogger("categorical")
+
+# the categories that always have the same code, new categories are appended to this list
+default_categories = {'interaction_type': ['cc', 'nc', 'had', 'em']}
+
+# the name of the empty string in the hdf5 enum type (hdf5 does not allow empty names)
+_empty_name = "''"
+
+
+def _to_str(value):
+    if(isinstance(value, bytes)):
+        return value.decode('utf8')
+    return str(value)
+
+
+def get_dtype(categories):
+    """
+    returns the (h5py enum) data type of the codes of the categories
+    """
+    basetype = 'i1' if len(categories) <= np.iinfo(np.int8).max + 1 else 'i2'
+    return h5py.enum_dtype({(category if category != '' else _empty_name): code for code, category in enumerate(categories)},
+                           basetype=basetype)
+
+
+def get_categories(codes):
+    """
+    returns the categories of an array (or data set) of codes, None if the data type has no categories
+    """
+    mapping = h5py.check_enum_dtype(codes.dtype)
+    if(mapping is None):
+        return None
+    categories = [None] * len(mapping)
+    for name, code in mapping.items():
+        categories[code] = name if name != _empty_name else ''
+    return categories
+
+
+def is_categorical(values):
+    """
+    returns True if the array (or data set) is stored as integer codes
+    """
+    return h5py.check_enum_dtype(values.dtype) is not None
+
+
+def encode(values, categories=None):
+    """
+    converts an array of strings (unicode or bytes) into integer codes
+
+    Parameters
+    ----------
+    values: array of strings
+        the values
+    categories: list of strings or None
+        the categories that are assigned the first codes (in this order), values that are not in this list are
+        appended in alphabetical order
+
+    Returns
+    -------
+    codes: array of ints
+        the codes, the categories are stored in the data type (see `get_categories`)
+    """
+    values = np.asarray(values)
+    if(values.dtype.kind == 'S'):
+        values = np.char.decode(values, 'utf8')
+    elif(values.dtype.kind == 'O'):
+        values = np.array([_to_str(value) for value in values.ravel()], dtype='U').reshape(values.shape)
+    elif(values.dtype.kind != 'U'):
+        values = values.astype('str')
+    categories = [] if categories is None else [_to_str(category) for category in categories]
+    unique_values, inverse = np.unique(values, return_inverse=True)
+    for value in unique_values:
+        if(value not in categories):
+            categories.append(str(value))
+    lookup = np.array([categories.index(value) for value in unique_values], dtype=int)
+    return lookup[inverse].reshape(values.shape).astype(get_dtype(categories))
+
+
+def decode(codes, categories=None):
+    """
+    converts integer codes into an array of (unicode) strings
+
+    Parameters
+    ----------
+    codes: array of ints
+        the codes
+    categories: list of strings or None
+        the categories of the codes, if None the categories of the data type of the codes are used
+    """
+    if(categories is None):
+        categories = get_categories(codes)
+    return np.array([_to_str(category) for category in categories], dtype='U')[np.asarray(codes, dtype=int)]
+
+
+def remap(codes, categories, new_categories):
+    """
+    converts codes to another list of categories
+
+    Parameters
+    ----------
+    codes: array of ints
+        the codes
+    categories: list of strings
+        the categories of the codes
+    new_categories: list of strings
+        the new categories, needs to contain all categories of the codes
+
+    Returns
+    -------
+    codes: array of ints
+    """
+    categories = [_to_str(category) for category in categories]
+    new_categories = [_to_str(category) for category in new_categories]
+    lookup = np.array([new_categories.index(category) for category in categories], dtype=int)
+    return lookup[np.asarray(codes, dtype=int)].astype(get_dtype(new_categories))
+
+
+def merge_categories(categories_list):
+    """
+    returns the union of several lists of categories (the first list keeps its order)
+    """
+    merged = []
+    for categories in categories_list:
+        for category in categories:
+            if(_to_str(category) not in merged):
+                merged.append(_to_str(category))
+    return merged
+
+
+def write(group, key, values, categories=None, **kwargs):
+    """
+    writes a categorical data set
+
+    Parameters
+    ----------
+    group: h5py.File or h5py.Group
+        the group the data set is created in
+    key: string
+        the name of the data set
+    values: array of strings or array of codes
+        the values as strings or as codes (if `values` are codes without categories in their data type, `categories`
+        is required)
+    categories: list of strings or None
+        the categories, if None the categories of the codes or the default categories of the key are used
+    kwargs:
+        passed to `create_dataset`, e.g. the compression
+    """
+    values = np.asarray(values)
+    if(values.dtype.kind in ['U', 'S', 'O']):
+        codes = encode(values, default_categories.get(key, None) if categories is None else categories)
+    elif(categories is not None):
+        codes = np.asarray(values).astype(get_dtype(categories))
+    elif(is_categorical(values)):
+        codes = values
+    else:
+        raise ValueError(f"the categories of the codes of data set {key} are unknown")
+    categories = get_categories(codes)
+    group.create_dataset(key, data=codes, dtype=codes.dtype, **kwargs)
+    group[key].attrs['categories'] = np.array(categories, dtype=h5py.string_dtype())
+
+
+def read(group, key):
+    """
+    reads a categorical data set as integer codes (data sets of strings are converted)
+
+    Parameters
+    ----------
+    group: h5py.File or h5py.Group
+        the group that contains the data set
+    key: string
+        the name of the data set
+
+    Returns
+    -------
+    codes: array of ints
+        the codes, the categories are stored in the data type (see `get_categories`)
+    """
+    dataset = group[key]
+    if(is_categorical(dataset)):
+        return np.array(dataset)
+    if('categories' in dataset.attrs):
+        return np.array(dataset).astype(get_dtype([_to_str(category) for category in dataset.attrs['categories']]))
+    logger.debug(f"converting data set {key} of strings into integer codes")
+    return encode(np.array(dataset), default_categories.get(key, None))
+
+
+def read_strings(group, key):
+    """
+    reads a categorical data set (or a data set of strings) as array of (unicode) strings
+    """
+    return decode(read(group, key))
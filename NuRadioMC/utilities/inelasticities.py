@@ -51,15 +51,8 @@ def get_ccnc(n_events):
     """
 
     rnd = np.random.uniform(0., 1., n_events)
-    ccnc = []
-    for i, r in enumerate(rnd):
-        #    if (r <= 0.6865254):#from AraSim
-        if(r <= 0.7064):
-            ccnc.append('cc')
-        else:
-            ccnc.append('nc')
-
-    return np.array(ccnc)
+    #    if (r <= 0.6865254):#from AraSim
+    return np.where(rnd <= 0.7064, 'cc', 'nc')
 
 def random_tau_branch():
     """
@@ -5,6 +5,8 @@ import numpy as np
 from collections import OrderedDict
 import h5py
 import argparse
+from NuRadioMC.utilities import trigger_masks
+from NuRadioMC.utilities import categorical
 import logging
 logger = logging.getLogger("HDF5-merger")
 logging.basicConfig(level=logging.DEBUG)
@@ -20,6 +22,8 @@ def merge2(filenames, output_filename):
     n_groups = {}
     non_empty_filenames = []
     n_events_total = 0
+    trigger_names = {}
+    categorical_keys = set()
 
     for f in filenames:
         logger.info("adding file {}".format(f))
@@ -35,6 +39,9 @@ def merge2(filenames, output_filename):
 
         data[f] = {}
         groups[f] = {}
+        trigger_names[f] = []
+        if('trigger_names' in fin.attrs):
+            trigger_names[f] = trigger_masks.decode_trigger_names(fin.attrs['trigger_names'])
 
         for key in fin:
             if isinstance(fin[key], h5py._hl.group.Group):
@@ -55,7 +62,12 @@ def merge2(filenames, output_filename):
                         if(not np.all(group_attrs[key][key2] == fin[key].attrs[key2])):
                             logger.warning(f"attribute {key2} of group {key} of file {filenames[0]} and {f} are different ({group_attrs[key][key2]} vs. {fin[key].attrs[key2]}. Using attribute value of first file, but you have been warned!")
             else:
-                data[f][key] = fin[key][...]
+                if(fin[key].dtype.kind in ['S', 'U'] or categorical.is_categorical(fin[key])):
+                    # string columns are merged as integer codes
+                    data[f][key] = categorical.read(fin, key)
+                    categorical_keys.add(key)
+                else:
+                    data[f][key] = fin[key][...]
                 if(key not in n_data):
                     n_data[key] = 0
                 n_data[key] += len(data[f][key])
@@ -74,6 +86,21 @@ def merge2(filenames, output_filename):
                 attrs['trigger_names'] = fin.attrs['trigger_names']
         fin.close()
 
+    # the bits of the trigger masks of all files are converted to the trigger names of the merged file
+    if('trigger_names' in attrs):
+        merged_trigger_names = trigger_masks.decode_trigger_names(attrs['trigger_names'])
+        for f in non_empty_filenames:
+            for d in [data[f]] + list(groups[f].values()):
+                if('multiple_triggers_mask' in d):
+                    d['multiple_triggers_mask'] = trigger_masks.remap(d['multiple_triggers_mask'], trigger_names[f], merged_trigger_names)
+
+    # the codes of all files are converted to the categories of the merged file
+    for key in categorical_keys:
+        merged_categories = categorical.merge_categories([categorical.get_categories(data[f][key]) for f in non_empty_filenames if key in data[f]])
+        for f in non_empty_filenames:
+            if(key in data[f]):
+                data[f][key] = categorical.remap(data[f][key], categorical.get_categories(data[f][key]), merged_categories)
+
     # create data sets
     logger.info("creating data sets")
     fout = h5py.File(output_filename, 'w')
@@ -99,8 +126,11 @@ def merge2(filenames, output_filename):
                 tmp[i:(i + len(data[f][key]))] = data[f][key]
                 i += len(data[f][key])
 
-            fout.create_dataset(key, tmp.shape, dtype=tmp.dtype,
-                                compression='gzip')[...] = tmp
+            if(key in categorical_keys):
+                categorical.write(fout, key, tmp, compression='gzip')
+            else:
+                fout.create_dataset(key, tmp.shape, dtype=tmp.dtype,
+                                    compression='gzip')[...] = tmp
 
         keys = groups[non_empty_filenames[0]]
         for key in keys:
@@ -136,26 +166,7 @@ def merge2(filenames, output_filename):
         for key in attrs:
             fout.attrs[key] = attrs[key]
     else:  # now handle the case
-        logger.warning("All files are empty. Copying content of first file to output file and keepting track of total number of simulated events.")
-        # all files are empty, so just copy the content of the first file (attributes and empyt data sets) to the output file
-        # update n_events attribute with the total number of events
-        fin = h5py.File(filenames[0], 'r')
-        for key in fin.attrs:
-            if(key == "n_events"):
-                fout.attrs[key] = n_events_total
-            else:
-                fout.attrs[key] = fin.attrs[key]
-        for key in fin:
-            if isinstance(fin[key], h5py._hl.group.Group):
-                g = fout.create_group(key)
-                for key2 in fin[key]:
-                    g.create_dataset(key2, fin[key][key2].shape, dtype=fin[key][key2].dtype,
-                                     compression='gzip')[...] = fin[key][key2]
-                for key2 in fin[key].attrs:
-                    g.attrs[key2] = fin[key].attrs[key2]
-            else:
-                fout.create_dataset(key, fin[key].shape, dtype=fin[key].dtype,
-                                    compression='gzip')[...] = fin[key]
+        _copy_empty_file(filenames[0], fout, n_events_total)
 
 #     # save all data to hdf5
 #     for key in data[filenames[0]]:
@@ -181,6 +192,166 @@ def merge2(filenames, output_filename):
     fout.close()
 
 
+def _copy_empty_file(filename, fout, n_events_total):
+    """
+    copies the content of a file without triggered events into the (open) output file and sets the total number of events
+    """
+    logger.warning("All files are empty. Copying content of first file to output file and keepting track of total number of simulated events.")
+    # all files are empty, so just copy the content of the first file (attributes and empyt data sets) to the output file
+    # update n_events attribute with the total number of events
+    fin = h5py.File(filename, 'r')
+    for key in fin.attrs:
+        if(key == "n_events"):
+            fout.attrs[key] = n_events_total
+        else:
+            fout.attrs[key] = fin.attrs[key]
+    for key in fin:
+        if isinstance(fin[key], h5py._hl.group.Group):
+            g = fout.create_group(key)
+            for key2 in fin[key]:
+                g.create_dataset(key2, fin[key][key2].shape, dtype=fin[key][key2].dtype,
+                                 compression='gzip')[...] = fin[key][key2]
+            for key2 in fin[key].attrs:
+                g.attrs[key2] = fin[key].attrs[key2]
+        else:
+            fout.create_dataset(key, fin[key].shape, dtype=fin[key].dtype,
+                                compression='gzip')[...] = fin[key]
+            for key2 in fin[key].attrs:
+                fout[key].attrs[key2] = fin[key].attrs[key2]
+    fin.close()
+
+
+def merge_stream(filenames, output_filename):
+    """
+    merges multiple hdf5 output files into one file without holding all files in memory
+
+    The result is the same as the one of `merge2`, but the files are read twice: the first pass only reads the
+    attributes, shapes and data types (and the categories of the string columns) to create the data sets of the
+    merged file, the second pass copies the data sets one by one. Hence, only one data set of one file is kept in
+    memory at a time.
+
+    Parameters
+    ----------
+    filenames: list of strings
+        the files to merge
+    output_filename: string
+        the merged file
+    """
+    attrs = OrderedDict()
+    group_attrs = OrderedDict()
+    n_events_total = 0
+    non_empty_filenames = []
+    trigger_names = {}
+    # the shape and data type of every data set (key or (group, key)) of every non-empty file
+    shapes = {}
+    dtypes = {}
+    categories = {}  # the categories of the string columns of every non-empty file
+    groups = {}  # the groups of every non-empty file
+
+    # first pass: attributes, shapes and data types
+    for f in filenames:
+        logger.info("reading the layout of file {}".format(f))
+        with h5py.File(f, 'r') as fin:
+            n_events_total += fin.attrs['n_events']
+            for key in fin.attrs:
+                if(key not in attrs):
+                    attrs[key] = fin.attrs[key]
+                elif(key not in ['trigger_names', 'n_events'] and not np.all(attrs[key] == fin.attrs[key])):
+                    logger.warning(f"attribute {key} of file {filenames[0]} and {f} are different ({attrs[key]} vs. {fin.attrs[key]}. Using attribute value of first file, but you have been warned!")
+                if((('trigger_names' not in attrs) or (len(attrs['trigger_names']) == 0)) and 'trigger_names' in fin.attrs):
+                    attrs['trigger_names'] = fin.attrs['trigger_names']
+            for key in fin:
+                if(isinstance(fin[key], h5py._hl.group.Group) and key not in group_attrs):
+                    group_attrs[key] = {key2: fin[key].attrs[key2] for key2 in fin[key].attrs}
+            if(np.sum(np.array(fin['triggered'])) == 0):
+                logger.info(f"file {f} contains no events")
+                continue
+            non_empty_filenames.append(f)
+            trigger_names[f] = []
+            if('trigger_names' in fin.attrs):
+                trigger_names[f] = trigger_masks.decode_trigger_names(fin.attrs['trigger_names'])
+            shapes[f] = OrderedDict()
+            dtypes[f] = {}
+            categories[f] = {}
+            groups[f] = []
+            for key in fin:
+                if isinstance(fin[key], h5py._hl.group.Group):
+                    groups[f].append(key)
+                    for key2 in fin[key]:
+                        shapes[f][(key, key2)] = fin[key][key2].shape
+                        dtypes[f][(key, key2)] = fin[key][key2].dtype
+                else:
+                    shapes[f][key] = fin[key].shape
+                    dtypes[f][key] = fin[key].dtype
+                    if(fin[key].dtype.kind in ['S', 'U'] or categorical.is_categorical(fin[key])):
+                        # string columns are merged as integer codes
+                        categories[f][key] = categorical.get_categories(categorical.read(fin, key))
+
+    fout = h5py.File(output_filename, 'w')
+    if(not len(non_empty_filenames)):
+        _copy_empty_file(filenames[0], fout, n_events_total)
+        fout.close()
+        return
+
+    merged_trigger_names = None
+    if('trigger_names' in attrs):
+        merged_trigger_names = trigger_masks.decode_trigger_names(attrs['trigger_names'])
+    merged_categories = {}
+    for key in categories[non_empty_filenames[0]]:
+        merged_categories[key] = categorical.merge_categories([categories[f][key] for f in non_empty_filenames if key in categories[f]])
+
+    # create the groups of the first file and the data sets that are present in all non-empty files
+    for key in groups[non_empty_filenames[0]]:
+        fout.create_group(key)
+    keys = []
+    for key, shape in shapes[non_empty_filenames[0]].items():
+        if(not np.all([key in shapes[f] for f in non_empty_filenames])):
+            logger.warning(f"not all files have the key {key}. This key will not be present in the merged file.")
+            continue
+        shape = list(shape)
+        shape[0] = np.sum([shapes[f][key][0] for f in non_empty_filenames])
+        if(key in merged_categories):
+            dtype = categorical.get_dtype(merged_categories[key])
+        else:
+            dtype = dtypes[non_empty_filenames[0]][key]
+        if(isinstance(key, tuple)):
+            fout[key[0]].create_dataset(key[1], shape, dtype=dtype, compression='gzip')
+        else:
+            fout.create_dataset(key, shape, dtype=dtype, compression='gzip')
+            if(key in merged_categories):
+                fout[key].attrs['categories'] = np.array(merged_categories[key], dtype=h5py.string_dtype())
+        keys.append(key)
+
+    # second pass: copy the data sets file by file
+    offsets = {key: 0 for key in keys}
+    for f in non_empty_filenames:
+        logger.info("adding file {}".format(f))
+        with h5py.File(f, 'r') as fin:
+            for key in keys:
+                if(isinstance(key, tuple)):
+                    values = fin[key[0]][key[1]][...]
+                    dataset = fout[key[0]][key[1]]
+                elif(key in merged_categories):
+                    values = categorical.read(fin, key)
+                    values = categorical.remap(values, categorical.get_categories(values), merged_categories[key])
+                    dataset = fout[key]
+                else:
+                    values = fin[key][...]
+                    dataset = fout[key]
+                if((key[1] if isinstance(key, tuple) else key) == 'multiple_triggers_mask' and merged_trigger_names is not None):
+                    values = trigger_masks.remap(values, trigger_names[f], merged_trigger_names)
+                dataset[offsets[key]:offsets[key] + len(values)] = values
+                offsets[key] += len(values)
+
+    for key in groups[non_empty_filenames[0]]:
+        for key2 in group_attrs[key]:
+            fout[key].attrs[key2] = group_attrs[key][key2]
+    attrs['n_events'] = n_events_total
+    for key in attrs:
+        fout.attrs[key] = attrs[key]
+    fout.close()
+
+
 if __name__ == "__main__":
     """
     merges multiple hdf5 output files into one single files.
@@ -0,0 +1,85 @@
+"""
+reproducible random number streams of single events
+
+The random numbers of an event (e.g. the shower realization of the Askaryan signal or the noise of a station) are
+drawn from a random number generator that only depends on the run seed, the event and the station, and not on the
+order in which the events are simulated. Hence, splitting the input file into several jobs, simulating only a
+subset of the events or reordering the events does not change the result of an event.
+
+The generators are derived with `numpy.random.SeedSequence`. The spawn key has a fixed length to avoid that different
+keys result in the same seed sequence.
+"""
+
+import numpy as np
+
+# the independent random number streams of an event
+streams = {'signal': 0,
+           'noise': 1,
+           'detector': 2}
+
+# the random number streams of a station that are not tied to an event (the numbers continue the event streams so
+# that both never share a spawn key)
+station_streams = {'noise_bank': 3}
+
+
+def get_seed_sequence(seed, event_id, station_id=None, interaction=1, stream='signal'):
+    """
+    returns the seed sequence of an event
+
+    Parameters
+    ----------
+    seed: int
+        the seed of the simulation run
+    event_id: int
+        the event id
+    station_id: int or None
+        the station id, None for random numbers that are shared by all stations of the event (e.g. the shower
+        realization)
+    interaction: int
+        the number of the interaction of the event (data set 'n_interaction' of the input file)
+    stream: string
+        the purpose of the random numbers, see `streams`
+
+    Returns
+    -------
+    numpy.random.SeedSequence
+    """
+    station_key = 0
+    if(station_id is not None):
+        station_key = int(station_id) + 1
+    return np.random.SeedSequence(int(seed), spawn_key=(int(event_id), int(interaction), station_key, streams[stream]))
+
+
+def get_random_state(seed, event_id, station_id=None, interaction=1, stream='signal'):
+    """
+    returns a random number generator (numpy.random.RandomState) of an event, see `get_seed_sequence`
+    """
+    return np.random.RandomState(np.random.MT19937(get_seed_sequence(seed, event_id, station_id, interaction, stream)))
+
+
+def get_seed(seed, event_id, station_id=None, interaction=1, stream='signal'):
+    """
+    returns an integer seed of an event (for modules that only accept integer seeds), see `get_seed_sequence`
+    """
+    return int(get_seed_sequence(seed, event_id, station_id, interaction, stream).generate_state(1)[0])
+
+
+def get_station_seed_sequence(seed, station_id, stream='noise_bank'):
+    """
+    returns the seed sequence of a station for random numbers that are shared by all events (e.g. the realizations of
+    the noise bank). New independent generators are obtained with `spawn`.
+
+    Parameters
+    ----------
+    seed: int
+        the seed of the simulation run
+    station_id: int
+        the station id
+    stream: string
+        the purpose of the random numbers, see `station_streams`
+
+    Returns
+    -------
+    numpy.random.SeedSequence
+    """
+    return np.random.SeedSequence(int(seed), spawn_key=(0, 0, int(station_id) + 1, station_streams[stream]))
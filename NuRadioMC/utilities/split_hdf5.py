@@ -5,6 +5,7 @@ import math
 from six import iteritems
 import numpy as np
 import h5py
+from NuRadioMC.utilities import categorical
 logger = logging.getLogger("HDF5-split")
 logging.basicConfig(level=logging.DEBUG)
 logger.setLevel(logging.WARNING)
@@ -30,6 +31,7 @@ def split_hdf5_input_file(input_filename, output_filename, number_of_events_per_
     n_groups = {}
     n_data = {}
     group_attrs = {}
+    categories = {}
 
     for key in fin:
         if isinstance(fin[key], h5py._hl.group.Group):
@@ -51,6 +53,8 @@ def split_hdf5_input_file(input_filename, output_filename, number_of_events_per_
                         logger.warning(f"attribute {key2} of group {key} of file {input_filename} are different ({group_attrs[key][key2]} vs. {fin[key].attrs[key2]}. Using attribute value of first file, but you have been warned!")
         else:
             data[key] = fin[key][...]
+            if(categorical.is_categorical(fin[key])):
+                categories[key] = categorical.get_categories(fin[key])
             if(key not in n_data):
                 n_data[key] = 0
             n_data[key] += len(data[key])
@@ -75,8 +79,10 @@ def split_hdf5_input_file(input_filename, output_filename, number_of_events_per_
         fout.attrs['n_events'] = number_of_events_per_file
 
         for key, value in data.items():
-            if value.dtype.kind == 'U':
-                fout[key] = [np.char.encode(c, 'utf8') for c in value[iFile * number_of_events_per_file:(iFile + 1) * number_of_events_per_file]]
+            if value.dtype.kind in ['U', 'S'] or key in categories:
+                # string columns are stored as integer codes
+                categorical.write(fout, key, value[iFile * number_of_events_per_file:(iFile + 1) * number_of_events_per_file],
+                                  categories=categories.get(key, None))
             else:
                 fout[key] = value[iFile * number_of_events_per_file:(iFile + 1) * number_of_events_per_file]
 
@@ -0,0 +1,262 @@
+"""
+bit-packed representation of the triggers of a NuRadioMC simulation
+
+The triggers of every event are stored as one unsigned 64 bit integer (the data set 'multiple_triggers_mask' of the
+hdf5 output), bit `i` is set if the trigger `trigger_names[i]` fired. Combinations of triggers are evaluated with a
+few bitwise operations on the masks, i.e., vectorized over all events of all files. Files with the old layout
+(bool array 'multiple_triggers' of shape (n_events, n_triggers)) are converted on reading.
+"""
+
+import numpy as np
+import h5py
+import logging
+logger = logging.getLogger("trigger_masks")
+
+# the maximum number of triggers that can be stored in one mask
+max_number_of_triggers = 64
+
+
+class trigger_registry:
+    """
+    assigns a fixed bit of the trigger masks to every trigger name
+    """
+
+    def __init__(self, trigger_names=None):
+        """
+        Parameters
+        ----------
+        trigger_names: list of strings or None
+            the trigger names that are registered up front (in this order). Triggers that are not in this list are
+            added to the registry when they are registered for the first time.
+        """
+        self._trigger_names = []
+        self._bits = {}
+        if(trigger_names is not None):
+            for trigger_name in trigger_names:
+                self.register(trigger_name)
+
+    def register(self, trigger_name):
+        """
+        returns the bit of a trigger, new triggers are added to the registry
+        """
+        if(trigger_name not in self._bits):
+            if(len(self._trigger_names) >= max_number_of_triggers):
+                raise ValueError(f"at most {max_number_of_triggers} triggers can be stored in the trigger masks, can not add trigger {trigger_name}")
+            self._bits[trigger_name] = len(self._trigger_names)
+            self._trigger_names.append(trigger_name)
+        return self._bits[trigger_name]
+
+    def get_bit(self, trigger_name):
+        return self._bits[trigger_name]
+
+    def get_trigger_names(self):
+        return list(self._trigger_names)
+
+    def __contains__(self, trigger_name):
+        return trigger_name in self._bits
+
+    def __len__(self):
+        return len(self._trigger_names)
+
+
+def pack(multiple_triggers):
+    """
+    converts the triggers of the old layout into trigger masks
+
+    Parameters
+    ----------
+    multiple_triggers: array of bools
+        shape (n_events, n_triggers)
+
+    Returns
+    -------
+    masks: array of uint64
+        shape (n_events)
+    """
+    multiple_triggers = np.asarray(multiple_triggers, dtype=bool)
+    if(multiple_triggers.shape[1] > max_number_of_triggers):
+        raise ValueError(f"at most {max_number_of_triggers} triggers can be stored in the trigger masks")
+    bits = np.left_shift(np.uint64(1), np.arange(multiple_triggers.shape[1], dtype=np.uint64))
+    return np.bitwise_or.reduce(np.where(multiple_triggers, bits, np.uint64(0)), axis=1).astype(np.uint64)
+
+
+def unpack(masks, n_triggers):
+    """
+    converts trigger masks into the old layout (array of bools of shape (n_events, n_triggers))
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    bits = np.left_shift(np.uint64(1), np.arange(n_triggers, dtype=np.uint64))
+    return (masks[:, np.newaxis] & bits) != 0
+
+
+def get_mask(trigger_names, triggers):
+    """
+    returns the mask with the bits of the `triggers` set
+
+    Parameters
+    ----------
+    trigger_names: list of strings
+        the trigger names of the masks (bit i corresponds to trigger_names[i])
+    triggers: string or list of strings
+        the triggers
+
+    Returns
+    -------
+    mask: uint64
+    """
+    if(isinstance(triggers, str)):
+        triggers = [triggers]
+    trigger_names = list(trigger_names)
+    mask = np.uint64(0)
+    for trigger in triggers:
+        if(trigger not in trigger_names):
+            raise KeyError(f"trigger {trigger} is not available, available triggers are {trigger_names}")
+        mask |= np.left_shift(np.uint64(1), np.uint64(trigger_names.index(trigger)))
+    return mask
+
+
+def evaluate(masks, trigger_names, triggers=None, triggerAND=None, notriggers=None):
+    """
+    evaluates a trigger combination
+
+    Parameters
+    ----------
+    masks: array of uint64
+        the trigger masks of the events
+    trigger_names: list of strings
+        the trigger names of the masks
+    triggers: string or list of strings or None
+        an event is triggered if any of these triggers fired. If None, all triggers are used
+    triggerAND: string or list of strings or None
+        additionally, all of these triggers need to have fired
+    notriggers: string or list of strings or None
+        additionally, none of these triggers must have fired
+
+    Returns
+    -------
+    triggered: array of bools
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    if(triggers is None):
+        triggers = trigger_names
+    triggered = (masks & get_mask(trigger_names, triggers)) != 0
+    if(triggerAND is not None):
+        mask = get_mask(trigger_names, triggerAND)
+        triggered &= (masks & mask) == mask
+    if(notriggers is not None):
+        triggered &= (masks & get_mask(trigger_names, notriggers)) == 0
+    return triggered
+
+
+def remap(masks, trigger_names, new_trigger_names):
+    """
+    converts trigger masks to another trigger name registry
+
+    Parameters
+    ----------
+    masks: array of uint64
+        the trigger masks
+    trigger_names: list of strings
+        the trigger names of the masks
+    new_trigger_names: list of strings
+        the new trigger names, needs to contain all trigger names of the masks
+
+    Returns
+    -------
+    masks: array of uint64
+    """
+    trigger_names = list(trigger_names)
+    new_trigger_names = list(new_trigger_names)
+    masks = np.asarray(masks, dtype=np.uint64)
+    if(trigger_names == new_trigger_names[:len(trigger_names)]):
+        return masks
+    new_masks = np.zeros_like(masks)
+    for iT, trigger_name in enumerate(trigger_names):
+        bit = np.uint64(new_trigger_names.index(trigger_name))
+        new_masks |= ((masks >> np.uint64(iT)) & np.uint64(1)) << bit
+    return new_masks
+
+
+def decode_trigger_names(trigger_names):
+    """
+    returns the trigger names (attribute of the hdf5 files) as list of strings
+    """
+    return [name.decode() if isinstance(name, bytes) else str(name) for name in trigger_names]
+
+
+def read(fin, station_id=None):
+    """
+    reads the trigger masks of a NuRadioMC hdf5 file (bit-packed and old layout)
+
+    Parameters
+    ----------
+    fin: h5py.File or string
+        the hdf5 file or its filename
+    station_id: int or None
+        if None, the triggers of all stations (global triggers) are returned, otherwise the ones of the station
+
+    Returns
+    -------
+    trigger_names: list of strings
+    masks: array of uint64
+    """
+    if(isinstance(fin, str)):
+        with h5py.File(fin, 'r') as f:
+            return read(f, station_id)
+    trigger_names = []
+    if('trigger_names' in fin.attrs):
+        trigger_names = decode_trigger_names(fin.attrs['trigger_names'])
+    group = fin
+    if(station_id is not None):
+        group = fin[f"station_{station_id:d}"]
+    if('multiple_triggers_mask' in group):
+        return trigger_names, np.array(group['multiple_triggers_mask'], dtype=np.uint64)
+    if('multiple_triggers' in group and len(trigger_names)):
+        return trigger_names, pack(np.array(group['multiple_triggers'])[:, :len(trigger_names)])
+    n_events = 0
+    if('triggered' in group):
+        n_events = len(group['triggered'])
+    return trigger_names, np.zeros(n_events, dtype=np.uint64)
+
+
+def query(filenames, trigger_combinations, station_id=None):
+    """
+    evaluates trigger combinations for many files
+
+    The masks of all files are converted to a common trigger name registry and the combinations are evaluated once
+    for all events.
+
+    Parameters
+    ----------
+    filenames: list of strings
+        the NuRadioMC hdf5 files
+    trigger_combinations: dict
+        keys are the names of the combinations, values are dicts with the (optional) keys 'triggers', 'triggerAND'
+        and 'notriggers', see `evaluate`
+    station_id: int or None
+        if None, the global triggers are used, otherwise the ones of the station
+
+    Returns
+    -------
+    dict with the same keys as `trigger_combinations`, the values are lists (one entry per file) of arrays of bools
+    """
+    all_trigger_names = []
+    file_trigger_names = []
+    file_masks = []
+    for filename in filenames:
+        trigger_names, masks = read(filename, station_id)
+        for trigger_name in trigger_names:
+            if(trigger_name not in all_trigger_names):
+                all_trigger_names.append(trigger_name)
+        file_trigger_names.append(trigger_names)
+        file_masks.append(masks)
+    if(len(all_trigger_names) > max_number_of_triggers):
+        raise ValueError(f"the files contain more than {max_number_of_triggers} different triggers")
+    masks = np.concatenate([remap(masks, trigger_names, all_trigger_names) for trigger_names, masks in zip(file_trigger_names, file_masks)] +
+                           [np.zeros(0, dtype=np.uint64)])
+    split_indices = np.cumsum([len(m) for m in file_masks])[:-1]
+    result = {}
+    for name, values in trigger_combinations.items():
+        triggered = evaluate(masks, all_trigger_names, values.get('triggers'), values.get('triggerAND'), values.get('notriggers'))
+        result[name] = np.split(triggered, split_indices)
+    return result